@@ -1,50 +1,66 @@
 import sys
-import pyodbc
+import threading
 from PyQt6.QtWidgets import *
-from PyQt6.QtCore import QDate, Qt, QTime
-from PyQt6.QtGui import QFont
-
-# ==================== DATABASE CONNECTION ====================
-try:
-    # conn = pyodbc.connect(
-    #     'DRIVER={ODBC Driver 17 for SQL Server};'
-    #     'SERVER=WAHEDNA;'
-    #     'DATABASE=OpthalmologyClinicDatabase;'
-    #     'Trusted_Connection=yes;'
-    # )
+from PyQt6.QtCore import QDate, QStringListModel, Qt, QTime, QTimer, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QTextCharFormat
+
+import availability
+import exports
+import notifications
+import passwords
+import ratings
+import reports
+import services
+from database import export_metrics, get_pool, metrics_report
+from query_executor import QueryExecutor
+from services import ServiceError
+from table_models import ButtonDelegate, CursorTableModel, PagedTable
+
+# ==================== HELPERS ====================
+def status_text(status_value):
+    if status_value == 2:
+        return "Rejected"
+    if status_value == 1:
+        return "Approved"
+    return "Pending"
+
+def rating_text(row):
+    # Aggregates from services.ophthalmologists(): count, sum, stars_1 ..
+    # stars_5, then the last WINDOW_DAYS' count and sum
+    count, total, recent_count, recent_total = row[0], row[1], row[7], row[8]
+    if not count:
+        return "No feedback yet"
+    text = f"\u2605 {ratings.average(count, total)} ({count})"
+    if recent_count:
+        text += f", {ratings.average(recent_count, recent_total)} last {ratings.WINDOW_DAYS} days"
+    return text
+
+def histogram_text(row):
+    # One bar per star rating, five stars first
+    count = row[0] or 0
+    lines = []
+    for stars, n in zip(reversed(ratings.STARS), reversed(row[2:7])):
+        bar = "\u2588" * round(20 * (n or 0) / count) if count else ""
+        lines.append(f"{stars}\u2605 {bar:<20} {n or 0}")
+    return "\n".join(lines)
+
+def checked(fn, *args):
+    # Worker thread: ("ok", result) or ("error", message) for a ServiceError
+    try:
+        return "ok", fn(*args)
+    except ServiceError as e:
+        return "error", str(e)
+    except passwords.Busy:
+        return "error", services.BUSY
 
-    
-    conn = pyodbc.connect(
-        r'DRIVER={ODBC Driver 17 for SQL Server};'
-        r'SERVER=DESKTOP-34G5GVS\SQLEXPRESS;'
-        r'DATABASE=OpthalmologyClinicDatabase;'
-        r'Trusted_Connection=yes;'
-    )
-    cursor = conn.cursor()
-    
-except Exception as e:
-    print(f"Database Error: Connection failed:\n{e}")
-    sys.exit()
 
-def execute_query(query, params=None, fetch=False):
-    try:
-                # Debug: Print the query and parameters
-        print(f"DEBUG - Query: {query}")
-        print(f"DEBUG - Params: {params}")
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        if fetch:
-            return cursor.fetchall()
-        conn.commit()
-        return True
-    except Exception as e:
-        print(f"Query Error: {e}") 
-        return None if fetch else False
+def money(amount):
+    return f"${amount:,.2f}"
 
 # ==================== MAIN WINDOW ====================
 class MainWindow(QMainWindow):
+    connection_failed = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Ophthalmology Clinic Management System")
@@ -53,74 +69,91 @@ class MainWindow(QMainWindow):
         self.current_patient_id = None
         self.current_ophth_id = None
 
+        # Screen loads run on background threads; see query_executor.py
+        self.executor = QueryExecutor()
+        # Table models that may hold an open cursor between fetchMore calls
+        self.cursor_models = []
+
         self.stack = QStackedWidget()
         self.setCentralWidget(self.stack)
+        self.connection_failed.connect(self.show_connection_error)
+
+        # Screens are built the first time they are shown; see SCREENS
+        self.screens = {}
+        self.go_to("initial_screen")
 
-        # Create all widgets
-        self.initial_screen = InitialScreen(self)
-        self.patient_reg = PatientRegistration(self)
-        self.ophth_reg = OphthalmologistRegistration(self)
-        self.patient_login = PatientLogin(self)
-        self.ophth_login = OphthalmologistLogin(self)
-        self.book_appointment = BookAppointment(self)
-        self.ophth_appointments = OphthalmologistAppointments(self)
-        self.appointment_history = AppointmentHistory(self)
-        self.add_record = AddUpdateRecord(self)
-        self.patient_view_record = PatientViewRecord(self)
-        self.patient_medical_history = PatientMedicalHistory(self)
-        self.ophth_medical_history = OphthalmologistMedicalHistory(self)
-        self.patient_billing = PatientBilling(self)
-        self.ophth_billing = OphthalmologistBilling(self)
-        self.patient_feedback = PatientFeedback(self)
-        self.ophth_feedback = OphthalmologistFeedback(self)
-        
-        # Create home screens
-        self.patient_home = PatientHome(self)
-        self.ophth_home = OphthalmologistHome(self)
-
-        for widget in [
-            self.initial_screen, self.patient_reg, self.ophth_reg,
-            self.patient_login, self.ophth_login, self.patient_home,
-            self.ophth_home, self.book_appointment, self.ophth_appointments,
-            self.appointment_history, self.add_record, self.patient_view_record,
-            self.patient_medical_history, self.ophth_medical_history,
-            self.patient_billing, self.ophth_billing,
-            self.patient_feedback, self.ophth_feedback
-        ]:
+    def connect_database(self):
+        # Connections come from the pool in database.py. Open the first one
+        # in the background once the window is up, so a bad server name
+        # still fails at startup without holding back the first screen.
+        threading.Thread(target=self.check_connection, daemon=True).start()
+
+    def check_connection(self):
+        try:
+            get_pool().check()
+        except Exception as e:
+            self.connection_failed.emit(str(e))
+
+    def show_connection_error(self, message):
+        print(f"Database Error: Connection failed:\n{message}")
+        QMessageBox.critical(self, "Database Error", f"Connection failed:\n{message}")
+        QApplication.instance().exit(1)
+
+    def screen(self, name):
+        widget = self.screens.get(name)
+        if widget is None:
+            widget = SCREENS[name](self)
+            self.screens[name] = widget
             self.stack.addWidget(widget)
+        return widget
 
-        self.stack.setCurrentWidget(self.initial_screen)
+    def go_to(self, name):
+        # Whatever the previous screen was still loading is no longer wanted
+        self.executor.cancel_all()
+        for model in self.cursor_models:
+            model.close_cursor()
 
-    def go_to(self, widget):
+        widget = self.screen(name)
         # Refresh data when navigating to certain screens
-        if widget == self.book_appointment:
+        if name in ("patient_reg", "ophth_reg", "patient_login", "ophth_login"):
+            widget.reset()
+        elif name == "book_appointment":
             widget.load_ophthalmologists()
-        elif widget == self.appointment_history:
+        elif name == "appointment_history":
             widget.load_appointments()
-        elif widget == self.ophth_appointments:
+        elif name == "ophth_appointments":
             widget.load_appointments()
-        elif widget == self.patient_medical_history:
+        elif name == "patient_medical_history":
             widget.load_history()
-        elif widget == self.ophth_medical_history:
-            widget.load_patients()
-        elif widget == self.patient_billing:
+        elif name == "ophth_medical_history":
+            widget.clear_patient()
+        elif name == "patient_billing":
             widget.load_bills()
-        elif widget == self.ophth_billing:
+        elif name == "ophth_billing":
             widget.load_bills()
-        elif widget == self.patient_view_record:
+        elif name == "patient_view_record":
             widget.load_record()
-        elif widget == self.ophth_feedback:
+        elif name == "ophth_feedback":
             widget.load_feedback()
-        elif widget == self.patient_feedback:
+        elif name == "patient_feedback":
             widget.load_ophthalmologists()
-        elif widget == self.add_record:
-            widget.load_patients()
+        elif name == "add_record":
+            widget.clear_patient()
+        elif name == "export_data":
+            widget.reset()
+        elif name == "ar_aging":
+            widget.load_report()
+        elif name == "record_search":
+            widget.reset()
+        elif name in ("patient_home", "ophth_home"):
+            # Figures and the unread badge in one round trip
+            widget.load_dashboard()
         self.stack.setCurrentWidget(widget)
 
     def logout(self):
         self.current_patient_id = None
         self.current_ophth_id = None
-        self.go_to(self.initial_screen)
+        self.go_to("initial_screen")
 
 # ==================== INITIAL SCREEN ====================
 class InitialScreen(QWidget):
@@ -167,15 +200,15 @@ class InitialScreen(QWidget):
 
     def signin(self):
         if self.rb_patient.isChecked():
-            self.parent.go_to(self.parent.patient_login)
+            self.parent.go_to("patient_login")
         else:
-            self.parent.go_to(self.parent.ophth_login)
+            self.parent.go_to("ophth_login")
 
     def register(self):
         if self.rb_patient.isChecked():
-            self.parent.go_to(self.parent.patient_reg)
+            self.parent.go_to("patient_reg")
         else:
-            self.parent.go_to(self.parent.ophth_reg)
+            self.parent.go_to("ophth_reg")
 
 # ==================== PATIENT REGISTRATION ====================
 class PatientRegistration(QWidget):
@@ -224,16 +257,16 @@ class PatientRegistration(QWidget):
         layout.addLayout(form)
 
         # Thinner buttons closer together
-        btn_reg = QPushButton("Register")
-        btn_reg.setFixedSize(400, 40)
-        btn_reg.clicked.connect(self.register)
-        layout.addWidget(btn_reg, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.btn_reg = QPushButton("Register")
+        self.btn_reg.setFixedSize(400, 40)
+        self.btn_reg.clicked.connect(self.register)
+        layout.addWidget(self.btn_reg, alignment=Qt.AlignmentFlag.AlignCenter)
 
         layout.addSpacing(3)
 
         btn_back = QPushButton("Back")
         btn_back.setFixedSize(400, 40)
-        btn_back.clicked.connect(lambda: parent.go_to(parent.initial_screen))
+        btn_back.clicked.connect(lambda: parent.go_to("initial_screen"))
         layout.addWidget(btn_back, alignment=Qt.AlignmentFlag.AlignCenter)
 
         self.setLayout(layout)
@@ -242,33 +275,30 @@ class PatientRegistration(QWidget):
         if self.password.text() != self.confirm.text():
             QMessageBox.warning(self, "Error", "Passwords do not match!")
             return
-        if not self.name.text() or not self.email.text() or not self.password.text():
-            QMessageBox.warning(self, "Error", "Please fill all required fields!")
-            return
         
         gender = ["Male", "Female", "Other"][self.gender_group.checkedId()]
         
-        # Password stored as integer per your schema
-        try:
-            password_int = int(self.password.text())
-        except ValueError:
-            QMessageBox.warning(self, "Error", "Password must be numeric!")
-            return
-        
-        try:
-            phone_int = int(self.phone.text()) if self.phone.text() else 0
-        except ValueError:
-            QMessageBox.warning(self, "Error", "Phone must be numeric!")
+        # Hashing the password takes a moment; keep the window responsive
+        self.btn_reg.setEnabled(False)
+        self.parent.executor.run((self, "register"), checked,
+                                 (services.register_patient, self.name.text(), gender,
+                                  self.dob.date().toString("yyyy-MM-dd"), self.email.text(), self.phone.text(),
+                                  self.password.text()),
+                                 self.registered)
+
+    def reset(self):
+        # A registration still hashing when the screen was left is dropped
+        self.btn_reg.setEnabled(True)
+
+    def registered(self, result):
+        self.btn_reg.setEnabled(True)
+        outcome, value = result or ("error", "Registration failed.")
+        if outcome == "error":
+            QMessageBox.warning(self, "Error", value)
             return
-            
-        result = execute_query(
-            "INSERT INTO Patient(name, gender, date_of_birth, email, phonenumber, password) VALUES(?,?,?,?,?,?)",
-            (self.name.text(), gender, self.dob.date().toString("yyyy-MM-dd"),
-             self.email.text(), phone_int, password_int))
         
-        if result:
-            QMessageBox.information(self, "Success", "Registration successful!")
-            self.parent.go_to(self.parent.initial_screen)
+        QMessageBox.information(self, "Success", "Registration successful!")
+        self.parent.go_to("initial_screen")
 
 # ==================== OPHTHALMOLOGIST REGISTRATION ====================
 class OphthalmologistRegistration(QWidget):
@@ -299,45 +329,40 @@ class OphthalmologistRegistration(QWidget):
         form.addRow("Password:", self.password)
         layout.addLayout(form)
 
-        btn_reg = QPushButton("Register")
-        btn_reg.setFixedSize(400, 40)
-        btn_reg.clicked.connect(self.register)
-        layout.addWidget(btn_reg, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.btn_reg = QPushButton("Register")
+        self.btn_reg.setFixedSize(400, 40)
+        self.btn_reg.clicked.connect(self.register)
+        layout.addWidget(self.btn_reg, alignment=Qt.AlignmentFlag.AlignCenter)
 
         layout.addSpacing(3)
 
         btn_back = QPushButton("Back")
         btn_back.setFixedSize(400, 40)
-        btn_back.clicked.connect(lambda: parent.go_to(parent.initial_screen))
+        btn_back.clicked.connect(lambda: parent.go_to("initial_screen"))
         layout.addWidget(btn_back, alignment=Qt.AlignmentFlag.AlignCenter)
 
         self.setLayout(layout)
 
     def register(self):
-        if not self.name.text() or not self.email.text() or not self.password.text():
-            QMessageBox.warning(self, "Error", "Please fill all required fields!")
+        self.btn_reg.setEnabled(False)
+        self.parent.executor.run((self, "register"), checked,
+                                 (services.register_ophthalmologist, self.name.text(), self.email.text(),
+                                  self.phone.text(), self.clinic.text(), self.address.text(), self.password.text()),
+                                 self.registered)
+
+    def reset(self):
+        # A registration still hashing when the screen was left is dropped
+        self.btn_reg.setEnabled(True)
+
+    def registered(self, result):
+        self.btn_reg.setEnabled(True)
+        outcome, value = result or ("error", "Registration failed.")
+        if outcome == "error":
+            QMessageBox.warning(self, "Error", value)
             return
-            
-        try:
-            password_int = int(self.password.text())
-        except ValueError:
-            QMessageBox.warning(self, "Error", "Password must be numeric!")
-            return
-        
-        try:
-            phone_int = int(self.phone.text()) if self.phone.text() else 0
-        except ValueError:
-            QMessageBox.warning(self, "Error", "Phone must be numeric!")
-            return
-            
-        result = execute_query(
-            "INSERT INTO Ophthalmologist(name, email, phonenumber, clinicname, clinicaddress, password) VALUES(?,?,?,?,?,?)",
-            (self.name.text(), self.email.text(), phone_int,
-             self.clinic.text(), self.address.text(), password_int))
         
-        if result:
-            QMessageBox.information(self, "Success", "Ophthalmologist registered!")
-            self.parent.go_to(self.parent.initial_screen)
+        QMessageBox.information(self, "Success", "Ophthalmologist registered!")
+        self.parent.go_to("initial_screen")
 
 # ==================== PATIENT LOGIN ====================
 class PatientLogin(QWidget):
@@ -358,7 +383,7 @@ class PatientLogin(QWidget):
         self.password = QLineEdit()
         self.password.setEchoMode(QLineEdit.EchoMode.Password)
         self.password.setFixedWidth(400)
-        self.password.setPlaceholderText("Enter your password (numeric)")
+        self.password.setPlaceholderText("Enter your password")
 
         layout.addWidget(QLabel("Email:"))
         layout.addWidget(self.email, alignment=Qt.AlignmentFlag.AlignCenter)
@@ -366,33 +391,41 @@ class PatientLogin(QWidget):
         layout.addWidget(self.password, alignment=Qt.AlignmentFlag.AlignCenter)
 
         # Thinner buttons closer together
-        btn_login = QPushButton("Sign In")
-        btn_login.setFixedSize(400, 40)
-        btn_login.clicked.connect(self.login)
-        layout.addWidget(btn_login, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.btn_login = QPushButton("Sign In")
+        self.btn_login.setFixedSize(400, 40)
+        self.btn_login.clicked.connect(self.login)
+        layout.addWidget(self.btn_login, alignment=Qt.AlignmentFlag.AlignCenter)
 
         layout.addSpacing(5)
 
         btn_back = QPushButton("Back")
         btn_back.setFixedSize(400, 40)
-        btn_back.clicked.connect(lambda: parent.go_to(parent.initial_screen))
+        btn_back.clicked.connect(lambda: parent.go_to("initial_screen"))
         layout.addWidget(btn_back, alignment=Qt.AlignmentFlag.AlignCenter)
         layout.addStretch()
         self.setLayout(layout)
 
     def login(self):
-        try:
-            password_int = int(self.password.text())
-        except ValueError:
-            QMessageBox.warning(self, "Error", "Password must be numeric!")
+        # The password check runs on the hashing pool (passwords.py), not here
+        self.btn_login.setEnabled(False)
+        self.parent.executor.run((self, "login"), checked,
+                                 (services.patient_login, self.email.text(), self.password.text()),
+                                 self.logged_in)
+
+    def reset(self):
+        # A sign-in still checking when the screen was left is dropped
+        self.btn_login.setEnabled(True)
+
+    def logged_in(self, result):
+        self.btn_login.setEnabled(True)
+        outcome, user_id = result or ("error", "Sign-in failed. Please try again.")
+        if outcome == "error":
+            QMessageBox.warning(self, "Error", user_id)
             return
             
-        rows = execute_query(
-            "SELECT patient_id FROM Patient WHERE RTRIM(email)=? AND password=?", 
-            (self.email.text(), password_int), fetch=True)
-        if rows:
-            self.parent.current_patient_id = rows[0][0]
-            self.parent.go_to(self.parent.patient_home)
+        if user_id:
+            self.parent.current_patient_id = user_id
+            self.parent.go_to("patient_home")
         else:
             QMessageBox.warning(self, "Error", "Invalid credentials")
 
@@ -415,47 +448,208 @@ class OphthalmologistLogin(QWidget):
         self.password = QLineEdit()
         self.password.setEchoMode(QLineEdit.EchoMode.Password)
         self.password.setFixedWidth(400)
-        self.password.setPlaceholderText("Enter your password (numeric)")
+        self.password.setPlaceholderText("Enter your password")
 
         layout.addWidget(QLabel("Email:"))
         layout.addWidget(self.email, alignment=Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(QLabel("Password:"))
         layout.addWidget(self.password, alignment=Qt.AlignmentFlag.AlignCenter)
 
-        btn_login = QPushButton("Sign In")
-        btn_login.setFixedSize(400, 40)
-        btn_login.clicked.connect(self.login)
-        layout.addWidget(btn_login, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.btn_login = QPushButton("Sign In")
+        self.btn_login.setFixedSize(400, 40)
+        self.btn_login.clicked.connect(self.login)
+        layout.addWidget(self.btn_login, alignment=Qt.AlignmentFlag.AlignCenter)
 
         layout.addSpacing(5)
 
         btn_back = QPushButton("Back")
         btn_back.setFixedSize(400, 40)
-        btn_back.clicked.connect(lambda: parent.go_to(parent.initial_screen))
+        btn_back.clicked.connect(lambda: parent.go_to("initial_screen"))
         layout.addWidget(btn_back, alignment=Qt.AlignmentFlag.AlignCenter)
         layout.addStretch()
         self.setLayout(layout)
 
     def login(self):
-        try:
-            password_int = int(self.password.text())
-        except ValueError:
-            QMessageBox.warning(self, "Error", "Password must be numeric!")
+        # The password check runs on the hashing pool (passwords.py), not here
+        self.btn_login.setEnabled(False)
+        self.parent.executor.run((self, "login"), checked,
+                                 (services.ophthalmologist_login, self.email.text(), self.password.text()),
+                                 self.logged_in)
+
+    def reset(self):
+        # A sign-in still checking when the screen was left is dropped
+        self.btn_login.setEnabled(True)
+
+    def logged_in(self, result):
+        self.btn_login.setEnabled(True)
+        outcome, user_id = result or ("error", "Sign-in failed. Please try again.")
+        if outcome == "error":
+            QMessageBox.warning(self, "Error", user_id)
             return
             
-        rows = execute_query(
-            "SELECT ophthalmologist_id FROM Ophthalmologist WHERE RTRIM(email)=? AND password=?", 
-            (self.email.text(), password_int), fetch=True)
-        
-        # Add this debug line too
-        print(f"Query returned: {rows}")
-
-        if rows:
-            self.parent.current_ophth_id = rows[0][0]
-            self.parent.go_to(self.parent.ophth_home)
+        if user_id:
+            self.parent.current_ophth_id = user_id
+            self.parent.go_to("ophth_home")
         else:
             QMessageBox.warning(self, "Error", "Invalid credentials")
 
+# ==================== NOTIFICATION BADGE ====================
+NOTIFICATION_POLL_MS = 30000
+
+class NotificationButton(QPushButton):
+    # Home screen button with the unread count; re-checked every
+    # NOTIFICATION_POLL_MS while its screen is showing
+    def __init__(self, parent, recipient_type):
+        super().__init__("Notifications")
+        self.parent = parent
+        self.recipient_type = recipient_type
+        self.setFixedSize(500, 45)
+        self.setFont(QFont("Arial", 14))
+        self.clicked.connect(self.load_notifications)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(NOTIFICATION_POLL_MS)
+
+    def recipient_id(self):
+        if self.recipient_type == notifications.PATIENT:
+            return self.parent.current_patient_id
+        return self.parent.current_ophth_id
+
+    def poll(self):
+        if self.isVisible():
+            self.load_unread()
+
+    def load_unread(self):
+        if self.recipient_id() is None:
+            return
+        self.parent.executor.run((self, "unread"), services.unread_notifications,
+                                 (self.recipient_id(), self.recipient_type), self.show_unread)
+
+    def show_unread(self, count):
+        if count is None:
+            return
+        self.setText(f"Notifications ({count})" if count else "Notifications")
+        self.setStyleSheet("font-weight: bold;" if count else "")
+
+    def load_notifications(self):
+        self.parent.executor.run((self, "list"), services.recent_notifications,
+                                 (self.recipient_id(), self.recipient_type), self.show_notifications)
+
+    def show_notifications(self, rows):
+        if rows is None:
+            return
+        if not rows:
+            QMessageBox.information(self, "Notifications", "No notifications yet.")
+            return
+        lines = []
+        for notification_id, sent_date, message, read in rows:
+            lines.append(f"{'' if read else '[New] '}{sent_date}: {message}")
+        QMessageBox.information(self, "Notifications", "\n\n".join(lines))
+        if any(not row[3] for row in rows):
+            self.parent.executor.run((self, "read"), checked,
+                                     (services.mark_notifications_read, self.recipient_id(), self.recipient_type),
+                                     self.marked_read)
+
+    def marked_read(self, result):
+        if result is None:
+            return
+        outcome, value = result
+        if outcome == "error":
+            QMessageBox.warning(self, "Error", value)
+            return
+        self.show_unread(0)
+
+# ==================== DASHBOARD PANEL ====================
+class DashboardPanel(QGroupBox):
+    # Figures and a short agenda on a home screen, filled from one
+    # services.*_dashboard call (a single database round trip)
+    def __init__(self, title, figures, agenda_title):
+        super().__init__(title)
+        self.setFixedWidth(500)
+        layout = QFormLayout(self)
+        self.values = {}
+        for key, label in figures:
+            self.values[key] = QLabel("-")
+            layout.addRow(label, self.values[key])
+        self.agenda = QLabel("-")
+        self.agenda.setWordWrap(True)
+        layout.addRow(agenda_title, self.agenda)
+
+    def show_figures(self, texts, agenda_lines):
+        for key, text in texts.items():
+            self.values[key].setText(text)
+        self.agenda.setText("\n".join(agenda_lines) if agenda_lines else "Nothing scheduled")
+
+# ==================== PATIENT SEARCH BOX ====================
+SEARCH_DEBOUNCE_MS = 250
+
+class PatientSearchBox(QLineEdit):
+    # Type-ahead patient picker. SEARCH_DEBOUNCE_MS after the last keystroke
+    # the typed prefix goes to lookup(ophth_id, prefix) on the executor and
+    # the matches drop down under the box. patient_changed carries the
+    # picked patient_id, or None once the text is edited again.
+    patient_changed = pyqtSignal(object)
+
+    def __init__(self, parent, lookup):
+        super().__init__()
+        self.parent = parent
+        self.lookup = lookup
+        self.patient_id = None
+        self.matches = {}   # popup label -> patient_id
+        self.setPlaceholderText("Type a patient name")
+
+        self.names = QStringListModel(self)
+        self.completer = QCompleter(self.names, self)
+        self.completer.setWidget(self)
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer.activated.connect(self.pick)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.timer.timeout.connect(self.run_lookup)
+        self.textEdited.connect(self.on_edited)
+
+    def reset(self):
+        self.timer.stop()
+        self.parent.executor.cancel((self, "lookup"))
+        self.clear()
+        self.matches = {}
+        self.names.setStringList([])
+        self.set_patient(None)
+
+    def focusInEvent(self, event):
+        super().focusInEvent(event)
+        # An empty box lists the first few patients straight away
+        if not self.text() and self.patient_id is None:
+            self.timer.start()
+
+    def on_edited(self, text):
+        self.set_patient(None)
+        self.timer.start()
+
+    def run_lookup(self):
+        self.parent.executor.run((self, "lookup"), self.lookup,
+                                 (self.parent.current_ophth_id, self.text()), self.show_matches)
+
+    def show_matches(self, rows):
+        if rows is None:
+            return
+        # Labels carry the id so patients with the same name can be told apart
+        self.matches = {f"{name} (#{patient_id})": patient_id for patient_id, name in rows}
+        self.names.setStringList(list(self.matches))
+        if rows and self.hasFocus():
+            self.completer.complete()
+
+    def pick(self, label):
+        self.setText(label)
+        self.set_patient(self.matches.get(label))
+
+    def set_patient(self, patient_id):
+        if patient_id != self.patient_id:
+            self.patient_id = patient_id
+            self.patient_changed.emit(patient_id)
+
 # ==================== PATIENT HOME ====================
 class PatientHome(QWidget):
     def __init__(self, parent):
@@ -468,15 +662,20 @@ class PatientHome(QWidget):
         title = QLabel("Welcome Patient")
         title.setFont(QFont("Arial", 20))
         layout.addWidget(title, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        self.dashboard = DashboardPanel("Overview", [("pending", "Pending requests:"),
+                                                     ("balance", "Outstanding balance:")],
+                                        "Coming week:")
+        layout.addWidget(self.dashboard, alignment=Qt.AlignmentFlag.AlignCenter)
         layout.addStretch()
 
         buttons = [
-            ("Book Appointment", parent.book_appointment),
-            ("Appointment History", parent.appointment_history),
-            ("View Medical Record", parent.patient_view_record),
-            ("Medical History", parent.patient_medical_history),
-            ("View Bills", parent.patient_billing),
-            ("Give Feedback", parent.patient_feedback),
+            ("Book Appointment", "book_appointment"),
+            ("Appointment History", "appointment_history"),
+            ("View Medical Record", "patient_view_record"),
+            ("Medical History", "patient_medical_history"),
+            ("View Bills", "patient_billing"),
+            ("Give Feedback", "patient_feedback"),
         ]
 
         for text, screen in buttons:
@@ -486,6 +685,9 @@ class PatientHome(QWidget):
             btn.clicked.connect(lambda checked, s=screen: parent.go_to(s))
             layout.addWidget(btn, alignment=Qt.AlignmentFlag.AlignCenter)
 
+        self.notifications = NotificationButton(parent, notifications.PATIENT)
+        layout.addWidget(self.notifications, alignment=Qt.AlignmentFlag.AlignCenter)
+
         logout = QPushButton("Logout")
         logout.setFixedSize(500, 45)
         logout.clicked.connect(parent.logout)
@@ -493,6 +695,19 @@ class PatientHome(QWidget):
         layout.addStretch()
         self.setLayout(layout)
 
+    def load_dashboard(self):
+        self.parent.executor.run((self, "dashboard"), services.patient_dashboard,
+                                 (self.parent.current_patient_id,), self.show_dashboard)
+
+    def show_dashboard(self, data):
+        if data is None:
+            return
+        self.dashboard.show_figures(
+            {"pending": str(data["pending"]), "balance": f"${data['balance']:.2f}"},
+            [f"{when:%a %d %b %I:%M %p}  {name} ({status_text(status)})"
+             for when, name, status in data["agenda"]])
+        self.notifications.show_unread(data["unread"])
+
 # ==================== OPHTHALMOLOGIST HOME ====================
 class OphthalmologistHome(QWidget):
     def __init__(self, parent):
@@ -505,14 +720,22 @@ class OphthalmologistHome(QWidget):
         title = QLabel("Welcome Ophthalmologist")
         title.setFont(QFont("Arial", 20))
         layout.addWidget(title, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        self.dashboard = DashboardPanel("Today", [("pending", "Pending requests:"),
+                                                  ("balance", "Outstanding bills:"),
+                                                  ("rating", "Average rating:")],
+                                        "Agenda:")
+        layout.addWidget(self.dashboard, alignment=Qt.AlignmentFlag.AlignCenter)
         layout.addStretch()
 
         buttons = [
-            ("Upcoming Appointments", parent.ophth_appointments),
-            ("Add/Update Record", parent.add_record),
-            ("View Medical History", parent.ophth_medical_history),
-            ("Billing", parent.ophth_billing),
-            ("View Feedback", parent.ophth_feedback),
+            ("Upcoming Appointments", "ophth_appointments"),
+            ("Add/Update Record", "add_record"),
+            ("View Medical History", "ophth_medical_history"),
+            ("Search Records", "record_search"),
+            ("Billing", "ophth_billing"),
+            ("View Feedback", "ophth_feedback"),
+            ("Export Data", "export_data"),
         ]
 
         for text, screen in buttons:
@@ -522,6 +745,9 @@ class OphthalmologistHome(QWidget):
             btn.clicked.connect(lambda checked, s=screen: parent.go_to(s))
             layout.addWidget(btn, alignment=Qt.AlignmentFlag.AlignCenter)
 
+        self.notifications = NotificationButton(parent, notifications.OPHTHALMOLOGIST)
+        layout.addWidget(self.notifications, alignment=Qt.AlignmentFlag.AlignCenter)
+
         logout = QPushButton("Logout")
         logout.setFixedSize(500, 45)
         logout.clicked.connect(parent.logout)
@@ -529,12 +755,26 @@ class OphthalmologistHome(QWidget):
         layout.addStretch()
         self.setLayout(layout)
 
+    def load_dashboard(self):
+        self.parent.executor.run((self, "dashboard"), services.ophthalmologist_dashboard,
+                                 (self.parent.current_ophth_id,), self.show_dashboard)
+
+    def show_dashboard(self, data):
+        if data is None:
+            return
+        rating = f"{data['rating']:.1f} / 5 ({data['ratings']} reviews)" if data["ratings"] else "No feedback yet"
+        self.dashboard.show_figures(
+            {"pending": str(data["pending"]), "balance": f"${data['balance']:.2f}", "rating": rating},
+            [f"{when:%I:%M %p}  {name} ({status_text(status)})" for when, name, status in data["agenda"]])
+        self.notifications.show_unread(data["unread"])
+
 # ==================== BOOK APPOINTMENT ====================
 class BookAppointment(QWidget):
     def __init__(self, parent):
         super().__init__()
         self.parent = parent
         self.ophth_ids = []
+        self.ophth_ratings = []
         layout = QVBoxLayout()
         layout.addStretch()
         
@@ -547,18 +787,27 @@ class BookAppointment(QWidget):
         
         self.ophth_combo = QComboBox()
         self.ophth_combo.setFixedWidth(400)
+        self.ophth_combo.currentIndexChanged.connect(lambda: self.load_availability())
+        self.ophth_combo.currentIndexChanged.connect(self.show_rating)
         layout.addWidget(self.ophth_combo, alignment=Qt.AlignmentFlag.AlignCenter)
         
+        # Star histogram of the selected ophthalmologist
+        self.rating_label = QLabel()
+        self.rating_label.setFont(QFont("Courier New", 9))
+        layout.addWidget(self.rating_label, alignment=Qt.AlignmentFlag.AlignCenter)
+        
         layout.addWidget(QLabel("Date:"), alignment=Qt.AlignmentFlag.AlignCenter)
         
         self.calendar = QCalendarWidget()
         self.calendar.setMinimumDate(QDate.currentDate())
+        self.calendar.selectionChanged.connect(self.show_slots)
         layout.addWidget(self.calendar, alignment=Qt.AlignmentFlag.AlignCenter)
         
         layout.addWidget(QLabel("Time:"), alignment=Qt.AlignmentFlag.AlignCenter)
         
+        # Only the free slots of the selected day; item data is the slot index
+        self.free = {}
         self.time = QComboBox()
-        self.time.addItems(["10:00 AM", "11:00 AM", "12:00 PM", "01:00 PM", "02:00 PM", "03:00 PM", "04:00 PM", "05:00 PM"])
         self.time.setFixedWidth(400)
         layout.addWidget(self.time, alignment=Qt.AlignmentFlag.AlignCenter)
         
@@ -571,7 +820,7 @@ class BookAppointment(QWidget):
         
         back = QPushButton("Back")
         back.setFixedSize(400, 40)
-        back.clicked.connect(lambda: parent.go_to(parent.patient_home))
+        back.clicked.connect(lambda: parent.go_to("patient_home"))
         layout.addWidget(back, alignment=Qt.AlignmentFlag.AlignCenter)
         layout.addStretch()
         self.setLayout(layout)
@@ -579,108 +828,144 @@ class BookAppointment(QWidget):
     def load_ophthalmologists(self):
         self.ophth_combo.clear()
         self.ophth_ids = []
-        rows = execute_query("SELECT ophthalmologist_id, RTRIM(name), RTRIM(clinicname) FROM Ophthalmologist", fetch=True)
+        self.ophth_ratings = []
+        self.ophth_combo.setPlaceholderText("Loading...")
+        self.parent.executor.run((self, "ophthalmologists"), services.ophthalmologists, (),
+                                 self.show_ophthalmologists)
+
+    def show_ophthalmologists(self, rows):
+        self.ophth_combo.setPlaceholderText("")
         if rows:
             for row in rows:
                 self.ophth_ids.append(row[0])
-                self.ophth_combo.addItem(f"{row[1]} - {row[2]}")
+                self.ophth_ratings.append(row[3:])
+                self.ophth_combo.addItem(f"{row[1]} - {row[2]}  {rating_text(row[3:])}")
+        self.show_rating()
+
+    def show_rating(self):
+        index = self.ophth_combo.currentIndex()
+        if 0 <= index < len(self.ophth_ratings) and self.ophth_ratings[index][0]:
+            self.rating_label.setText(histogram_text(self.ophth_ratings[index]))
+        else:
+            self.rating_label.setText("")
     
+    def load_availability(self, start=None):
+        # Free slots for the selected ophthalmologist, AVAILABILITY_DAYS from start
+        self.free = {}
+        self.time.clear()
+        if not self.ophth_ids or self.ophth_combo.currentIndex() < 0:
+            return
+        if start is None:
+            start = self.calendar.selectedDate().toPyDate()
+        self.time.setPlaceholderText("Loading...")
+        ophth_id = self.ophth_ids[self.ophth_combo.currentIndex()]
+        self.parent.executor.run((self, "availability"), services.free_slots,
+                                 (ophth_id, start), self.show_availability)
+
+    def show_availability(self, free):
+        self.calendar.setDateTextFormat(QDate(), QTextCharFormat())
+        if free is None:
+            self.time.setPlaceholderText("Availability unavailable")
+            return
+        self.free = free
+        booked_out = QTextCharFormat()
+        booked_out.setForeground(QColor("gray"))
+        for day, slots in free.items():
+            if not slots:
+                self.calendar.setDateTextFormat(QDate(day), booked_out)
+        self.show_slots()
+
+    def show_slots(self):
+        day = self.calendar.selectedDate().toPyDate()
+        if day not in self.free:
+            # Picked a day past the loaded window
+            self.load_availability(day)
+            return
+        self.time.clear()
+        for index in self.free[day]:
+            self.time.addItem(availability.slot_label(index), index)
+        self.time.setPlaceholderText("" if self.free[day] else "No free slots")
+
     def book_appointment(self):
         if not self.ophth_ids:
             QMessageBox.warning(self, "Error", "No ophthalmologist selected!")
             return
+        index = self.time.currentData()
+        if index is None:
+            QMessageBox.warning(self, "Error", "Please select a free time slot!")
+            return
             
         ophth_id = self.ophth_ids[self.ophth_combo.currentIndex()]
-        date = self.calendar.selectedDate().toString("yyyy-MM-dd")
+        day = self.calendar.selectedDate().toPyDate()
         
-        # Convert time to datetime format
-        time_text = self.time.currentText()
-        time_map = {
-            "10:00 AM": "10:00:00", "11:00 AM": "11:00:00", "12:00 PM": "12:00:00",
-            "01:00 PM": "13:00:00", "02:00 PM": "14:00:00", "03:00 PM": "15:00:00",
-            "04:00 PM": "16:00:00", "05:00 PM": "17:00:00"
-        }
-        time_value = f"{date} {time_map.get(time_text, '10:00:00')}"
-        
-        result = execute_query(
-            "INSERT INTO Appointment(patient_id, ophthalmologist_id, appointment_date, appointment_time, appointment_status) VALUES(?,?,?,?,?)",
-            (self.parent.current_patient_id, ophth_id, date, time_value, 0))
+        try:
+            services.book_appointment(self.parent.current_patient_id, ophth_id, day, index)
+        except services.SlotTaken:
+            QMessageBox.warning(self, "Error", "That slot was just booked by someone else. Please pick another time.")
+            self.load_availability()
+            return
+        except ServiceError as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
         
-        if result:
-            QMessageBox.information(self, "Success", "Appointment booked successfully!")
-            self.parent.go_to(self.parent.patient_home)
+        QMessageBox.information(self, "Success", "Appointment booked successfully!")
+        self.parent.go_to("patient_home")
 
 # ==================== APPOINTMENT HISTORY ====================
 class AppointmentHistory(QWidget):
     def __init__(self, parent):
         super().__init__()
         self.parent = parent
-        self.appointment_ids = []
         layout = QVBoxLayout()
         
         title = QLabel("Appointment History")
         title.setFont(QFont("Arial", 18))
         layout.addWidget(title, alignment=Qt.AlignmentFlag.AlignCenter)
         
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
         # Changed "Doctor" to "Ophthalmologist"
-        self.table.setHorizontalHeaderLabels(["Date", "Time", "Ophthalmologist", "Status", "Action"])
+        # Rows: appointment_id, date, time, ophthalmologist, status
+        self.paged = PagedTable(parent, services.pager("patient_appointments"),
+            ["Date", "Time", "Ophthalmologist", "Status", "Action"],
+            [lambda r: str(r[1]),
+             lambda r: r[2].strftime("%H:%M") if r[2] else "",
+             lambda r: str(r[3]),
+             lambda r: status_text(r[4]),
+             lambda r: ""])
+        self.model = self.paged.model
+        self.table = self.paged.table
+        self.actions = ButtonDelegate(lambda r: ["Cancel"], self.table)
+        self.actions.clicked.connect(self.on_action)
+        self.table.setItemDelegateForColumn(4, self.actions)
         self.table.setFixedSize(700, 400)
-        self.table.horizontalHeader().setStretchLastSection(True)
-        layout.addWidget(self.table, alignment=Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.paged, alignment=Qt.AlignmentFlag.AlignCenter)
         
         layout.addSpacing(5)
         
         back = QPushButton("Back")
         back.setFixedSize(400, 40)
-        back.clicked.connect(lambda: parent.go_to(parent.patient_home))
+        back.clicked.connect(lambda: parent.go_to("patient_home"))
         layout.addWidget(back, alignment=Qt.AlignmentFlag.AlignCenter)
         layout.addStretch()
         self.setLayout(layout)
     
     def load_appointments(self):
-        self.table.setRowCount(0)
-        self.appointment_ids = []
-        
-        rows = execute_query("""
-            SELECT a.appointment_id, a.appointment_date, a.appointment_time, 
-                   RTRIM(o.name), a.appointment_status
-            FROM Appointment a
-            JOIN Ophthalmologist o ON a.ophthalmologist_id = o.ophthalmologist_id
-            WHERE a.patient_id = ?
-            ORDER BY a.appointment_date DESC
-        """, (self.parent.current_patient_id,), fetch=True)
-        
-        if rows:
-            self.table.setRowCount(len(rows))
-            for i, row in enumerate(rows):
-                self.appointment_ids.append(row[0])
-                self.table.setItem(i, 0, QTableWidgetItem(str(row[1])))
-                self.table.setItem(i, 1, QTableWidgetItem(str(row[2].strftime("%H:%M") if row[2] else "")))
-                self.table.setItem(i, 2, QTableWidgetItem(str(row[3])))
-               
-                status_value = row[4]     # status = "Confirmed" if row[4] else "Pending"
-                if status_value == 2:
-                    status = "Rejected"
-                elif status_value == 1:
-                    status = "Approved"
-                else:
-                    status = "Pending"
-                
-                self.table.setItem(i, 3, QTableWidgetItem(status))
-                
-                # Cancel button
-                cancel_btn = QPushButton("Cancel")
-                cancel_btn.clicked.connect(lambda checked, aid=row[0]: self.cancel_appointment(aid))
-                self.table.setCellWidget(i, 4, cancel_btn)
+        self.paged.load((self.parent.current_patient_id,))
+
+    def on_action(self, row, label):
+        # Finish reading the page before writing so the open read can't
+        # block the update (and the page can be refreshed afterwards)
+        self.model.fetch_all()
+        self.cancel_appointment(self.model.row(row)[0])
     
     def cancel_appointment(self, appointment_id):
         reply = QMessageBox.question(self, "Confirm", "Cancel this appointment?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            execute_query("DELETE FROM Appointment WHERE appointment_id = ?", (appointment_id,))
-            self.load_appointments()
+            try:
+                services.cancel_appointment(appointment_id)
+            except ServiceError as e:
+                QMessageBox.warning(self, "Error", str(e))
+            self.paged.refresh()
 
 # ==================== PATIENT VIEW RECORD ====================
 class PatientViewRecord(QWidget):
@@ -725,20 +1010,16 @@ class PatientViewRecord(QWidget):
         
         back = QPushButton("Back")
         back.setFixedSize(400, 40)
-        back.clicked.connect(lambda: parent.go_to(parent.patient_home))
+        back.clicked.connect(lambda: parent.go_to("patient_home"))
         layout.addWidget(back, alignment=Qt.AlignmentFlag.AlignCenter)
         self.setLayout(layout)
     
     def load_record(self):
-        rows = execute_query("""
-            SELECT TOP 1 pr.record_date, RTRIM(o.name), RTRIM(pr.diagnosis), 
-                   pr.treatment_details, RTRIM(pr.prescription)
-            FROM Patient_Record pr
-            JOIN Ophthalmologist o ON pr.ophthalmologist_id = o.ophthalmologist_id
-            WHERE pr.patient_id = ?
-            ORDER BY pr.record_date DESC
-        """, (self.parent.current_patient_id,), fetch=True)
-        
+        self.diagnosis.setText("Loading...")
+        self.parent.executor.run((self, "record"), services.latest_record,
+                                 (self.parent.current_patient_id,), self.show_record)
+
+    def show_record(self, rows):
         if rows:
             row = rows[0]
             self.date_label.setText(str(row[0]))
@@ -764,143 +1045,126 @@ class PatientMedicalHistory(QWidget):
         title.setFont(QFont("Arial", 18))
         layout.addWidget(title, alignment=Qt.AlignmentFlag.AlignCenter)
         
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["Date", "Ophthalmologist", "Diagnosis", "Treatment", "Prescription"])
+        self.paged = PagedTable(parent, services.pager("patient_records"),
+            ["Date", "Ophthalmologist", "Diagnosis", "Treatment", "Prescription"],
+            [lambda r: str(r[0]),
+             lambda r: str(r[1]),
+             lambda r: str(r[2]) if r[2] else "",
+             lambda r: str(r[3]) if r[3] else "",
+             lambda r: str(r[4]) if r[4] else ""])
+        self.table = self.paged.table
         self.table.setFixedSize(750, 400)
-        self.table.horizontalHeader().setStretchLastSection(True)
-        layout.addWidget(self.table, alignment=Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.paged, alignment=Qt.AlignmentFlag.AlignCenter)
         
         layout.addSpacing(5)
         
         back = QPushButton("Back")
         back.setFixedSize(400, 40)
-        back.clicked.connect(lambda: parent.go_to(parent.patient_home))
+        back.clicked.connect(lambda: parent.go_to("patient_home"))
         layout.addWidget(back, alignment=Qt.AlignmentFlag.AlignCenter)
         layout.addStretch()
         self.setLayout(layout)
     
     def load_history(self):
-        self.table.setRowCount(0)
-        
-        rows = execute_query("""
-            SELECT pr.record_date, RTRIM(o.name), RTRIM(pr.diagnosis), 
-                   pr.treatment_details, RTRIM(pr.prescription)
-            FROM Patient_Record pr
-            JOIN Ophthalmologist o ON pr.ophthalmologist_id = o.ophthalmologist_id
-            WHERE pr.patient_id = ?
-            ORDER BY pr.record_date DESC
-        """, (self.parent.current_patient_id,), fetch=True)
-        
-        if rows:
-            self.table.setRowCount(len(rows))
-            for i, row in enumerate(rows):
-                self.table.setItem(i, 0, QTableWidgetItem(str(row[0])))
-                self.table.setItem(i, 1, QTableWidgetItem(str(row[1])))
-                self.table.setItem(i, 2, QTableWidgetItem(str(row[2]) if row[2] else ""))
-                self.table.setItem(i, 3, QTableWidgetItem(str(row[3]) if row[3] else ""))
-                self.table.setItem(i, 4, QTableWidgetItem(str(row[4]) if row[4] else ""))
+        self.paged.load((self.parent.current_patient_id,))
 
 # ==================== OPHTHALMOLOGIST APPOINTMENTS ====================
+QUEUE_REFRESH_MS = 10000
+
 class OphthalmologistAppointments(QWidget):
     def __init__(self, parent):
         super().__init__()
         self.parent = parent
-        self.appointment_ids = []
         layout = QVBoxLayout()
         
         title = QLabel("Upcoming Appointments")
         title.setFont(QFont("Arial", 18))
         layout.addWidget(title, alignment=Qt.AlignmentFlag.AlignCenter)
         
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["Patient", "Date", "Time", "Status", "Action"])
+        # Rows: appointment_id, patient, date, time, status
+        self.paged = PagedTable(parent, services.pager("ophthalmologist_appointments"),
+            ["Patient", "Date", "Time", "Status", "Action"],
+            [lambda r: str(r[1]),
+             lambda r: str(r[2]),
+             lambda r: r[3].strftime("%H:%M") if r[3] else "",
+             lambda r: status_text(r[4]),
+             lambda r: status_text(r[4])])
+        self.model = self.paged.model
+        self.table = self.paged.table
+        # Pending requests get Approve/Reject buttons, the rest show their status
+        self.actions = ButtonDelegate(
+            lambda r: ["Approve", "Reject"] if r[4] == 0 else [], self.table)
+        self.actions.clicked.connect(self.on_action)
+        self.table.setItemDelegateForColumn(4, self.actions)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.table.setFixedSize(700, 400)
-        self.table.horizontalHeader().setStretchLastSection(True)
-        layout.addWidget(self.table, alignment=Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.paged, alignment=Qt.AlignmentFlag.AlignCenter)
+        
+        # Bulk actions on the selected rows (Ctrl/Shift-click to select)
+        bulk = QHBoxLayout()
+        approve_btn = QPushButton("Approve Selected")
+        approve_btn.setFixedSize(195, 40)
+        approve_btn.clicked.connect(lambda: self.update_selected(services.APPROVED))
+        reject_btn = QPushButton("Reject Selected")
+        reject_btn.setFixedSize(195, 40)
+        reject_btn.clicked.connect(lambda: self.update_selected(services.REJECTED))
+        bulk.addStretch()
+        bulk.addWidget(approve_btn)
+        bulk.addSpacing(10)
+        bulk.addWidget(reject_btn)
+        bulk.addStretch()
+        layout.addLayout(bulk)
         
         layout.addSpacing(5)
         
         back = QPushButton("Back")
         back.setFixedSize(400, 40)
-        back.clicked.connect(lambda: parent.go_to(parent.ophth_home))
+        back.clicked.connect(lambda: parent.go_to("ophth_home"))
         layout.addWidget(back, alignment=Qt.AlignmentFlag.AlignCenter)
         
         layout.addStretch()
         self.setLayout(layout)
 
-    def load_appointments(self):
-        self.table.setRowCount(0)
-        self.appointment_ids = []
-        
-        rows = execute_query("""
-            SELECT a.appointment_id, RTRIM(p.name), a.appointment_date, 
-                   a.appointment_time, a.appointment_status
-            FROM Appointment a
-            JOIN Patient p ON a.patient_id = p.patient_id
-            WHERE a.ophthalmologist_id = ?
-            ORDER BY a.appointment_date ASC
-        """, (self.parent.current_ophth_id,), fetch=True)
-        
-        if not rows:
-            return
-        
-        self.table.setRowCount(len(rows))
-
-        for i, row in enumerate(rows):
-            appointment_id = row[0]
-            status_value = row[4]
+        # New bookings and cancellations show up while the queue is open;
+        # a refresh only fetches what changed, so it can run often
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_queue)
+        self.refresh_timer.start(QUEUE_REFRESH_MS)
 
-            self.table.setItem(i, 0, QTableWidgetItem(str(row[1])))
-            self.table.setItem(i, 1, QTableWidgetItem(str(row[2])))
-            self.table.setItem(i, 2, QTableWidgetItem(row[3].strftime("%H:%M") if row[3] else ""))
-
-            if status_value == 2:
-                status = "Rejected"
-            elif status_value == 0:
-                status = "Pending"
-            else:
-                status = "Approved"
-
-            self.table.setItem(i, 3, QTableWidgetItem(status))
+    def load_appointments(self):
+        self.paged.load((self.parent.current_ophth_id,))
 
-            if status_value == 0:
-                action_widget = QWidget()
-                layout_buttons = QHBoxLayout(action_widget)
-                layout_buttons.setContentsMargins(0, 0, 0, 0)
-                layout_buttons.setSpacing(5)
+    def refresh_queue(self):
+        if self.isVisible() and self.paged.can_refresh():
+            self.paged.refresh()
 
-                approve_btn = QPushButton("Approve")
-                reject_btn = QPushButton("Reject")
-            
-                approve_btn.clicked.connect(
-                    lambda checked, aid=appointment_id: self.approve_appointment(aid)
-                )
-                reject_btn.clicked.connect(
-                    lambda checked, aid=appointment_id: self.reject_appointment(aid)
-                )
-
-                layout_buttons.addWidget(approve_btn)
-                layout_buttons.addWidget(reject_btn)
-                self.table.setCellWidget(i, 4, action_widget)
-            else:
-                self.table.setItem(i, 4, QTableWidgetItem(status))
+    def on_action(self, row, label):
+        self.update_statuses([row], services.APPROVED if label == "Approve" else services.REJECTED)
 
-    
-    def approve_appointment(self, appointment_id):
-        execute_query(
-            "UPDATE Appointment SET appointment_status = 1 WHERE appointment_id = ?",
-            (appointment_id,)
-        )
-        self.load_appointments()
+    def update_selected(self, status):
+        rows = sorted(index.row() for index in self.table.selectionModel().selectedRows())
+        rows = [i for i in rows if self.model.row(i)[4] == 0]
+        if not rows:
+            QMessageBox.warning(self, "Error", "Please select one or more pending appointments!")
+            return
+        self.update_statuses(rows, status)
 
-    def reject_appointment(self, appointment_id):
-        execute_query(
-            "UPDATE Appointment SET appointment_status = 2 WHERE appointment_id = ?",
-            (appointment_id,)
-        )
-        self.load_appointments()
+    def update_statuses(self, rows, status):
+        # Finish reading the page first so the open read can't block the update
+        self.model.fetch_all()
+        try:
+            changed = services.set_appointment_status([self.model.row(i)[0] for i in rows], status)
+        except ServiceError as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
+        # Only the rows that changed are redrawn; the rest of the page stays
+        changed = set(changed)
+        for i in rows:
+            row = self.model.row(i)
+            if row[0] in changed:
+                self.model.set_row(i, tuple(row[:4]) + (status,) + tuple(row[5:]))
+        self.table.clearSelection()
 
 
 # ==================== ADD/UPDATE RECORD ====================
@@ -908,7 +1172,6 @@ class AddUpdateRecord(QWidget):
     def __init__(self, parent):
         super().__init__()
         self.parent = parent
-        self.patient_ids = []
         self.appointment_ids = []
         layout = QVBoxLayout()
         layout.setContentsMargins(50, 30, 50, 30)
@@ -919,9 +1182,10 @@ class AddUpdateRecord(QWidget):
         
         form = QFormLayout()
         
-        self.patient_combo = QComboBox()
-        self.patient_combo.setFixedWidth(400)
-        self.patient_combo.currentIndexChanged.connect(self.load_appointments_for_patient)
+        # Patients with an appointment with this ophthalmologist
+        self.patient_search = PatientSearchBox(parent, services.ophthalmologist_patients)
+        self.patient_search.setFixedWidth(400)
+        self.patient_search.patient_changed.connect(self.load_appointments_for_patient)
         
         self.appointment_combo = QComboBox()
         self.appointment_combo.setFixedWidth(400)
@@ -935,7 +1199,7 @@ class AddUpdateRecord(QWidget):
         self.prescription = QTextEdit()
         self.prescription.setFixedHeight(100)
         
-        form.addRow("Patient:", self.patient_combo)
+        form.addRow("Patient:", self.patient_search)
         form.addRow("Appointment:", self.appointment_combo)
         form.addRow("Diagnosis:", self.diagnosis)
         form.addRow("Treatment Plan:", self.treatment)
@@ -950,77 +1214,63 @@ class AddUpdateRecord(QWidget):
         
         back = QPushButton("Back")
         back.setFixedSize(180, 40)
-        back.clicked.connect(lambda: parent.go_to(parent.ophth_home))
+        back.clicked.connect(lambda: parent.go_to("ophth_home"))
         btn_layout.addWidget(back)
         layout.addLayout(btn_layout)
         
         self.setLayout(layout)
     
-    def load_patients(self):
-        self.patient_combo.clear()
-        self.patient_ids = []
-        
-        # Get patients who have appointments with this ophthalmologist
-        rows = execute_query("""
-            SELECT DISTINCT p.patient_id, RTRIM(p.name)
-            FROM Patient p
-            JOIN Appointment a ON p.patient_id = a.patient_id
-            WHERE a.ophthalmologist_id = ?
-        """, (self.parent.current_ophth_id,), fetch=True)
-        
-        if rows:
-            for row in rows:
-                self.patient_ids.append(row[0])
-                self.patient_combo.addItem(str(row[1]))
+    def clear_patient(self):
+        self.patient_search.reset()
     
-    def load_appointments_for_patient(self):
+    def load_appointments_for_patient(self, patient_id):
+        # Only the picked patient's appointments are fetched
         self.appointment_combo.clear()
         self.appointment_ids = []
+        self.appointment_combo.setPlaceholderText("")
         
-        if not self.patient_ids or self.patient_combo.currentIndex() < 0:
+        if patient_id is None:
+            self.parent.executor.cancel((self, "appointments"))
             return
             
-        patient_id = self.patient_ids[self.patient_combo.currentIndex()]
-        
-        rows = execute_query("""
-            SELECT appointment_id, appointment_date
-            FROM Appointment
-            WHERE patient_id = ? AND ophthalmologist_id = ?
-            ORDER BY appointment_date DESC
-        """, (patient_id, self.parent.current_ophth_id), fetch=True)
+        self.appointment_combo.setPlaceholderText("Loading...")
         
+        self.parent.executor.run((self, "appointments"), services.patient_appointments,
+                                 (patient_id, self.parent.current_ophth_id), self.show_appointments)
+
+    def show_appointments(self, rows):
+        self.appointment_combo.setPlaceholderText("")
         if rows:
             for row in rows:
                 self.appointment_ids.append(row[0])
                 self.appointment_combo.addItem(str(row[1]))
     
     def save_record(self):
-        if not self.patient_ids or not self.appointment_ids:
+        patient_id = self.patient_search.patient_id
+        if patient_id is None or not self.appointment_ids:
             QMessageBox.warning(self, "Error", "Please select patient and appointment!")
             return
             
-        patient_id = self.patient_ids[self.patient_combo.currentIndex()]
         appointment_id = self.appointment_ids[self.appointment_combo.currentIndex()]
         
-        result = execute_query("""
-            INSERT INTO Patient_Record(patient_id, ophthalmologist_id, appointment_id, 
-                                       record_date, diagnosis, prescription, treatment_details)
-            VALUES(?,?,?,GETDATE(),?,?,?)
-        """, (patient_id, self.parent.current_ophth_id, appointment_id,
-              self.diagnosis.text(), self.prescription.toPlainText(), self.treatment.toPlainText()))
+        try:
+            services.save_record(patient_id, self.parent.current_ophth_id, appointment_id,
+                                 self.diagnosis.text(), self.prescription.toPlainText(),
+                                 self.treatment.toPlainText())
+        except ServiceError as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
         
-        if result:
-            QMessageBox.information(self, "Success", "Record saved successfully!")
-            self.diagnosis.clear()
-            self.treatment.clear()
-            self.prescription.clear()
+        QMessageBox.information(self, "Success", "Record saved successfully!")
+        self.diagnosis.clear()
+        self.treatment.clear()
+        self.prescription.clear()
 
 # ==================== OPHTHALMOLOGIST MEDICAL HISTORY ====================
 class OphthalmologistMedicalHistory(QWidget):
     def __init__(self, parent):
         super().__init__()
         self.parent = parent
-        self.patient_ids = []
         layout = QVBoxLayout()
         
         title = QLabel("Patient Medical History")
@@ -1029,65 +1279,252 @@ class OphthalmologistMedicalHistory(QWidget):
         
         layout.addWidget(QLabel("Select Patient:"), alignment=Qt.AlignmentFlag.AlignCenter)
         
-        self.patient_combo = QComboBox()
-        self.patient_combo.setFixedWidth(400)
-        self.patient_combo.currentIndexChanged.connect(self.load_history)
-        layout.addWidget(self.patient_combo, alignment=Qt.AlignmentFlag.AlignCenter)
-        
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["Date", "Diagnosis", "Treatment", "Prescription"])
+        # Patients with a record written by this ophthalmologist
+        self.patient_search = PatientSearchBox(parent, services.record_patients)
+        self.patient_search.setFixedWidth(400)
+        self.patient_search.patient_changed.connect(self.load_history)
+        layout.addWidget(self.patient_search, alignment=Qt.AlignmentFlag.AlignCenter)
+        
+        self.paged = PagedTable(parent, services.pager("patient_records_by_ophthalmologist"),
+            ["Date", "Diagnosis", "Treatment", "Prescription"],
+            [lambda r: str(r[0]),
+             lambda r: str(r[1]) if r[1] else "",
+             lambda r: str(r[2]) if r[2] else "",
+             lambda r: str(r[3]) if r[3] else ""])
+        self.table = self.paged.table
         self.table.setFixedSize(700, 400)
-        self.table.horizontalHeader().setStretchLastSection(True)
-        layout.addWidget(self.table, alignment=Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.paged, alignment=Qt.AlignmentFlag.AlignCenter)
         
         layout.addSpacing(5)
         
         back = QPushButton("Back")
         back.setFixedSize(400, 40)
-        back.clicked.connect(lambda: parent.go_to(parent.ophth_home))
+        back.clicked.connect(lambda: parent.go_to("ophth_home"))
         layout.addWidget(back, alignment=Qt.AlignmentFlag.AlignCenter)
         layout.addStretch()
         self.setLayout(layout)
     
-    def load_patients(self):
-        self.patient_combo.clear()
-        self.patient_ids = []
-        
-        rows = execute_query("""
-            SELECT DISTINCT p.patient_id, RTRIM(p.name)
-            FROM Patient p
-            JOIN Patient_Record pr ON p.patient_id = pr.patient_id
-            WHERE pr.ophthalmologist_id = ?
-        """, (self.parent.current_ophth_id,), fetch=True)
-        
-        if rows:
-            for row in rows:
-                self.patient_ids.append(row[0])
-                self.patient_combo.addItem(str(row[1]))
+    def clear_patient(self):
+        self.patient_search.reset()
+        self.paged.clear()
     
-    def load_history(self):
-        self.table.setRowCount(0)
-        
-        if not self.patient_ids or self.patient_combo.currentIndex() < 0:
+    def load_history(self, patient_id):
+        if patient_id is None:
+            self.paged.clear()
             return
-            
-        patient_id = self.patient_ids[self.patient_combo.currentIndex()]
-        
-        rows = execute_query("""
-            SELECT record_date, RTRIM(diagnosis), treatment_details, RTRIM(prescription)
-            FROM Patient_Record
-            WHERE patient_id = ? AND ophthalmologist_id = ?
-            ORDER BY record_date DESC
-        """, (patient_id, self.parent.current_ophth_id), fetch=True)
-        
-        if rows:
-            self.table.setRowCount(len(rows))
-            for i, row in enumerate(rows):
-                self.table.setItem(i, 0, QTableWidgetItem(str(row[0])))
-                self.table.setItem(i, 1, QTableWidgetItem(str(row[1]) if row[1] else ""))
-                self.table.setItem(i, 2, QTableWidgetItem(str(row[2]) if row[2] else ""))
-                self.table.setItem(i, 3, QTableWidgetItem(str(row[3]) if row[3] else ""))
+        self.paged.load((patient_id, self.parent.current_ophth_id))
+
+# ==================== RECORD SEARCH ====================
+class RecordSearch(QWidget):
+    def __init__(self, parent):
+        super().__init__()
+        self.parent = parent
+        layout = QVBoxLayout()
+
+        title = QLabel("Search Records")
+        title.setFont(QFont("Arial", 18))
+        layout.addWidget(title, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        search_row = QHBoxLayout()
+        self.query = QLineEdit()
+        self.query.setPlaceholderText("Diagnosis, prescription or treatment, e.g. glaucoma latanoprost")
+        self.query.setFixedWidth(500)
+        self.query.returnPressed.connect(self.run_search)
+        search_btn = QPushButton("Search")
+        search_btn.clicked.connect(self.run_search)
+        search_row.addStretch()
+        search_row.addWidget(self.query)
+        search_row.addWidget(search_btn)
+        search_row.addStretch()
+        layout.addLayout(search_row)
+
+        self.status = QLabel("")
+        layout.addWidget(self.status, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        # Rows: record_id, patient_id, patient, date, diagnosis, prescription, treatment, score
+        self.model = CursorTableModel(
+            ["Patient", "Date", "Diagnosis", "Prescription", "Treatment"],
+            [lambda r: str(r[2]),
+             lambda r: str(r[3]),
+             lambda r: str(r[4]) if r[4] else "",
+             lambda r: str(r[5]) if r[5] else "",
+             lambda r: str(r[6]) if r[6] else ""])
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setFixedSize(700, 400)
+        layout.addWidget(self.table, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        back = QPushButton("Back")
+        back.setFixedSize(400, 40)
+        back.clicked.connect(lambda: parent.go_to("ophth_home"))
+        layout.addWidget(back, alignment=Qt.AlignmentFlag.AlignCenter)
+        layout.addStretch()
+        self.setLayout(layout)
+
+    def reset(self):
+        self.query.clear()
+        self.status.clear()
+        self.model.clear()
+
+    def run_search(self):
+        text = self.query.text().strip()
+        if not text:
+            QMessageBox.warning(self, "Error", "Please enter words to search for!")
+            return
+        self.status.setText("Searching...")
+        self.parent.executor.run((self, "search"), services.search_records,
+                                 (self.parent.current_ophth_id, text), self.show_results)
+
+    def show_results(self, result):
+        if result is None:
+            self.status.setText("Could not search the records.")
+            self.model.clear()
+            return
+        rows, total = result
+        self.model.set_rows(rows)
+        if total > len(rows):
+            self.status.setText(f"{total} matching records, best {len(rows)} shown")
+        else:
+            self.status.setText(f"{total} matching records")
+
+# ==================== DATA EXPORT ====================
+class ExportData(QWidget):
+    # Runs exports.export_file on the executor. The worker reports each
+    # batch through export_progress, which Qt queues back to the UI thread;
+    # Cancel sets an event the export checks between batches.
+    export_progress = pyqtSignal(int, int)
+
+    def __init__(self, parent):
+        super().__init__()
+        self.parent = parent
+        self.stop = threading.Event()
+        self.running = False
+        layout = QVBoxLayout()
+        layout.addStretch()
+
+        title = QLabel("Export Data")
+        title.setFont(QFont("Arial", 18))
+        layout.addWidget(title, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        form = QFormLayout()
+        self.dataset = QComboBox()
+        self.dataset.addItem("Medical records", "records")
+        self.dataset.addItem("Appointments", "appointments")
+        form.addRow("Data:", self.dataset)
+        self.scope = QComboBox()
+        self.scope.addItem("One patient", "patient")
+        self.scope.addItem("All my patients", "ophthalmologist")
+        self.scope.addItem("Whole clinic", "clinic")
+        self.scope.currentIndexChanged.connect(self.scope_changed)
+        form.addRow("Whose:", self.scope)
+        # Patients who have had an appointment with this ophthalmologist
+        self.patient_search = PatientSearchBox(parent, services.ophthalmologist_patients)
+        form.addRow("Patient:", self.patient_search)
+        self.format = QComboBox()
+        self.format.addItem("CSV", "csv")
+        self.format.addItem("JSON Lines", "jsonl")
+        form.addRow("Format:", self.format)
+        form_widget = QWidget()
+        form_widget.setLayout(form)
+        form_widget.setFixedWidth(400)
+        layout.addWidget(form_widget, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        self.progress = QProgressBar()
+        self.progress.setFixedWidth(400)
+        self.progress.hide()
+        layout.addWidget(self.progress, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.status = QLabel("")
+        layout.addWidget(self.status, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.export_progress.connect(self.show_progress)
+
+        self.export_btn = QPushButton("Export")
+        self.export_btn.setFixedSize(400, 40)
+        self.export_btn.clicked.connect(self.start_export)
+        layout.addWidget(self.export_btn, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        self.cancel_btn = QPushButton("Cancel Export")
+        self.cancel_btn.setFixedSize(400, 40)
+        self.cancel_btn.clicked.connect(self.stop.set)
+        self.cancel_btn.hide()
+        layout.addWidget(self.cancel_btn, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        back = QPushButton("Back")
+        back.setFixedSize(400, 40)
+        back.clicked.connect(lambda: parent.go_to("ophth_home"))
+        layout.addWidget(back, alignment=Qt.AlignmentFlag.AlignCenter)
+        layout.addStretch()
+        self.setLayout(layout)
+
+    def reset(self):
+        # A running export keeps going while the screen is away
+        if self.running:
+            return
+        self.patient_search.reset()
+        self.progress.hide()
+        self.status.clear()
+
+    def scope_changed(self):
+        self.patient_search.setEnabled(self.scope.currentData() == "patient")
+
+    def start_export(self):
+        scope = self.scope.currentData()
+        scope_id = self.parent.current_ophth_id
+        if scope == "patient":
+            scope_id = self.patient_search.patient_id
+            if scope_id is None:
+                QMessageBox.warning(self, "Error", "Please select a patient to export!")
+                return
+        fmt = self.format.currentData()
+        name = f"{self.dataset.currentData()}_{scope}_{scope_id}.{fmt}"
+        path, _ = QFileDialog.getSaveFileName(self, "Export Data", name,
+                                              "CSV files (*.csv)" if fmt == "csv" else "JSON Lines (*.jsonl)")
+        if not path:
+            return
+        self.stop.clear()
+        self.running = True
+        self.export_btn.setEnabled(False)
+        self.cancel_btn.show()
+        self.progress.setRange(0, 0)
+        self.progress.show()
+        self.status.setText("Counting rows...")
+        self.parent.executor.run((self, "export"), self.run_export,
+                                 (path, self.dataset.currentData(), scope, scope_id, fmt), self.export_finished,
+                                 keep=True)
+
+    def run_export(self, path, dataset, scope, scope_id, fmt):
+        # Worker thread: (outcome, rows or message)
+        try:
+            rows = services.export_data(path, dataset, scope, scope_id, fmt,
+                                        self.export_progress.emit, self.stop.is_set,
+                                        ophth_id=self.parent.current_ophth_id)
+            return "done", (path, rows)
+        except exports.ExportCancelled:
+            return "cancelled", None
+        except ServiceError as e:
+            return "error", str(e)
+
+    def show_progress(self, done, total):
+        if not self.running:
+            return
+        self.progress.setRange(0, max(total, 1))
+        self.progress.setValue(done)
+        self.status.setText(f"{done} of {total} rows")
+
+    def export_finished(self, result):
+        self.running = False
+        self.export_btn.setEnabled(True)
+        self.cancel_btn.hide()
+        self.progress.hide()
+        outcome, value = result or ("error", "The export failed.")
+        if outcome == "done":
+            path, rows = value
+            self.status.setText(f"Exported {rows} rows to {path}")
+        elif outcome == "cancelled":
+            self.status.setText("Export cancelled.")
+        else:
+            self.status.clear()
+            QMessageBox.warning(self, "Error", value)
 
 # ==================== PATIENT BILLING ====================
 class PatientBilling(QWidget):
@@ -1100,55 +1537,63 @@ class PatientBilling(QWidget):
         title.setFont(QFont("Arial", 18))
         layout.addWidget(title, alignment=Qt.AlignmentFlag.AlignCenter)
         
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
         # Changed "Doctor" to "Ophthalmologist"
-        self.table.setHorizontalHeaderLabels(["Date", "Ophthalmologist", "Amount", "Status", "Action"])
+        # Rows: bill_id, date, ophthalmologist, amount, paid
+        self.paged = PagedTable(parent, services.pager("patient_bills"),
+            ["Date", "Ophthalmologist", "Amount", "Status", "Action"],
+            [lambda r: str(r[1]),
+             lambda r: str(r[2]),
+             lambda r: f"${r[3]:.2f}",
+             lambda r: "Paid" if r[4] else "Unpaid",
+             lambda r: ""])
+        self.model = self.paged.model
+        self.table = self.paged.table
+        self.actions = ButtonDelegate(lambda r: ["Receipt"] if r[4] else ["Pay Now", "Invoice"], self.table)
+        self.actions.clicked.connect(self.on_action)
+        self.table.setItemDelegateForColumn(4, self.actions)
         self.table.setFixedSize(700, 400)
-        self.table.horizontalHeader().setStretchLastSection(True)
-        layout.addWidget(self.table, alignment=Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.paged, alignment=Qt.AlignmentFlag.AlignCenter)
         
         layout.addSpacing(5)
         
         back = QPushButton("Back")
         back.setFixedSize(400, 40)
-        back.clicked.connect(lambda: parent.go_to(parent.patient_home))
+        back.clicked.connect(lambda: parent.go_to("patient_home"))
         layout.addWidget(back, alignment=Qt.AlignmentFlag.AlignCenter)
         layout.addStretch()
         self.setLayout(layout)
     
     def load_bills(self):
-        self.table.setRowCount(0)
-        
-        rows = execute_query("""
-            SELECT b.bill_id, b.payment_date, RTRIM(o.name), b.amount, b.payment_status
-            FROM Bill b
-            JOIN Appointment a ON b.appointment_id = a.appointment_id
-            JOIN Ophthalmologist o ON a.ophthalmologist_id = o.ophthalmologist_id
-            WHERE b.patient_id = ?
-            ORDER BY b.payment_date DESC
-        """, (self.parent.current_patient_id,), fetch=True)
-        
-        if rows:
-            self.table.setRowCount(len(rows))
-            for i, row in enumerate(rows):
-                self.table.setItem(i, 0, QTableWidgetItem(str(row[1])))
-                self.table.setItem(i, 1, QTableWidgetItem(str(row[2])))
-                self.table.setItem(i, 2, QTableWidgetItem(f"${row[3]:.2f}"))
-                status = "Paid" if row[4] else "Unpaid"
-                self.table.setItem(i, 3, QTableWidgetItem(status))
-                
-                if not row[4]:
-                    pay_btn = QPushButton("Pay Now")
-                    pay_btn.clicked.connect(lambda checked, bid=row[0]: self.pay_bill(bid))
-                    self.table.setCellWidget(i, 4, pay_btn)
-                else:
-                    self.table.setItem(i, 4, QTableWidgetItem("Completed"))
+        self.paged.load((self.parent.current_patient_id,))
+
+    def on_action(self, row, label):
+        self.model.fetch_all()
+        bill_id = self.model.row(row)[0]
+        if label == "Pay Now":
+            self.pay_bill(bill_id)
+        else:
+            self.save_document(bill_id)
+
+    def save_document(self, bill_id):
+        # The invoice of an unpaid bill, the receipt of a paid one
+        out_dir = QFileDialog.getExistingDirectory(self, "Save Document In")
+        if not out_dir:
+            return
+        try:
+            path = services.bill_document(bill_id, out_dir)
+        except ServiceError as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
+        QMessageBox.information(self, "Success", f"Saved to {path}")
     
     def pay_bill(self, bill_id):
-        execute_query("UPDATE Bill SET payment_status = 1 WHERE bill_id = ?", (bill_id,))
+        try:
+            services.pay_bill(bill_id)
+        except ServiceError as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
         QMessageBox.information(self, "Success", "Payment successful!")
-        self.load_bills()
+        self.paged.refresh()
 
 # ==================== OPHTHALMOLOGIST BILLING ====================
 class OphthalmologistBilling(QWidget):
@@ -1163,107 +1608,195 @@ class OphthalmologistBilling(QWidget):
         
         # Add new bill section
         add_layout = QHBoxLayout()
-        self.patient_combo = QComboBox()
-        self.patient_combo.setFixedWidth(200)
+        # Patients with a concluded appointment that has no bill yet
+        self.patient_search = PatientSearchBox(parent, services.unbilled_patients)
+        self.patient_search.setFixedWidth(250)
         self.amount_input = QLineEdit()
         self.amount_input.setPlaceholderText("Amount")
         self.amount_input.setFixedWidth(100)
         add_bill_btn = QPushButton("Create Bill")
         add_bill_btn.clicked.connect(self.create_bill)
+        # End of day: one bill at the entered amount for every unbilled visit
+        bill_all_btn = QPushButton("Bill All Concluded")
+        bill_all_btn.clicked.connect(self.bill_all)
+        aging_btn = QPushButton("Aging Report")
+        aging_btn.clicked.connect(lambda: parent.go_to("ar_aging"))
         
         add_layout.addWidget(QLabel("Patient:"))
-        add_layout.addWidget(self.patient_combo)
+        add_layout.addWidget(self.patient_search)
         add_layout.addWidget(self.amount_input)
         add_layout.addWidget(add_bill_btn)
+        add_layout.addWidget(bill_all_btn)
+        add_layout.addWidget(aging_btn)
         layout.addLayout(add_layout)
         
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["Patient", "Date", "Amount", "Status"])
+        # Month-end run: invoices and receipts for every bill of a month
+        documents_layout = QHBoxLayout()
+        self.month = QDateEdit(QDate.currentDate())
+        self.month.setDisplayFormat("MMMM yyyy")
+        self.documents_btn = QPushButton("Render Invoices")
+        self.documents_btn.clicked.connect(self.render_documents)
+        self.documents_status = QLabel("")
+        documents_layout.addWidget(QLabel("Month:"))
+        documents_layout.addWidget(self.month)
+        documents_layout.addWidget(self.documents_btn)
+        documents_layout.addWidget(self.documents_status)
+        documents_layout.addStretch()
+        layout.addLayout(documents_layout)
+        
+        self.paged = PagedTable(parent, services.pager("ophthalmologist_bills"),
+            ["Patient", "Date", "Amount", "Status"],
+            [lambda r: str(r[0]),
+             lambda r: str(r[1]),
+             lambda r: f"${r[2]:.2f}",
+             lambda r: "Paid" if r[3] else "Unpaid"])
+        self.table = self.paged.table
         self.table.setFixedSize(700, 350)
-        self.table.horizontalHeader().setStretchLastSection(True)
-        layout.addWidget(self.table, alignment=Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.paged, alignment=Qt.AlignmentFlag.AlignCenter)
         
         layout.addSpacing(5)
         
         back = QPushButton("Back")
         back.setFixedSize(400, 40)
-        back.clicked.connect(lambda: parent.go_to(parent.ophth_home))
+        back.clicked.connect(lambda: parent.go_to("ophth_home"))
         layout.addWidget(back, alignment=Qt.AlignmentFlag.AlignCenter)
         layout.addStretch()
         self.setLayout(layout)
-        
-        self.patient_ids = []
-        self.appointment_map = {}
     
     def load_bills(self):
-        # Load patients with appointments
-        self.patient_combo.clear()
-        self.patient_ids = []
-        self.appointment_map = {}
-        
-        rows = execute_query("""
-            SELECT DISTINCT p.patient_id, RTRIM(p.name), a.appointment_id
-            FROM Patient p
-            JOIN Appointment a ON p.patient_id = a.patient_id
-            WHERE a.ophthalmologist_id = ?
-        """, (self.parent.current_ophth_id,), fetch=True)
-        
-        if rows:
-            for row in rows:
-                if row[0] not in self.patient_ids:
-                    self.patient_ids.append(row[0])
-                    self.patient_combo.addItem(str(row[1]))
-                    self.appointment_map[row[0]] = row[2]
-        
-        # Load existing bills
-        self.table.setRowCount(0)
-        
-        bill_rows = execute_query("""
-            SELECT RTRIM(p.name), b.payment_date, b.amount, b.payment_status
-            FROM Bill b
-            JOIN Patient p ON b.patient_id = p.patient_id
-            JOIN Appointment a ON b.appointment_id = a.appointment_id
-            WHERE a.ophthalmologist_id = ?
-            ORDER BY b.payment_date DESC
-        """, (self.parent.current_ophth_id,), fetch=True)
-        
-        if bill_rows:
-            self.table.setRowCount(len(bill_rows))
-            for i, row in enumerate(bill_rows):
-                self.table.setItem(i, 0, QTableWidgetItem(str(row[0])))
-                self.table.setItem(i, 1, QTableWidgetItem(str(row[1])))
-                self.table.setItem(i, 2, QTableWidgetItem(f"${row[2]:.2f}"))
-                status = "Paid" if row[3] else "Unpaid"
-                self.table.setItem(i, 3, QTableWidgetItem(status))
+        self.patient_search.reset()
+        self.paged.load((self.parent.current_ophth_id,))
     
     def create_bill(self):
-        if not self.patient_ids:
-            QMessageBox.warning(self, "Error", "No patients available!")
+        patient_id = self.patient_search.patient_id
+        if patient_id is None:
+            QMessageBox.warning(self, "Error", "Please select a patient to bill!")
             return
-            
+        
+        self.paged.model.fetch_all()
         try:
-            amount = float(self.amount_input.text())
-        except ValueError:
-            QMessageBox.warning(self, "Error", "Invalid amount!")
+            # The bill is for the picked patient's latest unbilled appointment
+            appointment_id = services.latest_unbilled_appointment(patient_id, self.parent.current_ophth_id)
+            services.create_bill(patient_id, appointment_id, self.amount_input.text())
+        except ServiceError as e:
+            QMessageBox.warning(self, "Error", str(e))
             return
         
-        patient_id = self.patient_ids[self.patient_combo.currentIndex()]
-        appointment_id = self.appointment_map.get(patient_id)
-        
-        if not appointment_id:
-            QMessageBox.warning(self, "Error", "No appointment found for this patient!")
+        QMessageBox.information(self, "Success", "Bill created successfully!")
+        self.amount_input.clear()
+        self.load_bills()
+
+    def bill_all(self):
+        self.paged.model.fetch_all()
+        try:
+            counts = services.bill_concluded(self.parent.current_ophth_id, self.amount_input.text())
+        except ServiceError as e:
+            QMessageBox.warning(self, "Error", str(e))
             return
-        
-        result = execute_query("""
-            INSERT INTO Bill(patient_id, appointment_id, amount, payment_status, payment_date)
-            VALUES(?,?,?,0,GETDATE())
-        """, (patient_id, appointment_id, amount))
-        
-        if result:
-            QMessageBox.information(self, "Success", "Bill created successfully!")
-            self.amount_input.clear()
-            self.load_bills()
+        if not counts["bills"]:
+            QMessageBox.information(self, "Billing", "No concluded appointments are waiting for a bill.")
+            return
+        QMessageBox.information(self, "Success",
+                                f"Created {counts['bills']} bills for {counts['patients']} patients "
+                                f"(total ${counts['total']:.2f}).")
+        self.amount_input.clear()
+        self.load_bills()
+
+    def render_documents(self):
+        out_dir = QFileDialog.getExistingDirectory(self, "Save Invoices In")
+        if not out_dir:
+            return
+        month = self.month.date()
+        self.documents_btn.setEnabled(False)
+        self.documents_status.setText("Rendering...")
+        # Keeps going (and re-enables the button) if the screen is left meanwhile
+        self.parent.executor.run((self, "documents"), checked,
+                                 (services.month_end_documents, self.parent.current_ophth_id,
+                                  month.year(), month.month(), out_dir),
+                                 self.documents_done, keep=True)
+
+    def documents_done(self, result):
+        self.documents_btn.setEnabled(True)
+        outcome, value = result or ("error", "Could not render the invoices.")
+        if outcome == "error":
+            self.documents_status.setText("")
+            QMessageBox.warning(self, "Error", value)
+            return
+        self.documents_status.setText(f"{value} documents written")
+
+# ==================== AR AGING REPORT ====================
+class AgingReport(QWidget):
+    def __init__(self, parent):
+        super().__init__()
+        self.parent = parent
+        self.report = None
+        layout = QVBoxLayout()
+
+        title = QLabel("Accounts Receivable Aging")
+        title.setFont(QFont("Arial", 18))
+        layout.addWidget(title, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        self.status = QLabel("")
+        layout.addWidget(self.status, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        # Rows laid out as reports.COLUMNS; the clinic subtotal has no
+        # ophthalmologist name
+        self.model = CursorTableModel(
+            reports.COLUMNS[1:],
+            [lambda r: r[1] or "Clinic total",
+             lambda r: str(r[2])]
+            + [lambda r, i=i: money(r[i]) for i in range(3, len(reports.COLUMNS) - 1)]
+            + [lambda r: "" if r[-1] is None else f"{r[-1]:.1%}"])
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setFixedSize(700, 400)
+        layout.addWidget(self.table, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        export_btn = QPushButton("Export CSV")
+        export_btn.setFixedSize(400, 40)
+        export_btn.clicked.connect(self.export_csv)
+        layout.addWidget(export_btn, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        back = QPushButton("Back")
+        back.setFixedSize(400, 40)
+        back.clicked.connect(lambda: parent.go_to("ophth_billing"))
+        layout.addWidget(back, alignment=Qt.AlignmentFlag.AlignCenter)
+        layout.addStretch()
+        self.setLayout(layout)
+
+    def load_report(self):
+        self.report = None
+        self.model.clear()
+        self.status.setText("Loading...")
+        self.parent.executor.run((self, "report"), services.clinic_aging_report,
+                                 (self.parent.current_ophth_id,), self.show_report)
+
+    def show_report(self, report):
+        if report is None:
+            self.status.setText("Could not load the report.")
+            return
+        self.report = report
+        # One clinic: its subtotal is already the grand total
+        self.model.set_rows(reports.report_lines(report)[:-1])
+        total = report["total"]
+        self.status.setText(f"As of {report['as_of']}: {total[2]} bills, {money(total[5])} outstanding")
+
+    def export_csv(self):
+        if self.report is None:
+            QMessageBox.warning(self, "Error", "The report has not loaded yet!")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export CSV", f"ar_aging_{self.report['as_of']}.csv",
+                                              "CSV files (*.csv)")
+        if not path:
+            return
+        try:
+            with open(path, "w", newline="") as out:
+                reports.write_csv(self.report, out)
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Could not write the file: {e}")
+            return
+        QMessageBox.information(self, "Success", f"Report saved to {path}")
 
 # ==================== PATIENT FEEDBACK ====================
 class PatientFeedback(QWidget):
@@ -1301,7 +1834,7 @@ class PatientFeedback(QWidget):
 
         back = QPushButton("Back")
         back.setFixedSize(400, 40)
-        back.clicked.connect(lambda: parent.go_to(parent.patient_home))
+        back.clicked.connect(lambda: parent.go_to("patient_home"))
         layout.addWidget(back, alignment=Qt.AlignmentFlag.AlignCenter)
         layout.addStretch()
         self.setLayout(layout)
@@ -1309,14 +1842,13 @@ class PatientFeedback(QWidget):
     def load_ophthalmologists(self):
         self.ophth_combo.clear()
         self.ophth_ids = []
+        self.ophth_combo.setPlaceholderText("Loading...")
 
-        rows = execute_query("""
-            SELECT DISTINCT o.ophthalmologist_id, RTRIM(o.name)
-            FROM Ophthalmologist o
-            JOIN Appointment a ON o.ophthalmologist_id = a.ophthalmologist_id
-            WHERE a.patient_id = ?
-        """, (self.parent.current_patient_id,), fetch=True)
+        self.parent.executor.run((self, "ophthalmologists"), services.patient_ophthalmologists,
+                                 (self.parent.current_patient_id,), self.show_ophthalmologists)
 
+    def show_ophthalmologists(self, rows):
+        self.ophth_combo.setPlaceholderText("")
         if rows:
             for row in rows:
                 self.ophth_ids.append(row[0])
@@ -1331,15 +1863,15 @@ class PatientFeedback(QWidget):
         rating = 5 - self.rating.currentIndex()
         comments = self.feedback_text.toPlainText()
 
-        result = execute_query("""
-            INSERT INTO Feedback(patient_id, ophthalmologist_id, rating, comments, feedback_date)
-            VALUES(?,?,?,?,GETDATE())
-        """, (self.parent.current_patient_id, ophth_id, rating, comments))
+        try:
+            services.submit_feedback(self.parent.current_patient_id, ophth_id, rating, comments)
+        except ServiceError as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
 
-        if result:
-            QMessageBox.information(self, "Success", "Feedback submitted successfully!")
-            self.feedback_text.clear()
-            self.parent.go_to(self.parent.patient_home)
+        QMessageBox.information(self, "Success", "Feedback submitted successfully!")
+        self.feedback_text.clear()
+        self.parent.go_to("patient_home")
 
 # ==================== OPHTHALMOLOGIST FEEDBACK ====================
 class OphthalmologistFeedback(QWidget):
@@ -1352,44 +1884,61 @@ class OphthalmologistFeedback(QWidget):
         title.setFont(QFont("Arial", 18))
         layout.addWidget(title, alignment=Qt.AlignmentFlag.AlignCenter)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["Patient", "Rating", "Comments", "Date"])
+        self.paged = PagedTable(parent, services.pager("ophthalmologist_feedback"),
+            ["Patient", "Rating", "Comments", "Date"],
+            [lambda r: str(r[0]),
+             lambda r: f"{r[1]}/5",
+             lambda r: str(r[2]) if r[2] else "",
+             lambda r: str(r[3])])
+        self.table = self.paged.table
         self.table.setFixedSize(700, 400)
-        self.table.horizontalHeader().setStretchLastSection(True)
-        layout.addWidget(self.table, alignment=Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.paged, alignment=Qt.AlignmentFlag.AlignCenter)
 
         back = QPushButton("Back")
         back.setFixedSize(400, 40)
-        back.clicked.connect(lambda: parent.go_to(parent.ophth_home))
+        back.clicked.connect(lambda: parent.go_to("ophth_home"))
         layout.addWidget(back, alignment=Qt.AlignmentFlag.AlignCenter)
         
         layout.addStretch()
         self.setLayout(layout)
 
     def load_feedback(self):
-        self.table.setRowCount(0)
-
-        rows = execute_query("""
-            SELECT RTRIM(p.name), f.rating, f.comments, f.feedback_date
-            FROM Feedback f
-            JOIN Patient p ON f.patient_id = p.patient_id
-            WHERE f.ophthalmologist_id = ?
-            ORDER BY f.feedback_date DESC
-        """, (self.parent.current_ophth_id,), fetch=True)
-
-        if rows:
-            self.table.setRowCount(len(rows))
-            for i, row in enumerate(rows):
-                self.table.setItem(i, 0, QTableWidgetItem(str(row[0])))
-                self.table.setItem(i, 1, QTableWidgetItem(f"{row[1]}/5"))
-                self.table.setItem(i, 2, QTableWidgetItem(str(row[2]) if row[2] else ""))
-                self.table.setItem(i, 3, QTableWidgetItem(str(row[3])))
-
+        self.paged.load((self.parent.current_ophth_id,))
+
+
+# ==================== SCREEN REGISTRY ====================
+SCREENS = {
+    "initial_screen": InitialScreen,
+    "patient_reg": PatientRegistration,
+    "ophth_reg": OphthalmologistRegistration,
+    "patient_login": PatientLogin,
+    "ophth_login": OphthalmologistLogin,
+    "patient_home": PatientHome,
+    "ophth_home": OphthalmologistHome,
+    "book_appointment": BookAppointment,
+    "ophth_appointments": OphthalmologistAppointments,
+    "appointment_history": AppointmentHistory,
+    "add_record": AddUpdateRecord,
+    "patient_view_record": PatientViewRecord,
+    "patient_medical_history": PatientMedicalHistory,
+    "ophth_medical_history": OphthalmologistMedicalHistory,
+    "record_search": RecordSearch,
+    "export_data": ExportData,
+    "patient_billing": PatientBilling,
+    "ophth_billing": OphthalmologistBilling,
+    "ar_aging": AgingReport,
+    "patient_feedback": PatientFeedback,
+    "ophth_feedback": OphthalmologistFeedback,
+}
 
 # ==================== RUN THE APPLICATION ====================
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
+    app.aboutToQuit.connect(window.executor.shutdown)
+    app.aboutToQuit.connect(notifications.outbox.close)
+    app.aboutToQuit.connect(lambda: print(metrics_report()))
+    app.aboutToQuit.connect(export_metrics)
     window.show()
+    window.connect_database()
     sys.exit(app.exec())
\ No newline at end of file
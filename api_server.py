@@ -0,0 +1,490 @@
+import argparse
+import asyncio
+import datetime
+import decimal
+import json
+import re
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import availability
+import notifications
+import reports
+import search
+import services
+import shards
+from database import Session, cache_stats, close_pool, get_pool, pool_stats, query_stats, session
+
+# ==================== HTTP API ====================
+# JSON over HTTP/1.1 on top of services.py, so several front-desk clients
+# can share one backend process and its connection pool. asyncio handles
+# the sockets; every service call runs on a thread pool the size of the
+# connection pool, so requests never queue on the event loop.
+#
+# There is no authentication: bind it to localhost or a trusted clinic LAN.
+#
+#   python api_server.py --port 8765
+
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_BODY = 1024 * 1024
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+               405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+               500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def to_json(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    raise TypeError(f"Can't encode {type(value).__name__}")
+
+
+# ==================== REQUEST HELPERS ====================
+def field(body, name, kind=str):
+    if name not in body:
+        raise HttpError(400, f"Missing field: {name}")
+    try:
+        return kind(body[name])
+    except (TypeError, ValueError):
+        raise HttpError(400, f"Invalid field: {name}")
+
+
+def parse_date(value):
+    return datetime.date.fromisoformat(value)
+
+
+def parse_after(query):
+    # Keyset cursor "date,id" handed out as "next" by the previous page
+    value = query.get("after")
+    if not value:
+        return None
+    try:
+        day, key_id = value.split(",")
+        return day, int(key_id)
+    except ValueError:
+        raise HttpError(400, "Invalid after cursor")
+
+
+def page(name, params, query):
+    result = services.fetch_page(name, params, parse_after(query))
+    if result is None:
+        raise HttpError(500, "Database error")
+    rows, next_key = result
+    if next_key:
+        day, key_id = next_key
+        next_key = f"{day.isoformat() if hasattr(day, 'isoformat') else day},{key_id}"
+    # Drop the two key columns KeysetPager appends to every row
+    return 200, {"rows": [list(row)[:-2] for row in rows], "next": next_key}
+
+
+def rows_or_error(rows):
+    if rows is None:
+        raise HttpError(500, "Database error")
+    return [list(row) for row in rows]
+
+
+# ==================== ROUTES ====================
+ROUTES = []
+
+
+def route(method, pattern):
+    regex = re.compile("^" + re.sub(r"\{(\w+)\}", r"(?P<\1>\\d+)", pattern) + "$")
+
+    def register(handler):
+        ROUTES.append((method, regex, handler))
+        return handler
+    return register
+
+
+@route("POST", "/login/patient")
+def login_patient(ids, query, body):
+    patient_id = services.patient_login(field(body, "email"), field(body, "password"))
+    if not patient_id:
+        raise HttpError(401, "Invalid credentials")
+    return 200, {"patient_id": patient_id}
+
+
+@route("POST", "/login/ophthalmologist")
+def login_ophthalmologist(ids, query, body):
+    ophth_id = services.ophthalmologist_login(field(body, "email"), field(body, "password"))
+    if not ophth_id:
+        raise HttpError(401, "Invalid credentials")
+    return 200, {"ophthalmologist_id": ophth_id}
+
+
+@route("POST", "/patients")
+def register_patient(ids, query, body):
+    services.register_patient(field(body, "name"), field(body, "gender"), field(body, "date_of_birth"),
+                              field(body, "email"), body.get("phone"), field(body, "password"))
+    return 201, {"registered": True}
+
+
+@route("POST", "/ophthalmologists")
+def register_ophthalmologist(ids, query, body):
+    services.register_ophthalmologist(field(body, "name"), field(body, "email"), body.get("phone"),
+                                      field(body, "clinic"), field(body, "address"), field(body, "password"))
+    return 201, {"registered": True}
+
+
+@route("GET", "/ophthalmologists")
+def list_ophthalmologists(ids, query, body):
+    return 200, {"rows": rows_or_error(services.ophthalmologists())}
+
+
+@route("GET", "/ophthalmologists/{ophthalmologist_id}/availability")
+def free_slots(ids, query, body):
+    try:
+        start = parse_date(query["start"]) if "start" in query else None
+        days = min(int(query.get("days", availability.AVAILABILITY_DAYS)), 90)
+    except ValueError:
+        raise HttpError(400, "Invalid start or days")
+    free = services.free_slots(ids["ophthalmologist_id"], start, days)
+    if free is None:
+        raise HttpError(500, "Database error")
+    return 200, {"slots": [availability.slot_label(i) for i in range(len(availability.SLOT_HOURS))],
+                 "free": {day.isoformat(): slots for day, slots in free.items()}}
+
+
+@route("POST", "/appointments")
+def book_appointment(ids, query, body):
+    try:
+        services.book_appointment(field(body, "patient_id", int), field(body, "ophthalmologist_id", int),
+                                  field(body, "date", parse_date), field(body, "slot", int))
+    except services.SlotTaken as e:
+        raise HttpError(409, str(e))
+    return 201, {"booked": True}
+
+
+@route("DELETE", "/appointments/{appointment_id}")
+def cancel_appointment(ids, query, body):
+    services.cancel_appointment(ids["appointment_id"])
+    return 200, {"cancelled": True}
+
+
+@route("POST", "/appointments/status")
+def set_appointment_status(ids, query, body):
+    statuses = {"approved": services.APPROVED, "rejected": services.REJECTED}
+    status = statuses.get(body.get("status"))
+    if status is None:
+        raise HttpError(400, "status must be approved or rejected")
+    appointment_ids = [int(i) for i in field(body, "ids", list)]
+    return 200, {"changed": services.set_appointment_status(appointment_ids, status)}
+
+
+@route("GET", "/patients/{patient_id}/appointments")
+def patient_appointments(ids, query, body):
+    return page("patient_appointments", (ids["patient_id"],), query)
+
+
+@route("GET", "/ophthalmologists/{ophthalmologist_id}/appointments")
+def ophthalmologist_appointments(ids, query, body):
+    return page("ophthalmologist_appointments", (ids["ophthalmologist_id"],), query)
+
+
+@route("GET", "/patients/{patient_id}/records")
+def patient_records(ids, query, body):
+    if "ophthalmologist_id" in query:
+        return page("patient_records_by_ophthalmologist",
+                    (ids["patient_id"], field(query, "ophthalmologist_id", int)), query)
+    return page("patient_records", (ids["patient_id"],), query)
+
+
+@route("GET", "/patients/{patient_id}/records/latest")
+def latest_record(ids, query, body):
+    rows = rows_or_error(services.latest_record(ids["patient_id"]))
+    return 200, {"record": rows[0] if rows else None}
+
+
+PATIENT_LOOKUPS = {"appointments": services.ophthalmologist_patients, "records": services.record_patients,
+                   "unbilled": services.unbilled_patients}
+
+
+@route("GET", "/ophthalmologists/{ophthalmologist_id}/patients")
+def find_patients(ids, query, body):
+    # Type-ahead: ?q=name prefix&scope=appointments|records|unbilled
+    lookup = PATIENT_LOOKUPS.get(query.get("scope", "appointments"))
+    if lookup is None:
+        raise HttpError(400, "scope must be appointments, records or unbilled")
+    try:
+        limit = min(int(query.get("limit", services.PATIENT_MATCHES)), 100)
+    except ValueError:
+        raise HttpError(400, "Invalid limit")
+    return 200, {"rows": rows_or_error(lookup(ids["ophthalmologist_id"], query.get("q", ""), limit))}
+
+
+@route("GET", "/ophthalmologists/{ophthalmologist_id}/records/search")
+def search_records(ids, query, body):
+    try:
+        limit = min(int(query.get("limit", search.SEARCH_LIMIT)), search.SEARCH_LIMIT)
+    except ValueError:
+        raise HttpError(400, "Invalid limit")
+    rows, total = services.search_records(ids["ophthalmologist_id"], query.get("q", ""), limit)
+    return 200, {"total": total, "rows": rows}
+
+
+@route("POST", "/records")
+def save_record(ids, query, body):
+    services.save_record(field(body, "patient_id", int), field(body, "ophthalmologist_id", int),
+                         field(body, "appointment_id", int), body.get("diagnosis", ""),
+                         body.get("prescription", ""), body.get("treatment", ""))
+    return 201, {"saved": True}
+
+
+@route("GET", "/patients/{patient_id}/bills")
+def patient_bills(ids, query, body):
+    return page("patient_bills", (ids["patient_id"],), query)
+
+
+@route("GET", "/ophthalmologists/{ophthalmologist_id}/bills")
+def ophthalmologist_bills(ids, query, body):
+    return page("ophthalmologist_bills", (ids["ophthalmologist_id"],), query)
+
+
+@route("POST", "/bills")
+def create_bill(ids, query, body):
+    services.create_bill(field(body, "patient_id", int), field(body, "appointment_id", int), body.get("amount"))
+    return 201, {"created": True}
+
+
+@route("POST", "/bills/batch")
+def bill_concluded(ids, query, body):
+    return 200, services.bill_concluded(field(body, "ophthalmologist_id", int), body.get("amount"))
+
+
+@route("POST", "/bills/{bill_id}/pay")
+def pay_bill(ids, query, body):
+    services.pay_bill(ids["bill_id"])
+    return 200, {"paid": True}
+
+
+@route("POST", "/feedback")
+def submit_feedback(ids, query, body):
+    services.submit_feedback(field(body, "patient_id", int), field(body, "ophthalmologist_id", int),
+                             body.get("rating"), body.get("comments", ""))
+    return 201, {"submitted": True}
+
+
+@route("GET", "/ophthalmologists/{ophthalmologist_id}/feedback")
+def ophthalmologist_feedback(ids, query, body):
+    return page("ophthalmologist_feedback", (ids["ophthalmologist_id"],), query)
+
+
+@route("GET", "/patients/{patient_id}/dashboard")
+def patient_dashboard(ids, query, body):
+    data = services.patient_dashboard(ids["patient_id"])
+    if data is None:
+        raise HttpError(500, "Database error")
+    return 200, data
+
+
+@route("GET", "/ophthalmologists/{ophthalmologist_id}/dashboard")
+def ophthalmologist_dashboard(ids, query, body):
+    data = services.ophthalmologist_dashboard(ids["ophthalmologist_id"])
+    if data is None:
+        raise HttpError(500, "Database error")
+    return 200, data
+
+
+@route("GET", "/reports/aging")
+def aging_report(ids, query, body):
+    # ?clinic= for one clinic; the CSV export is reports.py --csv
+    report = services.aging_report(query.get("clinic") or None)
+    if report is None:
+        raise HttpError(500, "Database error")
+    return 200, {"as_of": report["as_of"], "columns": list(reports.COLUMNS),
+                 "ophthalmologists": rows_or_error(report["ophthalmologists"]),
+                 "clinics": rows_or_error(report["clinics"]), "total": list(report["total"])}
+
+
+def notification_list(recipient_id, recipient_type):
+    unread = services.unread_notifications(recipient_id, recipient_type)
+    rows = rows_or_error(services.recent_notifications(recipient_id, recipient_type))
+    if unread is None:
+        raise HttpError(500, "Database error")
+    return 200, {"unread": unread, "notifications": rows}
+
+
+@route("GET", "/patients/{patient_id}/notifications")
+def patient_notifications(ids, query, body):
+    return notification_list(ids["patient_id"], notifications.PATIENT)
+
+
+@route("GET", "/ophthalmologists/{ophthalmologist_id}/notifications")
+def ophthalmologist_notifications(ids, query, body):
+    return notification_list(ids["ophthalmologist_id"], notifications.OPHTHALMOLOGIST)
+
+
+@route("POST", "/patients/{patient_id}/notifications/read")
+def patient_notifications_read(ids, query, body):
+    services.mark_notifications_read(ids["patient_id"], notifications.PATIENT)
+    return 200, {"read": True}
+
+
+@route("POST", "/ophthalmologists/{ophthalmologist_id}/notifications/read")
+def ophthalmologist_notifications_read(ids, query, body):
+    services.mark_notifications_read(ids["ophthalmologist_id"], notifications.OPHTHALMOLOGIST)
+    return 200, {"read": True}
+
+
+@route("GET", "/metrics")
+def metrics(ids, query, body):
+    return 200, {"queries": query_stats.snapshot(), "cache": cache_stats(), "pool": pool_stats(),
+                 "outbox": notifications.outbox.stats()}
+
+
+def dispatch_for(client, method, path, query, body):
+    with session(client):
+        return dispatch(method, path, query, body)
+
+
+def dispatch(method, path, query, body):
+    allowed = False
+    for route_method, regex, handler in ROUTES:
+        match = regex.match(path)
+        if not match:
+            continue
+        if route_method != method:
+            allowed = True
+            continue
+        ids = {name: int(value) for name, value in match.groupdict().items()}
+        try:
+            return handler(ids, query, body)
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+        except services.ServiceError as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            print(f"API Error: {method} {path}: {e}")
+            return 500, {"error": "Internal error"}
+    if allowed:
+        return 405, {"error": "Method not allowed"}
+    return 404, {"error": "Not found"}
+
+
+# ==================== SERVER ====================
+class ApiServer:
+    def __init__(self, host=HOST, port=PORT, workers=None):
+        self.host = host
+        self.port = port
+        self.workers = ThreadPoolExecutor(max_workers=workers or get_pool().size,
+                                          thread_name_prefix="api")
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.workers.shutdown(wait=True)
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        # Reads after this client's own writes skip the replica (database.py).
+        # The session is per connection: a client that reconnects, or spreads
+        # requests over several connections, can still read from the replica
+        # before it has its write
+        client = Session()
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, raw = request
+                url = urllib.parse.urlsplit(target)
+                query = dict(urllib.parse.parse_qsl(url.query))
+                try:
+                    body = json.loads(raw) if raw else {}
+                    if not isinstance(body, dict):
+                        raise ValueError
+                except ValueError:
+                    status, payload = 400, {"error": "Body must be a JSON object"}
+                else:
+                    status, payload = await loop.run_in_executor(
+                        self.workers, dispatch_for, client, method, url.path, query, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self.write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HttpError as e:
+            self.write_response(writer, e.status, {"error": str(e)}, False)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "Bad request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0) or 0)
+        if length > MAX_BODY:
+            raise HttpError(413, "Body too large")
+        raw = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, raw
+
+    @staticmethod
+    def write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload, default=to_json).encode()
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+
+
+async def serve(host, port):
+    server = await ApiServer(host, port).start()
+    print(f"Clinic API listening on http://{host}:{server.port}")
+    try:
+        await server.serve_forever()
+    finally:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clinic HTTP/JSON API")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    get_pool().check()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        notifications.outbox.close()
+        close_pool()
+        shards.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import datetime
+
+from database import execute_query, transaction, update_or_insert
+
+# ==================== SLOT AVAILABILITY ====================
+# Ophthalmologist_Schedule keeps one row per ophthalmologist per day that
+# has bookings, with a bitmask of the taken hourly slots (bit i is
+# SLOT_HOURS[i]). Free slots for any range of days come from a single seek
+# on that table's primary key.
+#
+# Booking claims the bit with UPDATE ... WHERE (slot_mask & bit) = 0 in the
+# same transaction as the Appointment insert. The database serializes the
+# two racing UPDATEs on the row, so only one of them sees the bit clear.
+
+SLOT_HOURS = (10, 11, 12, 13, 14, 15, 16, 17)
+FULL_MASK = (1 << len(SLOT_HOURS)) - 1
+AVAILABILITY_DAYS = 14
+IN_CHUNK = 500   # ids per IN (...) list; SQL Server allows 2100 parameters
+
+
+class SlotTaken(Exception):
+    pass
+
+
+def slot_label(index):
+    return datetime.time(SLOT_HOURS[index]).strftime("%I:%M %p")
+
+
+def slot_index(when):
+    # Slot of an appointment_time, None if it is not on a bookable hour
+    if when.hour in SLOT_HOURS and not when.minute:
+        return SLOT_HOURS.index(when.hour)
+    return None
+
+
+def free_slots(mask):
+    return [i for i in range(len(SLOT_HOURS)) if not mask & (1 << i)]
+
+
+def load_availability(ophth_id, start, days=AVAILABILITY_DAYS):
+    # {date: [free slot indexes]} for every day in [start, start + days).
+    # Not cached: another patient may have taken a slot a second ago.
+    end = start + datetime.timedelta(days=days - 1)
+    rows = execute_query("""
+        SELECT schedule_date, slot_mask
+        FROM Ophthalmologist_Schedule
+        WHERE ophthalmologist_id = ? AND schedule_date BETWEEN ? AND ?
+    """, (ophth_id, start.isoformat(), end.isoformat()), fetch=True, cache=False)
+    if rows is None:
+        return None
+    masks = {row[0]: row[1] for row in rows}
+    days_out = {}
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        days_out[day] = free_slots(masks.get(day, 0))
+    return days_out
+
+
+def _claim(tx, ophth_id, day, bit):
+    claim = """
+        UPDATE Ophthalmologist_Schedule SET slot_mask = slot_mask | ?
+        WHERE ophthalmologist_id = ? AND schedule_date = ? AND (slot_mask & ?) = 0
+    """
+    # The UPDATE misses when there is no row for that day yet or the slot is
+    # taken; in the second case the insert hits the primary key
+    return update_or_insert(tx, claim, (bit, ophth_id, day, bit),
+                            "INSERT INTO Ophthalmologist_Schedule(ophthalmologist_id, schedule_date, slot_mask) "
+                            "VALUES(?,?,?)",
+                            (ophth_id, day, bit))
+
+
+def _release(tx, appointment_id):
+    # Frees the appointment's slot and returns its row, None if it is gone
+    tx.execute("""
+        SELECT ophthalmologist_id, appointment_date, appointment_time, appointment_status
+        FROM Appointment WHERE appointment_id = ?
+    """, (appointment_id,))
+    row = tx.fetchone()
+    if row is None or row[3] == 2:
+        # Gone, or rejected earlier and already released
+        return row
+    index = slot_index(row[2])
+    if index is not None:
+        tx.execute("""
+            UPDATE Ophthalmologist_Schedule SET slot_mask = slot_mask & ?
+            WHERE ophthalmologist_id = ? AND schedule_date = ?
+        """, (FULL_MASK & ~(1 << index), row[0], str(row[1])))
+    return row
+
+
+def book_slot(patient_id, ophth_id, day, index):
+    # True when booked, False on a database error; raises SlotTaken
+    day = day.isoformat()
+    time_value = f"{day} {SLOT_HOURS[index]:02d}:00:00"
+    try:
+        with transaction() as tx:
+            if not _claim(tx, ophth_id, day, 1 << index):
+                raise SlotTaken(f"{slot_label(index)} on {day} is already booked")
+            tx.execute(
+                "INSERT INTO Appointment(patient_id, ophthalmologist_id, appointment_date, appointment_time, appointment_status) VALUES(?,?,?,?,?)",
+                (patient_id, ophth_id, day, time_value, 0))
+        return True
+    except SlotTaken:
+        raise
+    except Exception as e:
+        print(f"Query Error: {e}")
+        return False
+
+
+def cancel_appointment(appointment_id):
+    # The cancelled (ophthalmologist_id, appointment_date, appointment_time,
+    # appointment_status), None if there was no such appointment, False on
+    # a database error
+    try:
+        with transaction() as tx:
+            row = _release(tx, appointment_id)
+            # Notifications outlive the appointment they were about
+            tx.execute("UPDATE Notification SET appointment_id = NULL WHERE appointment_id = ?", (appointment_id,))
+            tx.execute("DELETE FROM Appointment WHERE appointment_id = ?", (appointment_id,))
+        return row
+    except Exception as e:
+        print(f"Query Error: {e}")
+        return False
+
+
+def set_status(appointment_ids, status):
+    # Approve (1) or reject (2) many pending appointments in one transaction:
+    # one set-based UPDATE per IN_CHUNK ids, and for rejections one
+    # executemany that frees their slots. Returns (appointment_id,
+    # patient_id, appointment_time) for the ones that changed (were still
+    # pending), or None on a database error. Both come from the rows the
+    # UPDATE itself changed, so an appointment another session decided
+    # meanwhile is left alone.
+    changed = []
+    freed = {}   # (ophthalmologist_id, date) -> AND mask
+    try:
+        with transaction() as tx:
+            for start in range(0, len(appointment_ids), IN_CHUNK):
+                chunk = tuple(appointment_ids[start:start + IN_CHUNK])
+                marks = ",".join("?" * len(chunk))
+                tx.execute(f"""
+                    UPDATE Appointment SET appointment_status = ?
+                    OUTPUT INSERTED.appointment_id, INSERTED.ophthalmologist_id, INSERTED.appointment_date,
+                           INSERTED.appointment_time, INSERTED.patient_id
+                    WHERE appointment_id IN ({marks}) AND appointment_status = 0
+                """, (status,) + chunk)
+                for appointment_id, ophth_id, day, when, patient_id in tx.fetchall():
+                    changed.append((appointment_id, patient_id, when))
+                    index = slot_index(when)
+                    if status == 2 and index is not None:
+                        key = (ophth_id, str(day))
+                        freed[key] = freed.get(key, FULL_MASK) & ~(1 << index)
+            if freed:
+                tx.executemany("""
+                    UPDATE Ophthalmologist_Schedule SET slot_mask = slot_mask & ?
+                    WHERE ophthalmologist_id = ? AND schedule_date = ?
+                """, [(mask, ophth_id, day) for (ophth_id, day), mask in freed.items()])
+        return changed
+    except Exception as e:
+        print(f"Query Error: {e}")
+        return None
@@ -0,0 +1,70 @@
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import datagen
+import reports
+import sqlite_standin
+
+# ==================== AR AGING BENCHMARK ====================
+# Time to build the accounts receivable aging report (reports.py) for every
+# clinic and for a single clinic, plus the CSV export, on a datagen.py
+# database. The default size gives about a million Bill rows; --db keeps
+# the generated database for the next run.
+
+
+def timed(fn, runs):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AR aging report time on a large generated database")
+    parser.add_argument("--db", metavar="PATH", help="reuse (or create) this generated database")
+    parser.add_argument("--patients", type=int, default=300000)
+    parser.add_argument("--ophthalmologists", type=int, default=300)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    database.query_stats.slow_query_ms = float("inf")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "aging.db")
+        if not os.path.exists(path):
+            print(f"Generating {args.patients} patients into {path} ...")
+            sqlite_standin.create_database(path, migrate=True)
+            conn = sqlite_standin.connect(path)
+            try:
+                datagen.generate(conn, "sqlite", args.patients, args.ophthalmologists)
+            finally:
+                conn.close()
+        database.configure_pool(connect=lambda: sqlite_standin.connect(path))
+
+        bills = database.execute_query("SELECT COUNT(*) FROM Bill", fetch=True)[0][0]
+        all_ms, report = timed(reports.aging_report, args.runs)
+        clinic = report["clinics"][0][0]
+        clinic_ms, _ = timed(lambda: reports.aging_report(clinic), args.runs)
+        csv_ms, _ = timed(lambda: reports.write_csv(report, io.StringIO()), args.runs)
+        database.close_pool()
+
+    print(f"{bills} bills, {len(report['ophthalmologists'])} ophthalmologists, {len(report['clinics'])} clinics; "
+          f"median of {args.runs}")
+    print(f"{'all clinics':<20} {all_ms:>10.1f} ms")
+    print(f"{'one clinic':<20} {clinic_ms:>10.1f} ms")
+    print(f"{'CSV export':<20} {csv_ms:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import argparse
+import datetime
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import availability
+import database
+import migrate
+import sqlite_standin
+
+# ==================== CONCURRENT BOOKING BENCHMARK ====================
+# Many patients booking the same few ophthalmologists at once. Compares the
+# old blind INSERT, a check-then-insert, and the slot bitmap claim from
+# availability.py on throughput and on how many slots end up double booked.
+# Also times the "free slots for the next N days" lookup against reading the
+# same answer out of Appointment.
+
+INSERT = ("INSERT INTO Appointment(patient_id, ophthalmologist_id, appointment_date, appointment_time, "
+          "appointment_status) VALUES(?,?,?,?,?)")
+
+
+def seed(path, patients, ophthalmologists, history):
+    sqlite_standin.create_database(path)
+    conn = sqlite_standin.connect(path)
+    conn.executemany(
+        "INSERT INTO Patient(name, gender, date_of_birth, email, phonenumber, password) VALUES(?,?,?,?,?,?)",
+        ((f"Patient {p}", "Other", "1980-01-01", f"patient{p}@example.com", p, 1234)
+         for p in range(1, patients + 1)))
+    conn.executemany(
+        "INSERT INTO Ophthalmologist(name, email, phonenumber, clinicname, clinicaddress, password) VALUES(?,?,?,?,?,?)",
+        ((f"Dr {o}", f"doctor{o}@example.com", o, "Clinic", "Address", 1234)
+         for o in range(1, ophthalmologists + 1)))
+    # Past bookings, so reading availability out of Appointment has work to do
+    rng = random.Random(1)
+    start = datetime.date.today() - datetime.timedelta(days=730)
+    rows = set()
+    while len(rows) < history:
+        day = start + datetime.timedelta(days=rng.randrange(720))
+        rows.add((rng.randint(1, ophthalmologists), day.isoformat(), rng.choice(availability.SLOT_HOURS)))
+    conn.executemany(INSERT, ((rng.randint(1, patients), o, d, f"{d} {h:02d}:00:00", 1) for o, d, h in rows))
+    conn.commit()
+    conn.close()
+    conn = sqlite_standin.connect(path)
+    migrate.migrate(conn, "sqlite")
+    conn.close()
+
+
+def blind_insert(pool, patient_id, ophth_id, day, index):
+    d = day.isoformat()
+    with pool.connection() as conn:
+        conn.cursor().execute(INSERT, (patient_id, ophth_id, d, f"{d} {availability.SLOT_HOURS[index]:02d}:00:00", 0))
+        conn.commit()
+    return True
+
+
+def check_then_insert(pool, patient_id, ophth_id, day, index):
+    d = day.isoformat()
+    when = f"{d} {availability.SLOT_HOURS[index]:02d}:00:00"
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM Appointment WHERE ophthalmologist_id = ? AND appointment_time = ?",
+                    (ophth_id, when))
+        if cur.fetchone()[0]:
+            return False
+        cur.execute(INSERT, (patient_id, ophth_id, d, when, 0))
+        conn.commit()
+    return True
+
+
+def bitmap_claim(pool, patient_id, ophth_id, day, index):
+    try:
+        return availability.book_slot(patient_id, ophth_id, day, index)
+    except availability.SlotTaken:
+        return False
+
+
+def run_booking(path, book, args):
+    pool = database.configure_pool(connect=lambda: sqlite_standin.connect(path, args.latency_ms / 1000),
+                                   size=args.pool_size, timeout=60)
+    today = datetime.date.today()
+    booked = [0] * args.workers
+
+    def worker(n):
+        rng = random.Random(n)
+        for _ in range(args.attempts):
+            day = today + datetime.timedelta(days=rng.randrange(args.days))
+            if book(pool, 1 + n, rng.randint(1, args.hot), day, rng.randrange(len(availability.SLOT_HOURS))):
+                booked[n] += 1
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.workers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    database.close_pool()
+
+    conn = sqlite_standin.connect(path)
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT COALESCE(SUM(n - 1), 0) FROM (
+            SELECT COUNT(*) AS n FROM Appointment
+            WHERE appointment_date >= ?
+            GROUP BY ophthalmologist_id, appointment_time
+        ) WHERE n > 1
+    """, (today.isoformat(),))
+    double_booked = cur.fetchone()[0]
+    conn.close()
+    return args.workers * args.attempts / elapsed, sum(booked), double_booked
+
+
+def time_lookups(path, args):
+    database.configure_pool(connect=lambda: sqlite_standin.connect(path))
+    conn = sqlite_standin.connect(path)
+    cur = conn.cursor()
+    start_day = datetime.date.today() - datetime.timedelta(days=365)
+    end_day = start_day + datetime.timedelta(days=args.lookup_days - 1)
+    rng = random.Random(3)
+    doctors = [rng.randint(1, args.ophthalmologists) for _ in range(200)]
+
+    start = time.perf_counter()
+    for ophth_id in doctors:
+        availability.load_availability(ophth_id, start_day, args.lookup_days)
+    bitmap_ms = (time.perf_counter() - start) * 1000 / len(doctors)
+
+    start = time.perf_counter()
+    for ophth_id in doctors:
+        cur.execute("""
+            SELECT appointment_date, appointment_time FROM Appointment
+            WHERE ophthalmologist_id = ? AND appointment_date BETWEEN ? AND ?
+        """, (ophth_id, start_day.isoformat(), end_day.isoformat()))
+        taken = {}
+        for day, when in cur.fetchall():
+            index = availability.slot_index(when)
+            if index is not None:
+                taken[day] = taken.get(day, 0) | (1 << index)
+        for offset in range(args.lookup_days):
+            availability.free_slots(taken.get(start_day + datetime.timedelta(days=offset), 0))
+    scan_ms = (time.perf_counter() - start) * 1000 / len(doctors)
+    conn.close()
+    database.close_pool()
+    return bitmap_ms, scan_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent booking: conflicts and throughput")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=40, help="booking attempts per worker")
+    parser.add_argument("--hot", type=int, default=3, help="ophthalmologists everybody books")
+    parser.add_argument("--days", type=int, default=5, help="days ahead the bookings spread over")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="simulated round trip per statement")
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--ophthalmologists", type=int, default=50)
+    parser.add_argument("--history", type=int, default=200000, help="past appointments")
+    parser.add_argument("--lookup-days", type=int, default=30)
+    args = parser.parse_args()
+
+    # SQLite locks the whole file per write, so waits are long by design here
+    database.query_stats.slow_query_ms = float("inf")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, "base.db")
+        seed(base, args.patients, args.ophthalmologists, args.history)
+
+        print(f"{args.workers} workers x {args.attempts} attempts on {args.hot} ophthalmologists x "
+              f"{args.days} days x {len(availability.SLOT_HOURS)} slots, latency={args.latency_ms}ms")
+        print(f"{'strategy':<20} {'attempts/s':>11} {'booked':>8} {'double booked':>14}")
+        for name, book in (("blind insert", blind_insert), ("check then insert", check_then_insert),
+                           ("slot bitmap", bitmap_claim)):
+            path = os.path.join(tmp, f"{name.replace(' ', '_')}.db")
+            shutil.copy(base, path)
+            rate, booked, double_booked = run_booking(path, book, args)
+            print(f"{name:<20} {rate:>11.1f} {booked:>8} {double_booked:>14}")
+
+        bitmap_ms, scan_ms = time_lookups(base, args)
+        print(f"Free slots over {args.lookup_days} days: bitmap {bitmap_ms:.3f} ms, "
+              f"from Appointment {scan_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrate
+import sqlite_standin
+from pagination import KeysetPager
+
+# ==================== INDEX MIGRATION BENCHMARK ====================
+# Times every query Clinic.py runs against a large synthetic clinic, first on
+# the bare schema (primary keys only) and again after migration 001 added the
+# normalized email keys and covering indexes. Logins run the old
+# RTRIM(email)=? form before and the email_normalized=? form after.
+
+PAGERS = {
+    "appointment history": KeysetPager(
+        "a.appointment_id, a.appointment_date, a.appointment_time, RTRIM(o.name), a.appointment_status",
+        "Appointment a JOIN Ophthalmologist o ON a.ophthalmologist_id = o.ophthalmologist_id",
+        "a.patient_id = ?", "a.appointment_date", "a.appointment_id"),
+    "patient medical history": KeysetPager(
+        "pr.record_date, RTRIM(o.name), RTRIM(pr.diagnosis), pr.treatment_details, RTRIM(pr.prescription)",
+        "Patient_Record pr JOIN Ophthalmologist o ON pr.ophthalmologist_id = o.ophthalmologist_id",
+        "pr.patient_id = ?", "pr.record_date", "pr.record_id"),
+    "ophthalmologist appointments": KeysetPager(
+        "a.appointment_id, RTRIM(p.name), a.appointment_date, a.appointment_time, a.appointment_status",
+        "Appointment a JOIN Patient p ON a.patient_id = p.patient_id",
+        "a.ophthalmologist_id = ?", "a.appointment_date", "a.appointment_id", descending=False),
+    "ophthalmologist medical history": KeysetPager(
+        "record_date, RTRIM(diagnosis), treatment_details, RTRIM(prescription)",
+        "Patient_Record",
+        "patient_id = ? AND ophthalmologist_id = ?", "record_date", "record_id"),
+    "patient billing": KeysetPager(
+        "b.bill_id, b.payment_date, RTRIM(o.name), b.amount, b.payment_status",
+        "Bill b JOIN Appointment a ON b.appointment_id = a.appointment_id "
+        "JOIN Ophthalmologist o ON a.ophthalmologist_id = o.ophthalmologist_id",
+        "b.patient_id = ?", "b.payment_date", "b.bill_id"),
+    "ophthalmologist billing": KeysetPager(
+        "RTRIM(p.name), b.payment_date, b.amount, b.payment_status",
+        "Bill b JOIN Patient p ON b.patient_id = p.patient_id "
+        "JOIN Appointment a ON b.appointment_id = a.appointment_id",
+        "a.ophthalmologist_id = ?", "b.payment_date", "b.bill_id"),
+    "ophthalmologist feedback": KeysetPager(
+        "RTRIM(p.name), f.rating, f.comments, f.feedback_date",
+        "Feedback f JOIN Patient p ON f.patient_id = p.patient_id",
+        "f.ophthalmologist_id = ?", "f.feedback_date", "f.feedback_id"),
+}
+
+PARAMS = {
+    "appointment history": "patient",
+    "patient medical history": "patient",
+    "ophthalmologist appointments": "ophth",
+    "ophthalmologist medical history": "patient_ophth",
+    "patient billing": "patient",
+    "ophthalmologist billing": "ophth",
+    "ophthalmologist feedback": "ophth",
+}
+
+# name -> (query before, query after, params kind); None means unchanged
+LOOKUPS = {
+    "patient login": (
+        "SELECT patient_id FROM Patient WHERE RTRIM(email)=? AND password=?",
+        "SELECT patient_id FROM Patient WHERE email_normalized=? AND password=?",
+        "patient_login"),
+    "ophthalmologist login": (
+        "SELECT ophthalmologist_id FROM Ophthalmologist WHERE RTRIM(email)=? AND password=?",
+        "SELECT ophthalmologist_id FROM Ophthalmologist WHERE email_normalized=? AND password=?",
+        "ophth_login"),
+    "latest record": ("""
+        SELECT TOP 1 pr.record_date, RTRIM(o.name), RTRIM(pr.diagnosis),
+               pr.treatment_details, RTRIM(pr.prescription)
+        FROM Patient_Record pr
+        JOIN Ophthalmologist o ON pr.ophthalmologist_id = o.ophthalmologist_id
+        WHERE pr.patient_id = ?
+        ORDER BY pr.record_date DESC
+    """, None, "patient"),
+    "record form patients": ("""
+        SELECT DISTINCT p.patient_id, RTRIM(p.name)
+        FROM Patient p
+        JOIN Appointment a ON p.patient_id = a.patient_id
+        WHERE a.ophthalmologist_id = ?
+    """, None, "ophth"),
+    "record form appointments": ("""
+        SELECT appointment_id, appointment_date
+        FROM Appointment
+        WHERE patient_id = ? AND ophthalmologist_id = ?
+        ORDER BY appointment_date DESC
+    """, None, "patient_ophth"),
+    "history patients": ("""
+        SELECT DISTINCT p.patient_id, RTRIM(p.name)
+        FROM Patient p
+        JOIN Patient_Record pr ON p.patient_id = pr.patient_id
+        WHERE pr.ophthalmologist_id = ?
+    """, None, "ophth"),
+    "billing patients": ("""
+        SELECT DISTINCT p.patient_id, RTRIM(p.name), a.appointment_id
+        FROM Patient p
+        JOIN Appointment a ON p.patient_id = a.patient_id
+        WHERE a.ophthalmologist_id = ?
+    """, None, "ophth"),
+    "feedback ophthalmologists": ("""
+        SELECT DISTINCT o.ophthalmologist_id, RTRIM(o.name)
+        FROM Ophthalmologist o
+        JOIN Appointment a ON o.ophthalmologist_id = a.ophthalmologist_id
+        WHERE a.patient_id = ?
+    """, None, "patient"),
+}
+
+
+def seed(path, patients, ophthalmologists, visits, rng):
+    sqlite_standin.create_database(path)
+    conn = sqlite_standin.connect(path)
+
+    def day(i):
+        return f"20{18 + i % 8}-{i % 12 + 1:02d}-{i % 28 + 1:02d}"
+
+    conn.executemany(
+        "INSERT INTO Patient(name, gender, date_of_birth, email, phonenumber, password) VALUES(?,?,?,?,?,?)",
+        ((f"Patient {p}", "Other", "1980-01-01", f"Patient{p}@example.com", p, 1000 + p % 9000)
+         for p in range(1, patients + 1)))
+    conn.executemany(
+        "INSERT INTO Ophthalmologist(name, email, phonenumber, clinicname, clinicaddress, password) VALUES(?,?,?,?,?,?)",
+        ((f"Dr {o}", f"Doctor{o}@example.com", o, "Clinic", "Address", 1000 + o % 9000)
+         for o in range(1, ophthalmologists + 1)))
+
+    appointments = []
+    for p in range(1, patients + 1):
+        for _ in range(visits):
+            appointments.append((p, rng.randint(1, ophthalmologists), rng.randint(0, 5000)))
+    conn.executemany(
+        "INSERT INTO Appointment(patient_id, ophthalmologist_id, appointment_date, appointment_time, appointment_status) VALUES(?,?,?,?,?)",
+        ((p, o, day(d), f"{day(d)} {9 + d % 8}:00:00", d % 2) for p, o, d in appointments))
+    conn.executemany(
+        "INSERT INTO Patient_Record(patient_id, ophthalmologist_id, appointment_id, record_date, diagnosis, prescription, treatment_details) VALUES(?,?,?,?,?,?,?)",
+        ((p, o, i, day(d), "Glaucoma", "Latanoprost", "Eye drops nightly")
+         for i, (p, o, d) in enumerate(appointments, 1) if i % 2 == 0))
+    conn.executemany(
+        "INSERT INTO Bill(patient_id, appointment_id, amount, payment_status, payment_date) VALUES(?,?,?,?,?)",
+        ((p, i, 100.0 + d % 400, d % 2, day(d)) for i, (p, o, d) in enumerate(appointments, 1)))
+    conn.executemany(
+        "INSERT INTO Feedback(patient_id, ophthalmologist_id, rating, comments, feedback_date) VALUES(?,?,?,?,?)",
+        ((p, o, d % 5 + 1, "Good visit", day(d))
+         for i, (p, o, d) in enumerate(appointments, 1) if i % 3 == 0))
+    conn.commit()
+    conn.close()
+    return appointments
+
+
+def param_sets(kind, samples, patients, ophthalmologists, appointments, rng):
+    out = []
+    for _ in range(samples):
+        p = rng.randint(1, patients)
+        o = rng.randint(1, ophthalmologists)
+        if kind == "patient":
+            out.append((p,))
+        elif kind == "ophth":
+            out.append((o,))
+        elif kind == "patient_ophth":
+            out.append((p, appointments[(p - 1) * (len(appointments) // patients)][1]))
+        elif kind == "patient_login":
+            out.append((f"Patient{p}@example.com", 1000 + p % 9000))
+        elif kind == "ophth_login":
+            out.append((f"Doctor{o}@example.com", 1000 + o % 9000))
+    return out
+
+
+def time_query(conn, query, params_list):
+    cursor = conn.cursor()
+    timings = []
+    for params in params_list:
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def run(conn, after, params):
+    results = {}
+    for name, (before_query, after_query, _) in LOOKUPS.items():
+        query = after_query if after and after_query else before_query
+        params_list = params[name]
+        if after and name.endswith("login"):
+            # Clinic.py normalizes what the user typed before the lookup
+            params_list = [(email.strip().lower(), password) for email, password in params_list]
+        results[name] = time_query(conn, query, params_list)
+    for name, pager in PAGERS.items():
+        query, _ = pager.query()
+        results[name] = time_query(conn, query, [pager.query(p)[1] for p in params[name]])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clinic.py query latency before/after the index migration")
+    parser.add_argument("--patients", type=int, default=20000)
+    parser.add_argument("--ophthalmologists", type=int, default=200)
+    parser.add_argument("--visits", type=int, default=15, help="appointments per patient")
+    parser.add_argument("--samples", type=int, default=20, help="timed runs per query (median is reported)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        start = time.perf_counter()
+        appointments = seed(path, args.patients, args.ophthalmologists, args.visits, rng)
+        print(f"Seeded {args.patients} patients, {len(appointments)} appointments "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        kinds = {name: kind for name, (_, _, kind) in LOOKUPS.items()}
+        kinds.update(PARAMS)
+        params = {name: param_sets(kind, args.samples, args.patients, args.ophthalmologists, appointments, rng)
+                  for name, kind in kinds.items()}
+
+        conn = sqlite_standin.connect(path)
+        before = run(conn, False, params)
+        start = time.perf_counter()
+        migrate.migrate(conn, "sqlite")
+        conn.execute("ANALYZE")
+        print(f"Migration applied in {time.perf_counter() - start:.1f}s")
+        after = run(conn, True, params)
+        conn.close()
+
+    print(f"{'query':<34} {'before ms':>10} {'after ms':>10} {'speedup':>9}")
+    for name in before:
+        speedup = before[name] / after[name] if after[name] else float("inf")
+        print(f"{name:<34} {before[name]:>10.3f} {after[name]:>10.3f} {speedup:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
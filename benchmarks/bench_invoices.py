@@ -0,0 +1,60 @@
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import invoices
+
+# ==================== INVOICE RENDERING BENCHMARK ====================
+# Documents per second for a month-end batch rendered by invoices.
+# render_batch with 1, 2, 4 ... workers (up to the core count, or
+# --workers). The documents are synthetic, so no database is needed; every
+# run writes into a fresh temporary directory. Times include starting the
+# process pool.
+
+
+def make_documents(count, seed=1):
+    rng = random.Random(seed)
+    start = datetime.datetime(2026, 9, 1, 10)
+    return [{"bill_id": i, "bill_date": (start + datetime.timedelta(days=i % 30)).date(),
+             "amount": rng.choice((1500, 2000, 2500, 3500)), "paid": rng.random() < 0.7,
+             "patient_id": rng.randint(1, 100000), "patient_name": f"Patient {i} <O'Brien & Co>",
+             "patient_email": f"patient{i}@example.com",
+             "appointment_time": start + datetime.timedelta(days=i % 30, hours=i % 8),
+             "ophthalmologist_name": "Dr Sara Khan", "clinic": "City Eye Clinic", "clinic_address": "12 Mall Road"}
+            for i in range(1, count + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Invoice rendering throughput against process pool size")
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", help="pool sizes to try")
+    parser.add_argument("--chunk", type=int, default=invoices.CHUNK)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    sizes = args.workers or sorted({1, 2, 4, 8, 16, cores} & set(range(1, max(cores, 4) + 1)))
+    docs = make_documents(args.docs)
+    print(f"{args.docs} documents, chunk {args.chunk}, {cores} cores; best of {args.runs}")
+    print(f"{'workers':>8} {'seconds':>9} {'docs/s':>9} {'speedup':>8}")
+    base = None
+    for workers in sizes:
+        best = None
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory() as out_dir:
+                start = time.perf_counter()
+                invoices.render_batch(docs, out_dir, workers, args.chunk, min_docs=0)
+                elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        base = base or best
+        print(f"{workers:>8} {best:>9.2f} {args.docs / best:>9.0f} {base / best:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import passwords
+import services
+import sqlite_standin
+
+# ==================== LOGIN THROUGHPUT BENCHMARK ====================
+# Logins per second through services.patient_login against the size of the
+# password hashing pool (passwords.py), with --clients threads signing in
+# at once on a SQLite stand-in. Every account has a current hash, so each
+# login is one key lookup plus one scrypt check. "busy" counts logins
+# refused because MAX_PENDING were already waiting; "tick" is the worst
+# delay of a 10 ms timer on another thread, standing in for the UI event
+# loop while the burst runs.
+
+PASSWORD = "correct horse battery staple"
+TICK_MS = 10
+
+
+def seed(path, accounts):
+    sqlite_standin.create_database(path, migrate=True)
+    conn = sqlite_standin.connect(path)
+    digest = passwords.hash_now(PASSWORD)
+    conn.executemany(
+        "INSERT INTO Patient(name, gender, date_of_birth, email, phonenumber, password, password_hash) "
+        "VALUES(?,?,?,?,?,0,?)",
+        ((f"Patient {n}", "Female", "1990-01-01", f"patient{n}@example.com", 300000000 + n, digest)
+         for n in range(1, accounts + 1)))
+    conn.commit()
+    conn.close()
+
+
+def burst(clients, accounts, seconds):
+    # (logins, busy, latencies in ms, worst timer delay in ms)
+    stop = time.perf_counter() + seconds
+    results = [[0, 0, []] for _ in range(clients)]
+
+    def client(n):
+        result = results[n]
+        i = n
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                if services.patient_login(f"patient{i % accounts + 1}@example.com", PASSWORD) is None:
+                    raise RuntimeError("login failed")
+                result[0] += 1
+            except services.ServiceError:
+                result[1] += 1
+                time.sleep(0.01)
+            result[2].append((time.perf_counter() - start) * 1000)
+            i += clients
+
+    worst = [0.0]
+
+    def ticker():
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            time.sleep(TICK_MS / 1000)
+            worst[0] = max(worst[0], (time.perf_counter() - start) * 1000 - TICK_MS)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    threads.append(threading.Thread(target=ticker))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies = sorted(ms for result in results for ms in result[2])
+    return sum(r[0] for r in results), sum(r[1] for r in results), latencies, worst[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logins per second against password hashing pool size")
+    parser.add_argument("--workers", type=int, nargs="+", help="pool sizes to try")
+    parser.add_argument("--clients", type=int, default=32, help="threads signing in at once")
+    parser.add_argument("--max-pending", type=int, default=passwords.MAX_PENDING)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    sizes = args.workers or sorted({1, 2, 4, 8, cores, cores * 2})
+    database.query_stats.slow_query_ms = float("inf")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "logins.db")
+        seed(path, args.accounts)
+        database.configure_pool(connect=lambda: sqlite_standin.connect(path), size=args.clients)
+        print(f"{args.clients} clients, {cores} cores, {passwords.SCHEME} {passwords.PARAMS[passwords.SCHEME]}, "
+              f"max pending {args.max_pending}, {args.seconds:g}s each")
+        print(f"{'workers':>8} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'busy':>6} {'tick ms':>8}")
+        for workers in sizes:
+            passwords.configure_pool(workers, args.max_pending)
+            logins, busy, latencies, tick = burst(args.clients, args.accounts, args.seconds)
+            p50 = latencies[len(latencies) // 2] if latencies else 0
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0
+            print(f"{workers:>8} {logins / args.seconds:>9.1f} {p50:>8.0f} {p95:>8.0f} {busy:>6} {tick:>8.1f}")
+        passwords.get_pool().close()
+        database.close_pool()
+
+
+if __name__ == "__main__":
+    main()
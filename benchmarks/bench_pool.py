@@ -0,0 +1,105 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite_standin
+from database import ConnectionPool
+
+# ==================== POOL THROUGHPUT BENCHMARK ====================
+# Compares the old model (one shared connection guarded by a lock, which is
+# what the module-level cursor amounted to) with the bounded pool, at rising
+# numbers of concurrent workers. Each statement pays a simulated round trip.
+
+QUERY = """
+    SELECT a.appointment_id, a.appointment_date, a.appointment_status
+    FROM Appointment a
+    WHERE a.patient_id = ?
+    ORDER BY a.appointment_date DESC
+"""
+
+
+def seed(path, patients=200, per_patient=20):
+    sqlite_standin.create_database(path)
+    conn = sqlite_standin.connect(path)
+    conn.executemany(
+        "INSERT INTO Appointment(patient_id, ophthalmologist_id, appointment_date, appointment_time, appointment_status) VALUES(?,?,?,?,?)",
+        ((p, p % 5 + 1, f"2025-{m % 12 + 1:02d}-{m % 28 + 1:02d}", "2025-01-01 10:00:00", m % 3)
+         for p in range(1, patients + 1) for m in range(per_patient)))
+    conn.commit()
+    conn.close()
+
+
+def run_workers(workers, queries_per_worker, do_query):
+    def worker(n):
+        for i in range(queries_per_worker):
+            do_query((n * 31 + i) % 200 + 1)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(workers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return workers * queries_per_worker / elapsed
+
+
+def bench_shared(path, latency, workers, queries):
+    conn = sqlite_standin.connect(path, latency)
+    lock = threading.Lock()
+
+    def do_query(patient_id):
+        with lock:
+            cur = conn.cursor()
+            cur.execute(QUERY, (patient_id,))
+            cur.fetchall()
+
+    try:
+        return run_workers(workers, queries, do_query)
+    finally:
+        conn.close()
+
+
+def bench_pool(path, latency, workers, queries, size):
+    pool = ConnectionPool(connect=lambda: sqlite_standin.connect(path, latency), size=size)
+
+    def do_query(patient_id):
+        with pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(QUERY, (patient_id,))
+            cur.fetchall()
+
+    try:
+        return run_workers(workers, queries, do_query)
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Connection pool throughput vs concurrency")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated round trip per statement")
+    parser.add_argument("--queries", type=int, default=50, help="queries per worker")
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--workers", default="1,2,4,8,16")
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    levels = [int(w) for w in args.workers.split(",")]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(path)
+        print(f"latency={args.latency_ms}ms  pool_size={args.pool_size}  queries/worker={args.queries}")
+        print(f"{'workers':>8} {'shared q/s':>12} {'pool q/s':>12} {'speedup':>8}")
+        for workers in levels:
+            shared = bench_shared(path, latency, workers, args.queries)
+            pooled = bench_pool(path, latency, workers, args.queries, args.pool_size)
+            print(f"{workers:>8} {shared:>12.1f} {pooled:>12.1f} {pooled / shared:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
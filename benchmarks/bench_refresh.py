@@ -0,0 +1,111 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import datagen
+import row_versions
+import services
+import sqlite_standin
+
+# ==================== DELTA REFRESH BENCHMARK ====================
+# Keeping an ophthalmologist's appointment queue current: reading the whole
+# 500-row page again versus fetching only what changed since the page's
+# watermark (row_versions.changes), with a few appointments updated, booked
+# and cancelled between refreshes. --latency-ms adds a simulated round trip
+# per statement; the delta costs more statements but moves far fewer rows.
+
+
+def busiest_ophthalmologist():
+    rows = database.execute_query("""
+        SELECT TOP (1) ophthalmologist_id FROM Appointment
+        GROUP BY ophthalmologist_id ORDER BY COUNT(*) DESC
+    """, fetch=True, cache=False)
+    return rows[0][0]
+
+
+def make_changes(ophth_id, rows, count):
+    # Update count rows of the page, book one appointment and cancel it again
+    with database.transaction() as tx:
+        for row in rows[:count]:
+            tx.execute("UPDATE Appointment SET appointment_status = appointment_status WHERE appointment_id = ?",
+                       (row[0],))
+        tx.execute("""
+            INSERT INTO Appointment (patient_id, ophthalmologist_id, appointment_date, appointment_time,
+                                     appointment_status)
+            VALUES (1, ?, '2000-01-01', '2000-01-01 10:00:00', 0)
+        """, (ophth_id,))
+        tx.execute("DELETE FROM Appointment WHERE ophthalmologist_id = ? AND appointment_date = '2000-01-01'",
+                   (ophth_id,))
+
+
+def timed(fn, runs):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full page reload versus delta refresh of a list screen")
+    parser.add_argument("--patients", type=int, default=20000)
+    parser.add_argument("--ophthalmologists", type=int, default=20)
+    parser.add_argument("--visits", type=int, default=5)
+    parser.add_argument("--changes", type=int, default=5, help="rows updated between refreshes")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="simulated round trip per statement")
+    args = parser.parse_args()
+
+    database.query_stats.slow_query_ms = float("inf")
+    database.result_cache.max_entries = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "refresh.db")
+        sqlite_standin.create_database(path, migrate=True)
+        conn = sqlite_standin.connect(path)
+        try:
+            datagen.generate(conn, "sqlite", args.patients, args.ophthalmologists, args.visits)
+        finally:
+            conn.close()
+        database.configure_pool(connect=lambda: sqlite_standin.connect(path, args.latency_ms / 1000))
+
+        ophth_id = busiest_ophthalmologist()
+        pager = services.pager("ophthalmologist_appointments")
+        params = (ophth_id,)
+        query, query_params = pager.query(params)
+
+        def reload():
+            row_versions.watermark()
+            return database.execute_query(query, query_params, fetch=True, cache=False)[:pager.page_size]
+
+        full_ms, page = timed(reload, args.runs)
+
+        delta_timings, delta_rows = [], 0
+        for _ in range(args.runs):
+            since = row_versions.watermark()
+            make_changes(ophth_id, page, args.changes)
+            start = time.perf_counter()
+            _, rows, deleted = row_versions.changes(pager, params, since)
+            delta_timings.append((time.perf_counter() - start) * 1000)
+            delta_rows = len(rows) + len(deleted)
+        delta_timings.sort()
+        delta_ms = delta_timings[len(delta_timings) // 2]
+        database.close_pool()
+
+    print(f"ophthalmologist {ophth_id}, latency={args.latency_ms:.1f}ms, {args.changes} updates + 1 booking "
+          f"cancelled between refreshes; median of {args.runs}")
+    print(f"{'full page reload':<20} {full_ms:>8.2f} ms {len(page):>6} rows")
+    print(f"{'delta refresh':<20} {delta_ms:>8.2f} ms {delta_rows:>6} rows")
+    print(f"{'speedup':<20} {full_ms / delta_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import datagen
+import services
+import sqlite_standin
+
+# ==================== READ REPLICA HARNESS ====================
+# Read/write splitting (database.py, READ REPLICA) on two SQLite files: the
+# primary, and a replica that sqlite_standin.Replica keeps --lag seconds
+# behind it. Three checks:
+#
+#   own reads     a patient pays a bill and reloads Your Bills in the same
+#                 session; "stale" counts reloads that still show it unpaid,
+#                 with the read-your-writes window on and off
+#   other reads   how long another session takes to see the payment (about
+#                 the lag, since its reads go to the replica)
+#   primary load  --clients sessions loading the ophthalmologist billing
+#                 page, one of them also paying a bill every WRITE_EVERY
+#                 pages: statements each database ran, without and with
+#                 the replica. The writer's session reads from the primary
+#                 while its read-your-writes window is open.
+
+POLL = 0.02
+WRITE_EVERY = 10
+
+
+class Counted:
+    # Counts the statements run on a pool's connections
+    def __init__(self, connect):
+        self.connect = connect
+        self.statements = 0
+
+    def __call__(self):
+        conn = self.connect()
+        cursor = conn.cursor
+
+        def counted():
+            self.statements += 1
+            return cursor()
+        conn.cursor = counted
+        return conn
+
+
+def unpaid_bills(count):
+    return database.execute_query("""
+        SELECT TOP (?) bill_id, patient_id FROM Bill WHERE payment_status = 0 ORDER BY bill_id
+    """, (count,), fetch=True, cache=False)
+
+
+def paid(bill_id, patient_id):
+    rows, _ = services.fetch_page("patient_bills", (patient_id,))
+    return any(row[0] == bill_id and row[4] for row in rows)
+
+
+def own_reads(bills):
+    stale = 0
+    for bill_id, patient_id in bills:
+        with database.session(database.Session()):
+            services.pay_bill(bill_id)
+            stale += not paid(bill_id, patient_id)
+    return stale
+
+
+def other_reads(bills):
+    waits = []
+    for bill_id, patient_id in bills:
+        with database.session(database.Session()):
+            services.pay_bill(bill_id)
+        start = time.perf_counter()
+        with database.session(database.Session()):
+            while not paid(bill_id, patient_id):
+                time.sleep(POLL)
+        waits.append((time.perf_counter() - start) * 1000)
+    waits.sort()
+    return waits[len(waits) // 2], waits[-1]
+
+
+def workload(ophth_ids, bills, clients, seconds):
+    # Pages loaded per second
+    stop = time.perf_counter() + seconds
+    counts = [0] * clients
+
+    def client(n):
+        with database.session(database.Session()):
+            while time.perf_counter() < stop:
+                if n == 0 and counts[n] % WRITE_EVERY == 0 and bills:
+                    services.pay_bill(bills.pop()[0])
+                services.fetch_page("ophthalmologist_bills", (ophth_ids[(n + counts[n]) % len(ophth_ids)],))
+                counts[n] += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read/write splitting against a lagging SQLite replica")
+    parser.add_argument("--patients", type=int, default=5000)
+    parser.add_argument("--ophthalmologists", type=int, default=10)
+    parser.add_argument("--lag", type=float, default=0.5, help="replica lag in seconds")
+    parser.add_argument("--writes", type=int, default=20, help="bills paid per check")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--pool", type=int, default=4, help="connections per pool")
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="simulated round trip per statement")
+    args = parser.parse_args()
+
+    database.query_stats.slow_query_ms = float("inf")
+    database.result_cache.max_entries = 0
+    latency = args.latency_ms / 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "primary.db")
+        sqlite_standin.create_database(path, migrate=True)
+        conn = sqlite_standin.connect(path)
+        try:
+            datagen.generate(conn, "sqlite", args.patients, args.ophthalmologists)
+        finally:
+            conn.close()
+        replica = sqlite_standin.Replica(path, os.path.join(tmp, "replica.db"), args.lag).start()
+        primary = Counted(lambda: sqlite_standin.connect(path, latency))
+        secondary = Counted(lambda: replica.connect(latency))
+        database.configure_pool(connect=primary, size=args.pool)
+        database.configure_replica(connect=secondary, size=args.pool)
+        print(f"replica lag {args.lag:g}s, {args.writes} payments per check, latency={args.latency_ms:.1f}ms")
+
+        bills = unpaid_bills(args.writes * 3 + 100000)
+        window = database.READ_YOUR_WRITES
+        stale = own_reads(bills[:args.writes])
+        print(f"{'own reads':<14} stale {stale}/{args.writes} with a {window:g}s read-your-writes window")
+        database.READ_YOUR_WRITES = 0
+        stale = own_reads(bills[args.writes:args.writes * 2])
+        print(f"{'own reads':<14} stale {stale}/{args.writes} without it")
+        database.READ_YOUR_WRITES = window
+
+        median, worst = other_reads(bills[args.writes * 2:args.writes * 3])
+        print(f"{'other reads':<14} payment visible after {median:.0f} ms median, {worst:.0f} ms worst")
+
+        ophth_ids = [row[0] for row in services.ophthalmologists()]
+        bills = bills[args.writes * 3:]
+        for label, use_replica in (("primary only", False), ("with replica", True)):
+            database.configure_pool(connect=primary, size=args.pool)
+            if use_replica:
+                database.configure_replica(connect=secondary, size=args.pool)
+            else:
+                database.configure_replica()
+            primary.statements = secondary.statements = 0
+            pages = workload(ophth_ids, bills, args.clients, args.seconds)
+            print(f"{'primary load':<14} {label}: {pages:.0f} pages/s, statements/s "
+                  f"{primary.statements / args.seconds:.0f} on the primary, "
+                  f"{secondary.statements / args.seconds:.0f} on the replica")
+
+        database.close_pool()
+        replica.stop()
+
+
+if __name__ == "__main__":
+    main()
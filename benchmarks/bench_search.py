@@ -0,0 +1,73 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import datagen
+import search
+import sqlite_standin
+
+# ==================== RECORD SEARCH BENCHMARK ====================
+# Latency of search.search() for whole-word, prefix and multi-word queries
+# against random ophthalmologists on a datagen.py database. The default
+# size gives about a million Patient_Record rows; --db keeps the generated
+# database for the next run.
+
+QUERIES = ("glaucoma", "glaucoma latanoprost", "latano", "cataract iol", "drops", "refraction test",
+           "macular oct", "dry eye lid", "diab")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record search latency on a large generated database")
+    parser.add_argument("--db", metavar="PATH", help="reuse (or create) this generated database")
+    parser.add_argument("--patients", type=int, default=320000)
+    parser.add_argument("--ophthalmologists", type=int, default=300)
+    parser.add_argument("--samples", type=int, default=100, help="searches per query")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated round trip per statement")
+    args = parser.parse_args()
+
+    database.query_stats.slow_query_ms = float("inf")
+    database.result_cache.max_entries = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "search.db")
+        if not os.path.exists(path):
+            print(f"Generating {args.patients} patients into {path} ...")
+            sqlite_standin.create_database(path, migrate=True)
+            conn = sqlite_standin.connect(path)
+            try:
+                datagen.generate(conn, "sqlite", args.patients, args.ophthalmologists)
+            finally:
+                conn.close()
+        database.configure_pool(connect=lambda: sqlite_standin.connect(path, args.latency_ms / 1000))
+
+        records = database.execute_query("SELECT COUNT(*) FROM Patient_Record", fetch=True)[0][0]
+        ophths = database.execute_query("SELECT MAX(ophthalmologist_id) FROM Ophthalmologist", fetch=True)[0][0]
+        rng = random.Random(1)
+        print(f"{records} records, {ophths} ophthalmologists, latency={args.latency_ms:.1f}ms")
+        print(f"{'query':<24} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'matches':>8}")
+        for text in QUERIES:
+            timings, matches = [], []
+            for _ in range(args.samples):
+                ophth_id = rng.randint(1, ophths)
+                start = time.perf_counter()
+                rows, total = search.search(ophth_id, text)
+                timings.append((time.perf_counter() - start) * 1000)
+                matches.append(total)
+            print(f"{text:<24} {percentile(timings, 0.5):>8.2f} {percentile(timings, 0.95):>8.2f} "
+                  f"{max(timings):>8.2f} {sum(matches) / len(matches):>8.0f}")
+        database.close_pool()
+
+
+if __name__ == "__main__":
+    main()
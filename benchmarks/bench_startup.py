@@ -0,0 +1,86 @@
+import time
+
+START = time.perf_counter()
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# ==================== STARTUP BENCHMARK ====================
+# Time from interpreter start to the first paint of the main window, in a
+# fresh process per run. The SQLite stand-in sleeps --connect-ms on every
+# new connection to stand in for an ODBC login to SQL Server, which is what
+# the app used to wait on before showing anything.
+
+
+def child(path, connect_ms):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import database
+    import sqlite_standin
+
+    def connect():
+        time.sleep(connect_ms / 1000)
+        return sqlite_standin.connect(path)
+
+    database.configure_pool(connect=connect)
+    from PyQt6.QtCore import QEvent, QObject
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication(sys.argv)
+    times = {}
+
+    import Clinic
+    times["import_ms"] = (time.perf_counter() - START) * 1000
+    window = Clinic.MainWindow()
+    times["window_ms"] = (time.perf_counter() - START) * 1000
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint and "first_paint_ms" not in times:
+                times["first_paint_ms"] = (time.perf_counter() - START) * 1000
+                app.quit()
+            return False
+
+    paint_filter = FirstPaint()
+    window.installEventFilter(paint_filter)
+    window.show()
+    window.connect_database()
+    app.exec()
+    print(json.dumps(times))
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first paint of the main window")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--connect-ms", type=float, default=500, help="simulated ODBC connect time")
+    parser.add_argument("--child", nargs=2, metavar=("DB", "CONNECT_MS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], float(args.child[1]))
+        return
+
+    import sqlite_standin
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "startup.db")
+        sqlite_standin.create_database(path, migrate=True)
+        runs = []
+        for _ in range(args.runs):
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", path, str(args.connect_ms)],
+                                 capture_output=True, text=True, timeout=120)
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{args.runs} runs, connect={args.connect_ms:.0f}ms; median ms since interpreter start")
+    for key, label in (("import_ms", "import Clinic"), ("window_ms", "MainWindow built"),
+                       ("first_paint_ms", "first paint")):
+        values = sorted(run[key] for run in runs)
+        print(f"{label:<18} {values[len(values) // 2]:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import datetime
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import sqlite_standin
+from api_server import ApiServer
+
+# ==================== API LOAD TEST ====================
+# Starts api_server.py in-process against a SQLite stand-in and drives it
+# with keep-alive HTTP clients, each playing a front desk: logins, list
+# pages, latest records, availability lookups and bookings. Reports
+# throughput and per-route latency percentiles.
+
+# route name -> weight in the request mix
+MIX = {
+    "login": 10,
+    "appointments page": 30,
+    "availability": 20,
+    "latest record": 15,
+    "feedback page": 10,
+    "book": 15,
+}
+
+
+def seed(path, patients, ophthalmologists, visits):
+    sqlite_standin.create_database(path, migrate=True)
+    conn = sqlite_standin.connect(path)
+    rng = random.Random(5)
+    conn.executemany(
+        "INSERT INTO Patient(name, gender, date_of_birth, email, phonenumber, password) VALUES(?,?,?,?,?,?)",
+        ((f"Patient {p}", "Other", "1980-01-01", f"patient{p}@example.com", p, 1234)
+         for p in range(1, patients + 1)))
+    conn.executemany(
+        "INSERT INTO Ophthalmologist(name, email, phonenumber, clinicname, clinicaddress, password) VALUES(?,?,?,?,?,?)",
+        ((f"Dr {o}", f"doctor{o}@example.com", o, "Clinic", "Address", 1234)
+         for o in range(1, ophthalmologists + 1)))
+    start = datetime.date.today() - datetime.timedelta(days=400)
+    appointments = []
+    for p in range(1, patients + 1):
+        for _ in range(visits):
+            day = (start + datetime.timedelta(days=rng.randrange(390))).isoformat()
+            appointments.append((p, rng.randint(1, ophthalmologists), day, f"{day} {rng.randint(10, 17):02d}:00:00", 1))
+    conn.executemany(
+        "INSERT INTO Appointment(patient_id, ophthalmologist_id, appointment_date, appointment_time, appointment_status) VALUES(?,?,?,?,?)",
+        appointments)
+    conn.executemany(
+        "INSERT INTO Patient_Record(patient_id, ophthalmologist_id, appointment_id, record_date, diagnosis, prescription, treatment_details) VALUES(?,?,?,?,?,?,?)",
+        ((p, o, i, d, "Myopia", "Glasses -1.5", "Refraction test") for i, (p, o, d, _, _) in enumerate(appointments, 1)))
+    conn.executemany(
+        "INSERT INTO Feedback(patient_id, ophthalmologist_id, rating, comments, feedback_date) VALUES(?,?,?,?,?)",
+        ((p, o, i % 5 + 1, "Fine", d) for i, (p, o, d, _, _) in enumerate(appointments, 1) if i % 2))
+    conn.commit()
+    conn.close()
+
+
+def start_server():
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(ApiServer(port=0).start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    return server, loop
+
+
+def client(port, seconds, patients, ophthalmologists, seed_value, results):
+    rng = random.Random(seed_value)
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    names = list(MIX)
+    weights = [MIX[n] for n in names]
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        p = rng.randint(1, patients)
+        o = rng.randint(1, ophthalmologists)
+        if name == "login":
+            method, url, body = "POST", "/login/patient", {"email": f"Patient{p}@example.com ", "password": 1234}
+        elif name == "appointments page":
+            method, url, body = "GET", f"/patients/{p}/appointments", None
+        elif name == "availability":
+            method, url, body = "GET", f"/ophthalmologists/{o}/availability?days=14", None
+        elif name == "latest record":
+            method, url, body = "GET", f"/patients/{p}/records/latest", None
+        elif name == "feedback page":
+            method, url, body = "GET", f"/ophthalmologists/{o}/feedback", None
+        else:
+            day = datetime.date.today() + datetime.timedelta(days=rng.randrange(1, 30))
+            method, url, body = "POST", "/appointments", {
+                "patient_id": p, "ophthalmologist_id": o, "date": day.isoformat(), "slot": rng.randrange(8)}
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload else {}
+        start = time.perf_counter()
+        conn.request(method, url, payload, headers)
+        response = conn.getresponse()
+        response.read()
+        results.append((name, response.status, (time.perf_counter() - start) * 1000))
+    conn.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test api_server.py on a SQLite stand-in")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="simulated round trip per statement")
+    parser.add_argument("--patients", type=int, default=5000)
+    parser.add_argument("--ophthalmologists", type=int, default=50)
+    parser.add_argument("--visits", type=int, default=10)
+    args = parser.parse_args()
+
+    database.query_stats.slow_query_ms = float("inf")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "load.db")
+        seed(path, args.patients, args.ophthalmologists, args.visits)
+        database.configure_pool(connect=lambda: sqlite_standin.connect(path, args.latency_ms / 1000),
+                                size=args.pool_size, timeout=60)
+        server, loop = start_server()
+
+        results = []
+        threads = [threading.Thread(target=client, args=(server.port, args.seconds, args.patients,
+                                                          args.ophthalmologists, n, results))
+                   for n in range(args.clients)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        loop.call_soon_threadsafe(server.server.close)
+        loop.call_soon_threadsafe(loop.stop)
+        server.workers.shutdown(wait=True)
+        database.close_pool()
+
+    errors = sum(1 for _, status, _ in results if status >= 500)
+    print(f"{args.clients} clients, {args.seconds:.0f}s, pool={args.pool_size}, latency={args.latency_ms}ms")
+    print(f"{len(results)} requests, {len(results) / elapsed:.1f} req/s, {errors} server errors")
+    print(f"{'route':<20} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for name in MIX:
+        timings = [ms for n, _, ms in results if n == name]
+        statuses = {}
+        for n, status, _ in results:
+            if n == name:
+                statuses[status] = statuses.get(status, 0) + 1
+        print(f"{name:<20} {len(timings):>7} {percentile(timings, 50):>8.2f} {percentile(timings, 95):>8.2f} "
+              f"{percentile(timings, 99):>8.2f}  {dict(sorted(statuses.items()))}")
+
+
+if __name__ == "__main__":
+    main()
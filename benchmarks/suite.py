@@ -0,0 +1,273 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import datagen
+import notifications
+import services
+import sqlite_standin
+
+# ==================== END-TO-END BENCHMARK SUITE ====================
+# Times every read Clinic.py does (through services.py, the same calls the
+# screens make) and every screen load (MainWindow.go_to until the executor
+# has delivered the rows) on a datagen.py database in the SQLite stand-in.
+# Results go to a JSON file; --compare prints the change against an earlier
+# one.
+#
+#   python benchmarks/suite.py --db big.db --output before.json
+#   python benchmarks/suite.py --db big.db --output after.json --compare before.json
+#
+# The result cache is off unless --cache is given, so every sample reaches
+# the database.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (function, kind of parameters it takes)
+QUERIES = {
+    "patient login": (services.patient_login, "patient_login"),
+    "ophthalmologist login": (services.ophthalmologist_login, "ophth_login"),
+    "ophthalmologist list": (services.ophthalmologists, "none"),
+    "feedback ophthalmologists": (services.patient_ophthalmologists, "patient"),
+    "record form patient lookup": (lambda ophth_id: services.ophthalmologist_patients(ophth_id, "A"), "ophth"),
+    "record form appointments": (services.patient_appointments, "patient_ophth"),
+    "history patient lookup": (lambda ophth_id: services.record_patients(ophth_id, "A"), "ophth"),
+    "billing patient lookup": (lambda ophth_id: services.unbilled_patients(ophth_id, "A"), "ophth"),
+    "free slots": (services.free_slots, "ophth"),
+    "latest record": (services.latest_record, "patient"),
+    "unread notifications": (services.unread_notifications, "patient_recipient"),
+    "recent notifications": (services.recent_notifications, "patient_recipient"),
+    "patient dashboard": (services.patient_dashboard, "patient"),
+    "ophthalmologist dashboard": (services.ophthalmologist_dashboard, "ophth"),
+    "record search": (lambda ophth_id: services.search_records(ophth_id, "glaucoma latano"), "ophth"),
+    "clinic aging report": (services.clinic_aging_report, "ophth"),
+}
+# First page of every keyset-paged list, see services.PAGES
+PAGE_PARAMS = {("patient_id",): "patient", ("ophthalmologist_id",): "ophth",
+               ("patient_id", "ophthalmologist_id"): "patient_ophth"}
+for page_name, spec in services.PAGES.items():
+    QUERIES[f"page {page_name}"] = (lambda *ids, name=page_name: services.fetch_page(name, ids),
+                                    PAGE_PARAMS[spec["params"]])
+
+# Clinic.SCREENS names, loaded with a random patient and ophthalmologist logged in
+SCREENS = (
+    "patient_home", "book_appointment", "appointment_history", "patient_view_record",
+    "patient_medical_history", "patient_billing", "patient_feedback", "ophth_home",
+    "ophth_appointments", "add_record", "ophth_medical_history", "ophth_billing", "ar_aging", "ophth_feedback",
+)
+
+
+# ==================== SAMPLING ====================
+class Sampler:
+    # Random but repeatable ids and credentials out of the generated data
+    def __init__(self, path, seed):
+        self.conn = sqlite3.connect(path)
+        self.rng = random.Random(seed)
+        self.max_patient = self._scalar("SELECT MAX(patient_id) FROM Patient")
+        self.max_ophth = self._scalar("SELECT MAX(ophthalmologist_id) FROM Ophthalmologist")
+        self.max_appointment = self._scalar("SELECT MAX(appointment_id) FROM Appointment")
+
+    def _scalar(self, query, params=()):
+        row = self.conn.execute(query, params).fetchone()
+        return row[0] if row else None
+
+    def params(self, kind):
+        rng = self.rng
+        if kind == "none":
+            return ()
+        if kind == "patient":
+            return (rng.randint(1, self.max_patient),)
+        if kind == "ophth":
+            return (rng.randint(1, self.max_ophth),)
+        if kind == "patient_recipient":
+            return (rng.randint(1, self.max_patient), notifications.PATIENT)
+        if kind == "patient_ophth":
+            row = self.conn.execute("SELECT patient_id, ophthalmologist_id FROM Appointment WHERE appointment_id >= ? "
+                                    "ORDER BY appointment_id LIMIT 1",
+                                    (rng.randint(1, self.max_appointment),)).fetchone()
+            return tuple(row)
+        if kind == "patient_login":
+            return self.conn.execute("SELECT email, password FROM Patient WHERE patient_id = ?",
+                                     (rng.randint(1, self.max_patient),)).fetchone()
+        if kind == "ophth_login":
+            return self.conn.execute("SELECT email, password FROM Ophthalmologist WHERE ophthalmologist_id = ?",
+                                     (rng.randint(1, self.max_ophth),)).fetchone()
+        raise ValueError(kind)
+
+    def counts(self):
+        return {table: self._scalar(f"SELECT COUNT(*) FROM {table}")
+                for table in ("Patient", "Ophthalmologist", "Appointment", "Patient_Record", "Bill", "Feedback")}
+
+
+def summarize(timings, rows=None):
+    timings = sorted(timings)
+    out = {"samples": len(timings), "mean_ms": sum(timings) / len(timings),
+           "p50_ms": timings[len(timings) // 2], "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+           "max_ms": timings[-1]}
+    if rows is not None:
+        out["mean_rows"] = sum(rows) / len(rows)
+    return out
+
+
+def row_count(result):
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], list):
+        return len(result[0])   # fetch_page
+    if isinstance(result, (list, dict)):
+        return len(result)
+    return 1 if result is not None else 0
+
+
+# ==================== RUNS ====================
+def run_queries(sampler, samples):
+    results = {}
+    for name, (fn, kind) in QUERIES.items():
+        timings, rows = [], []
+        for _ in range(samples):
+            params = sampler.params(kind)
+            start = time.perf_counter()
+            result = fn(*params)
+            timings.append((time.perf_counter() - start) * 1000)
+            rows.append(row_count(result))
+        results[name] = summarize(timings, rows)
+    return results
+
+
+def run_screens(sampler, samples):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt6.QtCore import QEventLoop
+        from PyQt6.QtWidgets import QApplication
+    except ImportError:
+        print("PyQt6 not available, skipping screen loads")
+        return {}
+    app = QApplication.instance() or QApplication(sys.argv)
+    import Clinic
+
+    window = Clinic.MainWindow()
+    window.show()
+    results = {}
+    for name in SCREENS:
+        timings = []
+        for _ in range(samples):
+            window.go_to("initial_screen")
+            window.current_patient_id = sampler.params("patient")[0]
+            window.current_ophth_id = sampler.params("ophth")[0]
+            start = time.perf_counter()
+            window.go_to(name)
+            deadline = start + 30
+            while not window.executor.idle() and time.perf_counter() < deadline:
+                app.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 5)
+            app.processEvents()
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = summarize(timings)
+    window.go_to("initial_screen")
+    window.executor.shutdown()
+    window.close()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+# ==================== REPORTING ====================
+def print_section(title, results, baseline=None):
+    print(f"\n{title}")
+    header = f"{'name':<42} {'p50 ms':>8} {'p95 ms':>8} {'rows':>8}"
+    if baseline is not None:
+        header += f" {'was p50':>8} {'change':>8}"
+    print(header)
+    for name, r in results.items():
+        rows = f"{r['mean_rows']:.1f}" if "mean_rows" in r else "-"
+        line = f"{name:<42} {r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f} {rows:>8}"
+        if baseline is not None:
+            old = baseline.get(name)
+            if old:
+                line += f" {old['p50_ms']:>8.3f} {(r['p50_ms'] / old['p50_ms'] - 1) * 100 if old['p50_ms'] else 0:>+7.0f}%"
+            else:
+                line += f" {'-':>8} {'new':>8}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every Clinic.py query and screen load on synthetic data")
+    parser.add_argument("--db", metavar="PATH", help="reuse (or create) this generated database")
+    parser.add_argument("--patients", type=int, default=20000)
+    parser.add_argument("--ophthalmologists", type=int, default=100)
+    parser.add_argument("--visits", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--samples", type=int, default=50, help="calls per query")
+    parser.add_argument("--screen-samples", type=int, default=10, help="loads per screen")
+    parser.add_argument("--no-screens", action="store_true", help="skip the PyQt screen loads")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated round trip per statement")
+    parser.add_argument("--cache", action="store_true", help="leave the result cache on")
+    parser.add_argument("--output", metavar="JSON", default="benchmark_results.json")
+    parser.add_argument("--compare", metavar="JSON", help="earlier results to compare against")
+    args = parser.parse_args()
+
+    database.query_stats.slow_query_ms = float("inf")
+    if not args.cache:
+        database.result_cache.max_entries = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "suite.db")
+        if not os.path.exists(path):
+            print(f"Generating {args.patients} patients into {path} ...")
+            sqlite_standin.create_database(path, migrate=True)
+            conn = sqlite_standin.connect(path)
+            try:
+                datagen.generate(conn, "sqlite", args.patients, args.ophthalmologists, args.visits, seed=args.seed)
+            finally:
+                conn.close()
+        database.configure_pool(connect=lambda: sqlite_standin.connect(path, args.latency_ms / 1000))
+
+        sampler = Sampler(path, args.seed)
+        queries = run_queries(sampler, args.samples)
+        screens = {} if args.no_screens else run_screens(sampler, args.screen_samples)
+        report = {
+            "meta": {
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "args": vars(args),
+                "rows": sampler.counts(),
+            },
+            "queries": queries,
+            "screens": screens,
+            "query_shapes": database.query_stats.snapshot()["shapes"],
+        }
+        sampler.conn.close()
+        notifications.outbox.close()
+        database.close_pool()
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_section("Queries", queries, baseline and baseline.get("queries", {}))
+    if screens:
+        print_section("Screen loads", screens, baseline and baseline.get("screens", {}))
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import datetime
+
+from database import is_conflict, transaction
+
+# ==================== BATCH BILLING ====================
+# An appointment is billable once it is concluded (approved and its time has
+# passed) and no Bill points at it yet. Both the patient list on the billing
+# screen and the end-of-day batch use the same NOT EXISTS anti-join, which
+# IX_Bill_Appointment answers with one seek per appointment. That index is
+# unique (migration 010), so an appointment is never billed twice even when
+# two batches run at once.
+
+UNBILLED = """
+    a.ophthalmologist_id = ? AND a.appointment_status = 1 AND a.appointment_time < ?
+    AND NOT EXISTS (SELECT 1 FROM Bill b WHERE b.appointment_id = a.appointment_id)
+"""
+
+# Patients with something to bill (the billing screen's patient lookup)
+UNBILLED_PATIENTS = f"SELECT a.patient_id FROM Appointment a WHERE {UNBILLED}"
+
+# A patient's latest unbilled appointment, once they have been picked
+LATEST_UNBILLED_QUERY = f"""
+    SELECT MAX(a.appointment_id) FROM Appointment a
+    WHERE a.patient_id = ? AND {UNBILLED}
+"""
+
+# The batch: one set-based insert that reports what it billed
+BILL_UNBILLED = f"""
+    INSERT INTO Bill(patient_id, appointment_id, amount, payment_status, payment_date)
+    OUTPUT INSERTED.appointment_id, INSERTED.patient_id
+    SELECT a.patient_id, a.appointment_id, ?, 0, GETDATE()
+    FROM Appointment a
+    WHERE {UNBILLED}
+"""
+
+BATCH_ATTEMPTS = 2
+
+
+def now_param():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def bill_concluded(ophth_id, amount):
+    # Bills every unbilled concluded appointment of ophth_id at amount, in
+    # one transaction. Returns {"bills": n, "patients": n, "total": amount,
+    # "billed": [(appointment_id, patient_id), ...]} or None on a database
+    # error.
+    for attempt in range(BATCH_ATTEMPTS):
+        try:
+            with transaction() as tx:
+                tx.execute(BILL_UNBILLED, (amount, ophth_id, now_param()))
+                rows = tx.fetchall()
+            return {"bills": len(rows), "patients": len({row[1] for row in rows}),
+                    "total": len(rows) * amount, "billed": [tuple(row) for row in rows]}
+        except Exception as e:
+            if is_conflict(e) and attempt + 1 < BATCH_ATTEMPTS:
+                # Another batch billed some of them first; the retry skips those
+                continue
+            print(f"Query Error: {e}")
+            return None
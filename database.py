@@ -0,0 +1,672 @@
+import contextvars
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+from query_cache import QueryCache, cache_key, tables_in
+from query_stats import QueryStats, payload_bytes
+
+# ==================== CONNECTION SETTINGS ====================
+# CONNECTION_STRING = (
+#     'DRIVER={ODBC Driver 17 for SQL Server};'
+#     'SERVER=WAHEDNA;'
+#     'DATABASE=OpthalmologyClinicDatabase;'
+#     'Trusted_Connection=yes;'
+# )
+
+CONNECTION_STRING = (
+    r'DRIVER={ODBC Driver 17 for SQL Server};'
+    r'SERVER=DESKTOP-34G5GVS\SQLEXPRESS;'
+    r'DATABASE=OpthalmologyClinicDatabase;'
+    r'Trusted_Connection=yes;'
+)
+
+# Read-only replica of the same database (see READ REPLICA below), e.g. an
+# Always On readable secondary with ApplicationIntent=ReadOnly; None reads
+# from the primary
+REPLICA_CONNECTION_STRING = None
+
+POOL_SIZE = 5              # max open connections
+CHECKOUT_TIMEOUT = 10      # seconds to wait for a free connection
+HEALTH_CHECK_AFTER = 30    # ping connections that sat idle longer than this
+HEALTH_QUERY = "SELECT 1"
+RECONNECT_ATTEMPTS = 4
+RECONNECT_BACKOFF = 0.25   # first retry delay, doubled on every attempt
+
+# Exception class names raised by DB drivers when the link itself is gone,
+# and the SQLSTATE they carry first in their args: class 08 is a connection
+# exception (08S01 link failure, 08001 cannot connect, 08003 not open).
+# sqlite3 raises OperationalError for syntax errors and lock timeouts too.
+DISCONNECT_ERRORS = ("OperationalError", "InterfaceError")
+DISCONNECT_STATE = "08"
+# ... and when a statement broke a constraint (duplicate key, foreign key,
+# NOT NULL, CHECK)
+CONSTRAINT_ERRORS = ("IntegrityError",)
+# A duplicate key among those: SQL Server's native errors 2627 (PRIMARY KEY
+# or UNIQUE constraint) and 2601 (unique index), SQLite's UNIQUE message
+DUPLICATE_KEY = re.compile(r"\((2627|2601)\)|UNIQUE constraint failed")
+
+# Streamed results longer than this are not kept in the result cache
+MAX_CACHED_ROWS = 5000
+
+
+def odbc_connect():
+    import pyodbc
+    return pyodbc.connect(CONNECTION_STRING)
+
+
+def replica_connect():
+    import pyodbc
+    return pyodbc.connect(REPLICA_CONNECTION_STRING)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PoolClosed(Exception):
+    pass
+
+
+def is_disconnect(error):
+    if type(error).__name__ not in DISCONNECT_ERRORS or not error.args:
+        return False
+    return str(error.args[0]).startswith(DISCONNECT_STATE)
+
+
+def is_constraint_violation(error):
+    return type(error).__name__ in CONSTRAINT_ERRORS
+
+
+def is_conflict(error):
+    # Another writer inserted the same key first
+    return is_constraint_violation(error) and bool(DUPLICATE_KEY.search(str(error)))
+
+
+def update_or_insert(tx, update, update_params, insert, insert_params):
+    # Run the UPDATE; if it matched no row, INSERT one. If another writer
+    # inserts the same key first, the INSERT conflicts and the UPDATE runs
+    # once more against their row. True if a row was updated or inserted.
+    tx.execute(update, update_params)
+    if tx.rowcount == 1:
+        return True
+    try:
+        tx.execute(insert, insert_params)
+        return True
+    except Exception as e:
+        if not is_conflict(e):
+            raise
+    tx.execute(update, update_params)
+    return tx.rowcount == 1
+
+
+# ==================== CONNECTION POOL ====================
+class ConnectionPool:
+    def __init__(self, connect=odbc_connect, size=POOL_SIZE, timeout=CHECKOUT_TIMEOUT,
+                 health_check_after=HEALTH_CHECK_AFTER, health_query=HEALTH_QUERY,
+                 retries=RECONNECT_ATTEMPTS, backoff=RECONNECT_BACKOFF):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self.health_query = health_query
+        self.retries = retries
+        self.backoff = backoff
+
+        self._idle = []        # (connection, released_at), most recent last
+        self._open = 0         # idle + checked out
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolClosed("Connection pool is closed")
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    conn, released_at = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No free connection after {self.timeout}s")
+                self._cond.wait(remaining)
+
+        # Connecting and pinging happen outside the lock so other threads
+        # can keep checking out while we wait on the network
+        try:
+            if conn is not None and time.monotonic() - released_at > self.health_check_after:
+                if not self._healthy(conn):
+                    self._close_quietly(conn)
+                    conn = None
+            if conn is None:
+                conn = self._reconnect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn, discard=False):
+        with self._cond:
+            if discard or self._closed:
+                self._open -= 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except Exception as e:
+            if is_disconnect(e):
+                discard = True
+            else:
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+            raise
+        finally:
+            self.release(conn, discard)
+
+    def check(self):
+        # Open (or ping) one connection so a bad connection string fails fast
+        conn = self.acquire()
+        healthy = self._healthy(conn)
+        self.release(conn, discard=not healthy)
+        if not healthy:
+            raise ConnectionError("Database health check failed")
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._open -= 1
+                self._close_quietly(conn)
+            self._idle = []
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {"size": self.size, "open": self._open, "idle": len(self._idle),
+                    "in_use": self._open - len(self._idle)}
+
+    def _healthy(self, conn):
+        try:
+            cur = conn.cursor()
+            cur.execute(self.health_query)
+            cur.fetchall()
+            return True
+        except Exception:
+            return False
+
+    def _reconnect(self):
+        delay = self.backoff
+        for attempt in range(self.retries):
+            try:
+                return self.connect()
+            except Exception as e:
+                if attempt == self.retries - 1:
+                    raise
+                print(f"Database Warning: connect failed ({e}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                delay *= 2
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
+
+
+def configure_pool(**kwargs):
+    # Replace the shared pool, e.g. configure_pool(connect=lambda: sqlite3.connect(...))
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(**kwargs)
+        return _pool
+
+
+def close_pool():
+    global _pool, _replica_pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+        if _replica_pool is not None:
+            _replica_pool.close()
+            _replica_pool = None
+
+
+# ==================== READ REPLICA ====================
+# With a replica configured, execute_query and open_cursor send read-only
+# statements (SELECT / WITH) to the replica pool and everything else to the
+# primary. The replica trails the primary by its replication lag, so for
+# READ_YOUR_WRITES seconds after a session writes, that session reads from
+# the primary too and sees its own change. The desktop app is one session;
+# api_server.py gives each client connection its own. Transactions and
+# calls routed to a clinic database (shards.py) always use the primary, and
+# a read the replica fails is run again on the primary.
+READ_YOUR_WRITES = 5.0     # seconds; keep it above the replica's usual lag
+
+READ_ONLY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+WRITE_WORDS = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|INTO|EXEC|EXECUTE)\b", re.IGNORECASE)
+
+_replica_pool = None
+
+
+class Session:
+    def __init__(self):
+        self.last_write = None
+
+    def wrote(self):
+        self.last_write = time.monotonic()
+
+    def sticky(self):
+        return self.last_write is not None and time.monotonic() - self.last_write < READ_YOUR_WRITES
+
+
+_default_session = Session()
+_session = contextvars.ContextVar("session", default=None)
+_last_write = None   # any session's, for the result cache
+
+
+@contextmanager
+def session(current):
+    token = _session.set(current)
+    try:
+        yield current
+    finally:
+        _session.reset(token)
+
+
+def current_session():
+    return _session.get() or _default_session
+
+
+def _wrote():
+    global _last_write
+    current_session().wrote()
+    _last_write = time.monotonic()
+
+
+def _recent_write():
+    return _last_write is not None and time.monotonic() - _last_write < READ_YOUR_WRITES
+
+
+@lru_cache(maxsize=512)
+def is_read_only(query):
+    return bool(READ_ONLY.match(query)) and not WRITE_WORDS.search(query)
+
+
+def get_replica_pool():
+    global _replica_pool
+    with _pool_lock:
+        if _replica_pool is None and REPLICA_CONNECTION_STRING:
+            _replica_pool = ConnectionPool(connect=replica_connect)
+        return _replica_pool
+
+
+def configure_replica(**kwargs):
+    # Replace the replica pool, e.g. configure_replica(connect=lambda: sqlite_standin.connect(...));
+    # no arguments turns read splitting off
+    global _replica_pool
+    with _pool_lock:
+        if _replica_pool is not None:
+            _replica_pool.close()
+        _replica_pool = ConnectionPool(**kwargs) if kwargs else None
+        return _replica_pool
+
+
+def replica_for(query):
+    # The replica pool if query may read from it, else None
+    if _replica_pool is None and not REPLICA_CONNECTION_STRING:
+        return None
+    if _route.get() is not None or current_session().sticky() or not is_read_only(query):
+        return None
+    return get_replica_pool()
+
+
+# ==================== ROUTING ====================
+# shards.py keeps each clinic's rows in its own database. Inside
+# `with routed(route)`, where route is a (shard name, pool) pair, this
+# thread's execute_query, transaction and open_cursor use that pool and
+# cache their results under the shard's name; routed(None) and code outside
+# any block use the shared pool above. The route is a context variable, so
+# threads (and the executor tasks they start) each have their own.
+_route = contextvars.ContextVar("route", default=None)
+
+
+@contextmanager
+def routed(route):
+    token = _route.set(route)
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+def current_route():
+    return _route.get()
+
+
+def current_pool():
+    route = _route.get()
+    return route[1] if route else get_pool()
+
+
+def _cache_key(query, params, replica=False):
+    # Replica rows may trail the primary's, so they are kept apart
+    route = _route.get()
+    key = cache_key(query, params)
+    if replica:
+        return "replica", key
+    return (route[0], key) if route else key
+
+
+# ==================== RESULT CACHE ====================
+# SELECT results shared by execute_query and open_cursor; see query_cache.py.
+# Writes made through execute_query invalidate the tables they touch.
+result_cache = QueryCache()
+
+
+def cache_stats():
+    return result_cache.stats()
+
+
+# ==================== INSTRUMENTATION ====================
+# Every statement is timed per query shape; see query_stats.py.
+query_stats = QueryStats()
+
+
+def pool_stats():
+    stats = get_pool().stats()
+    replica = get_replica_pool()
+    if replica is not None:
+        stats["replica"] = replica.stats()
+    return stats
+
+
+def metrics_report():
+    return f"{query_stats.report()}\nCache: {cache_stats()}\nPool: {pool_stats()}"
+
+
+def export_metrics(path=None):
+    extra = {"cache": cache_stats(), "pool": pool_stats()}
+    if path:
+        return query_stats.export(path, extra)
+    return query_stats.export(extra=extra)
+
+
+# ==================== QUERY HELPERS ====================
+def _run(conn, query, params, fetch):
+    cursor = conn.cursor()
+    if params:
+        cursor.execute(query, params)
+    else:
+        cursor.execute(query)
+    if fetch:
+        return cursor.fetchall()
+    conn.commit()
+    return True
+
+
+def execute_query(query, params=None, fetch=False, cache=True):
+    replica = replica_for(query) if fetch else None
+    use_cache = fetch and cache and is_read_only(query)
+    if use_cache:
+        key = _cache_key(query, params, replica is not None)
+        rows = result_cache.get(key)
+        if rows is not None:
+            query_stats.record_cache_hit(query)
+            return rows
+        tables = tables_in(query)
+        generation = result_cache.generation(tables)
+
+    start = time.perf_counter()
+    result = _execute(query, params, fetch, replica)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if fetch:
+        query_stats.record(query, elapsed_ms, len(result or ()), payload_bytes(result or ()),
+                           error=result is None)
+    else:
+        query_stats.record(query, elapsed_ms, error=not result)
+
+    ok = result is not None if fetch else bool(result)
+    if ok and not (fetch and is_read_only(query)):
+        # A failed write changed nothing, so it must not pin the session;
+        # an INSERT ... OUTPUT fetches but still changes its tables
+        _wrote()
+        result_cache.invalidate(tables_in(query))
+    elif use_cache and ok and not (replica and _recent_write()):
+        # Right after a write the replica may not have it yet
+        result_cache.put(key, result, tables, generation)
+    return result
+
+
+def _execute(query, params, fetch, replica=None):
+    if replica is not None:
+        try:
+            with replica.connection() as conn:
+                return _run(conn, query, params, fetch)
+        except Exception as e:
+            print(f"Database Warning: replica read failed ({e}), using the primary")
+    pool = current_pool()
+    try:
+        try:
+            with pool.connection() as conn:
+                return _run(conn, query, params, fetch)
+        except Exception as e:
+            if not (is_disconnect(e) and fetch and is_read_only(query)):
+                raise
+            # A read changes nothing, so retry it once on a fresh connection.
+            # A write is not retried: the link may have dropped after the
+            # server committed it. Checkout itself already reconnects.
+            with pool.connection() as conn:
+                return _run(conn, query, params, fetch)
+    except Exception as e:
+        print(f"Query Error: {e}")
+        return None if fetch else False
+
+
+# ==================== TRANSACTIONS ====================
+# Several statements on one pooled connection, committed together:
+#
+#     with transaction() as tx:
+#         tx.execute("UPDATE ...", params)
+#         if tx.rowcount == 0: ...
+#
+# An exception rolls everything back and propagates to the caller. Tables
+# written inside the block are invalidated in the result cache after commit.
+class Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.tables = set()
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    def execute(self, query, params=None):
+        start = time.perf_counter()
+        try:
+            if params:
+                self.cursor.execute(query, params)
+            else:
+                self.cursor.execute(query)
+        except Exception:
+            query_stats.record(query, (time.perf_counter() - start) * 1000, error=True)
+            raise
+        query_stats.record(query, (time.perf_counter() - start) * 1000)
+        if not query.lstrip().upper().startswith("SELECT"):
+            self.tables |= tables_in(query)
+        return self.cursor
+
+    def executemany(self, query, param_rows, fast=True):
+        # pyodbc's fast_executemany sends all parameter rows in one round
+        # trip instead of one per row; leave it off for TEXT/MAX columns
+        if fast and hasattr(self.cursor, "fast_executemany"):
+            self.cursor.fast_executemany = True
+        start = time.perf_counter()
+        try:
+            self.cursor.executemany(query, param_rows)
+        except Exception:
+            query_stats.record(query, (time.perf_counter() - start) * 1000, error=True)
+            raise
+        query_stats.record(query, (time.perf_counter() - start) * 1000)
+        self.tables |= tables_in(query)
+        return self.cursor
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+
+@contextmanager
+def transaction():
+    with current_pool().connection() as conn:
+        tx = Transaction(conn)
+        yield tx
+        conn.commit()
+    if tx.tables:
+        _wrote()
+    result_cache.invalidate(tx.tables)
+
+
+# ==================== STREAMING CURSORS ====================
+# A cursor that keeps its pooled connection checked out until the caller has
+# read what it needs, so rows can be fetched a batch at a time. If the caller
+# reads the result to the end, the rows go into the result cache and the next
+# open_cursor for the same query is answered by a CachedCursor.
+class StreamingCursor:
+    def __init__(self, pool, conn, cursor, query, cache_entry=None):
+        self._pool = pool
+        self._conn = conn
+        self._cursor = cursor
+        self._query = query
+        self._cache_entry = cache_entry   # (key, tables, generation) or None
+        self._seen = []
+
+    @property
+    def closed(self):
+        return self._conn is None
+
+    def fetchmany(self, size):
+        if self._conn is None:
+            return []
+        try:
+            rows = self._cursor.fetchmany(size)
+        except Exception as e:
+            print(f"Query Error: {e}")
+            self._cache_entry = None
+            self.close(discard=True)
+            return []
+        query_stats.record_rows(self._query, len(rows), payload_bytes(rows))
+        if self._cache_entry is not None:
+            self._seen.extend(rows)
+            if len(self._seen) > MAX_CACHED_ROWS:
+                self._cache_entry, self._seen = None, []
+            elif len(rows) < size:
+                key, tables, generation = self._cache_entry
+                result_cache.put(key, self._seen, tables, generation)
+                self._cache_entry = None
+        return rows
+
+    def close(self, discard=False):
+        if self._conn is None:
+            return
+        try:
+            self._cursor.close()
+        except Exception:
+            discard = True
+        self._pool.release(self._conn, discard)
+        self._conn = None
+
+
+class CachedCursor:
+    def __init__(self, rows):
+        self._rows = rows
+        self._pos = 0
+        self.closed = False
+
+    def fetchmany(self, size):
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def close(self, discard=False):
+        self.closed = True
+
+
+def open_cursor(query, params=None, cache=True):
+    replica = replica_for(query)
+    cache_entry = None
+    if cache:
+        key = _cache_key(query, params, replica is not None)
+        rows = result_cache.get(key)
+        if rows is not None:
+            query_stats.record_cache_hit(query)
+            return CachedCursor(rows)
+        tables = tables_in(query)
+        if not (replica and _recent_write()):
+            cache_entry = (key, tables, result_cache.generation(tables))
+
+    if replica is not None:
+        cursor = _open(replica, query, params, cache_entry)
+        if cursor is not None:
+            return cursor
+        print("Database Warning: replica read failed, using the primary")
+    return _open(current_pool(), query, params, cache_entry)
+
+
+def _open(pool, query, params, cache_entry):
+    try:
+        conn = pool.acquire()
+    except Exception as e:
+        print(f"Query Error: {e}")
+        return None
+    start = time.perf_counter()
+    try:
+        cursor = conn.cursor()
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+    except Exception as e:
+        print(f"Query Error: {e}")
+        query_stats.record(query, (time.perf_counter() - start) * 1000, error=True)
+        pool.release(conn, discard=is_disconnect(e))
+        return None
+    # Rows are added to the shape's totals as they are fetched
+    query_stats.record(query, (time.perf_counter() - start) * 1000)
+    return StreamingCursor(pool, conn, cursor, query, cache_entry)
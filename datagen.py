@@ -0,0 +1,281 @@
+import argparse
+import datetime
+import math
+import random
+import time
+
+import ratings
+import search
+
+# ==================== SYNTHETIC CLINIC DATA ====================
+# Fills a clinic database with a production-sized, repeatable dataset: the
+# same --seed and sizes always produce the same rows. Nothing is built up in
+# memory; patients are generated CHUNK at a time, and each chunk's
+# appointments, records, bills and feedback are generated and written before
+# the next chunk starts. Rows go in with executemany (fast_executemany on
+# pyodbc where the table has no TEXT column).
+#
+# Dates are relative to today, so runs on different days differ only by
+# that shift. Every appointment gets its own (ophthalmologist, day, hour)
+# slot, so the data never double books; the schedule bitmap (migration 002)
+# and the rating aggregates (migration 007) are rebuilt at the end. Records
+# are indexed for search (search.py) chunk by chunk. Meant for test
+# databases: run it on a migrated schema that nobody else is writing to.
+#
+#   python datagen.py --sqlite big.db --patients 1000000
+#   python datagen.py --patients 200000          (SQL Server, see database.py)
+
+CHUNK = 2000            # patients per chunk
+SLOT_HOURS = (10, 11, 12, 13, 14, 15, 16, 17)
+DAYS_AHEAD = 30         # appointments are booked up to this far into the future
+
+FIRST_NAMES = ("Ahmad", "Sara", "Ali", "Fatima", "Omar", "Aisha", "Hassan", "Zainab", "Bilal", "Maryam",
+               "John", "Emma", "David", "Olivia", "James", "Sophia", "Daniel", "Mia", "Yusuf", "Noor")
+LAST_NAMES = ("Khan", "Ahmed", "Malik", "Hussain", "Sheikh", "Qureshi", "Smith", "Brown", "Wilson",
+              "Taylor", "Iqbal", "Raza", "Butt", "Chaudhry", "Siddiqui", "Mirza", "Jones", "Clarke")
+CLINICS = ("Vision Care", "Eye Health Centre", "City Eye Clinic", "Clear Sight", "Retina Institute",
+           "Family Eye Care", "Lakeside Ophthalmology", "Bright Eyes")
+STREETS = ("Mall Road", "Jinnah Avenue", "Canal Bank", "Main Boulevard", "High Street", "Park Lane")
+DIAGNOSES = (
+    ("Myopia", "Spectacles -1.50 DS", "Refraction test; annual review"),
+    ("Hypermetropia", "Spectacles +2.00 DS", "Refraction test; reading glasses advised"),
+    ("Astigmatism", "Toric lenses", "Keratometry and refraction"),
+    ("Glaucoma", "Latanoprost 0.005% nightly", "IOP measured; visual field test booked"),
+    ("Cataract", "Prednisolone drops post-op", "Phacoemulsification with IOL implant"),
+    ("Conjunctivitis", "Chloramphenicol drops", "Hygiene advice; review in one week"),
+    ("Dry eye", "Carboxymethylcellulose drops", "Schirmer test; lid hygiene"),
+    ("Diabetic retinopathy", "None", "Fundus photography; laser referral"),
+    ("Macular degeneration", "AREDS2 supplements", "OCT scan; anti-VEGF considered"),
+)
+COMMENTS = ("Very professional", "Helpful and kind", "Highly recommended", "Long waiting time",
+            "Explained everything clearly", "Good visit", "Clinic was crowded", "Excellent care")
+FEES = (1500, 2000, 2500, 3000, 3500, 5000)
+
+
+# ==================== SLOTS ====================
+# Appointment k takes slot (offset + k * stride) mod the number of slots. The
+# stride is coprime with the slot count, so the first `slots` appointments
+# all land on different slots, spread over the whole date range.
+class SlotSequence:
+    def __init__(self, rng, ophthalmologists, first_day, days):
+        self.ophthalmologists = ophthalmologists
+        self.first_day = first_day
+        self.per_day = len(ophthalmologists) * len(SLOT_HOURS)
+        self.slots = days * self.per_day
+        self.stride = rng.randrange(self.slots // 3, self.slots) or 1
+        while math.gcd(self.stride, self.slots) != 1:
+            self.stride += 1
+        self.offset = rng.randrange(self.slots)
+        self.taken = 0
+
+    def next(self):
+        if self.taken >= self.slots:
+            raise ValueError(f"Out of slots after {self.taken} appointments; "
+                             "add ophthalmologists or years, or lower visits")
+        pos = (self.offset + self.taken * self.stride) % self.slots
+        self.taken += 1
+        day, rest = divmod(pos, self.per_day)
+        ophth, slot = divmod(rest, len(SLOT_HOURS))
+        return self.ophthalmologists[ophth], self.first_day + datetime.timedelta(days=day), SLOT_HOURS[slot]
+
+
+# ==================== GENERATOR ====================
+class Generator:
+    def __init__(self, conn, dialect="sqlserver", seed=1, years=3, visits=5, chunk=CHUNK, progress=None):
+        self.conn = conn
+        self.dialect = dialect
+        self.rng = random.Random(seed)
+        self.years = years
+        self.visits = visits
+        self.chunk = chunk
+        self.progress = progress
+        self.today = datetime.date.today()
+        self.counts = {}
+
+    def _insert(self, table, columns, rows, fast=True):
+        marks = ",".join("?" * len(columns))
+        query = f"INSERT INTO {table}({', '.join(columns)}) VALUES({marks})"
+        cursor = self.conn.cursor()
+        if fast and hasattr(cursor, "fast_executemany"):
+            cursor.fast_executemany = True
+        rows = list(rows)
+        if rows:
+            cursor.executemany(query, rows)
+        cursor.close()
+        self.counts[table] = self.counts.get(table, 0) + len(rows)
+
+    def _ids_after(self, table, id_column, last_id):
+        # Identity values the last insert handed out, in insert order
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT {id_column} FROM {table} WHERE {id_column} > ? ORDER BY {id_column}", (last_id,))
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        return ids
+
+    def _max_id(self, table, id_column):
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT COALESCE(MAX({id_column}), 0) FROM {table}")
+        value = cursor.fetchone()[0]
+        cursor.close()
+        return value
+
+    def _name(self):
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    # Accounts get an integer password and no hash, like accounts from before
+    # migration 008: hashing each one would take hours at this size. They are
+    # upgraded on login, or all at once by python passwords.py --migrate.
+    def ophthalmologists(self, count):
+        last_id = self._max_id("Ophthalmologist", "ophthalmologist_id")
+        rng = self.rng
+        self._insert("Ophthalmologist", ("name", "email", "phonenumber", "clinicname", "clinicaddress", "password"),
+                     ((f"Dr {self._name()}", f"doctor{last_id + n}@example.com",
+                       rng.randrange(300000000, 400000000), rng.choice(CLINICS),
+                       f"{rng.randint(1, 300)} {rng.choice(STREETS)}", rng.randrange(1000, 10000))
+                      for n in range(1, count + 1)))
+        self.conn.commit()
+        return self._ids_after("Ophthalmologist", "ophthalmologist_id", last_id)
+
+    def patients(self, count, ophthalmologists):
+        days = self.years * 365 + DAYS_AHEAD
+        slots = SlotSequence(self.rng, ophthalmologists, self.today - datetime.timedelta(days=days - DAYS_AHEAD), days)
+        done = 0
+        start = time.perf_counter()
+        while done < count:
+            size = min(self.chunk, count - done)
+            self._patient_chunk(size, slots)
+            done += size
+            if self.progress:
+                self.progress(done, count, time.perf_counter() - start)
+
+    def _patient_chunk(self, size, slots):
+        rng = self.rng
+        last_patient = self._max_id("Patient", "patient_id")
+        self._insert("Patient", ("name", "gender", "date_of_birth", "email", "phonenumber", "password"),
+                     ((self._name(), rng.choice(("Male", "Female")),
+                       datetime.date(rng.randint(1940, 2020), rng.randint(1, 12), rng.randint(1, 28)).isoformat(),
+                       f"patient{last_patient + n}@example.com",
+                       rng.randrange(300000000, 400000000), rng.randrange(1000, 10000))
+                      for n in range(1, size + 1)))
+        patient_ids = self._ids_after("Patient", "patient_id", last_patient)
+
+        appointments = []   # (patient_id, ophthalmologist_id, day, hour, status)
+        for patient_id in patient_ids:
+            for _ in range(min(int(rng.expovariate(1 / self.visits)), self.visits * 4)):
+                ophth_id, day, hour = slots.next()
+                if day < self.today:
+                    status = 2 if rng.random() < 0.1 else 1
+                else:
+                    status = 1 if rng.random() < 0.4 else 0
+                appointments.append((patient_id, ophth_id, day, hour, status))
+
+        last_appointment = self._max_id("Appointment", "appointment_id")
+        self._insert("Appointment", ("patient_id", "ophthalmologist_id", "appointment_date", "appointment_time",
+                                     "appointment_status"),
+                     ((p, o, day.isoformat(), f"{day.isoformat()} {hour:02d}:00:00", status)
+                      for p, o, day, hour, status in appointments))
+        appointment_ids = self._ids_after("Appointment", "appointment_id", last_appointment)
+
+        # Records, bills and feedback only for visits that took place
+        concluded = [(a, row) for a, row in zip(appointment_ids, appointments)
+                     if row[4] == 1 and row[2] < self.today]
+        records, bills, feedback = [], [], []
+        for appointment_id, (p, o, day, hour, status) in concluded:
+            if rng.random() < 0.8:
+                diagnosis, prescription, treatment = rng.choice(DIAGNOSES)
+                records.append((p, o, appointment_id, day.isoformat(), diagnosis, prescription, treatment))
+            if rng.random() < 0.9:
+                paid = rng.random() < (0.9 if (self.today - day).days > 30 else 0.5)
+                bills.append((p, appointment_id, rng.choice(FEES), int(paid), day.isoformat()))
+            if rng.random() < 0.3:
+                rating = rng.choices((1, 2, 3, 4, 5), (2, 3, 10, 35, 50))[0]
+                when = min(day + datetime.timedelta(days=rng.randint(0, 3)), self.today)
+                feedback.append((p, o, rating, rng.choice(COMMENTS), when.isoformat()))
+
+        # TEXT columns don't mix with fast_executemany
+        last_record = self._max_id("Patient_Record", "record_id")
+        self._insert("Patient_Record", ("patient_id", "ophthalmologist_id", "appointment_id", "record_date",
+                                        "diagnosis", "prescription", "treatment_details"), records, fast=False)
+        # Search terms of the new records (see search.py)
+        terms = []
+        for record_id, (p, o, a, day, diagnosis, prescription, treatment) in zip(
+                self._ids_after("Patient_Record", "record_id", last_record), records):
+            terms += search.term_rows(record_id, o, diagnosis, prescription, treatment)
+        self._insert("Record_Term", ("ophthalmologist_id", "term", "record_id", "weight"), terms)
+        self._insert("Bill", ("patient_id", "appointment_id", "amount", "payment_status", "payment_date"), bills)
+        self._insert("Feedback", ("patient_id", "ophthalmologist_id", "rating", "comments", "feedback_date"),
+                     feedback, fast=False)
+        self.conn.commit()
+
+    def rebuild_schedule(self):
+        if self.dialect == "sqlite":
+            bit = "1 << (CAST(strftime('%H', appointment_time) AS INTEGER) - 10)"
+            hour = "CAST(strftime('%H', appointment_time) AS INTEGER)"
+            minute = "CAST(strftime('%M', appointment_time) AS INTEGER)"
+        else:
+            bit = "POWER(2, DATEPART(HOUR, appointment_time) - 10)"
+            hour = "DATEPART(HOUR, appointment_time)"
+            minute = "DATEPART(MINUTE, appointment_time)"
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM Ophthalmologist_Schedule")
+        # Rejected appointments and times off the hour don't hold a slot
+        cursor.execute(f"""
+            INSERT INTO Ophthalmologist_Schedule(ophthalmologist_id, schedule_date, slot_mask)
+            SELECT ophthalmologist_id, appointment_date, SUM(DISTINCT {bit})
+            FROM Appointment
+            WHERE {hour} BETWEEN 10 AND 17 AND {minute} = 0 AND appointment_status <> 2
+            GROUP BY ophthalmologist_id, appointment_date
+        """)
+        self.conn.commit()
+        cursor.close()
+
+
+def generate(conn, dialect="sqlserver", patients=10000, ophthalmologists=50, visits=5, years=3, seed=1,
+             chunk=CHUNK, progress=None):
+    # Returns {table: rows inserted}
+    gen = Generator(conn, dialect, seed, years, visits, chunk, progress)
+    ophth_ids = gen.ophthalmologists(ophthalmologists)
+    gen.patients(patients, ophth_ids)
+    gen.rebuild_schedule()
+    ratings.rebuild(conn)
+    return gen.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a clinic database with seeded synthetic data")
+    parser.add_argument("--sqlite", metavar="PATH", help="create or extend a SQLite stand-in database")
+    parser.add_argument("--patients", type=int, default=100000)
+    parser.add_argument("--ophthalmologists", type=int, default=200)
+    parser.add_argument("--visits", type=int, default=5, help="mean appointments per patient")
+    parser.add_argument("--years", type=int, default=3, help="years of appointment history")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--chunk", type=int, default=CHUNK, help="patients generated per batch")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        import sqlite_standin
+        sqlite_standin.create_database(args.sqlite, migrate=True)
+        conn = sqlite_standin.connect(args.sqlite)
+        dialect = "sqlite"
+    else:
+        from database import odbc_connect
+        conn = odbc_connect()
+        dialect = "sqlserver"
+
+    def progress(done, total, elapsed):
+        print(f"\r{done}/{total} patients, {done / elapsed:.0f}/s", end="", flush=True)
+
+    start = time.perf_counter()
+    try:
+        counts = generate(conn, dialect, args.patients, args.ophthalmologists, args.visits, args.years,
+                          args.seed, args.chunk, progress)
+    finally:
+        conn.close()
+    print()
+    for table, rows in counts.items():
+        print(f"{table:<16} {rows:>10}")
+    print(f"{sum(counts.values())} rows in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import argparse
+import csv
+import datetime
+import decimal
+import json
+import os
+import sys
+import time
+from contextlib import closing
+
+from database import execute_query, open_cursor
+
+# ==================== STREAMING EXPORTS ====================
+# Patient_Record and Appointment data of one patient, one ophthalmologist or
+# a whole clinic, written as CSV or JSON Lines for audits and referrals.
+# Rows are read with fetchmany from one streaming cursor (database.
+# open_cursor, bypassing the result cache) and pass through generators
+# straight to the file, so memory holds one batch whatever the export's
+# size.
+#
+# export_file reports progress after every batch as progress(done, total),
+# total being a COUNT(*) taken first, and stops between batches once
+# should_stop() is true. The file is written under a .part name and only
+# renamed into place when complete.
+#
+#   python exports.py records --patient 12 -o history.csv
+#   python exports.py appointments --clinic-of 3 --format jsonl -o audit.jsonl
+
+BATCH_SIZE = 1000
+FORMATS = ("csv", "jsonl")
+
+DATASETS = {
+    "records": {
+        "columns": ("record_id", "record_date", "patient_id", "patient_name", "ophthalmologist_id",
+                    "ophthalmologist_name", "appointment_id", "diagnosis", "prescription", "treatment_details"),
+        "select": """x.record_id, x.record_date, x.patient_id, RTRIM(p.name), x.ophthalmologist_id,
+                     RTRIM(o.name), x.appointment_id, RTRIM(x.diagnosis), RTRIM(x.prescription),
+                     x.treatment_details""",
+        "tables": "Patient_Record", "id_column": "record_id"},
+    "appointments": {
+        "columns": ("appointment_id", "appointment_date", "appointment_time", "appointment_status",
+                    "patient_id", "patient_name", "ophthalmologist_id", "ophthalmologist_name"),
+        "select": """x.appointment_id, x.appointment_date, x.appointment_time, x.appointment_status,
+                     x.patient_id, RTRIM(p.name), x.ophthalmologist_id, RTRIM(o.name)""",
+        "tables": "Appointment", "id_column": "appointment_id"},
+}
+
+# Whose rows; each takes one id
+SCOPES = {
+    "patient": "x.patient_id = ?",
+    "ophthalmologist": "x.ophthalmologist_id = ?",
+    # The whole clinic of the given ophthalmologist
+    "clinic": "o.clinicname = (SELECT clinicname FROM Ophthalmologist WHERE ophthalmologist_id = ?)",
+}
+
+
+class ExportError(Exception):
+    pass
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def export_query(dataset, scope):
+    # (rows query, count query); counting needs no Patient join
+    spec = DATASETS[dataset]
+    ophthalmologist = "JOIN Ophthalmologist o ON x.ophthalmologist_id = o.ophthalmologist_id"
+    rows = f"""
+        SELECT {spec["select"]}
+        FROM {spec["tables"]} x
+        JOIN Patient p ON x.patient_id = p.patient_id
+        {ophthalmologist}
+        WHERE {SCOPES[scope]}
+        ORDER BY x.{spec["id_column"]}
+    """
+    count = f"SELECT COUNT(*) FROM {spec['tables']} x {ophthalmologist} WHERE {SCOPES[scope]}"
+    return rows, count
+
+
+# ==================== PIPELINE ====================
+def stream_rows(query, params, batch_size=BATCH_SIZE):
+    # Yields lists of rows; the cursor's connection goes back to the pool
+    # when the generator finishes or is closed
+    cursor = open_cursor(query, params, cache=False)
+    if cursor is None:
+        raise ExportError("Could not read the data.")
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if rows:
+                yield rows
+            if len(rows) < batch_size:
+                if cursor.closed:
+                    # StreamingCursor closes itself on a fetch error
+                    raise ExportError("Reading the data failed part way.")
+                return
+    finally:
+        cursor.close()
+
+
+def plain(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def plain_batches(batches):
+    for rows in batches:
+        yield [[plain(value) for value in row] for row in rows]
+
+
+def csv_chunks(columns, batches):
+    # The rendered text of each batch, header first
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.take(), 0
+    for rows in batches:
+        writer.writerows(["" if value is None else value for value in row] for row in rows)
+        yield buffer.take(), len(rows)
+
+
+def jsonl_chunks(columns, batches):
+    for rows in batches:
+        yield "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows), len(rows)
+
+
+class _LineBuffer:
+    # File-like target for csv.writer that hands back what was written
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def take(self):
+        text = "".join(self.parts)
+        self.parts = []
+        return text
+
+
+CHUNKERS = {"csv": csv_chunks, "jsonl": jsonl_chunks}
+
+
+# ==================== EXPORT ====================
+def count_rows(dataset, scope, scope_id):
+    rows = execute_query(export_query(dataset, scope)[1], (scope_id,), fetch=True, cache=False)
+    if rows is None:
+        raise ExportError("Could not count the rows to export.")
+    return rows[0][0]
+
+
+def export_file(path, dataset, scope, scope_id, fmt="csv", progress=None, should_stop=None,
+                batch_size=BATCH_SIZE):
+    # Writes the export to path and returns the number of rows. Raises
+    # ExportCancelled when should_stop() turned true, ExportError when the
+    # database failed; either way nothing is left at path.
+    if dataset not in DATASETS or scope not in SCOPES or fmt not in FORMATS:
+        raise ExportError("Unknown dataset, scope or format.")
+    total = count_rows(dataset, scope, scope_id)
+    if progress:
+        progress(0, total)
+    query = export_query(dataset, scope)[0]
+    part = path + ".part"
+    done = 0
+    try:
+        with open(part, "w", newline="", encoding="utf-8") as out, \
+                closing(stream_rows(query, (scope_id,), batch_size)) as batches:
+            for text, count in CHUNKERS[fmt](DATASETS[dataset]["columns"], plain_batches(batches)):
+                out.write(text)
+                done += count
+                if count and progress:
+                    progress(done, max(total, done))
+                if should_stop and should_stop():
+                    raise ExportCancelled()
+        os.replace(part, path)
+    except BaseException:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export medical records or appointments as CSV or JSON Lines")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    who = parser.add_mutually_exclusive_group(required=True)
+    who.add_argument("--patient", type=int, metavar="ID")
+    who.add_argument("--ophthalmologist", type=int, metavar="ID")
+    who.add_argument("--clinic-of", type=int, metavar="OPHTHALMOLOGIST_ID",
+                     help="every ophthalmologist at this ophthalmologist's clinic")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the output file's extension")
+    parser.add_argument("-o", "--output", required=True, metavar="PATH")
+    parser.add_argument("--sqlite", metavar="PATH", help="use a SQLite stand-in database")
+    args = parser.parse_args()
+
+    if args.patient is not None:
+        scope, scope_id = "patient", args.patient
+    elif args.ophthalmologist is not None:
+        scope, scope_id = "ophthalmologist", args.ophthalmologist
+    else:
+        scope, scope_id = "clinic", args.clinic_of
+    fmt = args.format or ("jsonl" if args.output.endswith((".jsonl", ".json")) else "csv")
+
+    import database
+    if args.sqlite:
+        import sqlite_standin
+        database.configure_pool(connect=lambda: sqlite_standin.connect(args.sqlite))
+
+    def progress(done, total):
+        print(f"\r{done}/{total} rows", end="", file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    try:
+        done = export_file(args.output, args.dataset, scope, scope_id, fmt, progress)
+    except ExportError as e:
+        raise SystemExit(str(e))
+    finally:
+        database.close_pool()
+    print(f"\rWrote {done} rows to {args.output} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import datetime
+import html
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from database import execute_query
+
+# ==================== INVOICES AND RECEIPTS ====================
+# Printable HTML documents for bills: an invoice while the bill is unpaid,
+# a receipt once it is paid. The bills are read here in one query, and
+# rendering plus writing the files is spread over a process pool a chunk of
+# documents per task, so a month-end run of thousands keeps every core
+# busy. The workers never touch the database; they only get plain dicts.
+#
+# Starting the pool costs a few hundred milliseconds, while one HTML
+# document takes well under a millisecond, so batches smaller than
+# POOL_MIN_DOCS are rendered in-process (benchmarks/bench_invoices.py). The
+# pool uses the spawn start method: the desktop app starts it from a worker
+# thread, and forking a process that has threads running is unsafe.
+#
+#   python invoices.py --bill 42 --out docs/
+#   python invoices.py --month 2026-09 --clinic-of 3 --out docs/ --workers 8
+
+WORKERS = os.cpu_count() or 1
+CHUNK = 250      # documents per task sent to a worker
+POOL_MIN_DOCS = 5000
+IN_CHUNK = 500   # ids per IN (...) list; SQL Server allows 2100 parameters
+
+FIELDS = ("bill_id", "bill_date", "amount", "paid", "patient_id", "patient_name", "patient_email",
+          "appointment_time", "ophthalmologist_name", "clinic", "clinic_address")
+
+DOCUMENT_QUERY = """
+    SELECT b.bill_id, b.payment_date, b.amount, b.payment_status, p.patient_id, RTRIM(p.name),
+           RTRIM(p.email), a.appointment_time, RTRIM(o.name), RTRIM(o.clinicname), RTRIM(o.clinicaddress)
+    FROM Bill b
+    JOIN Appointment a ON b.appointment_id = a.appointment_id
+    JOIN Patient p ON b.patient_id = p.patient_id
+    JOIN Ophthalmologist o ON a.ophthalmologist_id = o.ophthalmologist_id
+"""
+
+# Whose bills a month-end run covers; each takes one ophthalmologist id
+SCOPES = {
+    "ophthalmologist": "a.ophthalmologist_id = ?",
+    "clinic": "o.clinicname = (SELECT clinicname FROM Ophthalmologist WHERE ophthalmologist_id = ?)",
+}
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title} {number}</title>
+<style>
+body {{ font-family: Arial, sans-serif; margin: 40px; color: #222; }}
+h1 {{ margin-bottom: 0; }} .muted {{ color: #666; }}
+table {{ width: 100%; border-collapse: collapse; margin-top: 24px; }}
+th, td {{ border-bottom: 1px solid #ccc; padding: 8px; text-align: left; }}
+td.amount, th.amount {{ text-align: right; }}
+.total td {{ font-weight: bold; border-bottom: none; }}
+@media print {{ body {{ margin: 0; }} }}
+</style></head>
+<body>
+<h1>{clinic}</h1>
+<div class="muted">{clinic_address}</div>
+<h2>{title} {number}</h2>
+<p>Date: {bill_date}<br>Billed to: {patient_name} (patient #{patient_id})<br>{patient_email}</p>
+<table>
+<tr><th>Description</th><th class="amount">Amount</th></tr>
+<tr><td>Consultation with {ophthalmologist_name} on {visit}</td><td class="amount">${amount:,.2f}</td></tr>
+<tr class="total"><td>{total_label}</td><td class="amount">${amount:,.2f}</td></tr>
+</table>
+<p class="muted">{footer}</p>
+</body></html>
+"""
+
+
+# ==================== LOADING ====================
+def _documents(where, params):
+    rows = execute_query(f"{DOCUMENT_QUERY} WHERE {where} ORDER BY b.bill_id", params, fetch=True, cache=False)
+    if rows is None:
+        return None
+    return [dict(zip(FIELDS, row)) for row in rows]
+
+
+def bill_documents(bill_ids):
+    # Documents for the given bills, or None on a database error
+    docs = []
+    for i in range(0, len(bill_ids), IN_CHUNK):
+        chunk = tuple(bill_ids[i:i + IN_CHUNK])
+        found = _documents(f"b.bill_id IN ({','.join('?' * len(chunk))})", chunk)
+        if found is None:
+            return None
+        docs += found
+    return docs
+
+
+def month_documents(scope, ophth_id, year, month):
+    # Every bill dated in that month, for one ophthalmologist or their clinic
+    first = datetime.date(year, month, 1)
+    last = (first + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+    return _documents(f"{SCOPES[scope]} AND b.payment_date BETWEEN ? AND ?",
+                      (ophth_id, first.isoformat(), last.isoformat()))
+
+
+# ==================== RENDERING ====================
+def document_name(doc):
+    return f"{'receipt' if doc['paid'] else 'invoice'}_{doc['bill_id']}.html"
+
+
+def render(doc):
+    text = {key: html.escape(str(value)) if isinstance(value, str) else value for key, value in doc.items()}
+    when = doc["appointment_time"]
+    visit = when.strftime("%d %b %Y, %I:%M %p") if hasattr(when, "strftime") else html.escape(str(when))
+    if doc["paid"]:
+        title, number, total_label = "Receipt", f"RCT-{doc['bill_id']:08d}", "Paid"
+        footer = "Thank you for your payment."
+    else:
+        title, number, total_label = "Invoice", f"INV-{doc['bill_id']:08d}", "Amount due"
+        footer = "Please pay from the Billing screen of the clinic app or at the front desk."
+    return PAGE.format(title=title, number=number, total_label=total_label, footer=footer, visit=visit,
+                       **{**text, "amount": float(doc["amount"]), "bill_date": doc["bill_date"]})
+
+
+def write_document(doc, out_dir):
+    path = os.path.join(out_dir, document_name(doc))
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(render(doc))
+    return path
+
+
+def _render_chunk(docs, out_dir):
+    # Runs in a worker process
+    return [write_document(doc, out_dir) for doc in docs]
+
+
+def render_batch(docs, out_dir, workers=WORKERS, chunk=CHUNK, progress=None, min_docs=POOL_MIN_DOCS):
+    # Writes one file per document into out_dir and returns their paths.
+    # progress(done, total) is called as chunks finish.
+    os.makedirs(out_dir, exist_ok=True)
+    chunks = [docs[i:i + chunk] for i in range(0, len(docs), chunk)]
+    paths = []
+    if workers <= 1 or len(chunks) <= 1 or len(docs) < min_docs:
+        for part in chunks:
+            paths += _render_chunk(part, out_dir)
+            if progress:
+                progress(len(paths), len(docs))
+        return paths
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(min(workers, len(chunks)), mp_context=context) as pool:
+        futures = [pool.submit(_render_chunk, part, out_dir) for part in chunks]
+        for future in as_completed(futures):
+            paths += future.result()
+            if progress:
+                progress(len(paths), len(docs))
+    return sorted(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render invoices and receipts as HTML")
+    which = parser.add_mutually_exclusive_group(required=True)
+    which.add_argument("--bill", type=int, nargs="+", metavar="ID")
+    which.add_argument("--month", metavar="YYYY-MM", help="every bill dated in this month")
+    who = parser.add_mutually_exclusive_group()
+    who.add_argument("--ophthalmologist", type=int, metavar="ID")
+    who.add_argument("--clinic-of", type=int, metavar="OPHTHALMOLOGIST_ID")
+    parser.add_argument("--out", default="invoices", metavar="DIR")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--sqlite", metavar="PATH", help="use a SQLite stand-in database")
+    args = parser.parse_args()
+    if args.month and args.ophthalmologist is None and args.clinic_of is None:
+        parser.error("--month needs --ophthalmologist or --clinic-of")
+
+    import database
+    if args.sqlite:
+        import sqlite_standin
+        database.configure_pool(connect=lambda: sqlite_standin.connect(args.sqlite))
+    if args.bill:
+        docs = bill_documents(args.bill)
+    else:
+        year, month = (int(part) for part in args.month.split("-"))
+        if args.clinic_of is not None:
+            docs = month_documents("clinic", args.clinic_of, year, month)
+        else:
+            docs = month_documents("ophthalmologist", args.ophthalmologist, year, month)
+    database.close_pool()
+    if docs is None:
+        raise SystemExit("Could not load the bills")
+
+    start = time.perf_counter()
+    paths = render_batch(docs, args.out, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {len(paths)} documents to {args.out} in {elapsed:.2f}s "
+          f"({len(paths) / elapsed if elapsed else 0:.0f} docs/s, {args.workers} workers)")
+
+
+if __name__ == "__main__":
+    main()
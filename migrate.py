@@ -0,0 +1,127 @@
+import argparse
+import os
+import re
+
+# ==================== SCHEMA MIGRATIONS ====================
+# Versioned SQL scripts under migrations/<dialect>/NNN_name.sql, applied in
+# order and recorded in SchemaVersion so each one runs exactly once.
+# SQL Server scripts are split into batches on GO lines like sqlcmd does.
+#
+#   python migrate.py                 # the clinic's SQL Server database
+#   python migrate.py --sqlite x.db   # a sqlite_standin database
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+FILE_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
+GO_LINE = re.compile(r"^\s*GO\s*$", re.IGNORECASE | re.MULTILINE)
+
+VERSION_TABLE_SQL = {
+    "sqlserver": """
+        IF OBJECT_ID('SchemaVersion') IS NULL
+        CREATE TABLE SchemaVersion(
+            version INT NOT NULL PRIMARY KEY,
+            name VARCHAR(200) NOT NULL,
+            applied_at DATETIME NOT NULL DEFAULT GETDATE()
+        )
+    """,
+    "sqlite": """
+        CREATE TABLE IF NOT EXISTS SchemaVersion(
+            version INTEGER NOT NULL PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+}
+
+
+def available(dialect):
+    folder = os.path.join(MIGRATIONS_DIR, dialect)
+    found = []
+    for filename in sorted(os.listdir(folder)):
+        match = FILE_PATTERN.match(filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2), os.path.join(folder, filename)))
+    return found
+
+
+def applied(conn, dialect):
+    cursor = conn.cursor()
+    cursor.execute(VERSION_TABLE_SQL[dialect])
+    conn.commit()
+    cursor.execute("SELECT version FROM SchemaVersion")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def pending(conn, dialect):
+    done = applied(conn, dialect)
+    return [m for m in available(dialect) if m[0] not in done]
+
+
+def batches(sql):
+    return [batch.strip() for batch in GO_LINE.split(sql) if batch.strip()]
+
+
+def apply(conn, dialect, version, name, path):
+    with open(path, encoding="utf-8") as f:
+        sql = f.read()
+    try:
+        if dialect == "sqlite":
+            # executescript commits first; BEGIN keeps the script and its
+            # SchemaVersion row in one transaction
+            conn.executescript("BEGIN;\n" + sql)
+            conn.execute("INSERT INTO SchemaVersion(version, name) VALUES(?, ?)", (version, name))
+        else:
+            cursor = conn.cursor()
+            for batch in batches(sql):
+                cursor.execute(batch)
+            cursor.execute("INSERT INTO SchemaVersion(version, name) VALUES(?, ?)", (version, name))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def migrate(conn, dialect="sqlserver", target=None):
+    done = []
+    for version, name, path in pending(conn, dialect):
+        if target is not None and version > target:
+            break
+        apply(conn, dialect, version, name, path)
+        done.append((version, name))
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--sqlite", metavar="PATH", help="migrate a SQLite stand-in database instead")
+    parser.add_argument("--target", type=int, help="stop after this version")
+    parser.add_argument("--status", action="store_true", help="list pending migrations and exit")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        import sqlite3
+        conn = sqlite3.connect(args.sqlite)
+        dialect = "sqlite"
+    else:
+        from database import odbc_connect
+        conn = odbc_connect()
+        dialect = "sqlserver"
+
+    try:
+        if args.status:
+            todo = pending(conn, dialect)
+            for version, name, _ in todo:
+                print(f"pending  {version:03d} {name}")
+            if not todo:
+                print("Up to date")
+            return
+        done = migrate(conn, dialect, args.target)
+        for version, name in done:
+            print(f"applied  {version:03d} {name}")
+        if not done:
+            print("Up to date")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
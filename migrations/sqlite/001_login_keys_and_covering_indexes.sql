@@ -0,0 +1,32 @@
+-- SQLite mirror of sqlserver/001. SQLite has no INCLUDE, so covered
+-- columns are appended to the index key instead.
+
+ALTER TABLE Patient ADD COLUMN email_normalized TEXT
+    GENERATED ALWAYS AS (lower(rtrim(email))) VIRTUAL;
+ALTER TABLE Ophthalmologist ADD COLUMN email_normalized TEXT
+    GENERATED ALWAYS AS (lower(rtrim(email))) VIRTUAL;
+
+CREATE UNIQUE INDEX UX_Patient_EmailNormalized ON Patient(email_normalized);
+CREATE UNIQUE INDEX UX_Ophthalmologist_EmailNormalized ON Ophthalmologist(email_normalized);
+
+CREATE INDEX IX_Appointment_Patient_Date
+    ON Appointment(patient_id, appointment_date DESC, appointment_id DESC,
+                   ophthalmologist_id, appointment_time, appointment_status);
+CREATE INDEX IX_Appointment_Ophthalmologist_Date
+    ON Appointment(ophthalmologist_id, appointment_date, appointment_id,
+                   patient_id, appointment_time, appointment_status);
+
+CREATE INDEX IX_PatientRecord_Patient_Date
+    ON Patient_Record(patient_id, record_date DESC, record_id DESC);
+CREATE INDEX IX_PatientRecord_Patient_Ophthalmologist_Date
+    ON Patient_Record(patient_id, ophthalmologist_id, record_date DESC, record_id DESC);
+CREATE INDEX IX_PatientRecord_Ophthalmologist_Patient
+    ON Patient_Record(ophthalmologist_id, patient_id);
+
+CREATE INDEX IX_Bill_Patient_Date
+    ON Bill(patient_id, payment_date DESC, bill_id DESC, appointment_id, amount, payment_status);
+CREATE INDEX IX_Bill_Appointment
+    ON Bill(appointment_id, patient_id, amount, payment_status, payment_date);
+
+CREATE INDEX IX_Feedback_Ophthalmologist_Date
+    ON Feedback(ophthalmologist_id, feedback_date DESC, feedback_id DESC, patient_id, rating);
@@ -0,0 +1,15 @@
+-- SQLite mirror of sqlserver/002.
+
+CREATE TABLE Ophthalmologist_Schedule(
+    ophthalmologist_id INTEGER NOT NULL REFERENCES Ophthalmologist(ophthalmologist_id),
+    schedule_date DATE NOT NULL,
+    slot_mask INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (ophthalmologist_id, schedule_date)
+) WITHOUT ROWID;
+
+INSERT INTO Ophthalmologist_Schedule(ophthalmologist_id, schedule_date, slot_mask)
+SELECT ophthalmologist_id, appointment_date,
+       SUM(DISTINCT 1 << (CAST(strftime('%H', appointment_time) AS INTEGER) - 10))
+FROM Appointment
+WHERE CAST(strftime('%H', appointment_time) AS INTEGER) BETWEEN 10 AND 17
+GROUP BY ophthalmologist_id, appointment_date;
@@ -0,0 +1,23 @@
+-- SQLite mirror of sqlserver/003. SQLite can't drop NOT NULL in place, so
+-- the table is rebuilt.
+
+CREATE TABLE Notification_new(
+    notification_id INTEGER PRIMARY KEY,
+    appointment_id INTEGER REFERENCES Appointment(appointment_id),
+    recipient_id INTEGER NOT NULL,
+    recipient_type TEXT NOT NULL,
+    sent_date DATE NOT NULL,
+    message TEXT NOT NULL,
+    message_read INTEGER NOT NULL
+);
+
+INSERT INTO Notification_new SELECT * FROM Notification;
+DROP TABLE Notification;
+ALTER TABLE Notification_new RENAME TO Notification;
+
+CREATE INDEX IX_Notification_Unread
+    ON Notification(recipient_type, recipient_id)
+    WHERE message_read = 0;
+
+CREATE INDEX IX_Notification_Recipient
+    ON Notification(recipient_type, recipient_id, notification_id DESC);
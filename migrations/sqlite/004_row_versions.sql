@@ -0,0 +1,89 @@
+-- SQLite mirror of sqlserver/004. SQLite has no rowversion type: a single
+-- counter row stands in for it and triggers stamp each inserted or updated
+-- row with the next value. sqlite_standin.translate() rewrites
+-- MIN_ACTIVE_ROWVERSION() to read the counter.
+
+CREATE TABLE Row_Version(value INTEGER NOT NULL);
+INSERT INTO Row_Version VALUES(0);
+
+CREATE TABLE Row_Tombstone(
+    table_name TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    row_version INTEGER NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IX_Row_Tombstone_Version ON Row_Tombstone(table_name, row_version);
+
+ALTER TABLE Appointment ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0;
+
+CREATE TRIGGER TR_Appointment_Version_Insert AFTER INSERT ON Appointment
+BEGIN
+    UPDATE Row_Version SET value = value + 1;
+    UPDATE Appointment SET row_version = (SELECT value FROM Row_Version) WHERE appointment_id = NEW.appointment_id;
+END;
+
+-- The stamp itself changes row_version, which skips the trigger
+CREATE TRIGGER TR_Appointment_Version_Update AFTER UPDATE ON Appointment
+WHEN NEW.row_version = OLD.row_version
+BEGIN
+    UPDATE Row_Version SET value = value + 1;
+    UPDATE Appointment SET row_version = (SELECT value FROM Row_Version) WHERE appointment_id = NEW.appointment_id;
+END;
+
+ALTER TABLE Patient_Record ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0;
+
+CREATE TRIGGER TR_Patient_Record_Version_Insert AFTER INSERT ON Patient_Record
+BEGIN
+    UPDATE Row_Version SET value = value + 1;
+    UPDATE Patient_Record SET row_version = (SELECT value FROM Row_Version) WHERE record_id = NEW.record_id;
+END;
+
+CREATE TRIGGER TR_Patient_Record_Version_Update AFTER UPDATE ON Patient_Record
+WHEN NEW.row_version = OLD.row_version
+BEGIN
+    UPDATE Row_Version SET value = value + 1;
+    UPDATE Patient_Record SET row_version = (SELECT value FROM Row_Version) WHERE record_id = NEW.record_id;
+END;
+
+ALTER TABLE Bill ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0;
+
+CREATE TRIGGER TR_Bill_Version_Insert AFTER INSERT ON Bill
+BEGIN
+    UPDATE Row_Version SET value = value + 1;
+    UPDATE Bill SET row_version = (SELECT value FROM Row_Version) WHERE bill_id = NEW.bill_id;
+END;
+
+CREATE TRIGGER TR_Bill_Version_Update AFTER UPDATE ON Bill
+WHEN NEW.row_version = OLD.row_version
+BEGIN
+    UPDATE Row_Version SET value = value + 1;
+    UPDATE Bill SET row_version = (SELECT value FROM Row_Version) WHERE bill_id = NEW.bill_id;
+END;
+
+ALTER TABLE Feedback ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0;
+
+CREATE TRIGGER TR_Feedback_Version_Insert AFTER INSERT ON Feedback
+BEGIN
+    UPDATE Row_Version SET value = value + 1;
+    UPDATE Feedback SET row_version = (SELECT value FROM Row_Version) WHERE feedback_id = NEW.feedback_id;
+END;
+
+CREATE TRIGGER TR_Feedback_Version_Update AFTER UPDATE ON Feedback
+WHEN NEW.row_version = OLD.row_version
+BEGIN
+    UPDATE Row_Version SET value = value + 1;
+    UPDATE Feedback SET row_version = (SELECT value FROM Row_Version) WHERE feedback_id = NEW.feedback_id;
+END;
+
+CREATE TRIGGER TR_Appointment_Tombstone AFTER DELETE ON Appointment
+BEGIN
+    UPDATE Row_Version SET value = value + 1;
+    INSERT INTO Row_Tombstone(table_name, row_id, row_version)
+    SELECT 'Appointment', OLD.appointment_id, value FROM Row_Version;
+END;
+
+CREATE INDEX IX_Appointment_Patient_Version ON Appointment(patient_id, row_version);
+CREATE INDEX IX_Appointment_Ophthalmologist_Version ON Appointment(ophthalmologist_id, row_version);
+CREATE INDEX IX_PatientRecord_Patient_Version ON Patient_Record(patient_id, row_version);
+CREATE INDEX IX_Bill_Version ON Bill(row_version);
+CREATE INDEX IX_Feedback_Ophthalmologist_Version ON Feedback(ophthalmologist_id, row_version);
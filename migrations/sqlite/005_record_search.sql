@@ -0,0 +1,10 @@
+-- SQLite mirror of sqlserver/005. NOCASE on term lets SQLite turn
+-- LIKE 'word%' into a range seek on the key, as SQL Server does.
+
+CREATE TABLE Record_Term(
+    ophthalmologist_id INTEGER NOT NULL,
+    term TEXT COLLATE NOCASE NOT NULL,
+    record_id INTEGER NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (ophthalmologist_id, term, record_id)
+) WITHOUT ROWID;
@@ -0,0 +1,9 @@
+-- SQLite mirror of sqlserver/006 (partial indexes).
+
+CREATE INDEX IX_Appointment_Pending
+    ON Appointment(ophthalmologist_id, patient_id)
+    WHERE appointment_status = 0;
+
+CREATE INDEX IX_Bill_Unpaid
+    ON Bill(appointment_id, amount)
+    WHERE payment_status = 0;
@@ -0,0 +1,32 @@
+-- SQLite mirror of sqlserver/007.
+
+CREATE TABLE Ophthalmologist_Rating(
+    ophthalmologist_id INTEGER NOT NULL PRIMARY KEY REFERENCES Ophthalmologist(ophthalmologist_id),
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    rating_sum INTEGER NOT NULL DEFAULT 0,
+    stars_1 INTEGER NOT NULL DEFAULT 0,
+    stars_2 INTEGER NOT NULL DEFAULT 0,
+    stars_3 INTEGER NOT NULL DEFAULT 0,
+    stars_4 INTEGER NOT NULL DEFAULT 0,
+    stars_5 INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE Ophthalmologist_Rating_Day(
+    ophthalmologist_id INTEGER NOT NULL REFERENCES Ophthalmologist(ophthalmologist_id),
+    rating_date DATE NOT NULL,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    rating_sum INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (ophthalmologist_id, rating_date)
+) WITHOUT ROWID;
+
+INSERT INTO Ophthalmologist_Rating(ophthalmologist_id, rating_count, rating_sum,
+                                   stars_1, stars_2, stars_3, stars_4, stars_5)
+SELECT ophthalmologist_id, COUNT(*), SUM(rating),
+       SUM(rating = 1), SUM(rating = 2), SUM(rating = 3), SUM(rating = 4), SUM(rating = 5)
+FROM Feedback
+GROUP BY ophthalmologist_id;
+
+INSERT INTO Ophthalmologist_Rating_Day(ophthalmologist_id, rating_date, rating_count, rating_sum)
+SELECT ophthalmologist_id, feedback_date, COUNT(*), SUM(rating)
+FROM Feedback
+GROUP BY ophthalmologist_id, feedback_date;
@@ -0,0 +1,5 @@
+-- SQLite mirror of sqlserver/008. The login indexes cover nothing here
+-- (see 001), so only the columns are added.
+
+ALTER TABLE Patient ADD COLUMN password_hash TEXT;
+ALTER TABLE Ophthalmologist ADD COLUMN password_hash TEXT;
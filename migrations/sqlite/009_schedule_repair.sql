@@ -0,0 +1,11 @@
+-- SQLite mirror of sqlserver/009.
+
+UPDATE Ophthalmologist_Schedule
+SET slot_mask = COALESCE((
+    SELECT SUM(DISTINCT 1 << (CAST(strftime('%H', a.appointment_time) AS INTEGER) - 10))
+    FROM Appointment a
+    WHERE a.ophthalmologist_id = Ophthalmologist_Schedule.ophthalmologist_id
+      AND a.appointment_date = Ophthalmologist_Schedule.schedule_date
+      AND CAST(strftime('%H', a.appointment_time) AS INTEGER) BETWEEN 10 AND 17
+      AND strftime('%M', a.appointment_time) = '00' AND a.appointment_status <> 2
+), 0);
@@ -0,0 +1,4 @@
+-- SQLite mirror of sqlserver/010. IX_Bill_Appointment covers more columns
+-- here (see 001), so the unique key is an index of its own.
+
+CREATE UNIQUE INDEX UX_Bill_Appointment ON Bill(appointment_id);
@@ -0,0 +1,5 @@
+-- SQLite mirror of sqlserver/011. The stand-in's INTEGER column already
+-- holds 2; drop the triggers that made it behave like the old BIT.
+
+DROP TRIGGER IF EXISTS TR_Appointment_Status_Bit_Insert;
+DROP TRIGGER IF EXISTS TR_Appointment_Status_Bit_Update;
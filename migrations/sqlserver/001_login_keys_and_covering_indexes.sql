@@ -0,0 +1,66 @@
+-- Normalized, unique email keys so login can seek instead of scanning
+-- RTRIM(email) on every row, plus one covering index per list query in
+-- Clinic.py. TEXT columns (treatment_details, comments) cannot be INCLUDEd;
+-- those two screens do a key lookup for the page they show.
+--
+-- The unique indexes fail if two accounts already share an email (ignoring
+-- case and trailing spaces); merge those rows before applying.
+
+ALTER TABLE [Patient] ADD [email_normalized] AS LOWER(RTRIM([email])) PERSISTED;
+GO
+ALTER TABLE [Ophthalmologist] ADD [email_normalized] AS LOWER(RTRIM([email])) PERSISTED;
+GO
+
+-- PatientLogin.login
+CREATE UNIQUE INDEX [UX_Patient_EmailNormalized]
+    ON [Patient]([email_normalized]) INCLUDE ([password]);
+GO
+-- OphthalmologistLogin.login
+CREATE UNIQUE INDEX [UX_Ophthalmologist_EmailNormalized]
+    ON [Ophthalmologist]([email_normalized]) INCLUDE ([password]);
+GO
+
+-- AppointmentHistory, PatientFeedback.load_ophthalmologists,
+-- AddUpdateRecord.load_appointments_for_patient
+CREATE INDEX [IX_Appointment_Patient_Date]
+    ON [Appointment]([patient_id], [appointment_date] DESC, [appointment_id] DESC)
+    INCLUDE ([ophthalmologist_id], [appointment_time], [appointment_status]);
+GO
+-- OphthalmologistAppointments, AddUpdateRecord.load_patients,
+-- OphthalmologistBilling.load_bills (patient list)
+CREATE INDEX [IX_Appointment_Ophthalmologist_Date]
+    ON [Appointment]([ophthalmologist_id], [appointment_date], [appointment_id])
+    INCLUDE ([patient_id], [appointment_time], [appointment_status]);
+GO
+
+-- PatientViewRecord, PatientMedicalHistory
+CREATE INDEX [IX_PatientRecord_Patient_Date]
+    ON [Patient_Record]([patient_id], [record_date] DESC, [record_id] DESC)
+    INCLUDE ([ophthalmologist_id], [diagnosis], [prescription]);
+GO
+-- OphthalmologistMedicalHistory.load_history
+CREATE INDEX [IX_PatientRecord_Patient_Ophthalmologist_Date]
+    ON [Patient_Record]([patient_id], [ophthalmologist_id], [record_date] DESC, [record_id] DESC)
+    INCLUDE ([diagnosis], [prescription]);
+GO
+-- OphthalmologistMedicalHistory.load_patients
+CREATE INDEX [IX_PatientRecord_Ophthalmologist_Patient]
+    ON [Patient_Record]([ophthalmologist_id], [patient_id]);
+GO
+
+-- PatientBilling
+CREATE INDEX [IX_Bill_Patient_Date]
+    ON [Bill]([patient_id], [payment_date] DESC, [bill_id] DESC)
+    INCLUDE ([appointment_id], [amount], [payment_status]);
+GO
+-- OphthalmologistBilling (joined through Appointment)
+CREATE INDEX [IX_Bill_Appointment]
+    ON [Bill]([appointment_id])
+    INCLUDE ([patient_id], [amount], [payment_status], [payment_date]);
+GO
+
+-- OphthalmologistFeedback
+CREATE INDEX [IX_Feedback_Ophthalmologist_Date]
+    ON [Feedback]([ophthalmologist_id], [feedback_date] DESC, [feedback_id] DESC)
+    INCLUDE ([patient_id], [rating]);
+GO
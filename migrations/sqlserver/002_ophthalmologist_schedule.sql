@@ -0,0 +1,22 @@
+-- Per-ophthalmologist, per-day slot bitmap used by availability.py: bit i
+-- of slot_mask is set while the i-th bookable hour (10:00 .. 17:00) is
+-- taken. Booking flips the bit with a conditional UPDATE, which is what
+-- makes two patients racing for the same slot impossible.
+
+CREATE TABLE [Ophthalmologist_Schedule](
+    [ophthalmologist_id] INT NOT NULL,
+    [schedule_date] DATE NOT NULL,
+    [slot_mask] INT NOT NULL DEFAULT 0,
+    PRIMARY KEY CLUSTERED ([ophthalmologist_id] ASC, [schedule_date] ASC),
+    FOREIGN KEY ([ophthalmologist_id]) REFERENCES [Ophthalmologist]([ophthalmologist_id])
+);
+GO
+
+-- Existing bookings; DISTINCT so old double bookings set their bit once
+INSERT INTO [Ophthalmologist_Schedule](ophthalmologist_id, schedule_date, slot_mask)
+SELECT ophthalmologist_id, appointment_date,
+       SUM(DISTINCT POWER(2, DATEPART(HOUR, appointment_time) - 10))
+FROM [Appointment]
+WHERE DATEPART(HOUR, appointment_time) BETWEEN 10 AND 17
+GROUP BY ophthalmologist_id, appointment_date;
+GO
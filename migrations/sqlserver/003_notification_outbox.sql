@@ -0,0 +1,21 @@
+-- Notifications written by the outbox in notifications.py.
+--
+-- A cancelled appointment is deleted, but the notifications about it (and
+-- the one telling the ophthalmologist it was cancelled) must survive, so
+-- appointment_id becomes optional; cancelling clears it first.
+
+ALTER TABLE [Notification] ALTER COLUMN [appointment_id] INT NULL;
+GO
+
+-- The home screen badge: COUNT(*) of one recipient's unread rows. Filtered,
+-- so read notifications never make the index or the count any bigger.
+CREATE INDEX [IX_Notification_Unread]
+    ON [Notification]([recipient_type], [recipient_id])
+    WHERE [message_read] = 0;
+GO
+
+-- Newest-first list of one recipient's notifications
+CREATE INDEX [IX_Notification_Recipient]
+    ON [Notification]([recipient_type], [recipient_id], [notification_id] DESC)
+    INCLUDE ([sent_date], [message], [message_read]);
+GO
@@ -0,0 +1,38 @@
+-- Watermarks for delta refresh (see row_versions.py). Every insert or update
+-- stamps row_version with the database-wide rowversion counter, so "what
+-- changed since watermark W" is row_version >= W. Deletes leave a row in
+-- Row_Tombstone, stamped the same way.
+
+ALTER TABLE [Appointment] ADD [row_version] ROWVERSION;
+ALTER TABLE [Patient_Record] ADD [row_version] ROWVERSION;
+ALTER TABLE [Bill] ADD [row_version] ROWVERSION;
+ALTER TABLE [Feedback] ADD [row_version] ROWVERSION;
+GO
+
+CREATE TABLE [Row_Tombstone](
+    [table_name] VARCHAR(64) NOT NULL,
+    [row_id] INT NOT NULL,
+    [row_version] ROWVERSION NOT NULL,
+    [deleted_at] DATETIME NOT NULL DEFAULT GETDATE()
+);
+GO
+
+CREATE INDEX [IX_Row_Tombstone_Version] ON [Row_Tombstone]([table_name], [row_version]) INCLUDE ([row_id]);
+GO
+
+-- Cancelling deletes the appointment
+CREATE TRIGGER [TR_Appointment_Tombstone] ON [Appointment] AFTER DELETE AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO [Row_Tombstone](table_name, row_id)
+    SELECT 'Appointment', appointment_id FROM deleted;
+END
+GO
+
+-- One seek per list for "this owner's rows changed since W"
+CREATE INDEX [IX_Appointment_Patient_Version] ON [Appointment]([patient_id], [row_version]);
+CREATE INDEX [IX_Appointment_Ophthalmologist_Version] ON [Appointment]([ophthalmologist_id], [row_version]);
+CREATE INDEX [IX_PatientRecord_Patient_Version] ON [Patient_Record]([patient_id], [row_version]);
+CREATE INDEX [IX_Bill_Version] ON [Bill]([row_version]);
+CREATE INDEX [IX_Feedback_Ophthalmologist_Version] ON [Feedback]([ophthalmologist_id], [row_version]);
+GO
@@ -0,0 +1,16 @@
+-- Inverted index over Patient_Record text for record search (see search.py).
+-- One row per (ophthalmologist, term, record) with the term's precomputed
+-- score weight in that record. The key puts each ophthalmologist's postings
+-- for a term (or a term prefix) next to each other, so a search is one
+-- range seek per query word.
+
+CREATE TABLE [Record_Term](
+    [ophthalmologist_id] INT NOT NULL,
+    [term] VARCHAR(40) NOT NULL,
+    [record_id] INT NOT NULL,
+    [weight] REAL NOT NULL,
+    CONSTRAINT [PK_Record_Term] PRIMARY KEY ([ophthalmologist_id], [term], [record_id])
+);
+GO
+
+-- Existing records are indexed by: python search.py --rebuild
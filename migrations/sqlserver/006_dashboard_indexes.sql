@@ -0,0 +1,16 @@
+-- Home screen dashboards (services.*_DASHBOARD_QUERY). Filtered, so the
+-- figures only read the rows still waiting on something.
+
+-- Pending requests of one ophthalmologist
+CREATE INDEX [IX_Appointment_Pending]
+    ON [Appointment]([ophthalmologist_id], [patient_id])
+    WHERE [appointment_status] = 0;
+GO
+
+-- Outstanding balance: each of an ophthalmologist's appointments probes
+-- this instead of every bill
+CREATE INDEX [IX_Bill_Unpaid]
+    ON [Bill]([appointment_id])
+    INCLUDE ([amount])
+    WHERE [payment_status] = 0;
+GO
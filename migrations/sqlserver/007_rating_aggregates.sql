@@ -0,0 +1,45 @@
+-- Feedback figures kept up to date by ratings.py in the same transaction
+-- as each Feedback insert, so no screen has to read Feedback to show them.
+-- Ophthalmologist_Rating holds the all-time count, sum and 1-5 histogram;
+-- Ophthalmologist_Rating_Day one bucket per day with feedback, summed over
+-- the last ratings.WINDOW_DAYS days for the recent figure.
+
+CREATE TABLE [Ophthalmologist_Rating](
+    [ophthalmologist_id] INT NOT NULL,
+    [rating_count] INT NOT NULL DEFAULT 0,
+    [rating_sum] INT NOT NULL DEFAULT 0,
+    [stars_1] INT NOT NULL DEFAULT 0,
+    [stars_2] INT NOT NULL DEFAULT 0,
+    [stars_3] INT NOT NULL DEFAULT 0,
+    [stars_4] INT NOT NULL DEFAULT 0,
+    [stars_5] INT NOT NULL DEFAULT 0,
+    PRIMARY KEY CLUSTERED ([ophthalmologist_id] ASC),
+    FOREIGN KEY ([ophthalmologist_id]) REFERENCES [Ophthalmologist]([ophthalmologist_id])
+);
+GO
+
+CREATE TABLE [Ophthalmologist_Rating_Day](
+    [ophthalmologist_id] INT NOT NULL,
+    [rating_date] DATE NOT NULL,
+    [rating_count] INT NOT NULL DEFAULT 0,
+    [rating_sum] INT NOT NULL DEFAULT 0,
+    PRIMARY KEY CLUSTERED ([ophthalmologist_id] ASC, [rating_date] ASC),
+    FOREIGN KEY ([ophthalmologist_id]) REFERENCES [Ophthalmologist]([ophthalmologist_id])
+);
+GO
+
+INSERT INTO [Ophthalmologist_Rating](ophthalmologist_id, rating_count, rating_sum,
+                                     stars_1, stars_2, stars_3, stars_4, stars_5)
+SELECT ophthalmologist_id, COUNT(*), SUM(rating),
+       SUM(CASE WHEN rating = 1 THEN 1 ELSE 0 END), SUM(CASE WHEN rating = 2 THEN 1 ELSE 0 END),
+       SUM(CASE WHEN rating = 3 THEN 1 ELSE 0 END), SUM(CASE WHEN rating = 4 THEN 1 ELSE 0 END),
+       SUM(CASE WHEN rating = 5 THEN 1 ELSE 0 END)
+FROM [Feedback]
+GROUP BY ophthalmologist_id;
+GO
+
+INSERT INTO [Ophthalmologist_Rating_Day](ophthalmologist_id, rating_date, rating_count, rating_sum)
+SELECT ophthalmologist_id, feedback_date, COUNT(*), SUM(rating)
+FROM [Feedback]
+GROUP BY ophthalmologist_id, feedback_date;
+GO
@@ -0,0 +1,22 @@
+-- Salted password hashes (passwords.py) next to the old integer password.
+-- The hash is NULL for accounts created before this migration until their
+-- next login or `python passwords.py --migrate`; both then zero the
+-- integer. New accounts get a hash and a 0.
+--
+-- The login indexes are rebuilt to cover the hash as well.
+
+ALTER TABLE [Patient] ADD [password_hash] VARCHAR(200) NULL;
+GO
+ALTER TABLE [Ophthalmologist] ADD [password_hash] VARCHAR(200) NULL;
+GO
+
+-- PatientLogin.login
+CREATE UNIQUE INDEX [UX_Patient_EmailNormalized]
+    ON [Patient]([email_normalized]) INCLUDE ([password], [password_hash])
+    WITH (DROP_EXISTING = ON);
+GO
+-- OphthalmologistLogin.login
+CREATE UNIQUE INDEX [UX_Ophthalmologist_EmailNormalized]
+    ON [Ophthalmologist]([email_normalized]) INCLUDE ([password], [password_hash])
+    WITH (DROP_EXISTING = ON);
+GO
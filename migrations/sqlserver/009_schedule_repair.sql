@@ -0,0 +1,16 @@
+-- Migration 002's backfill also set the bits of rejected appointments and
+-- of times off the hour, leaving those slots unbookable. Recompute every
+-- day's mask from the appointments that hold a slot.
+
+UPDATE s
+SET slot_mask = COALESCE(taken.mask, 0)
+FROM [Ophthalmologist_Schedule] s
+LEFT JOIN (
+    SELECT ophthalmologist_id, appointment_date,
+           SUM(DISTINCT POWER(2, DATEPART(HOUR, appointment_time) - 10)) AS mask
+    FROM [Appointment]
+    WHERE DATEPART(HOUR, appointment_time) BETWEEN 10 AND 17 AND DATEPART(MINUTE, appointment_time) = 0
+      AND appointment_status <> 2
+    GROUP BY ophthalmologist_id, appointment_date
+) taken ON taken.ophthalmologist_id = s.ophthalmologist_id AND taken.appointment_date = s.schedule_date;
+GO
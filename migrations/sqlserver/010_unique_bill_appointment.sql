@@ -0,0 +1,14 @@
+-- One bill per appointment. billing.bill_concluded's anti-join alone lets
+-- two batches running at once bill the same appointment twice; the unique
+-- index makes the second insert fail instead. Appointments already billed
+-- twice have to be sorted out by hand first.
+
+IF EXISTS (SELECT appointment_id FROM [Bill] GROUP BY appointment_id HAVING COUNT(*) > 1)
+    THROW 50010, 'Some appointments have more than one bill; remove the duplicates before migrating.', 1;
+GO
+
+CREATE UNIQUE INDEX [IX_Bill_Appointment]
+    ON [Bill]([appointment_id])
+    INCLUDE ([patient_id], [amount], [payment_status], [payment_date])
+    WITH (DROP_EXISTING = ON);
+GO
@@ -0,0 +1,28 @@
+-- appointment_status was a BIT, which holds only 0 and 1: a rejection (2)
+-- was stored as 1, so the appointment read back as approved while its slot
+-- had been freed for another booking. TINYINT holds 0 pending, 1 approved
+-- and 2 rejected. Rejections made before this migration were already
+-- stored as approvals and stay that way.
+
+DROP INDEX [IX_Appointment_Patient_Date] ON [Appointment];
+DROP INDEX [IX_Appointment_Ophthalmologist_Date] ON [Appointment];
+DROP INDEX [IX_Appointment_Pending] ON [Appointment];
+GO
+
+ALTER TABLE [Appointment] ALTER COLUMN [appointment_status] TINYINT NOT NULL;
+GO
+
+CREATE INDEX [IX_Appointment_Patient_Date]
+    ON [Appointment]([patient_id], [appointment_date] DESC, [appointment_id] DESC)
+    INCLUDE ([ophthalmologist_id], [appointment_time], [appointment_status]);
+GO
+
+CREATE INDEX [IX_Appointment_Ophthalmologist_Date]
+    ON [Appointment]([ophthalmologist_id], [appointment_date], [appointment_id])
+    INCLUDE ([patient_id], [appointment_time], [appointment_status]);
+GO
+
+CREATE INDEX [IX_Appointment_Pending]
+    ON [Appointment]([ophthalmologist_id], [patient_id])
+    WHERE [appointment_status] = 0;
+GO
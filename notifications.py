@@ -0,0 +1,163 @@
+import queue
+import threading
+import time
+
+from database import current_route, execute_query, is_constraint_violation, routed, transaction
+
+# ==================== NOTIFICATION OUTBOX ====================
+# Approvals, rejections, cancellations, new bills and new records leave a
+# message in the Notification table for the other party. The action only
+# puts the message on an in-memory queue; a background thread writes
+# whatever has queued up in one executemany per batch, so the screen or API
+# call that caused it never waits on the insert.
+#
+# Messages still queued when the process dies are lost; close() on shutdown
+# writes out the rest. Each message remembers the clinic database it was
+# queued for (shards.py) and is written there.
+
+PATIENT = "Patient"
+OPHTHALMOLOGIST = "Ophthalmologist"
+
+BATCH_SIZE = 200        # rows per INSERT batch
+FLUSH_INTERVAL = 0.5    # seconds to keep collecting once a message arrives
+RETRY_ATTEMPTS = 3
+RETRY_DELAY = 1.0       # doubled on every attempt
+MESSAGE_LENGTH = 255    # Notification.message is CHAR(255)
+
+INSERT = """
+    INSERT INTO Notification(appointment_id, recipient_id, recipient_type, sent_date, message, message_read)
+    VALUES(?,?,?,GETDATE(),?,0)
+"""
+
+
+class Outbox:
+    def __init__(self, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+
+    def enqueue(self, appointment_id, recipient_id, recipient_type, message):
+        if self._closed:
+            return
+        self._queue.put((current_route(), (appointment_id, recipient_id, recipient_type, message[:MESSAGE_LENGTH])))
+        self.enqueued += 1
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="notification-outbox", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            by_route = {}
+            for route, row in batch:
+                by_route.setdefault(route, []).append(row)
+            for route, rows in by_route.items():
+                with routed(route):
+                    self._write(rows)
+            if stop:
+                return
+
+    def _write(self, batch):
+        delay = RETRY_DELAY
+        for attempt in range(RETRY_ATTEMPTS):
+            try:
+                with transaction() as tx:
+                    tx.executemany(INSERT, batch)
+                self.written += len(batch)
+                self.batches += 1
+                return
+            except Exception as e:
+                if is_constraint_violation(e):
+                    # Usually an appointment deleted while its message was
+                    # queued; write the rest one by one
+                    self._write_each(batch)
+                    return
+                print(f"Notification Error: {e}")
+                if attempt + 1 < RETRY_ATTEMPTS:
+                    time.sleep(delay)
+                    delay *= 2
+        self.dropped += len(batch)
+
+    def _write_each(self, batch):
+        for row in batch:
+            try:
+                with transaction() as tx:
+                    tx.execute(INSERT, row)
+                self.written += 1
+            except Exception as e:
+                print(f"Notification Error: {e}")
+                self.dropped += 1
+        self.batches += 1
+
+    def close(self, timeout=10):
+        # Writes what is queued and stops the worker
+        self._closed = True
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def stats(self):
+        return {"enqueued": self.enqueued, "written": self.written, "dropped": self.dropped,
+                "batches": self.batches, "queued": self._queue.qsize()}
+
+
+outbox = Outbox()
+
+
+def notify(appointment_id, recipient_id, recipient_type, message):
+    outbox.enqueue(appointment_id, recipient_id, recipient_type, message)
+
+
+# ==================== READING ====================
+# Not cached: the rows are written by the outbox of whichever process
+# (desktop app or API server) handled the action.
+def unread_count(recipient_id, recipient_type):
+    rows = execute_query("""
+        SELECT COUNT(*) FROM Notification
+        WHERE recipient_type = ? AND recipient_id = ? AND message_read = 0
+    """, (recipient_type, recipient_id), fetch=True, cache=False)
+    return rows[0][0] if rows else None
+
+
+def recent(recipient_id, recipient_type, limit=20):
+    return execute_query("""
+        SELECT TOP (?) notification_id, sent_date, RTRIM(message), message_read
+        FROM Notification
+        WHERE recipient_type = ? AND recipient_id = ?
+        ORDER BY notification_id DESC
+    """, (limit, recipient_type, recipient_id), fetch=True, cache=False)
+
+
+def mark_read(recipient_id, recipient_type):
+    return execute_query("""
+        UPDATE Notification SET message_read = 1
+        WHERE recipient_type = ? AND recipient_id = ? AND message_read = 0
+    """, (recipient_type, recipient_id))
@@ -0,0 +1,98 @@
+# ==================== KEYSET PAGINATION ====================
+# List screens page through their rows by seeking past the (date, id) of the
+# last row shown instead of using OFFSET, so page 300 costs the same index
+# seek as page 1. The two key columns are appended to the select list;
+# key() reads them back off the end of a row.
+#
+# Previous pages are reached by remembering where each visited page started,
+# so every query runs in the same (index-friendly) direction.
+#
+# Lists with a version_column (a row_version, see row_versions.py) can also
+# fetch just the rows changed since a watermark, on any page; tombstones
+# names the table whose deletes are tracked in Row_Tombstone.
+#
+# With clinic databases (shards.py), shard_param is the index of the filter
+# parameter holding the ophthalmologist id whose clinic has the rows; lists
+# without one read every clinic.
+
+PAGE_SIZE = 500
+
+
+class KeysetPager:
+    def __init__(self, columns, tables, where, date_column, id_column,
+                 descending=True, page_size=PAGE_SIZE, version_column=None, tombstones=None, shard_param=None):
+        self.columns = columns
+        self.tables = tables
+        self.where = where
+        self.date_column = date_column
+        self.id_column = id_column
+        self.descending = descending
+        self.page_size = page_size
+        self.version_column = version_column
+        self.tombstones = tombstones
+        self.shard_param = shard_param
+        self.starts = [None]   # seek key each visited page starts after
+
+    @property
+    def page_number(self):
+        return len(self.starts)
+
+    @property
+    def has_previous(self):
+        return len(self.starts) > 1
+
+    def reset(self):
+        self.starts = [None]
+
+    def next(self, last_row):
+        self.starts.append(self.key(last_row))
+
+    def previous(self):
+        if not self.has_previous:
+            return False
+        self.starts.pop()
+        return True
+
+    @staticmethod
+    def key(row):
+        return row[-2], row[-1]
+
+    def sorts_before(self, a, b):
+        # Whether key a comes before key b in this list's order
+        return a > b if self.descending else a < b
+
+    def query(self, params=(), after=None):
+        # One extra row tells the caller whether a next page exists. after
+        # overrides the remembered start for stateless callers (the API).
+        order = "DESC" if self.descending else "ASC"
+        op = "<" if self.descending else ">"
+        where = self.where
+        params = (self.page_size + 1,) + tuple(params)
+
+        start = self.starts[-1] if after is None else after
+        if start is not None:
+            # The first comparison gives the optimizer a range to seek on,
+            # the OR only resolves ties on the same date
+            seek = (f"{self.date_column} {op}= ? AND "
+                    f"({self.date_column} {op} ? OR {self.id_column} {op} ?)")
+            where = f"{where} AND {seek}" if where else seek
+            params += (start[0], start[0], start[1])
+
+        query = f"""
+            SELECT TOP (?) {self.columns}, {self.date_column}, {self.id_column}
+            FROM {self.tables}
+            {"WHERE " + where if where else ""}
+            ORDER BY {self.date_column} {order}, {self.id_column} {order}
+        """
+        return query, params
+
+    def changes_query(self, params, since):
+        # Rows changed at or after watermark since, same columns as a page
+        seek = f"{self.version_column} >= ?"
+        where = f"{self.where} AND {seek}" if self.where else seek
+        query = f"""
+            SELECT {self.columns}, {self.date_column}, {self.id_column}
+            FROM {self.tables}
+            WHERE {where}
+        """
+        return query, tuple(params) + (since,)
@@ -0,0 +1,224 @@
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database import execute_query, transaction
+
+# ==================== PASSWORD HASHING ====================
+# Passwords are kept as salted scrypt hashes in the password_hash column
+# (migration 008), written "scrypt$n$r$p$salt$hash" with the salt and hash
+# in base64. A Python whose OpenSSL has no scrypt falls back to
+# PBKDF2-SHA256, "pbkdf2_sha256$iterations$salt$hash"; verify reads both
+# and needs_rehash flags hashes made with other settings than the current
+# ones, so they are redone at the next login.
+#
+# A hash costs tens of milliseconds of CPU and 128 * SCRYPT_N * SCRYPT_R
+# bytes (16 MiB) of memory, by design. hash_password and verify therefore
+# run on one shared pool of WORKERS threads (hashlib releases the GIL while
+# it works): the caller waits for its own result, at most WORKERS hashes
+# run at once however many logins arrive, and once MAX_PENDING more are
+# waiting further calls raise Busy instead of queueing without bound.
+# benchmarks/bench_logins.py measures logins/sec against the pool size.
+#
+# Accounts created before the migration still have their number in the
+# integer password column and no hash. Their next successful login stores
+# the hash and zeroes the number (services._login); --migrate converts all
+# remaining accounts at once:
+#
+#   python passwords.py --migrate [--sqlite x.db]
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = 600000
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+SCHEME = "scrypt" if hasattr(hashlib, "scrypt") else "pbkdf2_sha256"
+PARAMS = {"scrypt": (SCRYPT_N, SCRYPT_R, SCRYPT_P), "pbkdf2_sha256": (PBKDF2_ITERATIONS,)}
+
+# Leave the other cores to the UI, the API threads and the database
+WORKERS = max(1, (os.cpu_count() or 1) // 2)
+MAX_PENDING = 64
+
+MIGRATE_BATCH = 500
+
+# Tables with login credentials: (table, id column)
+ACCOUNTS = (("Patient", "patient_id"), ("Ophthalmologist", "ophthalmologist_id"))
+
+
+class Busy(Exception):
+    pass
+
+
+# ==================== KDF ====================
+def _derive(password, salt, scheme, params):
+    secret = password.encode("utf-8")
+    if scheme == "scrypt":
+        n, r, p = params
+        return hashlib.scrypt(secret, salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=HASH_BYTES)
+    if scheme == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", secret, salt, params[0], HASH_BYTES)
+    raise ValueError(f"Unknown password hash scheme {scheme!r}")
+
+
+def _parse(stored):
+    scheme, *fields = stored.split("$")
+    return scheme, tuple(int(field) for field in fields[:-2]), \
+        base64.b64decode(fields[-2]), base64.b64decode(fields[-1])
+
+
+def hash_now(password):
+    # On the calling thread; everything else should use hash_password
+    salt = secrets.token_bytes(SALT_BYTES)
+    params = PARAMS[SCHEME]
+    digest = _derive(password, salt, SCHEME, params)
+    return "$".join([SCHEME, *map(str, params),
+                     base64.b64encode(salt).decode("ascii"), base64.b64encode(digest).decode("ascii")])
+
+
+def verify_now(password, stored):
+    try:
+        scheme, params, salt, expected = _parse(stored)
+        digest = _derive(password, salt, scheme, params)
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(digest, expected)
+
+
+def needs_rehash(stored):
+    scheme, params, _, _ = _parse(stored)
+    return scheme != SCHEME or params != PARAMS[SCHEME]
+
+
+def legacy_matches(password, legacy):
+    # Accounts from before migration 008 compared the password as a number
+    try:
+        return int(password) == legacy
+    except (TypeError, ValueError):
+        return False
+
+
+# ==================== WORKER POOL ====================
+class KdfPool:
+    def __init__(self, workers=WORKERS, max_pending=MAX_PENDING):
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="kdf")
+        # One slot per running or waiting hash
+        self.slots = threading.BoundedSemaphore(workers + max_pending)
+
+    def run(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            raise Busy()
+        try:
+            return self.executor.submit(fn, *args).result()
+        finally:
+            self.slots.release()
+
+    def close(self):
+        self.executor.shutdown()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_dummy_hash = None
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = KdfPool()
+        return _pool
+
+
+def configure_pool(workers=WORKERS, max_pending=MAX_PENDING):
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, KdfPool(workers, max_pending)
+    if old:
+        old.close()
+
+
+def hash_password(password):
+    return get_pool().run(hash_now, password)
+
+
+def verify(password, stored):
+    return get_pool().run(verify_now, password, stored)
+
+
+def dummy_hash():
+    # Checked against when the email is unknown, so that takes as long as a
+    # wrong password and the timing does not tell which emails exist
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(secrets.token_hex(16))
+    return _dummy_hash
+
+
+# ==================== MIGRATION ====================
+def migrate_table(table, id_column, progress=None):
+    # Hashes every legacy password in table, MIGRATE_BATCH accounts per
+    # transaction, and returns how many were converted
+    done = 0
+    last_id = 0
+    while True:
+        rows = execute_query(f"""
+            SELECT TOP (?) {id_column}, password FROM {table}
+            WHERE {id_column} > ? AND password_hash IS NULL
+            ORDER BY {id_column}
+        """, (MIGRATE_BATCH, last_id), fetch=True, cache=False)
+        if rows is None:
+            raise RuntimeError(f"Could not read {table}")
+        if not rows:
+            return done
+        pool = get_pool()
+        hashes = list(pool.executor.map(hash_now, (str(password) for _, password in rows)))
+        with transaction() as tx:
+            # password_hash IS NULL again: a login may have upgraded the row meanwhile
+            tx.executemany(f"UPDATE {table} SET password_hash = ?, password = 0 "
+                           f"WHERE {id_column} = ? AND password_hash IS NULL",
+                           [(digest, row[0]) for digest, row in zip(hashes, rows)])
+        done += len(rows)
+        last_id = rows[-1][0]
+        if progress:
+            progress(table, done)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hash the integer passwords left from before migration 008")
+    parser.add_argument("--migrate", action="store_true", required=True)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="hashing threads (default: every core, for an offline run)")
+    parser.add_argument("--sqlite", metavar="PATH", help="use a SQLite stand-in database")
+    args = parser.parse_args()
+
+    import database
+    if args.sqlite:
+        import sqlite_standin
+        database.configure_pool(connect=lambda: sqlite_standin.connect(args.sqlite))
+    configure_pool(args.workers)
+
+    def progress(table, done):
+        print(f"\r{table}: {done} accounts", end="", flush=True)
+
+    start = time.perf_counter()
+    try:
+        for table, id_column in ACCOUNTS:
+            count = migrate_table(table, id_column, progress)
+            print(f"\r{table}: {count} accounts hashed")
+    finally:
+        database.close_pool()
+        get_pool().close()
+    print(f"Done in {time.perf_counter() - start:.1f}s ({SCHEME})")
+
+
+if __name__ == "__main__":
+    main()
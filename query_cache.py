@@ -0,0 +1,99 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+# ==================== QUERY RESULT CACHE ====================
+# LRU cache of SELECT results keyed on (sql, params). Each entry is tagged
+# with the tables its query reads; a write through execute_query drops only
+# the entries tagged with the table it touched. TTL bounds how long rows
+# changed by another client can stay stale.
+
+MAX_ENTRIES = 256
+TTL = 60  # seconds
+
+TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE)\s+\[?(\w+)\]?", re.IGNORECASE)
+
+
+@lru_cache(maxsize=512)
+def tables_in(query):
+    return frozenset(name.lower() for name in TABLE_PATTERN.findall(query))
+
+
+def cache_key(query, params):
+    return query, tuple(params) if params else ()
+
+
+class QueryCache:
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires_at, rows, tables)
+        self._by_table = {}             # table -> set of keys
+        # Bumped on every write to a table; a read that started before the
+        # write finished must not store its (possibly stale) rows
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self, tables):
+        with self._lock:
+            return tuple(self._generations.get(t, 0) for t in sorted(tables))
+
+    def put(self, key, rows, tables, generation):
+        with self._lock:
+            if generation != tuple(self._generations.get(t, 0) for t in sorted(tables)):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, rows, tables)
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tables):
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                for key in list(self._by_table.get(table, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "evictions": self.evictions, "invalidations": self.invalidations}
+
+    def _remove(self, key):
+        _, _, tables = self._entries.pop(key)
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
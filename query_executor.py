@@ -0,0 +1,105 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from database import execute_query
+
+# ==================== BACKGROUND QUERY EXECUTOR ====================
+# Screens hand their SELECTs to the executor instead of calling
+# execute_query on the UI thread. Every request has a key (normally the
+# screen plus what it is loading); submitting again under the same key, or
+# cancelling it, makes the earlier request stale and its rows are dropped.
+# Results that hold resources (open cursors) are passed to on_stale instead
+# so they can be closed.
+#
+# Navigating away cancels every pending load (cancel_all). Jobs the user
+# started and waits on, such as an export or a login, pass keep=True: they
+# still report back to their screen after it is left.
+
+MAX_THREADS = 4
+
+
+class _TaskSignals(QObject):
+    done = pyqtSignal(int, object)
+
+
+class QueryTask(QRunnable):
+    def __init__(self, token, fn, args):
+        super().__init__()
+        self.token = token
+        self.fn = fn
+        self.args = args
+        # Created on the UI thread, so emits from the worker are queued back to it
+        self.signals = _TaskSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args)
+        except Exception as e:
+            print(f"Background Query Error: {e}")
+            result = None
+        self.signals.done.emit(self.token, result)
+
+
+class QueryExecutor(QObject):
+    def __init__(self, max_threads=MAX_THREADS):
+        super().__init__()
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(max_threads)
+        self._next_token = 0
+        self._pending = {}   # key -> (token, task, callback)
+        self._running = {}   # token -> (task, on_stale), kept alive until it reports back
+        self._kept = set()   # keys cancel_all leaves alone
+
+    def fetch(self, key, query, params, callback):
+        return self.run(key, execute_query, (query, params, True), callback)
+
+    def run(self, key, fn, args, callback, on_stale=None, keep=False):
+        self.cancel(key)
+        if keep:
+            self._kept.add(key)
+        self._next_token += 1
+        token = self._next_token
+        task = QueryTask(token, fn, args)
+        task.setAutoDelete(False)
+        task.signals.done.connect(self._on_done)
+        self._pending[key] = (token, task, callback)
+        self._running[token] = (task, on_stale)
+        self.thread_pool.start(task)
+        return token
+
+    def cancel(self, key):
+        self._kept.discard(key)
+        entry = self._pending.pop(key, None)
+        if entry is None:
+            return
+        token, task, _ = entry
+        # Not started yet: pull it off the queue. Already running: let it
+        # finish, _on_done ignores the result since the key is gone.
+        if self.thread_pool.tryTake(task):
+            self._running.pop(token, None)
+
+    def cancel_all(self):
+        for key in list(self._pending):
+            if key not in self._kept:
+                self.cancel(key)
+
+    def is_pending(self, key):
+        return key in self._pending
+
+    def idle(self):
+        return not self._pending
+
+    def _on_done(self, token, result):
+        _, on_stale = self._running.pop(token, (None, None))
+        for key, (pending_token, _, callback) in self._pending.items():
+            if pending_token == token:
+                del self._pending[key]
+                self._kept.discard(key)
+                callback(result)
+                return
+        if on_stale is not None and result is not None:
+            on_stale(result)
+
+    def shutdown(self):
+        for key in list(self._pending):
+            self.cancel(key)
+        self.thread_pool.waitForDone()
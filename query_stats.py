@@ -0,0 +1,161 @@
+import datetime
+import json
+import math
+import re
+import threading
+from collections import deque
+from functools import lru_cache
+
+# ==================== QUERY INSTRUMENTATION ====================
+# Latency histograms, row and byte counts per query shape (the SQL text with
+# whitespace collapsed; values are always bound as parameters, so the shape
+# never contains patient data). Statements slower than SLOW_QUERY_MS go to a
+# bounded slow-query log. Parameters are never recorded.
+
+SLOW_QUERY_MS = 200
+SLOW_LOG_SIZE = 100
+METRICS_FILE = "query_metrics.json"
+
+# Log-scale latency buckets: bucket i covers up to MIN_BUCKET_MS * RATIO**i,
+# so any percentile read from the histogram is within ~9% of the true value
+MIN_BUCKET_MS = 0.01
+RATIO = 2 ** (1 / 8)
+
+
+@lru_cache(maxsize=512)
+def shape(query):
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def payload_bytes(rows):
+    # Rough size of what came over the wire: text and binary by length,
+    # everything else (numbers, dates, flags) as 8 bytes
+    total = 0
+    for row in rows:
+        for value in row:
+            if value is None:
+                continue
+            if isinstance(value, (str, bytes, bytearray)):
+                total += len(value)
+            else:
+                total += 8
+    return total
+
+
+def _bucket(ms):
+    if ms <= MIN_BUCKET_MS:
+        return 0
+    return int(math.ceil(math.log(ms / MIN_BUCKET_MS, RATIO)))
+
+
+def _bucket_upper(index):
+    return MIN_BUCKET_MS * RATIO ** index
+
+
+class ShapeStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.buckets = {}   # bucket index -> count
+
+    def percentile(self, p):
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(_bucket_upper(index), self.max_ms)
+        return self.max_ms
+
+    def as_dict(self):
+        return {"count": self.count, "errors": self.errors, "cache_hits": self.cache_hits,
+                "total_ms": round(self.total_ms, 3), "max_ms": round(self.max_ms, 3),
+                "p50_ms": round(self.percentile(50), 3), "p95_ms": round(self.percentile(95), 3),
+                "p99_ms": round(self.percentile(99), 3), "rows": self.rows, "bytes": self.bytes}
+
+
+class QueryStats:
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS, slow_log_size=SLOW_LOG_SIZE):
+        self.slow_query_ms = slow_query_ms
+        self.shapes = {}
+        self.slow_log = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+
+    def _get(self, query):
+        key = shape(query)
+        stats = self.shapes.get(key)
+        if stats is None:
+            stats = self.shapes[key] = ShapeStats()
+        return key, stats
+
+    def record(self, query, elapsed_ms, rows=0, nbytes=0, error=False):
+        with self._lock:
+            key, stats = self._get(query)
+            stats.count += 1
+            stats.errors += bool(error)
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.rows += rows
+            stats.bytes += nbytes
+            index = _bucket(elapsed_ms)
+            stats.buckets[index] = stats.buckets.get(index, 0) + 1
+            slow = elapsed_ms >= self.slow_query_ms
+            if slow:
+                self.slow_log.append({"at": datetime.datetime.now().isoformat(timespec="seconds"),
+                                      "ms": round(elapsed_ms, 1), "rows": rows, "query": key})
+        if slow:
+            print(f"Slow query ({elapsed_ms:.0f} ms): {key[:120]}")
+
+    def record_rows(self, query, rows, nbytes):
+        # Rows streamed after the statement was timed (open cursors)
+        with self._lock:
+            _, stats = self._get(query)
+            stats.rows += rows
+            stats.bytes += nbytes
+
+    def record_cache_hit(self, query):
+        with self._lock:
+            _, stats = self._get(query)
+            stats.cache_hits += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {"shapes": {key: s.as_dict() for key, s in self.shapes.items()},
+                    "slow_queries": list(self.slow_log)}
+
+    def reset(self):
+        with self._lock:
+            self.shapes.clear()
+            self.slow_log.clear()
+
+    def report(self, limit=20):
+        snap = self.snapshot()
+        shapes = sorted(snap["shapes"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        lines = [f"{'count':>7} {'cached':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                 f"{'total ms':>10} {'rows':>8} {'KB':>8}  query"]
+        for key, s in shapes[:limit]:
+            lines.append(f"{s['count']:>7} {s['cache_hits']:>6} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} "
+                         f"{s['p99_ms']:>8.2f} {s['total_ms']:>10.1f} {s['rows']:>8} "
+                         f"{s['bytes'] / 1024:>8.1f}  {key[:80]}")
+        if snap["slow_queries"]:
+            lines.append(f"Slow queries (>= {self.slow_query_ms} ms):")
+            for entry in snap["slow_queries"]:
+                lines.append(f"  {entry['at']} {entry['ms']:>8.1f} ms {entry['rows']:>6} rows  {entry['query'][:80]}")
+        return "\n".join(lines)
+
+    def export(self, path=METRICS_FILE, extra=None):
+        data = self.snapshot()
+        data["exported_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+        if extra:
+            data.update(extra)
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+        return path
+
@@ -0,0 +1,69 @@
+import datetime
+
+from database import update_or_insert
+
+# ==================== RATING AGGREGATES ====================
+# Count, sum and 1-5 histogram of every ophthalmologist's feedback, kept in
+# Ophthalmologist_Rating (migration 007) and updated by record_rating in the
+# same transaction as the Feedback insert. Ophthalmologist_Rating_Day holds
+# the same count and sum per day; the rolling WINDOW_DAYS figure is the sum
+# of the buckets since window_start(), so it needs no expiry job.
+#
+# Feedback rows are never updated or deleted, so the aggregates only ever
+# grow. Feedback written around them (an import, datagen.py) is folded in by
+# rebuild().
+
+WINDOW_DAYS = 90
+STARS = (1, 2, 3, 4, 5)
+
+AGGREGATE_COLUMNS = ("rating_count, rating_sum, " + ", ".join(f"stars_{stars}" for stars in STARS))
+
+
+def window_start(today=None):
+    today = today or datetime.date.today()
+    return (today - datetime.timedelta(days=WINDOW_DAYS - 1)).isoformat()
+
+
+def average(count, total):
+    return round(total / count, 1) if count else None
+
+
+def record_rating(tx, ophth_id, rating, day):
+    # Called inside the transaction that inserts the Feedback row; rating is
+    # an int already checked to be in STARS
+    stars = f"stars_{rating}"
+    update_or_insert(tx, f"""
+        UPDATE Ophthalmologist_Rating
+        SET rating_count = rating_count + 1, rating_sum = rating_sum + ?, {stars} = {stars} + 1
+        WHERE ophthalmologist_id = ?
+    """, (rating, ophth_id),
+        f"INSERT INTO Ophthalmologist_Rating(ophthalmologist_id, rating_count, rating_sum, {stars}) VALUES(?,1,?,1)",
+        (ophth_id, rating))
+    update_or_insert(tx, """
+        UPDATE Ophthalmologist_Rating_Day
+        SET rating_count = rating_count + 1, rating_sum = rating_sum + ?
+        WHERE ophthalmologist_id = ? AND rating_date = ?
+    """, (rating, ophth_id, day),
+        "INSERT INTO Ophthalmologist_Rating_Day(ophthalmologist_id, rating_date, rating_count, rating_sum) "
+        "VALUES(?,?,1,?)",
+        (ophth_id, day, rating))
+
+
+def rebuild(conn):
+    # Recompute both tables from Feedback on a plain DB-API connection
+    histogram = ", ".join(f"SUM(CASE WHEN rating = {stars} THEN 1 ELSE 0 END)" for stars in STARS)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM Ophthalmologist_Rating")
+    cursor.execute("DELETE FROM Ophthalmologist_Rating_Day")
+    cursor.execute(f"""
+        INSERT INTO Ophthalmologist_Rating(ophthalmologist_id, {AGGREGATE_COLUMNS})
+        SELECT ophthalmologist_id, COUNT(*), SUM(rating), {histogram}
+        FROM Feedback GROUP BY ophthalmologist_id
+    """)
+    cursor.execute("""
+        INSERT INTO Ophthalmologist_Rating_Day(ophthalmologist_id, rating_date, rating_count, rating_sum)
+        SELECT ophthalmologist_id, feedback_date, COUNT(*), SUM(rating)
+        FROM Feedback GROUP BY ophthalmologist_id, feedback_date
+    """)
+    conn.commit()
+    cursor.close()
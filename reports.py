@@ -0,0 +1,185 @@
+import argparse
+import csv
+import datetime
+import sys
+import time
+
+from database import execute_query
+
+# ==================== ACCOUNTS RECEIVABLE AGING ====================
+# Billed, collected and outstanding amounts per ophthalmologist, with the
+# outstanding part split by how long ago the bill was issued. One GROUP BY
+# over Bill does all the arithmetic in the database: each bucket is a
+# SUM(CASE ...) against cutoff dates computed here, so the same statement
+# runs on SQL Server and the SQLite stand-in and only one row per
+# ophthalmologist comes back, however many bills there are. Clinic and
+# grand totals are added up from those rows.
+#
+# A bill's age is counted from payment_date, which is set when the bill is
+# issued. Collection rate is collected / billed.
+#
+#   python reports.py [--clinic NAME] [--csv aging.csv] [--sqlite x.db]
+
+# (label, oldest age in days or None for "older than that")
+AGING_BUCKETS = (("0-30", 30), ("31-60", 60), ("61-90", 90), ("90+", None))
+
+COLUMNS = ("Clinic", "Ophthalmologist", "Bills", "Billed", "Collected", "Outstanding") \
+    + tuple(label for label, _ in AGING_BUCKETS) + ("Collection rate",)
+
+
+def cutoffs(today):
+    # Issue dates on or after cutoff i fall in bucket i (or a younger one)
+    return [(today - datetime.timedelta(days=days)).isoformat() for _, days in AGING_BUCKETS if days]
+
+
+def aging_query(clinic, ophth_id):
+    cases = []
+    newer = None
+    for _, days in AGING_BUCKETS:
+        condition = "b.payment_status = 0"
+        if days:
+            condition += " AND b.payment_date >= ?"
+        if newer:
+            condition += " AND b.payment_date < ?"
+        cases.append(f"SUM(CASE WHEN {condition} THEN b.amount ELSE 0 END)")
+        newer = days
+    where = ""
+    if clinic:
+        where = "WHERE o.clinicname = ?"
+    elif ophth_id:
+        # The whole clinic the ophthalmologist works at
+        where = "WHERE o.clinicname = (SELECT clinicname FROM Ophthalmologist WHERE ophthalmologist_id = ?)"
+    return f"""
+        SELECT RTRIM(o.clinicname), RTRIM(o.name), COUNT(*), SUM(b.amount),
+               SUM(CASE WHEN b.payment_status = 1 THEN b.amount ELSE 0 END),
+               {", ".join(cases)}
+        FROM Bill b
+        JOIN Appointment a ON b.appointment_id = a.appointment_id
+        JOIN Ophthalmologist o ON a.ophthalmologist_id = o.ophthalmologist_id
+        {where}
+        GROUP BY o.ophthalmologist_id, o.clinicname, o.name
+        ORDER BY o.clinicname, o.name
+    """
+
+
+def aging_params(today, clinic, ophth_id):
+    # One date per bound, in the order aging_query uses them
+    dates = cutoffs(today)
+    params = []
+    for i in range(len(AGING_BUCKETS)):
+        if i < len(dates):
+            params.append(dates[i])
+        if i:
+            params.append(dates[i - 1])
+    if clinic or ophth_id:
+        params.append(clinic or ophth_id)
+    return tuple(params)
+
+
+def report_row(clinic, name, bills, billed, collected, buckets):
+    billed, collected = float(billed or 0), float(collected or 0)
+    buckets = [round(float(amount or 0), 2) for amount in buckets]
+    rate = round(collected / billed, 4) if billed else None
+    return (clinic, name, bills, round(billed, 2), round(collected, 2), round(sum(buckets), 2)) \
+        + tuple(buckets) + (rate,)
+
+
+def add_rows(clinic, name, rows):
+    bills = sum(row[2] for row in rows)
+    billed = sum(row[3] for row in rows)
+    collected = sum(row[4] for row in rows)
+    buckets = [sum(row[6 + i] for row in rows) for i in range(len(AGING_BUCKETS))]
+    return report_row(clinic, name, bills, billed, collected, buckets)
+
+
+def aging_rows(today, clinic=None, ophth_id=None):
+    # One COLUMNS row per ophthalmologist, by clinic and name; None on a
+    # database error
+    rows = execute_query(aging_query(clinic, ophth_id), aging_params(today, clinic, ophth_id),
+                         fetch=True, cache=False)
+    if rows is None:
+        return None
+    return [report_row(row[0], row[1], row[2], row[3], row[4], row[5:]) for row in rows]
+
+
+def aging_report(clinic=None, ophth_id=None, today=None):
+    # {"as_of", "ophthalmologists", "clinics", "total"} for every clinic, one
+    # clinic by name, or ophth_id's clinic. Rows are laid out as COLUMNS
+    # (clinic rows have an empty ophthalmologist, the total row empty both);
+    # None on a database error.
+    today = today or datetime.date.today()
+    ophthalmologists = aging_rows(today, clinic, ophth_id)
+    if ophthalmologists is None:
+        return None
+    return summarize(today, ophthalmologists)
+
+
+def summarize(today, ophthalmologists):
+    # The report from ophthalmologist rows sorted by clinic
+    clinics = []
+    for row in ophthalmologists:
+        if not clinics or clinics[-1][0] != row[0]:
+            clinics.append((row[0], []))
+        clinics[-1][1].append(row)
+    return {"as_of": today,
+            "ophthalmologists": ophthalmologists,
+            "clinics": [add_rows(name, "", members) for name, members in clinics],
+            "total": add_rows("", "", ophthalmologists)}
+
+
+def report_lines(report):
+    # Every row in reading order: each clinic's ophthalmologists then the
+    # clinic's subtotal, and the grand total last
+    lines = []
+    for clinic in report["clinics"]:
+        lines += [row for row in report["ophthalmologists"] if row[0] == clinic[0]]
+        lines.append(clinic)
+    lines.append(report["total"])
+    return lines
+
+
+def write_csv(report, out):
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    for row in report_lines(report):
+        writer.writerow(["" if value is None else value for value in row])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accounts receivable aging per ophthalmologist and clinic")
+    parser.add_argument("--sqlite", metavar="PATH", help="use a SQLite stand-in database")
+    parser.add_argument("--clinic", help="only this clinic")
+    parser.add_argument("--csv", metavar="PATH", help="write the report to this file ('-' for stdout)")
+    args = parser.parse_args()
+
+    import database
+    if args.sqlite:
+        import sqlite_standin
+        database.configure_pool(connect=lambda: sqlite_standin.connect(args.sqlite))
+    start = time.perf_counter()
+    report = aging_report(args.clinic)
+    elapsed = time.perf_counter() - start
+    database.close_pool()
+    if report is None:
+        raise SystemExit("Report failed")
+
+    if args.csv == "-":
+        write_csv(report, sys.stdout)
+        return
+    if args.csv:
+        with open(args.csv, "w", newline="") as out:
+            write_csv(report, out)
+    total = report["total"]
+    print(f"As of {report['as_of']}: {total[2]} bills, ${total[3]:,.2f} billed, ${total[5]:,.2f} outstanding "
+          f"({len(report['ophthalmologists'])} ophthalmologists, {len(report['clinics'])} clinics, "
+          f"{elapsed:.2f}s)")
+    for label, amount in zip(COLUMNS[6:-1], total[6:-1]):
+        print(f"  {label:<6} ${amount:>14,.2f}")
+    if total[-1] is not None:
+        print(f"  Collected {total[-1]:.1%} of the amount billed")
+    if args.csv:
+        print(f"Wrote {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
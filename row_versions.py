@@ -0,0 +1,41 @@
+from database import execute_query
+
+# ==================== DELTA REFRESH ====================
+# Appointment, Patient_Record, Bill and Feedback carry a row_version that
+# every insert and update bumps (migration 004). A screen remembers the
+# watermark it read before loading its rows; a refresh asks only for rows
+# with row_version >= that watermark (plus tombstones of deleted rows) and
+# patches them into what it already shows.
+#
+# MIN_ACTIVE_ROWVERSION() is the lowest rowversion any open transaction may
+# still commit with, so everything below it is visible to the next read and
+# nothing is skipped. Reading it before the rows means a change can show up
+# twice, never not at all; patching is idempotent.
+
+WATERMARK_QUERY = "SELECT MIN_ACTIVE_ROWVERSION()"
+
+
+def watermark():
+    rows = execute_query(WATERMARK_QUERY, fetch=True, cache=False)
+    return rows[0][0] if rows else None
+
+
+def changes(pager, params, since):
+    # (new watermark, changed rows, deleted ids) for one list, or None on a
+    # database error
+    mark = watermark()
+    if mark is None:
+        return None
+    query, query_params = pager.changes_query(params, since)
+    rows = execute_query(query, query_params, fetch=True, cache=False)
+    if rows is None:
+        return None
+    deleted = []
+    if pager.tombstones:
+        tombstones = execute_query("""
+            SELECT row_id FROM Row_Tombstone WHERE table_name = ? AND row_version >= ?
+        """, (pager.tombstones, since), fetch=True, cache=False)
+        if tombstones is None:
+            return None
+        deleted = [row[0] for row in tombstones]
+    return mark, rows, deleted
@@ -0,0 +1,217 @@
+import argparse
+import math
+import re
+import time
+
+from database import execute_query
+
+# ==================== RECORD SEARCH ====================
+# Word search over an ophthalmologist's Patient_Record diagnosis,
+# prescription and treatment_details ("glaucoma latanoprost"). Record_Term
+# (migration 005) is an inverted index: one row per (ophthalmologist, term,
+# record) holding the term's BM25 weight in that record, written in the same
+# transaction as the record itself (index_record).
+#
+# A search fetches the postings of every query word with one range seek per
+# word on Record_Term's key, scores them here (BM25: weight times idf within
+# the ophthalmologist's records) and loads the details of the best
+# SEARCH_LIMIT records. Every word must match; words of MIN_PREFIX letters or
+# more also match as a prefix ("latano" finds latanoprost).
+#
+# Records written before the index existed are indexed by
+#   python search.py --rebuild [--sqlite x.db]
+
+TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(("a", "an", "and", "as", "at", "be", "by", "for", "in", "is", "of", "on", "or",
+                       "per", "the", "to", "with"))
+TERM_LENGTH = 40             # Record_Term.term is VARCHAR(40)
+MIN_PREFIX = 3               # shorter words only match whole terms
+MAX_QUERY_TERMS = 8
+SEARCH_LIMIT = 100
+REBUILD_CHUNK = 5000         # records per batch when rebuilding
+
+# diagnosis, prescription, treatment_details: a word in the diagnosis counts
+# three times as much as one in the treatment notes
+FIELD_WEIGHTS = (3.0, 2.0, 1.0)
+K1 = 1.2                     # BM25 term-frequency saturation
+B = 0.75                     # BM25 length normalisation
+AVERAGE_LENGTH = 12          # words per record, roughly, for length normalisation
+PREFIX_FACTOR = 0.8          # a prefix-only match scores a little below a whole word
+
+INSERT_TERM = "INSERT INTO Record_Term(ophthalmologist_id, term, record_id, weight) VALUES(?,?,?,?)"
+
+
+def tokenize(text):
+    return [word[:TERM_LENGTH] for word in TOKEN.findall((text or "").lower()) if word not in STOPWORDS]
+
+
+def record_terms(diagnosis, prescription, treatment):
+    # {term: weight} for one record
+    frequencies = {}
+    length = 0
+    for text, field_weight in zip((diagnosis, prescription, treatment), FIELD_WEIGHTS):
+        words = tokenize(text)
+        length += len(words)
+        for word in words:
+            frequencies[word] = frequencies.get(word, 0) + field_weight
+    norm = K1 * (1 - B + B * length / AVERAGE_LENGTH)
+    return {term: round(f * (K1 + 1) / (f + norm), 4) for term, f in frequencies.items()}
+
+
+def term_rows(record_id, ophth_id, diagnosis, prescription, treatment):
+    return [(ophth_id, term, record_id, weight)
+            for term, weight in record_terms(diagnosis, prescription, treatment).items()]
+
+
+def index_record(tx, record_id, ophth_id, diagnosis, prescription, treatment):
+    # Called inside the transaction that inserts the record
+    rows = term_rows(record_id, ophth_id, diagnosis, prescription, treatment)
+    if rows:
+        tx.executemany(INSERT_TERM, rows)
+
+
+def query_terms(text):
+    terms = []
+    for word in tokenize(text):
+        if word not in terms:
+            terms.append(word)
+    return terms[:MAX_QUERY_TERMS]
+
+
+# ==================== QUERIES ====================
+def search(ophth_id, text, limit=SEARCH_LIMIT):
+    # (rows, total matches) best first, or None on a database error. Rows:
+    # record_id, patient_id, patient name, record_date, diagnosis,
+    # prescription, treatment_details, score
+    terms = query_terms(text)
+    if not terms:
+        return [], 0
+
+    # One branch per word, so each stays a range seek on the key (an OR of
+    # them scans all the ophthalmologist's postings on SQLite). LIKE 'word%'
+    # is a seek on SQL Server and, with term COLLATE NOCASE, on SQLite.
+    branches, params = [], ()
+    for i, term in enumerate(terms):
+        match = "term LIKE ?" if len(term) >= MIN_PREFIX else "term = ?"
+        branches.append(f"SELECT {i}, term, record_id, weight FROM Record_Term "
+                        f"WHERE ophthalmologist_id = ? AND {match}")
+        params += (ophth_id, term + "%" if len(term) >= MIN_PREFIX else term)
+    postings = execute_query(" UNION ALL ".join(branches), params, fetch=True)
+    if postings is None:
+        return None
+    total_rows = execute_query("SELECT COUNT(*) FROM Patient_Record WHERE ophthalmologist_id = ?",
+                               (ophth_id,), fetch=True)
+    if total_rows is None:
+        return None
+    total = max(total_rows[0][0], 1)
+
+    # Best weight of each query word in each record
+    best = [{} for _ in terms]
+    for i, term, record_id, weight in postings:
+        if term != terms[i]:
+            weight *= PREFIX_FACTOR
+        if weight > best[i].get(record_id, 0):
+            best[i][record_id] = weight
+
+    candidates = set(best[0])
+    for found in best[1:]:
+        candidates &= found.keys()
+    scores = dict.fromkeys(candidates, 0.0)
+    for found in best:
+        idf = math.log(1 + (total - len(found) + 0.5) / (len(found) + 0.5))
+        for record_id in candidates:
+            scores[record_id] += found[record_id] * idf
+    ranked = sorted(scores, key=lambda record_id: (-scores[record_id], -record_id))[:limit]
+    if not ranked:
+        return [], 0
+
+    marks = ",".join("?" * len(ranked))
+    rows = execute_query(f"""
+        SELECT pr.record_id, pr.patient_id, RTRIM(p.name), pr.record_date, RTRIM(pr.diagnosis),
+               RTRIM(pr.prescription), pr.treatment_details
+        FROM Patient_Record pr
+        JOIN Patient p ON pr.patient_id = p.patient_id
+        WHERE pr.record_id IN ({marks})
+    """, tuple(ranked), fetch=True)
+    if rows is None:
+        return None
+    by_id = {row[0]: tuple(row) for row in rows}
+    results = [by_id[record_id] + (round(scores[record_id], 3),) for record_id in ranked if record_id in by_id]
+    return results, len(candidates)
+
+
+# ==================== REBUILD ====================
+def rebuild(conn, chunk=REBUILD_CHUNK, progress=None):
+    # Re-index every record on a plain DB-API connection; returns the
+    # number of records indexed
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM Record_Term")
+    conn.commit()
+    last_id, done = 0, 0
+    while True:
+        cursor.execute("""
+            SELECT TOP (?) record_id, ophthalmologist_id, diagnosis, prescription, treatment_details
+            FROM Patient_Record WHERE record_id > ? ORDER BY record_id
+        """, (chunk, last_id))
+        records = cursor.fetchall()
+        if not records:
+            break
+        rows = []
+        for record_id, ophth_id, diagnosis, prescription, treatment in records:
+            rows += term_rows(record_id, ophth_id, diagnosis, prescription, treatment)
+        if rows:
+            if hasattr(cursor, "fast_executemany"):
+                cursor.fast_executemany = True
+            cursor.executemany(INSERT_TERM, rows)
+        conn.commit()
+        last_id = records[-1][0]
+        done += len(records)
+        if progress:
+            progress(done)
+    cursor.close()
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search patient records, or rebuild the search index")
+    parser.add_argument("--sqlite", metavar="PATH", help="use a SQLite stand-in database")
+    parser.add_argument("--rebuild", action="store_true", help="re-index every Patient_Record")
+    parser.add_argument("--ophthalmologist", type=int, help="search this ophthalmologist's records")
+    parser.add_argument("query", nargs="*")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        import sqlite_standin
+        connect = lambda: sqlite_standin.connect(args.sqlite)
+    else:
+        from database import odbc_connect
+        connect = odbc_connect
+
+    if args.rebuild:
+        conn = connect()
+        start = time.perf_counter()
+        try:
+            done = rebuild(conn, progress=lambda n: print(f"\r{n} records", end="", flush=True))
+        finally:
+            conn.close()
+        print(f"\rIndexed {done} records in {time.perf_counter() - start:.1f}s")
+        return
+
+    if args.ophthalmologist is None or not args.query:
+        parser.error("give --ophthalmologist and a query, or --rebuild")
+    import database
+    database.configure_pool(connect=connect)
+    start = time.perf_counter()
+    result = search(args.ophthalmologist, " ".join(args.query))
+    elapsed = (time.perf_counter() - start) * 1000
+    database.close_pool()
+    if result is None:
+        raise SystemExit("Search failed")
+    rows, total = result
+    for row in rows:
+        print(f"{row[7]:>7.3f}  {row[3]}  {row[2]:<24} {row[4]} / {row[5]}")
+    print(f"{total} matching records, {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,646 @@
+import datetime
+
+import availability
+import billing
+import exports
+import invoices
+import notifications
+import passwords
+import ratings
+import reports
+import search
+import shards
+from availability import SlotTaken  # re-exported for callers
+from database import execute_query, transaction
+from pagination import PAGE_SIZE, KeysetPager
+
+# ==================== CLINIC SERVICES ====================
+# Everything the clinic does, without Qt: the screens in Clinic.py and the
+# HTTP API in api_server.py both call these functions, so the queries and
+# rules live in one place. Functions are safe to call from any thread (each
+# statement checks a connection out of the shared pool).
+#
+# Bad input raises ServiceError with a message fit to show the user; a
+# lost booking race raises availability.SlotTaken. Reads return rows, or
+# None when the database call failed. Writes that concern the other party
+# queue a notification for them (see notifications.py).
+#
+# With clinic databases configured (shards.py), a call about one
+# ophthalmologist, appointment or bill runs against that clinic's database;
+# a patient's lists, dashboard and notifications are read from every clinic
+# at once and merged. Accounts stay in the directory database.
+
+
+class ServiceError(Exception):
+    pass
+
+
+def _number(value, message, kind=int):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        raise ServiceError(message)
+
+
+def normalize_email(email):
+    # Same value as the email_normalized column: LOWER(RTRIM(email))
+    return email.strip().lower()
+
+
+def _when(value):
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d at %I:%M %p")
+    return str(value)
+
+
+# ==================== ACCOUNTS ====================
+# Passwords are checked and hashed on the passwords.py worker pool; see
+# there for the hash format and the upgrade of old integer passwords.
+BUSY = "Too many sign-ins at once. Please try again in a moment."
+
+
+def _login(table, id_column, email, password):
+    password = "" if password is None else str(password)
+    rows = execute_query(f"SELECT {id_column}, password, password_hash FROM {table} WHERE email_normalized=?",
+                         (normalize_email(email),), fetch=True, cache=False)
+    if rows is None:
+        return None
+    try:
+        if not rows:
+            passwords.verify(password, passwords.dummy_hash())
+            return None
+        user_id, legacy, stored = rows[0]
+        if stored:
+            if not passwords.verify(password, stored):
+                return None
+            upgrade = passwords.needs_rehash(stored)
+        elif passwords.legacy_matches(password, legacy):
+            upgrade = True
+        else:
+            return None
+    except passwords.Busy:
+        raise ServiceError(BUSY)
+    if upgrade:
+        # Best effort: the login stands even if the new hash is not saved
+        # (a busy pool leaves it for the next login)
+        try:
+            execute_query(f"UPDATE {table} SET password_hash = ?, password = 0 WHERE {id_column} = ?",
+                          (passwords.hash_password(password), user_id))
+        except passwords.Busy:
+            pass
+    return user_id
+
+
+def _password_hash(password):
+    try:
+        return passwords.hash_password(str(password))
+    except passwords.Busy:
+        raise ServiceError(BUSY)
+
+
+def patient_login(email, password):
+    return _login("Patient", "patient_id", email, password)
+
+
+def ophthalmologist_login(email, password):
+    return _login("Ophthalmologist", "ophthalmologist_id", email, password)
+
+
+def register_patient(name, gender, date_of_birth, email, phone, password):
+    if not name or not email or not password:
+        raise ServiceError("Please fill all required fields!")
+    phone = _number(phone, "Phone must be numeric!") if phone else 0
+    if not execute_query(
+            "INSERT INTO Patient(name, gender, date_of_birth, email, phonenumber, password, password_hash) "
+            "VALUES(?,?,?,?,?,0,?)",
+            (name, gender, date_of_birth, email, phone, _password_hash(password))):
+        raise ServiceError("Registration failed. Is this email already registered?")
+    return True
+
+
+def register_ophthalmologist(name, email, phone, clinic, address, password):
+    if not name or not email or not password:
+        raise ServiceError("Please fill all required fields!")
+    phone = _number(phone, "Phone must be numeric!") if phone else 0
+    if not execute_query(
+            "INSERT INTO Ophthalmologist(name, email, phonenumber, clinicname, clinicaddress, password, password_hash) "
+            "VALUES(?,?,?,?,?,0,?)",
+            (name, email, phone, clinic, address, _password_hash(password))):
+        raise ServiceError("Registration failed. Is this email already registered?")
+    if shards.active():
+        # Listed for booking once their clinic's database has them; booking
+        # tries again if this copy fails
+        rows = execute_query("SELECT ophthalmologist_id FROM Ophthalmologist WHERE email_normalized = ?",
+                             (normalize_email(email),), fetch=True, cache=False)
+        if rows:
+            with shards.by_ophthalmologist(rows[0][0]):
+                shards.copy_ophthalmologist(rows[0][0])
+    return True
+
+
+# ==================== LOOKUPS ====================
+def ophthalmologists():
+    # id, name, clinic, then the feedback aggregates (see ratings.py): count,
+    # sum, stars_1 .. stars_5 and the last WINDOW_DAYS' count and sum. The
+    # figures are NULL for an ophthalmologist without feedback. The window
+    # sums are a key seek on each ophthalmologist's recent day buckets.
+    # Every clinic database lists its own ophthalmologists.
+    return shards.concat(shards.fan_out(_ophthalmologists, ratings.window_start()))
+
+
+def _ophthalmologists(since):
+    return execute_query("""
+        SELECT o.ophthalmologist_id, RTRIM(o.name), RTRIM(o.clinicname),
+               r.rating_count, r.rating_sum, r.stars_1, r.stars_2, r.stars_3, r.stars_4, r.stars_5,
+               (SELECT SUM(d.rating_count) FROM Ophthalmologist_Rating_Day d
+                WHERE d.ophthalmologist_id = o.ophthalmologist_id AND d.rating_date >= ?),
+               (SELECT SUM(d.rating_sum) FROM Ophthalmologist_Rating_Day d
+                WHERE d.ophthalmologist_id = o.ophthalmologist_id AND d.rating_date >= ?)
+        FROM Ophthalmologist o
+        LEFT JOIN Ophthalmologist_Rating r ON r.ophthalmologist_id = o.ophthalmologist_id
+    """, (since, since), fetch=True)
+
+
+def patient_ophthalmologists(patient_id):
+    # Ophthalmologists the patient has seen (feedback form), at any clinic
+    return shards.concat(shards.fan_out(execute_query, """
+        SELECT DISTINCT o.ophthalmologist_id, RTRIM(o.name)
+        FROM Ophthalmologist o
+        JOIN Appointment a ON o.ophthalmologist_id = a.ophthalmologist_id
+        WHERE a.patient_id = ?
+    """, (patient_id,), True))
+
+
+# ==================== PATIENT LOOKUP ====================
+# Ophthalmologist screens pick a patient by typing the start of their name
+# rather than from a list of everyone they have seen. A lookup returns the
+# first PATIENT_MATCHES names with that prefix among the patients in scope:
+# the subquery seeks the ophthalmologist's rows, each candidate is then one
+# primary key lookup on Patient.
+PATIENT_MATCHES = 20
+
+
+def _name_prefix(text):
+    # LIKE pattern for names starting with text, wildcards taken literally
+    text = (text or "").strip()
+    for char in "\\%_[":
+        text = text.replace(char, "\\" + char)
+    return text + "%"
+
+
+def _find_patients(scope, scope_params, prefix, limit):
+    return execute_query(f"""
+        SELECT TOP (?) p.patient_id, RTRIM(p.name)
+        FROM Patient p
+        WHERE p.name LIKE ? ESCAPE '\\' AND p.patient_id IN ({scope})
+        ORDER BY p.name, p.patient_id
+    """, (limit, _name_prefix(prefix)) + tuple(scope_params), fetch=True)
+
+
+def ophthalmologist_patients(ophth_id, prefix="", limit=PATIENT_MATCHES):
+    # Patients with an appointment (record form)
+    with shards.by_ophthalmologist(ophth_id):
+        return _find_patients("SELECT a.patient_id FROM Appointment a WHERE a.ophthalmologist_id = ?",
+                              (ophth_id,), prefix, limit)
+
+
+def record_patients(ophth_id, prefix="", limit=PATIENT_MATCHES):
+    # Patients with a record written by this ophthalmologist (history screen)
+    with shards.by_ophthalmologist(ophth_id):
+        return _find_patients("SELECT pr.patient_id FROM Patient_Record pr WHERE pr.ophthalmologist_id = ?",
+                              (ophth_id,), prefix, limit)
+
+
+def unbilled_patients(ophth_id, prefix="", limit=PATIENT_MATCHES):
+    # Patients with a concluded appointment that has no bill yet
+    with shards.by_ophthalmologist(ophth_id):
+        return _find_patients(billing.UNBILLED_PATIENTS, (ophth_id, billing.now_param()), prefix, limit)
+
+
+def latest_unbilled_appointment(patient_id, ophth_id):
+    # appointment_id, None if there is nothing left to bill; raises
+    # ServiceError on a database error
+    with shards.by_ophthalmologist(ophth_id):
+        rows = execute_query(billing.LATEST_UNBILLED_QUERY, (patient_id, ophth_id, billing.now_param()),
+                             fetch=True, cache=False)
+    if rows is None:
+        raise ServiceError("Could not load the patient's appointments.")
+    return rows[0][0] if rows else None
+
+
+def patient_appointments(patient_id, ophth_id):
+    with shards.by_ophthalmologist(ophth_id):
+        return execute_query("""
+            SELECT appointment_id, appointment_date
+            FROM Appointment
+            WHERE patient_id = ? AND ophthalmologist_id = ?
+            ORDER BY appointment_date DESC
+        """, (patient_id, ophth_id), fetch=True)
+
+
+# ==================== APPOINTMENTS ====================
+APPROVED = 1
+REJECTED = 2
+
+
+def free_slots(ophth_id, start=None, days=availability.AVAILABILITY_DAYS):
+    with shards.by_ophthalmologist(ophth_id):
+        return availability.load_availability(ophth_id, start or datetime.date.today(), days)
+
+
+def book_appointment(patient_id, ophth_id, day, slot):
+    if not 0 <= slot < len(availability.SLOT_HOURS):
+        raise ServiceError("Please select a free time slot!")
+    if day < datetime.date.today():
+        raise ServiceError("Appointments can't be booked in the past!")
+    with shards.by_ophthalmologist(ophth_id):
+        # The clinic's queries join these rows for names
+        if not shards.copy_patient(patient_id) or not shards.copy_ophthalmologist(ophth_id):
+            raise ServiceError("Booking failed. Please try again.")
+        if not availability.book_slot(patient_id, ophth_id, day, slot):
+            raise ServiceError("Booking failed. Please try again.")
+    return True
+
+
+def cancel_appointment(appointment_id):
+    with shards.by_id(appointment_id):
+        row = availability.cancel_appointment(appointment_id)
+        if row is False:
+            raise ServiceError("Could not cancel the appointment.")
+        if row is not None:
+            # The appointment row is gone, so the message carries no appointment_id
+            notifications.notify(None, row[0], notifications.OPHTHALMOLOGIST,
+                                 f"The appointment on {_when(row[2])} was cancelled by the patient.")
+    return True
+
+
+def set_appointment_status(appointment_ids, status):
+    # Returns the ids that were still pending and changed
+    if status not in (APPROVED, REJECTED):
+        raise ServiceError("Status must be approved or rejected!")
+    verdict = "approved" if status == APPROVED else "rejected"
+    changed = []
+    # One transaction per clinic database holding some of the ids
+    for ids in shards.group_ids(list(appointment_ids)):
+        with shards.by_id(ids[0]):
+            rows = availability.set_status(ids, status)
+            if rows is None:
+                raise ServiceError("Could not update the appointments.")
+            for appointment_id, patient_id, when in rows:
+                notifications.notify(appointment_id, patient_id, notifications.PATIENT,
+                                     f"Your appointment on {_when(when)} was {verdict}.")
+        changed += rows
+    return [row[0] for row in changed]
+
+
+# ==================== RECORDS ====================
+def latest_record(patient_id):
+    # The newest record from any clinic
+    results = shards.fan_out(execute_query, """
+        SELECT TOP 1 pr.record_date, RTRIM(o.name), RTRIM(pr.diagnosis),
+               pr.treatment_details, RTRIM(pr.prescription)
+        FROM Patient_Record pr
+        JOIN Ophthalmologist o ON pr.ophthalmologist_id = o.ophthalmologist_id
+        WHERE pr.patient_id = ?
+        ORDER BY pr.record_date DESC
+    """, (patient_id,), True)
+    return shards.merge_rows(results, key=lambda row: row[0], reverse=True, limit=1)
+
+
+def save_record(patient_id, ophth_id, appointment_id, diagnosis, prescription, treatment):
+    if not patient_id or not appointment_id:
+        raise ServiceError("Please select patient and appointment!")
+    # The record and its search terms go in together
+    try:
+        with shards.by_ophthalmologist(ophth_id), transaction() as tx:
+            tx.execute("""
+                INSERT INTO Patient_Record(patient_id, ophthalmologist_id, appointment_id,
+                                           record_date, diagnosis, prescription, treatment_details)
+                OUTPUT INSERTED.record_id
+                VALUES(?,?,?,GETDATE(),?,?,?)
+            """, (patient_id, ophth_id, appointment_id, diagnosis, prescription, treatment))
+            record_id = tx.fetchone()[0]
+            search.index_record(tx, record_id, ophth_id, diagnosis, prescription, treatment)
+    except Exception as e:
+        print(f"Query Error: {e}")
+        raise ServiceError("Could not save the record.")
+    with shards.by_ophthalmologist(ophth_id):
+        notifications.notify(appointment_id, patient_id, notifications.PATIENT,
+                             "A new entry was added to your medical record.")
+    return True
+
+
+def search_records(ophth_id, text, limit=search.SEARCH_LIMIT):
+    # (rows, total matches), best match first; see search.search
+    if not search.query_terms(text):
+        raise ServiceError("Please enter words to search for!")
+    with shards.by_ophthalmologist(ophth_id):
+        result = search.search(ophth_id, text, limit)
+    if result is None:
+        raise ServiceError("Could not search the records.")
+    return result
+
+
+# ==================== BILLING ====================
+def create_bill(patient_id, appointment_id, amount):
+    amount = _number(amount, "Invalid amount!", float)
+    if not appointment_id:
+        raise ServiceError("No appointment found for this patient!")
+    with shards.by_id(appointment_id):
+        if not execute_query("""
+            INSERT INTO Bill(patient_id, appointment_id, amount, payment_status, payment_date)
+            VALUES(?,?,?,0,GETDATE())
+        """, (patient_id, appointment_id, amount)):
+            raise ServiceError("Could not create the bill.")
+        notifications.notify(appointment_id, patient_id, notifications.PATIENT,
+                             f"A bill of ${amount:.2f} was issued for your appointment.")
+    return True
+
+
+def bill_concluded(ophth_id, amount):
+    amount = _number(amount, "Enter the amount to bill per appointment!", float)
+    with shards.by_ophthalmologist(ophth_id):
+        counts = billing.bill_concluded(ophth_id, amount)
+        if counts is None:
+            raise ServiceError("Batch billing failed; no bills were created.")
+        for appointment_id, patient_id in counts.pop("billed"):
+            notifications.notify(appointment_id, patient_id, notifications.PATIENT,
+                                 f"A bill of ${amount:.2f} was issued for your appointment.")
+    return counts
+
+
+def pay_bill(bill_id):
+    with shards.by_id(bill_id):
+        if not execute_query("UPDATE Bill SET payment_status = 1 WHERE bill_id = ?", (bill_id,)):
+            raise ServiceError("Payment failed.")
+    return True
+
+
+# ==================== INVOICES ====================
+def bill_document(bill_id, out_dir):
+    # Writes the bill's invoice (or receipt, once paid) into out_dir and
+    # returns the file's path; see invoices.py
+    with shards.by_id(bill_id):
+        docs = invoices.bill_documents([bill_id])
+    if not docs:
+        raise ServiceError("Could not load the bill.")
+    try:
+        return invoices.write_document(docs[0], out_dir)
+    except OSError as e:
+        raise ServiceError(f"Could not write the document: {e}")
+
+
+def month_end_documents(ophth_id, year, month, out_dir, progress=None):
+    # Invoices and receipts for every bill of ophth_id dated in that month,
+    # rendered on the process pool; returns how many were written
+    with shards.by_ophthalmologist(ophth_id):
+        docs = invoices.month_documents("ophthalmologist", ophth_id, year, month)
+    if docs is None:
+        raise ServiceError("Could not load the bills.")
+    try:
+        return len(invoices.render_batch(docs, out_dir, progress=progress))
+    except OSError as e:
+        raise ServiceError(f"Could not write the documents: {e}")
+
+
+# ==================== FEEDBACK ====================
+def submit_feedback(patient_id, ophth_id, rating, comments):
+    rating = _number(rating, "Rating must be 1 to 5!")
+    if not 1 <= rating <= 5:
+        raise ServiceError("Rating must be 1 to 5!")
+    # The feedback and the ophthalmologist's rating figures go in together
+    today = datetime.date.today().isoformat()
+    try:
+        with shards.by_ophthalmologist(ophth_id), transaction() as tx:
+            tx.execute("""
+                INSERT INTO Feedback(patient_id, ophthalmologist_id, rating, comments, feedback_date)
+                VALUES(?,?,?,?,?)
+            """, (patient_id, ophth_id, rating, comments, today))
+            ratings.record_rating(tx, ophth_id, rating, today)
+    except Exception as e:
+        print(f"Query Error: {e}")
+        raise ServiceError("Could not submit the feedback.")
+    return True
+
+
+# ==================== REPORTS ====================
+def clinic_aging_report(ophth_id):
+    # Accounts receivable aging of the clinic ophth_id works at, see
+    # reports.aging_report
+    with shards.by_ophthalmologist(ophth_id):
+        return reports.aging_report(ophth_id=ophth_id)
+
+
+def aging_report(clinic=None):
+    # Every clinic, or one by name
+    if clinic:
+        with shards.by_clinic(clinic):
+            return reports.aging_report(clinic)
+    today = datetime.date.today()
+    rows = shards.concat(shards.fan_out(reports.aging_rows, today))
+    if rows is None:
+        return None
+    return reports.summarize(today, sorted(rows, key=lambda row: (row[0], row[1])))
+
+
+# ==================== EXPORTS ====================
+def export_data(path, dataset, scope, scope_id, fmt, progress=None, should_stop=None, ophth_id=None):
+    # Streams the export to path (see exports.py) and returns the number of
+    # rows; exports.ExportCancelled propagates once should_stop() is true.
+    # The rows come from the clinic of ophth_id (default: scope_id, for the
+    # ophthalmologist and clinic scopes).
+    try:
+        with shards.by_ophthalmologist(scope_id if ophth_id is None else ophth_id):
+            return exports.export_file(path, dataset, scope, scope_id, fmt, progress, should_stop)
+    except exports.ExportError as e:
+        raise ServiceError(str(e))
+    except OSError as e:
+        raise ServiceError(f"Could not write the file: {e}")
+
+
+# ==================== NOTIFICATIONS ====================
+# An ophthalmologist's messages are in their clinic's database, a
+# patient's in every clinic they have seen
+def _for_recipient(fn, recipient_id, recipient_type, *args):
+    if recipient_type == notifications.OPHTHALMOLOGIST:
+        with shards.by_ophthalmologist(recipient_id):
+            return [fn(recipient_id, recipient_type, *args)]
+    return shards.fan_out(fn, recipient_id, recipient_type, *args)
+
+
+def unread_notifications(recipient_id, recipient_type):
+    counts = _for_recipient(notifications.unread_count, recipient_id, recipient_type)
+    return None if None in counts else sum(counts)
+
+
+def recent_notifications(recipient_id, recipient_type, limit=20):
+    return shards.merge_rows(_for_recipient(notifications.recent, recipient_id, recipient_type, limit),
+                             key=lambda row: row[1], reverse=True, limit=limit)
+
+
+def mark_notifications_read(recipient_id, recipient_type):
+    if not all(_for_recipient(notifications.mark_read, recipient_id, recipient_type)):
+        raise ServiceError("Could not update the notifications.")
+    return True
+
+
+# ==================== DASHBOARDS ====================
+# The home screens' figures come from one statement each: a single row of
+# counts and sums (scalar subqueries, each an index seek on the owner's
+# rows) LEFT JOINed to the short agenda list, so every agenda row repeats
+# the figures and an empty agenda still returns one row.
+AGENDA_DAYS = 7   # a patient's agenda covers the coming week
+
+OPHTHALMOLOGIST_DASHBOARD_QUERY = """
+    SELECT c.pending, c.balance, c.rating, c.ratings, c.unread,
+           ag.appointment_time, ag.patient_name, ag.appointment_status
+    FROM (SELECT
+            (SELECT COUNT(*) FROM Appointment
+             WHERE ophthalmologist_id = ? AND appointment_status = 0) AS pending,
+            (SELECT COALESCE(SUM(b.amount), 0)
+             FROM Appointment a JOIN Bill b ON b.appointment_id = a.appointment_id
+             WHERE a.ophthalmologist_id = ? AND b.payment_status = 0) AS balance,
+            (SELECT CAST(rating_sum AS FLOAT) / rating_count FROM Ophthalmologist_Rating
+             WHERE ophthalmologist_id = ?) AS rating,
+            (SELECT rating_count FROM Ophthalmologist_Rating WHERE ophthalmologist_id = ?) AS ratings,
+            (SELECT COUNT(*) FROM Notification
+             WHERE recipient_type = ? AND recipient_id = ? AND message_read = 0) AS unread
+         ) c
+    LEFT JOIN (
+        SELECT a.appointment_time, RTRIM(p.name) AS patient_name, a.appointment_status
+        FROM Appointment a JOIN Patient p ON a.patient_id = p.patient_id
+        WHERE a.ophthalmologist_id = ? AND a.appointment_date = ? AND a.appointment_status <> 2
+    ) ag ON 1 = 1
+    ORDER BY ag.appointment_time
+"""
+
+PATIENT_DASHBOARD_QUERY = """
+    SELECT c.pending, c.balance, c.unread,
+           ag.appointment_time, ag.ophthalmologist_name, ag.appointment_status
+    FROM (SELECT
+            (SELECT COUNT(*) FROM Appointment
+             WHERE patient_id = ? AND appointment_status = 0) AS pending,
+            (SELECT COALESCE(SUM(amount), 0) FROM Bill
+             WHERE patient_id = ? AND payment_status = 0) AS balance,
+            (SELECT COUNT(*) FROM Notification
+             WHERE recipient_type = ? AND recipient_id = ? AND message_read = 0) AS unread
+         ) c
+    LEFT JOIN (
+        SELECT a.appointment_time, RTRIM(o.name) AS ophthalmologist_name, a.appointment_status
+        FROM Appointment a JOIN Ophthalmologist o ON a.ophthalmologist_id = o.ophthalmologist_id
+        WHERE a.patient_id = ? AND a.appointment_date BETWEEN ? AND ? AND a.appointment_status <> 2
+    ) ag ON 1 = 1
+    ORDER BY ag.appointment_time
+"""
+
+
+def ophthalmologist_dashboard(ophth_id):
+    # {"pending", "balance", "rating" (None before any feedback), "ratings",
+    # "unread", "agenda": [(appointment_time, patient, status)]} for today,
+    # or None on a database error
+    today = datetime.date.today().isoformat()
+    with shards.by_ophthalmologist(ophth_id):
+        rows = execute_query(OPHTHALMOLOGIST_DASHBOARD_QUERY,
+                             (ophth_id, ophth_id, ophth_id, ophth_id, notifications.OPHTHALMOLOGIST, ophth_id,
+                              ophth_id, today), fetch=True)
+    if not rows:
+        return None
+    pending, balance, rating, rating_count, unread = rows[0][:5]
+    return {"pending": pending, "balance": float(balance), "rating": rating, "ratings": rating_count or 0,
+            "unread": unread, "agenda": [tuple(row[5:]) for row in rows if row[5] is not None]}
+
+
+def patient_dashboard(patient_id):
+    # {"pending", "balance", "unread", "agenda": [(appointment_time,
+    # ophthalmologist, status)]} for the next AGENDA_DAYS days, or None on a
+    # database error. Every clinic adds its figures and agenda.
+    today = datetime.date.today()
+    last_day = today + datetime.timedelta(days=AGENDA_DAYS - 1)
+    results = shards.fan_out(execute_query, PATIENT_DASHBOARD_QUERY,
+                             (patient_id, patient_id, notifications.PATIENT, patient_id,
+                              patient_id, today.isoformat(), last_day.isoformat()), True)
+    if not all(results):
+        return None
+    agenda = [tuple(row[3:]) for rows in results for row in rows if row[3] is not None]
+    return {"pending": sum(rows[0][0] for rows in results),
+            "balance": sum(float(rows[0][1]) for rows in results),
+            "unread": sum(rows[0][2] for rows in results),
+            "agenda": sorted(agenda, key=lambda row: row[0])}
+
+
+# ==================== LIST PAGES ====================
+# Keyset-paged lists (see pagination.py). Each name maps to the arguments of
+# its KeysetPager; the filter parameters are the ids named in "params". The
+# patient's lists have no shard_param and are read from every clinic.
+PAGES = {
+    "patient_appointments": {
+        "params": ("patient_id",),
+        "columns": "a.appointment_id, a.appointment_date, a.appointment_time, RTRIM(o.name), a.appointment_status",
+        "tables": "Appointment a JOIN Ophthalmologist o ON a.ophthalmologist_id = o.ophthalmologist_id",
+        "where": "a.patient_id = ?", "date_column": "a.appointment_date", "id_column": "a.appointment_id",
+        "version_column": "a.row_version", "tombstones": "Appointment"},
+    "ophthalmologist_appointments": {
+        "params": ("ophthalmologist_id",),
+        "columns": "a.appointment_id, RTRIM(p.name), a.appointment_date, a.appointment_time, a.appointment_status",
+        "tables": "Appointment a JOIN Patient p ON a.patient_id = p.patient_id",
+        "where": "a.ophthalmologist_id = ?", "date_column": "a.appointment_date", "id_column": "a.appointment_id",
+        "descending": False, "version_column": "a.row_version", "tombstones": "Appointment", "shard_param": 0},
+    "patient_records": {
+        "params": ("patient_id",),
+        "columns": "pr.record_date, RTRIM(o.name), RTRIM(pr.diagnosis), pr.treatment_details, RTRIM(pr.prescription)",
+        "tables": "Patient_Record pr JOIN Ophthalmologist o ON pr.ophthalmologist_id = o.ophthalmologist_id",
+        "where": "pr.patient_id = ?", "date_column": "pr.record_date", "id_column": "pr.record_id",
+        "version_column": "pr.row_version"},
+    "patient_records_by_ophthalmologist": {
+        "params": ("patient_id", "ophthalmologist_id"),
+        "columns": "record_date, RTRIM(diagnosis), treatment_details, RTRIM(prescription)",
+        "tables": "Patient_Record",
+        "where": "patient_id = ? AND ophthalmologist_id = ?", "date_column": "record_date", "id_column": "record_id",
+        "version_column": "row_version", "shard_param": 1},
+    "patient_bills": {
+        "params": ("patient_id",),
+        "columns": "b.bill_id, b.payment_date, RTRIM(o.name), b.amount, b.payment_status",
+        "tables": "Bill b JOIN Appointment a ON b.appointment_id = a.appointment_id "
+                  "JOIN Ophthalmologist o ON a.ophthalmologist_id = o.ophthalmologist_id",
+        "where": "b.patient_id = ?", "date_column": "b.payment_date", "id_column": "b.bill_id",
+        "version_column": "b.row_version"},
+    "ophthalmologist_bills": {
+        "params": ("ophthalmologist_id",),
+        "columns": "RTRIM(p.name), b.payment_date, b.amount, b.payment_status",
+        "tables": "Bill b JOIN Patient p ON b.patient_id = p.patient_id "
+                  "JOIN Appointment a ON b.appointment_id = a.appointment_id",
+        "where": "a.ophthalmologist_id = ?", "date_column": "b.payment_date", "id_column": "b.bill_id",
+        "version_column": "b.row_version", "shard_param": 0},
+    "ophthalmologist_feedback": {
+        "params": ("ophthalmologist_id",),
+        "columns": "RTRIM(p.name), f.rating, f.comments, f.feedback_date",
+        "tables": "Feedback f JOIN Patient p ON f.patient_id = p.patient_id",
+        "where": "f.ophthalmologist_id = ?", "date_column": "f.feedback_date", "id_column": "f.feedback_id",
+        "version_column": "f.row_version", "shard_param": 0},
+}
+
+
+def pager(name, page_size=PAGE_SIZE):
+    spec = {k: v for k, v in PAGES[name].items() if k != "params"}
+    return KeysetPager(page_size=page_size, **spec)
+
+
+def fetch_page(name, params, after=None, page_size=PAGE_SIZE):
+    # (rows, next_key): rows end with the two key columns; next_key is the
+    # after= value for the following page, or None on the last page
+    page = pager(name, page_size)
+    query, query_params = page.query(params, after)
+    if shards.fans_out(page):
+        # Each clinic's first page_size + 1 rows, merged in page order
+        rows = shards.merge_rows(shards.fan_out(execute_query, query, query_params, True),
+                                 key=shards.page_key, reverse=page.descending, limit=page_size + 1)
+    else:
+        with shards.page_route(page, params):
+            rows = execute_query(query, query_params, fetch=True)
+    if rows is None:
+        return None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, page.key(rows[-1])
+    return rows, None
+
@@ -0,0 +1,490 @@
+import argparse
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from database import (POOL_SIZE, ConnectionPool, current_route, execute_query, is_conflict, open_cursor,
+                      routed, transaction)
+
+# ==================== CLINIC SHARDS ====================
+# Each clinic's appointments, records, bills, feedback and notifications can
+# live in a database of their own. The database.py one then acts as the
+# directory: it holds every Patient and Ophthalmologist row (logins, the
+# doctor list) and says which clinic an ophthalmologist works at. A clinic
+# database holds its own ophthalmologists and a copy of each patient it has
+# seen, without passwords, so its queries join exactly as before.
+#
+# Services pick the database per call:
+#
+#     with shards.by_ophthalmologist(ophth_id):   # one clinic
+#         ...execute_query / transaction / open_cursor as usual...
+#
+#     shards.fan_out(fn, *args)   # fn on every clinic at once, one result each
+#
+# by_id routes a row by its id: every clinic database numbers its ID_TABLES
+# rows from its own id_base (ID_SPAN apart), so an appointment or bill id
+# names its clinic. With SHARDS empty nothing is routed and everything
+# stays in the one database.
+#
+#   python shards.py split clinic.db --out shards/     # SQLite: one file per clinic
+#   python shards.py reseed                            # SQL Server: set each id_base
+
+# One entry per clinic database, e.g.
+# {"name": "city", "clinics": ["City Eye Clinic"], "id_base": 100000000,
+#  "connection_string": "DRIVER={ODBC Driver 17 for SQL Server};SERVER=...;DATABASE=Clinic_City;..."}
+# The first one also takes clinics not listed anywhere.
+SHARDS = []
+
+ID_SPAN = 100000000   # ids per clinic database; INT columns leave room for 21
+ID_TABLES = (("Appointment", "appointment_id"), ("Patient_Record", "record_id"),
+             ("Bill", "bill_id"), ("Feedback", "feedback_id"))
+
+# Copied into a clinic database; the password stays in the directory
+PATIENT_COPY = ("patient_id", "name", "gender", "date_of_birth", "email", "phonenumber")
+OPHTHALMOLOGIST_COPY = ("ophthalmologist_id", "name", "email", "phonenumber", "clinicname", "clinicaddress")
+
+FETCH_BATCH = 100   # rows read from each clinic at a time by MergedCursor
+
+
+class ShardError(Exception):
+    pass
+
+
+def clinic_key(clinic):
+    return (clinic or "").strip().lower()
+
+
+def _odbc(connection_string):
+    def connect():
+        import pyodbc
+        return pyodbc.connect(connection_string)
+    return connect
+
+
+# ==================== SHARD MAP ====================
+class Shard:
+    def __init__(self, name, clinics, connect, id_base, pool_size=POOL_SIZE):
+        self.name = name
+        self.clinics = list(clinics)
+        self.id_base = id_base
+        self.pool = ConnectionPool(connect=connect, size=pool_size)
+        self.route = (name, self.pool)
+
+
+class ShardMap:
+    def __init__(self, shards):
+        if not shards:
+            raise ShardError("No clinic databases configured")
+        self.shards = list(shards)
+        self.default = self.shards[0]
+        self.by_clinic = {clinic_key(clinic): shard for shard in self.shards for clinic in shard.clinics}
+        self.by_base = sorted(self.shards, key=lambda shard: shard.id_base)
+        self._ophthalmologists = {}   # ophthalmologist_id -> Shard; a doctor never changes clinic
+        self._copied = set()          # (shard name, table, id) known to be present
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(len(self.shards) * POOL_SIZE, thread_name_prefix="shard")
+
+    def for_clinic(self, clinic):
+        return self.by_clinic.get(clinic_key(clinic), self.default)
+
+    def for_ophthalmologist(self, ophth_id):
+        shard = self._ophthalmologists.get(ophth_id)
+        if shard is not None:
+            return shard
+        with routed(None):
+            rows = execute_query("SELECT clinicname FROM Ophthalmologist WHERE ophthalmologist_id = ?",
+                                 (ophth_id,), fetch=True, cache=False)
+        if rows is None:
+            raise ShardError("Could not look up the ophthalmologist's clinic")
+        if not rows:
+            # Nothing of theirs anywhere; any database answers "none"
+            return self.default
+        shard = self.for_clinic(rows[0][0])
+        with self._lock:
+            self._ophthalmologists[ophth_id] = shard
+        return shard
+
+    def for_id(self, row_id):
+        found = self.by_base[0]
+        for shard in self.by_base:
+            if shard.id_base > row_id:
+                break
+            found = shard
+        return found
+
+    def fan_out(self, fn, *args):
+        futures = [self.executor.submit(self._call, shard, fn, args) for shard in self.shards]
+        return [future.result() for future in futures]
+
+    @staticmethod
+    def _call(shard, fn, args):
+        with routed(shard.route):
+            return fn(*args)
+
+    def close(self):
+        self.executor.shutdown()
+        for shard in self.shards:
+            shard.pool.close()
+
+
+_map = None
+_map_lock = threading.Lock()
+
+
+def get_map():
+    # The configured ShardMap, or None when everything is in one database
+    global _map
+    if _map is None and SHARDS:
+        with _map_lock:
+            if _map is None:
+                _map = ShardMap([Shard(spec["name"], spec.get("clinics", ()),
+                                       _odbc(spec["connection_string"]), spec["id_base"]) for spec in SHARDS])
+    return _map
+
+
+def configure(shards):
+    # Replace the clinic databases, e.g. configure([Shard("north", ["North Clinic"],
+    # lambda: sqlite_standin.connect("north.db"), ID_SPAN), ...]); an empty list
+    # turns routing off
+    global _map
+    with _map_lock:
+        old, _map = _map, ShardMap(shards) if shards else None
+    if old:
+        old.close()
+    return _map
+
+
+def close():
+    global _map
+    with _map_lock:
+        old, _map = _map, None
+    if old:
+        old.close()
+
+
+def active():
+    return get_map() is not None
+
+
+# ==================== ROUTING ====================
+def _route(pick):
+    shard_map = get_map()
+    if shard_map is None:
+        return nullcontext()
+    return routed(pick(shard_map).route)
+
+
+def by_ophthalmologist(ophth_id):
+    return _route(lambda shard_map: shard_map.for_ophthalmologist(ophth_id))
+
+
+def by_clinic(clinic):
+    return _route(lambda shard_map: shard_map.for_clinic(clinic))
+
+
+def by_id(row_id):
+    # An Appointment, Patient_Record, Bill or Feedback id
+    return _route(lambda shard_map: shard_map.for_id(row_id))
+
+
+def directory():
+    # Patient and Ophthalmologist master rows
+    return routed(None)
+
+
+def fan_out(fn, *args):
+    # fn(*args) on every clinic database in parallel, one result per
+    # database in SHARDS order; just [fn(*args)] when nothing is sharded
+    shard_map = get_map()
+    if shard_map is None:
+        return [fn(*args)]
+    return shard_map.fan_out(fn, *args)
+
+
+def merge_rows(results, key, reverse=False, limit=None):
+    # One list from each database's rows, each already sorted by key; None
+    # if any database failed
+    if any(rows is None for rows in results):
+        return None
+    if len(results) == 1:
+        rows = list(results[0])
+    else:
+        rows = list(heapq.merge(*results, key=key, reverse=reverse))
+    return rows if limit is None else rows[:limit]
+
+
+def concat(results):
+    # Every database's rows in one list; None if any database failed
+    if any(rows is None for rows in results):
+        return None
+    return [row for rows in results for row in rows]
+
+
+def group_ids(row_ids):
+    # row_ids split into one list per database that holds them
+    shard_map = get_map()
+    if shard_map is None:
+        return [list(row_ids)] if row_ids else []
+    groups = {}
+    for row_id in row_ids:
+        groups.setdefault(shard_map.for_id(row_id).name, []).append(row_id)
+    return list(groups.values())
+
+
+def page_key(row):
+    # Keyset pages end with their (date, id) sort key; see pagination.py
+    return row[-2], row[-1]
+
+
+# ==================== REFERENCE COPIES ====================
+def _copy(table, id_column, columns, row_id):
+    # Puts the directory's row into the clinic database routed to, once;
+    # False if the row could not be read or written
+    route = current_route()
+    shard_map = get_map()
+    if route is None or shard_map is None:
+        return True
+    marker = (route[0], table, row_id)
+    if marker in shard_map._copied:
+        return True
+    present = execute_query(f"SELECT 1 FROM {table} WHERE {id_column} = ?", (row_id,), fetch=True, cache=False)
+    if present is None:
+        return False
+    if not present:
+        with routed(None):
+            rows = execute_query(f"SELECT {', '.join(columns)} FROM {table} WHERE {id_column} = ?",
+                                 (row_id,), fetch=True, cache=False)
+        if not rows:
+            return False
+        try:
+            with transaction() as tx:
+                # The id is the directory's; the password stays there
+                tx.execute(f"""
+                    SET IDENTITY_INSERT {table} ON;
+                    INSERT INTO {table}({', '.join(columns)}, password) VALUES({','.join('?' * len(columns))}, 0);
+                    SET IDENTITY_INSERT {table} OFF;
+                """, tuple(rows[0]))
+        except Exception as e:
+            if not is_conflict(e):
+                print(f"Query Error: {e}")
+                return False
+    with shard_map._lock:
+        shard_map._copied.add(marker)
+    return True
+
+
+def copy_patient(patient_id):
+    return _copy("Patient", "patient_id", PATIENT_COPY, patient_id)
+
+
+def copy_ophthalmologist(ophth_id):
+    return _copy("Ophthalmologist", "ophthalmologist_id", OPHTHALMOLOGIST_COPY, ophth_id)
+
+
+# ==================== MERGED CURSOR ====================
+# A keyset page read from every clinic at once: each database runs the
+# page query, and their rows (each in page order) are merged as they are
+# fetched, so the page comes out in order and at most a batch per clinic is
+# held. Same fetchmany/close/closed as database.StreamingCursor.
+class MergedCursor:
+    def __init__(self, cursors, descending=True, batch_size=FETCH_BATCH):
+        self._cursors = cursors
+        self._batch_size = batch_size
+        self._rows = heapq.merge(*(self._read(cursor) for cursor in cursors), key=page_key, reverse=descending)
+        self.closed = False
+
+    def _read(self, cursor):
+        while True:
+            rows = cursor.fetchmany(self._batch_size)
+            yield from rows
+            if len(rows) < self._batch_size:
+                return
+
+    def fetchmany(self, size):
+        if self.closed:
+            return []
+        rows = list(itertools.islice(self._rows, size))
+        if len(rows) < size:
+            self.close()
+        return rows
+
+    def close(self, discard=False):
+        self.closed = True
+        for cursor in self._cursors:
+            cursor.close()
+
+
+def open_merged(query, params=None, descending=True, cache=True):
+    cursors = fan_out(open_cursor, query, params, cache)
+    if any(cursor is None for cursor in cursors):
+        for cursor in cursors:
+            if cursor is not None:
+                cursor.close()
+        return None
+    return MergedCursor(cursors, descending)
+
+
+def fans_out(pager):
+    # Whether a KeysetPager list reads every clinic rather than one
+    return active() and pager.shard_param is None
+
+
+def page_route(pager, params):
+    # Where one clinic's list (pager.shard_param set) is read
+    if pager.shard_param is None:
+        return nullcontext()
+    return by_ophthalmologist(params[pager.shard_param])
+
+
+# ==================== SQLITE SPLIT ====================
+# Turns one SQLite stand-in database (datagen.py's, say) into a directory
+# file and one file per clinic, renumbering each clinic's rows into its id
+# range. The derived tables (schedule, search terms, ratings) are rebuilt.
+SPLIT_TABLES = (
+    ("Appointment", "appointment_id, patient_id, ophthalmologist_id, appointment_date, appointment_time, "
+                    "appointment_status",
+     "appointment_id + :base, patient_id, ophthalmologist_id, appointment_date, appointment_time, "
+     "appointment_status", "ophthalmologist_id IN ({ophthalmologists})"),
+    ("Patient_Record", "record_id, patient_id, ophthalmologist_id, appointment_id, record_date, diagnosis, "
+                       "prescription, treatment_details",
+     "record_id + :base, patient_id, ophthalmologist_id, appointment_id + :base, record_date, diagnosis, "
+     "prescription, treatment_details", "ophthalmologist_id IN ({ophthalmologists})"),
+    ("Bill", "bill_id, patient_id, appointment_id, amount, payment_status, payment_date",
+     "bill_id + :base, patient_id, appointment_id + :base, amount, payment_status, payment_date",
+     "appointment_id IN (SELECT appointment_id FROM src.Appointment WHERE ophthalmologist_id IN ({ophthalmologists}))"),
+    ("Feedback", "feedback_id, patient_id, ophthalmologist_id, rating, comments, feedback_date",
+     "feedback_id + :base, patient_id, ophthalmologist_id, rating, comments, feedback_date",
+     "ophthalmologist_id IN ({ophthalmologists})"),
+    ("Notification", "appointment_id, recipient_id, recipient_type, sent_date, message, message_read",
+     "appointment_id + :base, recipient_id, recipient_type, sent_date, message, message_read",
+     "appointment_id IN (SELECT appointment_id FROM src.Appointment WHERE ophthalmologist_id IN ({ophthalmologists})) "
+     "OR (appointment_id IS NULL AND recipient_type = 'Ophthalmologist' "
+     "AND recipient_id IN ({ophthalmologists}))"),
+)
+
+
+def split_sqlite(source, out_dir, groups=None, progress=None):
+    # groups: [[clinic, ...], ...], one clinic database each (default: one
+    # per clinic). Returns the directory path and [(name, clinics, path,
+    # id_base)] for configure().
+    import datagen
+    import ratings
+    import search
+    import sqlite_standin
+
+    os.makedirs(out_dir, exist_ok=True)
+    src = sqlite3.connect(source)
+    clinics = [row[0] for row in src.execute(
+        "SELECT DISTINCT RTRIM(clinicname) FROM Ophthalmologist ORDER BY 1")]
+    for table, id_column in ID_TABLES:
+        top = src.execute(f"SELECT COALESCE(MAX({id_column}), 0) FROM {table}").fetchone()[0]
+        if top >= ID_SPAN:
+            raise ShardError(f"{table} ids reach {top}, past ID_SPAN")
+    src.close()
+    groups = groups or [[clinic] for clinic in clinics]
+    listed = {clinic_key(clinic) for group in groups for clinic in group}
+
+    directory_path = os.path.join(out_dir, "directory.db")
+    sqlite_standin.create_database(directory_path, migrate=True)
+    conn = sqlite3.connect(directory_path)
+    conn.execute("ATTACH DATABASE ? AS src", (source,))
+    conn.execute("INSERT INTO Patient(patient_id, name, gender, date_of_birth, email, phonenumber, password, "
+                 "password_hash) SELECT patient_id, name, gender, date_of_birth, email, phonenumber, password, "
+                 "password_hash FROM src.Patient")
+    conn.execute("INSERT INTO Ophthalmologist(ophthalmologist_id, name, email, phonenumber, clinicname, "
+                 "clinicaddress, password, password_hash) SELECT ophthalmologist_id, name, email, phonenumber, "
+                 "clinicname, clinicaddress, password, password_hash FROM src.Ophthalmologist")
+    conn.commit()
+    conn.close()
+
+    shards = []
+    for n, group in enumerate(groups, 1):
+        name = f"shard{n}"
+        path = os.path.join(out_dir, f"{name}.db")
+        id_base = n * ID_SPAN
+        sqlite_standin.create_database(path, migrate=True, id_base=id_base)
+        conn = sqlite3.connect(path)
+        conn.execute("ATTACH DATABASE ? AS src", (source,))
+        keys = [clinic_key(clinic) for clinic in group]
+        if n == 1:
+            # The first database also takes clinics nobody listed
+            keys += [clinic_key(clinic) for clinic in clinics if clinic_key(clinic) not in listed]
+        conn.execute("CREATE TEMP TABLE split_ophthalmologist(ophthalmologist_id INTEGER PRIMARY KEY)")
+        conn.execute(f"""
+            INSERT INTO split_ophthalmologist SELECT ophthalmologist_id FROM src.Ophthalmologist
+            WHERE lower(rtrim(clinicname)) IN ({','.join('?' * len(keys))})
+        """, keys)
+        ophthalmologists = "SELECT ophthalmologist_id FROM split_ophthalmologist"
+        conn.execute(f"""
+            INSERT INTO Ophthalmologist({', '.join(OPHTHALMOLOGIST_COPY)}, password)
+            SELECT {', '.join(OPHTHALMOLOGIST_COPY)}, 0 FROM src.Ophthalmologist
+            WHERE ophthalmologist_id IN ({ophthalmologists})
+        """)
+        conn.execute(f"""
+            INSERT INTO Patient({', '.join(PATIENT_COPY)}, password)
+            SELECT {', '.join(PATIENT_COPY)}, 0 FROM src.Patient
+            WHERE patient_id IN (SELECT patient_id FROM src.Appointment WHERE ophthalmologist_id IN ({ophthalmologists})
+                                 UNION SELECT patient_id FROM src.Feedback
+                                 WHERE ophthalmologist_id IN ({ophthalmologists}))
+        """)
+        for table, columns, select, where in SPLIT_TABLES:
+            conn.execute(f"INSERT INTO {table}({columns}) SELECT {select} FROM src.{table} "
+                         f"WHERE {where.format(ophthalmologists=ophthalmologists)}", {"base": id_base})
+        conn.commit()
+        conn.execute("DETACH DATABASE src")
+        standin = sqlite_standin.connect(path)
+        datagen.Generator(standin, "sqlite").rebuild_schedule()
+        search.rebuild(standin)
+        ratings.rebuild(standin)
+        standin.close()
+        conn.close()
+        shards.append((name, group, path, id_base))
+        if progress:
+            progress(name, group)
+    return directory_path, shards
+
+
+# ==================== SQL SERVER ID RANGES ====================
+def reseed(shard):
+    # Starts the shard's ID_TABLES identities at its id_base, unless its
+    # rows are past it already
+    with routed(shard.route), transaction() as tx:
+        for table, id_column in ID_TABLES:
+            tx.execute(f"SELECT COALESCE(MAX({id_column}), 0) FROM {table}")
+            if tx.fetchone()[0] < shard.id_base:
+                tx.execute(f"DBCC CHECKIDENT ('{table}', RESEED, {shard.id_base})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Set up per-clinic databases")
+    commands = parser.add_subparsers(dest="command", required=True)
+    split = commands.add_parser("split", help="split a SQLite stand-in database into one file per clinic")
+    split.add_argument("source")
+    split.add_argument("--out", required=True, metavar="DIR")
+    commands.add_parser("reseed", help="start each SHARDS database's ids at its id_base (SQL Server)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "split":
+        directory_path, shards = split_sqlite(args.source, args.out,
+                                              progress=lambda name, group: print(f"{name}: {', '.join(group)}"))
+        print(f"Directory: {directory_path}; {len(shards)} clinic databases in {time.perf_counter() - start:.1f}s")
+        return
+    shard_map = get_map()
+    if shard_map is None:
+        raise SystemExit("SHARDS is empty")
+    try:
+        for shard in shard_map.shards:
+            reseed(shard)
+            print(f"{shard.name}: ids from {shard.id_base}")
+    finally:
+        close()
+
+
+if __name__ == "__main__":
+    main()
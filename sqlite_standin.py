@@ -0,0 +1,266 @@
+import collections
+import datetime
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# ==================== SQLITE STAND-IN ====================
+# Local SQLite copy of the clinic schema for benchmarks and load tests that
+# cannot reach SQL Server. Column names and types mirror
+# ophthalmology_clinic_data_population.sql; DATE and TIMESTAMP columns come
+# back as date/datetime objects like they do from pyodbc. Until migration
+# 011, triggers store any appointment_status other than 0 as 1, like the
+# BIT column it was.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Patient(
+    patient_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    gender TEXT NOT NULL,
+    date_of_birth DATE NOT NULL,
+    email TEXT NOT NULL,
+    phonenumber INTEGER NOT NULL,
+    password INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS Ophthalmologist(
+    ophthalmologist_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    phonenumber INTEGER NOT NULL,
+    clinicname TEXT NOT NULL,
+    clinicaddress TEXT NOT NULL,
+    password INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS Appointment(
+    appointment_id INTEGER PRIMARY KEY,
+    patient_id INTEGER NOT NULL REFERENCES Patient(patient_id),
+    ophthalmologist_id INTEGER NOT NULL REFERENCES Ophthalmologist(ophthalmologist_id),
+    appointment_date DATE NOT NULL,
+    appointment_time TIMESTAMP NOT NULL,
+    appointment_status INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS Patient_Record(
+    record_id INTEGER PRIMARY KEY,
+    patient_id INTEGER NOT NULL REFERENCES Patient(patient_id),
+    ophthalmologist_id INTEGER NOT NULL REFERENCES Ophthalmologist(ophthalmologist_id),
+    appointment_id INTEGER NOT NULL REFERENCES Appointment(appointment_id),
+    record_date DATE NOT NULL,
+    diagnosis TEXT,
+    prescription TEXT,
+    treatment_details TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS Bill(
+    bill_id INTEGER PRIMARY KEY,
+    patient_id INTEGER NOT NULL REFERENCES Patient(patient_id),
+    appointment_id INTEGER NOT NULL REFERENCES Appointment(appointment_id),
+    amount REAL NOT NULL,
+    payment_status INTEGER NOT NULL,
+    payment_date DATE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS Feedback(
+    feedback_id INTEGER PRIMARY KEY,
+    patient_id INTEGER NOT NULL REFERENCES Patient(patient_id),
+    ophthalmologist_id INTEGER NOT NULL REFERENCES Ophthalmologist(ophthalmologist_id),
+    rating INTEGER NOT NULL,
+    comments TEXT NOT NULL,
+    feedback_date DATE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS Notification(
+    notification_id INTEGER PRIMARY KEY,
+    appointment_id INTEGER NOT NULL REFERENCES Appointment(appointment_id),
+    recipient_id INTEGER NOT NULL,
+    recipient_type TEXT NOT NULL,
+    sent_date DATE NOT NULL,
+    message TEXT NOT NULL,
+    message_read INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS TR_Appointment_Status_Bit_Insert AFTER INSERT ON Appointment
+WHEN NEW.appointment_status NOT IN (0, 1)
+BEGIN
+    UPDATE Appointment SET appointment_status = 1 WHERE appointment_id = NEW.appointment_id;
+END;
+CREATE TRIGGER IF NOT EXISTS TR_Appointment_Status_Bit_Update AFTER UPDATE OF appointment_status ON Appointment
+WHEN NEW.appointment_status NOT IN (0, 1)
+BEGIN
+    UPDATE Appointment SET appointment_status = 1 WHERE appointment_id = NEW.appointment_id;
+END;
+"""
+
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations", "sqlite")
+
+
+def connect(path, latency=0.0):
+    # check_same_thread=False because pooled connections move between threads
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30,
+                           detect_types=sqlite3.PARSE_DECLTYPES)
+    conn.create_function("GETDATE", 0, lambda: datetime.date.today().isoformat())
+    return StandInConnection(conn, latency)
+
+
+def create_database(path, migrate=False, id_base=0):
+    # A clinic database (shards.py) numbers its ID_TABLES rows from id_base
+    conn = sqlite3.connect(path)
+    schema = SCHEMA
+    if id_base:
+        from shards import ID_TABLES
+        for _, id_column in ID_TABLES:
+            schema = schema.replace(f"{id_column} INTEGER PRIMARY KEY,", f"{id_column} INTEGER PRIMARY KEY AUTOINCREMENT,")
+    conn.executescript(schema)
+    if id_base:
+        conn.executemany("INSERT INTO sqlite_sequence(name, seq) VALUES(?, ?)",
+                         [(table, id_base) for table, _ in ID_TABLES])
+    conn.commit()
+    if migrate:
+        import migrate as migrations
+        migrations.migrate(conn, "sqlite")
+    conn.close()
+
+
+# ==================== T-SQL TRANSLATION ====================
+# Clinic.py's queries are written for SQL Server. The few constructs SQLite
+# lacks are rewritten per statement: TOP (?) / TOP n become LIMIT (the TOP
+# parameter moves to the end, where LIMIT's placeholder is). GETDATE() is a
+# registered function. MIN_ACTIVE_ROWVERSION() reads the counter that
+# migration 004 keeps in place of rowversion. The OUTPUT INSERTED.col, ...
+# of an INSERT or UPDATE moves to the end as RETURNING col, .... SET
+# IDENTITY_INSERT is dropped: SQLite always accepts explicit ids.
+MIN_ACTIVE_ROWVERSION = "(SELECT value + 1 FROM Row_Version)"
+IDENTITY_INSERT = re.compile(r"\bSET\s+IDENTITY_INSERT\s+\w+\s+(ON|OFF)\s*;?", re.IGNORECASE)
+OUTPUT_INSERTED = re.compile(r"\bOUTPUT\s+(INSERTED\.\w+(?:\s*,\s*INSERTED\.\w+)*)\s+", re.IGNORECASE)
+TOP_PARAM = re.compile(r"\bSELECT\s+TOP\s*\(\?\)", re.IGNORECASE)
+TOP_LITERAL = re.compile(r"\bSELECT\s+TOP\s*\(?(\d+)\)?", re.IGNORECASE)
+
+
+def translate(query, params=()):
+    params = tuple(params) if params else ()
+    query = query.replace("MIN_ACTIVE_ROWVERSION()", MIN_ACTIVE_ROWVERSION)
+    if "IDENTITY_INSERT" in query:
+        query = IDENTITY_INSERT.sub("", query).strip()
+    match = OUTPUT_INSERTED.search(query)
+    if match:
+        columns = re.sub(r"INSERTED\.", "", match.group(1), flags=re.IGNORECASE)
+        query = f"{query[:match.start()]}{query[match.end():].rstrip()} RETURNING {columns}"
+    match = TOP_PARAM.search(query)
+    if match:
+        query = f"{query[:match.start()]}SELECT{query[match.end():].rstrip()} LIMIT ?"
+        params = params[1:] + params[:1]
+        return query, params
+    match = TOP_LITERAL.search(query)
+    if match:
+        query = f"{query[:match.start()]}SELECT{query[match.end():].rstrip()} LIMIT {match.group(1)}"
+    return query, params
+
+
+# ==================== SIMULATED NETWORK LATENCY ====================
+# SQLite answers in microseconds; a real SQL Server link costs a round trip
+# per statement. time.sleep releases the GIL just like pyodbc does while it
+# waits on the socket, so concurrency effects look the same.
+class StandInConnection:
+    def __init__(self, conn, latency=0.0):
+        self._conn = conn
+        self.latency = latency
+
+    def cursor(self):
+        return StandInCursor(self._conn.cursor(), self.latency)
+
+    def commit(self):
+        if self.latency:
+            time.sleep(self.latency)
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class StandInCursor:
+    def __init__(self, cursor, latency=0.0):
+        self._cursor = cursor
+        self.latency = latency
+
+    def execute(self, query, params=()):
+        if self.latency:
+            time.sleep(self.latency)
+        self._cursor.execute(*translate(query, params))
+        return self
+
+    def executemany(self, query, param_rows):
+        if self.latency:
+            time.sleep(self.latency)
+        self._cursor.executemany(translate(query)[0], param_rows)
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+# ==================== SIMULATED REPLICA ====================
+# A second database file that trails the primary by about `lag` seconds,
+# for trying database.configure_replica without SQL Server. Every
+# `interval` the primary is snapshotted into memory; the newest snapshot at
+# least `lag` old is copied over the replica file. Readers of the replica
+# see whole committed states, as with log shipping.
+class Replica:
+    def __init__(self, primary_path, replica_path, lag=1.0, interval=0.1):
+        self.primary_path = primary_path
+        self.replica_path = replica_path
+        self.lag = lag
+        self.interval = interval
+        self.copies = 0
+        self._snapshots = collections.deque()   # (taken_at, in-memory copy)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._copy(self._snapshot())
+        self._thread = threading.Thread(target=self._run, name="sqlite-replica", daemon=True)
+        self._thread.start()
+        return self
+
+    def connect(self, latency=0.0):
+        return connect(self.replica_path, latency)
+
+    def _snapshot(self):
+        source = sqlite3.connect(self.primary_path)
+        copy = sqlite3.connect(":memory:", check_same_thread=False)
+        source.backup(copy)
+        source.close()
+        return copy
+
+    def _copy(self, snapshot):
+        target = sqlite3.connect(self.replica_path, timeout=30)
+        snapshot.backup(target)
+        target.close()
+        snapshot.close()
+        self.copies += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            self._snapshots.append((now, self._snapshot()))
+            due = None
+            while self._snapshots and now - self._snapshots[0][0] >= self.lag:
+                if due is not None:
+                    due.close()
+                due = self._snapshots.popleft()[1]
+            if due is not None:
+                self._copy(due)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        for _, snapshot in self._snapshots:
+            snapshot.close()
+        self._snapshots.clear()
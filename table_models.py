@@ -0,0 +1,391 @@
+from PyQt6.QtCore import QAbstractTableModel, QEvent, QModelIndex, QRect, Qt, pyqtSignal
+from PyQt6.QtWidgets import (QApplication, QHBoxLayout, QLabel, QPushButton, QStyle,
+                             QStyledItemDelegate, QStyleOptionButton, QTableView,
+                             QVBoxLayout, QWidget)
+
+import row_versions
+import shards
+from database import open_cursor
+
+# ==================== CURSOR-BACKED TABLE MODEL ====================
+# Keeps the raw result rows and formats cells only when the view paints
+# them. Rows arrive in batches from an open cursor: the first batch with the
+# load, the rest through canFetchMore/fetchMore as the user scrolls. With a
+# limit (the page size) reading stops there and has_more records whether the
+# query had rows past it. complete is False while rows are still to be read,
+# and stays False if the cursor is closed early.
+
+BATCH_SIZE = 100
+
+
+class CursorTableModel(QAbstractTableModel):
+    def __init__(self, headers, columns, batch_size=BATCH_SIZE):
+        super().__init__()
+        self.headers = headers
+        self.columns = columns    # one function per column: raw row -> cell text
+        self.batch_size = batch_size
+        self.rows = []
+        self.cursor = None
+        self.limit = None
+        self.has_more = False
+        self.complete = False
+
+    # ---------- loading ----------
+    @staticmethod
+    def open_source(query, params, batch_size=BATCH_SIZE, cache=True):
+        # Runs on a worker thread: execute and read the first batch
+        return CursorTableModel.first_batch(open_cursor(query, params, cache), batch_size)
+
+    @staticmethod
+    def first_batch(cursor, batch_size=BATCH_SIZE):
+        if cursor is None:
+            return None
+        rows = cursor.fetchmany(batch_size)
+        if len(rows) < batch_size:
+            cursor.close()
+        return cursor, rows
+
+    @staticmethod
+    def close_source(source):
+        source[0].close()
+
+    def set_source(self, source, limit=None):
+        self.beginResetModel()
+        self.close_cursor()
+        self.rows = []
+        self.limit = limit
+        self.has_more = False
+        self.complete = False
+        if source:
+            cursor, rows = source
+            self.cursor = None if cursor.closed else cursor
+            self.complete = self.cursor is None
+            self.rows = self._within_limit(rows)
+        self.endResetModel()
+
+    def clear(self):
+        self.set_source(None)
+
+    def set_rows(self, rows):
+        # Rows already read in full (search results and the like)
+        self.set_source(None)
+        self.beginResetModel()
+        self.rows = list(rows)
+        self.complete = True
+        self.endResetModel()
+
+    def _within_limit(self, rows):
+        if self.limit is None:
+            return list(rows)
+        room = self.limit - len(self.rows)
+        if len(rows) > room:
+            self.has_more = True
+            self.close_cursor()
+            self.complete = True
+            return list(rows[:room])
+        return list(rows)
+
+    def close_cursor(self):
+        if self.cursor is not None:
+            self.cursor.close()
+            self.cursor = None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.cursor is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.cursor is None:
+            return
+        rows = self.cursor.fetchmany(self.batch_size)
+        if len(rows) < self.batch_size:
+            self.close_cursor()
+            self.complete = True
+        rows = self._within_limit(rows)
+        if rows:
+            start = len(self.rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+            self.rows.extend(rows)
+            self.endInsertRows()
+
+    def fetch_all(self):
+        while self.canFetchMore():
+            self.fetchMore()
+
+    # ---------- access ----------
+    def row(self, i):
+        return self.rows[i]
+
+    def set_row(self, i, row):
+        self.rows[i] = row
+        self.dataChanged.emit(self.index(i, 0), self.index(i, len(self.columns) - 1))
+
+    def insert_row(self, i, row):
+        self.beginInsertRows(QModelIndex(), i, i)
+        self.rows.insert(i, row)
+        self.endInsertRows()
+
+    def remove_row(self, i):
+        self.beginRemoveRows(QModelIndex(), i, i)
+        del self.rows[i]
+        self.endRemoveRows()
+
+    # ---------- QAbstractTableModel ----------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        return self.columns[index.column()](self.rows[index.row()])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return str(section + 1)
+
+
+# ==================== PAINTED ACTION BUTTONS ====================
+# Draws push buttons into a cell instead of creating a QPushButton widget
+# per row. buttons_for(row) returns the labels to show for a raw row; an
+# empty list falls back to the cell's normal text. Clicks come out of the
+# clicked(row_index, label) signal.
+class ButtonDelegate(QStyledItemDelegate):
+    clicked = pyqtSignal(int, str)
+
+    SPACING = 5
+    MARGIN = 2
+
+    def __init__(self, buttons_for, parent=None):
+        super().__init__(parent)
+        self.buttons_for = buttons_for
+        self._pressed = None    # (row, label) while the mouse is held down
+
+    def _labels(self, index):
+        return self.buttons_for(index.model().row(index.row()))
+
+    def _rects(self, rect, count):
+        inner = rect.adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+        width = (inner.width() - self.SPACING * (count - 1)) // count
+        return [QRect(inner.left() + i * (width + self.SPACING), inner.top(), width, inner.height())
+                for i in range(count)]
+
+    def paint(self, painter, option, index):
+        labels = self._labels(index)
+        if not labels:
+            super().paint(painter, option, index)
+            return
+        widget = option.widget
+        style = widget.style() if widget else QApplication.style()
+        for label, rect in zip(labels, self._rects(option.rect, len(labels))):
+            button = QStyleOptionButton()
+            button.rect = rect
+            button.text = label
+            button.state = QStyle.StateFlag.State_Enabled
+            if self._pressed == (index.row(), label):
+                button.state |= QStyle.StateFlag.State_Sunken
+            else:
+                button.state |= QStyle.StateFlag.State_Raised
+            style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter, widget)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() not in (QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonRelease):
+            return super().editorEvent(event, model, option, index)
+        labels = self._labels(index)
+        if not labels or event.button() != Qt.MouseButton.LeftButton:
+            return super().editorEvent(event, model, option, index)
+
+        pos = event.position().toPoint()
+        hit = None
+        for label, rect in zip(labels, self._rects(option.rect, len(labels))):
+            if rect.contains(pos):
+                hit = (index.row(), label)
+
+        if event.type() == QEvent.Type.MouseButtonPress:
+            self._pressed = hit
+            return hit is not None
+
+        pressed, self._pressed = self._pressed, None
+        if hit is not None and hit == pressed:
+            self.clicked.emit(*hit)
+        return hit is not None
+
+
+# ==================== PAGED TABLE ====================
+# Table, loading label and Previous/Next controls for one list screen. The
+# pager builds each page query; the model streams that page from a cursor.
+#
+# If the pager has a version_column, the page remembers the watermark it was
+# read at, and loading the same list again only fetches what changed since
+# (see row_versions.py): changed rows are patched in place, new rows that
+# fall inside the page are inserted, deleted rows are removed.
+#
+# With clinic databases (shards.py), a list of one ophthalmologist's rows
+# is read from their clinic; a patient's lists merge every clinic's rows in
+# page order and are always loaded whole rather than refreshed.
+class PagedTable(QWidget):
+    def __init__(self, parent, pager, headers, columns):
+        super().__init__()
+        self.parent = parent
+        self.pager = pager
+        self.params = ()
+        self.watermark = None
+
+        self.model = CursorTableModel(headers, columns)
+        self.model.rowsInserted.connect(self.update_controls)
+        parent.cursor_models.append(self.model)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        controls = QHBoxLayout()
+        self.prev_btn = QPushButton("< Previous")
+        self.prev_btn.clicked.connect(self.previous_page)
+        self.page_label = QLabel("")
+        self.next_btn = QPushButton("Next >")
+        self.next_btn.clicked.connect(self.next_page)
+        controls.addWidget(self.prev_btn)
+        controls.addStretch()
+        controls.addWidget(self.page_label)
+        controls.addStretch()
+        controls.addWidget(self.next_btn)
+        layout.addLayout(controls)
+        self.update_controls()
+
+    def load(self, params):
+        # First page for a new filter (patient, ophthalmologist, ...); the
+        # same filter again only refreshes the page already shown
+        if tuple(params) == self.params and self.can_refresh():
+            self.refresh()
+            return
+        self.params = tuple(params)
+        self.pager.reset()
+        self.load_page()
+
+    def reload(self):
+        # Same page again, e.g. after a row action changed it
+        self.load_page()
+
+    def clear(self):
+        self.parent.executor.cancel((self, "page"))
+        self.parent.executor.cancel((self, "changes"))
+        self.watermark = None
+        self.pager.reset()
+        self.model.clear()
+        self.page_label.clear()
+        self.update_controls()
+
+    def load_page(self):
+        self.parent.executor.cancel((self, "changes"))
+        self.watermark = None
+        self.model.clear()
+        self.page_label.setText("Loading...")
+        self.prev_btn.setEnabled(False)
+        self.next_btn.setEnabled(False)
+        query, params = self.pager.query(self.params)
+        self.parent.executor.run((self, "page"), self.open_page,
+                                 (self.pager, self.params, query, params),
+                                 self.show_page, on_stale=self.close_page)
+
+    @staticmethod
+    def open_page(pager, filter_params, query, params):
+        if shards.fans_out(pager):
+            return None, CursorTableModel.first_batch(shards.open_merged(query, params, pager.descending))
+        # Watermark first, so whatever commits during the read is picked up
+        # by the next refresh. A cached page could predate the watermark.
+        with shards.page_route(pager, filter_params):
+            if pager.version_column is None:
+                return None, CursorTableModel.open_source(query, params)
+            mark = row_versions.watermark()
+            return mark, CursorTableModel.open_source(query, params, cache=mark is None)
+
+    @staticmethod
+    def close_page(result):
+        if result[1] is not None:
+            CursorTableModel.close_source(result[1])
+
+    def show_page(self, result):
+        self.watermark, source = result
+        self.model.set_source(source, self.pager.page_size)
+        self.page_label.setText(f"Page {self.pager.page_number}")
+        self.update_controls()
+
+    def next_page(self):
+        # The rest of this page has to be read to know where the next one starts
+        self.model.fetch_all()
+        if self.model.has_more and self.model.rowCount():
+            self.pager.next(self.model.row(self.model.rowCount() - 1))
+            self.load_page()
+        else:
+            self.update_controls()
+
+    def previous_page(self):
+        if self.pager.previous():
+            self.load_page()
+
+    def can_refresh(self):
+        return (self.watermark is not None and self.model.complete
+                and not self.parent.executor.is_pending((self, "page")))
+
+    def refresh(self):
+        # Patch the page with what changed since it was read; a page that
+        # was never read to the end is loaded again instead
+        if not self.can_refresh():
+            self.load_page()
+            return
+        self.parent.executor.run((self, "changes"), self.changes,
+                                 (self.pager, self.params, self.watermark), self.apply_changes)
+
+    @staticmethod
+    def changes(pager, params, watermark):
+        with shards.page_route(pager, params):
+            return row_versions.changes(pager, params, watermark)
+
+    def apply_changes(self, result):
+        if result is None:
+            return
+        self.watermark, rows, deleted = result
+        model = self.model
+        deleted = set(deleted)
+        for i in reversed(range(model.rowCount())):
+            if model.row(i)[-1] in deleted:
+                model.remove_row(i)
+
+        positions = {row[-1]: i for i, row in enumerate(model.rows)}
+        start = self.pager.starts[-1]
+        for row in rows:
+            key = self.pager.key(row)
+            i = positions.get(key[1])
+            if i is not None and self.pager.key(model.row(i)) == key:
+                model.set_row(i, row)
+                continue
+            if i is not None:
+                # Its sort key changed: take it out and place it again
+                model.remove_row(i)
+                positions = {r[-1]: n for n, r in enumerate(model.rows)}
+            if start is not None and not self.pager.sorts_before(start, key):
+                continue   # belongs to an earlier page
+            i = 0
+            while i < model.rowCount() and self.pager.sorts_before(self.pager.key(model.row(i)), key):
+                i += 1
+            if i == model.rowCount() and model.has_more:
+                continue   # belongs to a later page
+            model.insert_row(i, row)
+            if model.rowCount() > self.pager.page_size:
+                model.remove_row(model.rowCount() - 1)
+                model.has_more = True
+            positions = {r[-1]: n for n, r in enumerate(model.rows)}
+        self.update_controls()
+
+    def update_controls(self):
+        self.prev_btn.setEnabled(self.pager.has_previous)
+        self.next_btn.setEnabled(self.model.has_more or self.model.canFetchMore())
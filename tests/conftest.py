@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import database
+import sqlite_standin
+
+
+# A migrated SQLite stand-in as the shared pool, with an empty result cache
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "clinic.db")
+    sqlite_standin.create_database(path, migrate=True)
+    database.configure_pool(connect=lambda: sqlite_standin.connect(path))
+    database.result_cache.clear()
+    yield path
+    database.close_pool()
+
+
+@pytest.fixture
+def clinic(db):
+    # One patient and one ophthalmologist
+    conn = sqlite_standin.connect(db)
+    conn.execute("INSERT INTO Patient(patient_id, name, gender, date_of_birth, email, phonenumber, password) "
+                 "VALUES(1, 'Sara Malik', 'Female', '1990-01-01', 'sara@example.com', 1, 0)")
+    conn.execute("INSERT INTO Ophthalmologist(ophthalmologist_id, name, email, phonenumber, clinicname, "
+                 "clinicaddress, password) VALUES(1, 'Dr Omar Malik', 'omar@example.com', 2, 'Vision Care', "
+                 "'1 Main St', 0)")
+    conn.commit()
+    conn.close()
+    return db
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    # One QApplication for every Qt test; a QCoreApplication would stop
+    # widget tests from creating theirs
+    widgets = pytest.importorskip("PyQt6.QtWidgets")
+    return widgets.QApplication.instance() or widgets.QApplication([])
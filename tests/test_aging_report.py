@@ -0,0 +1,51 @@
+import datetime
+import sqlite3
+
+import reports
+import services
+
+TODAY = datetime.date(2026, 6, 30)
+
+# (ophthalmologist, age in days, amount, paid); each age sits on a bucket edge
+BILLS = [(1, 0, 10.0, 0), (1, 30, 20.0, 0), (1, 31, 40.0, 0), (1, 60, 80.0, 0), (1, 61, 160.0, 0),
+         (1, 90, 320.0, 0), (1, 91, 640.0, 0), (1, 200, 100.0, 1), (2, 5, 50.0, 1), (2, 45, 50.0, 0)]
+
+
+def seed(db):
+    conn = sqlite3.connect(db)
+    conn.execute("INSERT INTO Ophthalmologist(ophthalmologist_id, name, email, phonenumber, clinicname, "
+                 "clinicaddress, password) VALUES(2, 'Dr Lina Aziz', 'lina@example.com', 3, 'Bright Eyes', "
+                 "'2 Side St', 0)")
+    for ophth_id, age, amount, paid in BILLS:
+        issued = (TODAY - datetime.timedelta(days=age)).isoformat()
+        appointment_id = conn.execute(
+            "INSERT INTO Appointment(patient_id, ophthalmologist_id, appointment_date, appointment_time, "
+            "appointment_status) VALUES(1, ?, ?, ?, 1)", (ophth_id, issued, f"{issued} 10:00:00")).lastrowid
+        conn.execute("INSERT INTO Bill(patient_id, appointment_id, amount, payment_status, payment_date) "
+                     "VALUES(1, ?, ?, ?, ?)", (appointment_id, amount, paid, issued))
+    conn.commit()
+    conn.close()
+
+
+def test_outstanding_bills_fall_in_their_age_bucket(clinic):
+    seed(clinic)
+    report = reports.aging_report(today=TODAY)
+    bright, vision = report["ophthalmologists"]
+    assert vision == ("Vision Care", "Dr Omar Malik", 8, 1370.0, 100.0, 1270.0, 30.0, 120.0, 480.0, 640.0, 0.073)
+    assert bright == ("Bright Eyes", "Dr Lina Aziz", 2, 100.0, 50.0, 50.0, 0.0, 50.0, 0.0, 0.0, 0.5)
+    # One clinic each, so the subtotals repeat their ophthalmologist
+    assert [row[2:] for row in report["clinics"]] == [bright[2:], vision[2:]]
+    assert report["total"] == ("", "", 10, 1470.0, 150.0, 1320.0, 30.0, 170.0, 480.0, 640.0, 0.102)
+
+
+def test_clinic_reports(clinic):
+    seed(clinic)
+    assert [row[1] for row in reports.aging_report("Bright Eyes", today=TODAY)["ophthalmologists"]] == ["Dr Lina Aziz"]
+    assert reports.aging_report(ophth_id=1, today=TODAY)["total"][2] == 8
+    assert [row[0] for row in services.aging_report()["clinics"]] == ["Bright Eyes", "Vision Care"]
+
+
+def test_no_bills_has_no_collection_rate(clinic):
+    report = reports.aging_report(today=TODAY)
+    assert report["ophthalmologists"] == [] and report["clinics"] == []
+    assert report["total"] == ("", "", 0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, None)
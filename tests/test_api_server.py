@@ -0,0 +1,66 @@
+import asyncio
+import datetime
+import http.client
+import json
+import threading
+
+import pytest
+
+from api_server import ApiServer
+
+DAY = (datetime.date.today() + datetime.timedelta(days=7)).isoformat()
+
+
+async def stop(server):
+    # Close the listener and end the connection handlers still running
+    server.server.close()
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@pytest.fixture
+def api(clinic):
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(ApiServer(port=0, workers=2).start())
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    conn = http.client.HTTPConnection(server.host, server.port, timeout=10)
+    yield conn
+    conn.close()
+    asyncio.run_coroutine_threadsafe(stop(server), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    server.close()
+    loop.close()
+
+
+def call(conn, method, path, body=None):
+    conn.request(method, path, body=None if body is None else json.dumps(body),
+                 headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_booking_over_one_keep_alive_connection(api):
+    status, payload = call(api, "GET", "/ophthalmologists")
+    assert status == 200 and payload["rows"][0][0] == 1
+    booking = {"patient_id": 1, "ophthalmologist_id": 1, "date": DAY, "slot": 2}
+    assert call(api, "POST", "/appointments", booking) == (201, {"booked": True})
+    status, payload = call(api, "POST", "/appointments", booking)
+    assert status == 409 and "already booked" in payload["error"]
+    status, payload = call(api, "GET", f"/ophthalmologists/1/availability?start={DAY}&days=1")
+    assert status == 200 and 2 not in payload["free"][DAY]
+    status, payload = call(api, "GET", "/patients/1/appointments")
+    assert status == 200 and len(payload["rows"]) == 1 and payload["next"] is None
+
+
+def test_errors_map_to_status_codes(api):
+    assert call(api, "GET", "/nowhere")[0] == 404
+    assert call(api, "DELETE", "/ophthalmologists")[0] == 405
+    assert call(api, "POST", "/appointments", {"patient_id": 1})[0] == 400
+    assert call(api, "POST", "/login/patient", {"email": "sara@example.com", "password": "wrong"})[0] == 401
+    api.request("POST", "/feedback", body="[1, 2]")
+    response = api.getresponse()
+    assert response.status == 400 and "JSON object" in json.loads(response.read())["error"]
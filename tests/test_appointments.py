@@ -0,0 +1,73 @@
+import datetime
+import sqlite3
+
+import availability
+import database
+import migrate
+import sqlite_standin
+
+DAY = datetime.date.today() + datetime.timedelta(days=7)
+
+
+def status(db):
+    conn = sqlite3.connect(db)
+    rows = conn.execute("SELECT appointment_id, appointment_status FROM Appointment ORDER BY appointment_id").fetchall()
+    conn.close()
+    return rows
+
+
+def test_rejection_is_stored_and_frees_the_slot(clinic):
+    assert availability.book_slot(1, 1, DAY, 0)
+    changed = availability.set_status([1], 2)
+    assert [row[0] for row in changed] == [1]
+    assert status(clinic) == [(1, 2)]
+    assert 0 in availability.load_availability(1, DAY, 1)[DAY]
+    # Booking the freed slot leaves the rejection as it was
+    assert availability.book_slot(1, 1, DAY, 0)
+    assert status(clinic) == [(1, 2), (2, 0)]
+
+
+def test_bit_status_reads_rejection_as_approval(tmp_path):
+    # What migration 011 fixes: before it the column holds only 0 and 1
+    path = str(tmp_path / "clinic.db")
+    sqlite_standin.create_database(path)
+    conn = sqlite3.connect(path)
+    migrate.migrate(conn, "sqlite", 10)
+    conn.execute("INSERT INTO Patient(patient_id, name, gender, date_of_birth, email, phonenumber, password) "
+                 "VALUES(1, 'Sara Malik', 'Female', '1990-01-01', 'sara@example.com', 1, 0)")
+    conn.execute("INSERT INTO Ophthalmologist(ophthalmologist_id, name, email, phonenumber, clinicname, "
+                 "clinicaddress, password) VALUES(1, 'Dr Omar Malik', 'omar@example.com', 2, 'Vision Care', "
+                 "'1 Main St', 0)")
+    conn.commit()
+    database.configure_pool(connect=lambda: sqlite_standin.connect(path))
+    try:
+        availability.book_slot(1, 1, DAY, 0)
+        availability.set_status([1], 2)
+        assert status(path) == [(1, 1)]
+        migrate.migrate(conn, "sqlite")
+        availability.book_slot(1, 1, DAY, 1)
+        availability.set_status([2], 2)
+        assert status(path) == [(1, 1), (2, 2)]
+    finally:
+        database.close_pool()
+        conn.close()
+
+
+def test_status_change_skips_decided_appointments(clinic):
+    assert availability.book_slot(1, 1, DAY, 0)
+    assert availability.book_slot(1, 1, DAY, 1)
+    assert [row[0] for row in availability.set_status([1], 1)] == [1]
+    # Only the still pending one is rejected, and only its slot is freed
+    assert [row[0] for row in availability.set_status([1, 2], 2)] == [2]
+    assert status(clinic) == [(1, 1), (2, 2)]
+    free = availability.load_availability(1, DAY, 1)[DAY]
+    assert 0 not in free and 1 in free
+
+
+def test_booking_an_unknown_ophthalmologist_is_not_a_taken_slot(clinic):
+    def connect():
+        conn = sqlite_standin.connect(clinic)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+    database.configure_pool(connect=connect)
+    assert availability.book_slot(1, 99, DAY, 0) is False
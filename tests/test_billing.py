@@ -0,0 +1,57 @@
+import datetime
+import sqlite3
+import threading
+
+import pytest
+
+import billing
+import sqlite_standin
+
+
+def seed_concluded(db, count):
+    conn = sqlite3.connect(db)
+    when = datetime.datetime.now() - datetime.timedelta(days=1)
+    conn.executemany("INSERT INTO Appointment(patient_id, ophthalmologist_id, appointment_date, appointment_time, "
+                     "appointment_status) VALUES(1, 1, ?, ?, 1)",
+                     [(when.date().isoformat(), when.strftime("%Y-%m-%d %H:00:00"))] * count)
+    conn.commit()
+    conn.close()
+
+
+def bills_per_appointment(db):
+    conn = sqlite3.connect(db)
+    rows = conn.execute("SELECT appointment_id, COUNT(*) FROM Bill GROUP BY appointment_id").fetchall()
+    conn.close()
+    return rows
+
+
+def test_batch_bills_each_concluded_appointment_once(clinic):
+    seed_concluded(clinic, 3)
+    counts = billing.bill_concluded(1, 50.0)
+    assert counts["bills"] == 3 and counts["patients"] == 1 and counts["total"] == 150.0
+    assert sorted(counts["billed"]) == [(1, 1), (2, 1), (3, 1)]
+    assert billing.bill_concluded(1, 50.0)["bills"] == 0
+    assert all(n == 1 for _, n in bills_per_appointment(clinic))
+
+
+def test_concurrent_batches_never_double_bill(clinic):
+    seed_concluded(clinic, 50)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(billing.bill_concluded(1, 50.0))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(result["bills"] for result in results if result) == 50
+    assert len(bills_per_appointment(clinic)) == 50
+    assert all(n == 1 for _, n in bills_per_appointment(clinic))
+
+
+def test_unique_index_rejects_a_second_bill(clinic):
+    seed_concluded(clinic, 1)
+    billing.bill_concluded(1, 50.0)
+    conn = sqlite_standin.connect(clinic)
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO Bill(patient_id, appointment_id, amount, payment_status, payment_date) "
+                     "VALUES(1, 1, 50, 0, '2030-01-01')")
+    conn.close()
@@ -0,0 +1,53 @@
+import time
+
+import pytest
+
+pytest.importorskip("PyQt6.QtWidgets")
+
+from PyQt6.QtCore import QCoreApplication
+
+import Clinic
+import database
+import sqlite_standin
+
+
+class CountingConnect:
+    def __init__(self, path):
+        self.path = path
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return sqlite_standin.connect(self.path)
+
+
+def test_window_opens_without_the_database_and_builds_screens_on_demand(qapp, clinic):
+    connect = CountingConnect(clinic)
+    database.configure_pool(connect=connect)
+    window = Clinic.MainWindow()
+    assert list(window.screens) == ["initial_screen"] and connect.opened == 0
+    window.go_to("patient_login")
+    login = window.screen("patient_login")
+    window.go_to("initial_screen")
+    window.go_to("patient_login")
+    assert window.screen("patient_login") is login
+    assert set(window.screens) == {"initial_screen", "patient_login"} and connect.opened == 0
+    window.executor.shutdown()
+
+
+def test_bad_connection_is_reported_once_the_window_is_up(qapp, db):
+    def refuse():
+        raise ConnectionError("server not found")
+    database.configure_pool(connect=refuse, retries=1, backoff=0)
+    window = Clinic.MainWindow()
+    # Instead of the message box that quits the app
+    errors = []
+    window.connection_failed.disconnect()
+    window.connection_failed.connect(errors.append)
+    window.connect_database()
+    deadline = time.monotonic() + 5
+    while not errors and time.monotonic() < deadline:
+        QCoreApplication.processEvents()
+        time.sleep(0.01)
+    assert errors and "server not found" in errors[0]
+    window.executor.shutdown()
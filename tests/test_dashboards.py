@@ -0,0 +1,46 @@
+import datetime
+import sqlite3
+
+import services
+
+TODAY = datetime.date.today()
+
+
+def seed(db):
+    # Today: 9:00 pending, 10:00 approved, 11:00 rejected; day 3 pending;
+    # one unpaid and one paid bill
+    conn = sqlite3.connect(db)
+    visits = [(TODAY, 9, 0), (TODAY, 10, 1), (TODAY, 11, 2), (TODAY + datetime.timedelta(days=3), 9, 0),
+              (TODAY + datetime.timedelta(days=30), 9, 0)]
+    for day, hour, status in visits:
+        conn.execute("INSERT INTO Appointment(patient_id, ophthalmologist_id, appointment_date, appointment_time, "
+                     "appointment_status) VALUES(1, 1, ?, ?, ?)",
+                     (day.isoformat(), f"{day.isoformat()} {hour:02d}:00:00", status))
+    conn.executemany("INSERT INTO Bill(patient_id, appointment_id, amount, payment_status, payment_date) "
+                     "VALUES(1, ?, ?, ?, ?)", [(2, 40.0, 0, TODAY.isoformat()), (3, 25.0, 1, TODAY.isoformat())])
+    conn.commit()
+    conn.close()
+
+
+def test_ophthalmologist_dashboard(clinic):
+    seed(clinic)
+    dashboard = services.ophthalmologist_dashboard(1)
+    assert dashboard["pending"] == 3 and dashboard["balance"] == 40.0
+    assert dashboard["rating"] is None and dashboard["ratings"] == 0 and dashboard["unread"] == 0
+    # Only today's appointments, rejections left out
+    assert [(time.hour, name, status) for time, name, status in dashboard["agenda"]] == [
+        (9, "Sara Malik", 0), (10, "Sara Malik", 1)]
+
+
+def test_patient_dashboard_covers_the_coming_week(clinic):
+    seed(clinic)
+    dashboard = services.patient_dashboard(1)
+    assert dashboard["pending"] == 3 and dashboard["balance"] == 40.0 and dashboard["unread"] == 0
+    assert [row[0].date() for row in dashboard["agenda"]] == [TODAY] * 2 + [TODAY + datetime.timedelta(days=3)]
+    assert {row[1] for row in dashboard["agenda"]} == {"Dr Omar Malik"}
+
+
+def test_empty_dashboard_still_has_figures(clinic):
+    dashboard = services.ophthalmologist_dashboard(1)
+    assert dashboard == {"pending": 0, "balance": 0.0, "rating": None, "ratings": 0, "unread": 0, "agenda": []}
+    assert services.patient_dashboard(1)["agenda"] == []
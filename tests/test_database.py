@@ -0,0 +1,124 @@
+import sqlite3
+
+import pytest
+
+import database
+import sqlite_standin
+
+
+def test_failed_write_does_not_pin_session(db, monkeypatch):
+    monkeypatch.setattr(database, "_last_write", None)
+    client = database.Session()
+    with database.session(client):
+        assert database.execute_query("UPDATE Missing SET x = 1") is False
+        assert database.execute_query("INSERT INTO Missing(x) OUTPUT INSERTED.x VALUES(1)", fetch=True) is None
+    assert not client.sticky()
+    assert not database._recent_write()
+
+
+def test_write_pins_session(clinic, monkeypatch):
+    monkeypatch.setattr(database, "_last_write", None)
+    client = database.Session()
+    with database.session(client):
+        assert database.execute_query("UPDATE Patient SET name = 'Sara' WHERE patient_id = 1")
+    assert client.sticky()
+    assert database._recent_write()
+
+
+BOOK = ("INSERT INTO Appointment(patient_id, ophthalmologist_id, appointment_date, appointment_time, "
+        "appointment_status) OUTPUT INSERTED.appointment_id VALUES(1, 1, '2030-01-01', '2030-01-01 10:00:00', 0)")
+
+
+def test_fetching_write_is_not_cached(clinic):
+    first = database.execute_query(BOOK, fetch=True)
+    second = database.execute_query(BOOK, fetch=True)
+    assert first[0][0] != second[0][0]
+
+
+def test_fetching_write_invalidates_its_tables(clinic):
+    count = "SELECT COUNT(*) FROM Appointment"
+    assert database.execute_query(count, fetch=True)[0][0] == 0
+    database.execute_query(BOOK, fetch=True)
+    assert database.execute_query(count, fetch=True)[0][0] == 1
+
+
+CLAIM = ("UPDATE Ophthalmologist_Schedule SET slot_mask = slot_mask | ? "
+         "WHERE ophthalmologist_id = 1 AND schedule_date = '2030-01-01' AND (slot_mask & ?) = 0")
+CREATE = "INSERT INTO Ophthalmologist_Schedule(ophthalmologist_id, schedule_date, slot_mask) VALUES(1, '2030-01-01', ?)"
+
+
+def claim(bit):
+    with database.transaction() as tx:
+        return database.update_or_insert(tx, CLAIM, (bit, bit), CREATE, (bit,))
+
+
+def test_update_or_insert(clinic):
+    assert claim(1)       # no row yet: inserted
+    assert claim(2)       # updated
+    assert not claim(1)   # update misses, insert conflicts, update misses again
+    mask = database.execute_query("SELECT slot_mask FROM Ophthalmologist_Schedule", fetch=True, cache=False)
+    assert mask == [(3,)]
+
+
+def test_only_duplicate_keys_are_conflicts():
+    duplicate = sqlite3.IntegrityError("UNIQUE constraint failed: Bill.appointment_id")
+    odbc = sqlite3.IntegrityError("[23000] Violation of PRIMARY KEY constraint 'PK_X'. Cannot insert duplicate "
+                                  "key in object 'dbo.X'. (2627) (SQLExecDirectW)")
+    foreign = sqlite3.IntegrityError("FOREIGN KEY constraint failed")
+    assert database.is_conflict(duplicate) and database.is_conflict(odbc)
+    assert not database.is_conflict(foreign)
+    assert database.is_constraint_violation(foreign)
+
+
+def test_update_or_insert_raises_other_violations(clinic):
+    with pytest.raises(sqlite3.IntegrityError):
+        with database.transaction() as tx:
+            database.update_or_insert(tx, CLAIM, (1, 1), CREATE, (None,))
+
+
+class Flaky:
+    # Stand-in connections whose link drops on the next `commits` commits
+    # (after the server committed) or `cursors` cursors (before anything ran)
+    def __init__(self, path):
+        self.path = path
+        self.commits = 0
+        self.cursors = 0
+
+    def __call__(self):
+        conn = sqlite_standin.connect(self.path)
+        commit, cursor = conn.commit, conn.cursor
+
+        def flaky_commit():
+            commit()
+            if self.commits:
+                self.commits -= 1
+                raise sqlite3.OperationalError("08S01", "[08S01] Communication link failure")
+
+        def flaky_cursor():
+            if self.cursors:
+                self.cursors -= 1
+                raise sqlite3.OperationalError("08S01", "[08S01] Communication link failure")
+            return cursor()
+        conn.commit, conn.cursor = flaky_commit, flaky_cursor
+        return conn
+
+
+def test_is_disconnect_needs_a_connection_state():
+    assert database.is_disconnect(sqlite3.OperationalError("08S01", "[08S01] Communication link failure"))
+    assert not database.is_disconnect(sqlite3.OperationalError("database is locked"))
+    assert not database.is_disconnect(sqlite3.OperationalError('near "SELEC": syntax error'))
+
+
+def test_write_is_not_retried_after_the_link_drops(clinic):
+    flaky = Flaky(clinic)
+    database.configure_pool(connect=flaky)
+    flaky.commits = 1
+    assert database.execute_query(BOOK.replace(" OUTPUT INSERTED.appointment_id", "")) is False
+    assert database.execute_query("SELECT COUNT(*) FROM Appointment", fetch=True, cache=False) == [(1,)]
+
+
+def test_read_is_retried_after_the_link_drops(clinic):
+    flaky = Flaky(clinic)
+    database.configure_pool(connect=flaky)
+    flaky.cursors = 1
+    assert database.execute_query("SELECT COUNT(*) FROM Patient", fetch=True, cache=False) == [(1,)]
@@ -0,0 +1,48 @@
+import sqlite3
+
+import datagen
+import sqlite_standin
+
+
+def generated(tmp_path, name, seed=1):
+    path = str(tmp_path / name)
+    sqlite_standin.create_database(path, migrate=True)
+    conn = sqlite_standin.connect(path)
+    counts = datagen.generate(conn, "sqlite", patients=300, ophthalmologists=4, years=1, seed=seed, chunk=100)
+    conn.close()
+    return path, counts
+
+
+def dump(path, query):
+    conn = sqlite3.connect(path)
+    rows = conn.execute(query).fetchall()
+    conn.close()
+    return rows
+
+
+def test_same_seed_gives_the_same_rows(tmp_path):
+    first, counts = generated(tmp_path, "a.db")
+    second, _ = generated(tmp_path, "b.db")
+    other, _ = generated(tmp_path, "c.db", seed=2)
+    query = "SELECT patient_id, ophthalmologist_id, appointment_time, appointment_status FROM Appointment"
+    assert counts["Patient"] == 300 and counts["Appointment"] > 0
+    assert dump(first, query) == dump(second, query) != dump(other, query)
+
+
+def test_no_double_bookings_and_derived_tables_agree(tmp_path):
+    path, _ = generated(tmp_path, "a.db")
+    assert dump(path, "SELECT ophthalmologist_id, appointment_time FROM Appointment "
+                      "GROUP BY 1, 2 HAVING COUNT(*) > 1") == []
+    # Every held slot is in the bitmap and nothing else is
+    assert dump(path, """
+        SELECT s.ophthalmologist_id, s.schedule_date FROM Ophthalmologist_Schedule s
+        WHERE s.slot_mask <> (
+            SELECT COALESCE(SUM(1 << (CAST(strftime('%H', a.appointment_time) AS INTEGER) - 10)), 0)
+            FROM Appointment a
+            WHERE a.ophthalmologist_id = s.ophthalmologist_id AND a.appointment_date = s.schedule_date
+              AND a.appointment_status <> 2)
+    """) == []
+    assert dump(path, "SELECT ophthalmologist_id, rating_count, rating_sum FROM Ophthalmologist_Rating "
+                      "ORDER BY 1") == \
+        dump(path, "SELECT ophthalmologist_id, COUNT(*), SUM(rating) FROM Feedback GROUP BY 1 ORDER BY 1")
+    assert dump(path, "SELECT COUNT(*) FROM Appointment WHERE appointment_status = 2")[0][0] > 0
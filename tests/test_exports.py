@@ -0,0 +1,64 @@
+import csv
+import datetime
+import json
+import os
+import sqlite3
+
+import pytest
+
+import exports
+import services
+
+DAY = datetime.date(2026, 5, 4)
+
+
+def seed(db, count):
+    conn = sqlite3.connect(db)
+    conn.executemany("INSERT INTO Appointment(appointment_id, patient_id, ophthalmologist_id, appointment_date, "
+                     "appointment_time, appointment_status) VALUES(?, 1, 1, ?, ?, 1)",
+                     [(i, DAY.isoformat(), f"{DAY.isoformat()} 10:00:00") for i in range(1, count + 1)])
+    conn.commit()
+    conn.close()
+
+
+def test_csv_streams_every_row_in_batches(clinic, tmp_path):
+    seed(clinic, 25)
+    path = str(tmp_path / "audit.csv")
+    calls = []
+    done = exports.export_file(path, "appointments", "ophthalmologist", 1, "csv",
+                               progress=lambda *args: calls.append(args), batch_size=10)
+    assert done == 25
+    assert calls == [(0, 25), (10, 25), (20, 25), (25, 25)]
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(exports.DATASETS["appointments"]["columns"])
+    assert [row[0] for row in rows[1:]] == [str(i) for i in range(1, 26)]
+    assert rows[1][1] == DAY.isoformat() and rows[1][5] == "Sara Malik" and rows[1][7] == "Dr Omar Malik"
+    assert not os.path.exists(path + ".part")
+
+
+def test_jsonl_has_one_object_per_row(clinic, tmp_path):
+    seed(clinic, 3)
+    path = str(tmp_path / "audit.jsonl")
+    assert services.export_data(path, "appointments", "patient", 1, "jsonl", ophth_id=1) == 3
+    with open(path) as f:
+        rows = [json.loads(line) for line in f]
+    assert [row["appointment_id"] for row in rows] == [1, 2, 3]
+    assert rows[0]["patient_name"] == "Sara Malik" and rows[0]["appointment_date"] == DAY.isoformat()
+
+
+def test_cancelled_export_leaves_no_file(clinic, tmp_path):
+    seed(clinic, 25)
+    path = str(tmp_path / "audit.csv")
+    done = []
+    with pytest.raises(exports.ExportCancelled):
+        exports.export_file(path, "appointments", "clinic", 1, "csv",
+                            progress=lambda n, total: done.append(n), should_stop=lambda: len(done) > 1,
+                            batch_size=10)
+    assert done == [0, 10]
+    assert not os.path.exists(path) and not os.path.exists(path + ".part")
+
+
+def test_unknown_format_is_refused(clinic, tmp_path):
+    with pytest.raises(services.ServiceError):
+        services.export_data(str(tmp_path / "audit.xml"), "appointments", "patient", 1, "xml", ophth_id=1)
@@ -0,0 +1,28 @@
+import sqlite3
+
+import pytest
+
+import services
+
+
+def plan(db, query):
+    conn = sqlite3.connect(db)
+    rows = conn.execute("EXPLAIN QUERY PLAN " + query, (0,) * query.count("?")).fetchall()
+    conn.close()
+    return " ".join(row[-1] for row in rows)
+
+
+def test_login_lookup_seeks_the_normalized_email(db):
+    assert "USING INDEX UX_Patient_EmailNormalized" in plan(
+        db, "SELECT patient_id, password, password_hash FROM Patient WHERE email_normalized=?")
+
+
+def test_email_differing_only_in_case_or_trailing_space_is_taken(clinic):
+    with pytest.raises(services.ServiceError, match="already registered"):
+        services.register_patient("Sara M", "Female", "1990-01-01", "SARA@example.com  ", "1", "secret")
+
+
+def test_patient_appointment_page_reads_only_the_index(db):
+    detail = plan(db, "SELECT appointment_id, appointment_date, appointment_time, appointment_status "
+                      "FROM Appointment WHERE patient_id = ? ORDER BY appointment_date DESC, appointment_id DESC")
+    assert "COVERING INDEX IX_Appointment_Patient_Date" in detail and "TEMP B-TREE" not in detail
@@ -0,0 +1,57 @@
+import os
+import sqlite3
+
+import invoices
+import services
+
+# (bill_id, payment_date, amount, paid)
+BILLS = [(1, "2026-05-03", 80.0, 0), (2, "2026-05-31", 1250.5, 1), (3, "2026-06-01", 60.0, 0)]
+
+
+def seed(db):
+    conn = sqlite3.connect(db)
+    conn.execute("UPDATE Patient SET name = 'Sara <Malik>' WHERE patient_id = 1")
+    for bill_id, day, amount, paid in BILLS:
+        conn.execute("INSERT INTO Appointment(appointment_id, patient_id, ophthalmologist_id, appointment_date, "
+                     "appointment_time, appointment_status) VALUES(?, 1, 1, ?, ?, 1)",
+                     (bill_id, day, f"{day} 14:30:00"))
+        conn.execute("INSERT INTO Bill(bill_id, patient_id, appointment_id, amount, payment_status, payment_date) "
+                     "VALUES(?, 1, ?, ?, ?, ?)", (bill_id, bill_id, amount, paid, day))
+    conn.commit()
+    conn.close()
+
+
+def test_invoice_until_paid_then_receipt(clinic, tmp_path):
+    seed(clinic)
+    path = services.bill_document(1, str(tmp_path))
+    assert os.path.basename(path) == "invoice_1.html"
+    with open(path, encoding="utf-8") as f:
+        page = f.read()
+    assert "INV-00000001" in page and "Amount due" in page and "$80.00" in page
+    assert "Sara &lt;Malik&gt;" in page and "03 May 2026, 02:30 PM" in page
+    receipt = invoices.render(invoices.bill_documents([2])[0])
+    assert "RCT-00000002" in receipt and "$1,250.50" in receipt and "Thank you" in receipt
+
+
+def test_small_month_end_run_stays_in_process(clinic, tmp_path, monkeypatch):
+    seed(clinic)
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("a small batch started the process pool")
+
+    monkeypatch.setattr(invoices, "ProcessPoolExecutor", no_pool)
+    calls = []
+    out = str(tmp_path / "docs")
+    assert services.month_end_documents(1, 2026, 5, out, progress=lambda *args: calls.append(args)) == 2
+    assert sorted(os.listdir(out)) == ["invoice_1.html", "receipt_2.html"]
+    assert calls == [(2, 2)]
+
+
+def test_pool_writes_the_same_documents(clinic, tmp_path):
+    seed(clinic)
+    docs = invoices.bill_documents([1, 2, 3])
+    paths = invoices.render_batch(docs, str(tmp_path / "pool"), workers=2, chunk=1, min_docs=0)
+    assert [os.path.basename(path) for path in paths] == ["invoice_1.html", "invoice_3.html", "receipt_2.html"]
+    for doc in docs:
+        with open(tmp_path / "pool" / invoices.document_name(doc), encoding="utf-8") as f:
+            assert f.read() == invoices.render(doc)
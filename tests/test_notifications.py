@@ -0,0 +1,44 @@
+import sqlite3
+
+import database
+import notifications
+import sqlite_standin
+
+
+def seed_appointments(db, count):
+    conn = sqlite3.connect(db)
+    conn.executemany("INSERT INTO Appointment(appointment_id, patient_id, ophthalmologist_id, appointment_date, "
+                     "appointment_time, appointment_status) VALUES(?, 1, 1, '2030-01-01', '2030-01-01 10:00:00', 0)",
+                     [(i,) for i in range(1, count + 1)])
+    conn.commit()
+    conn.close()
+
+
+def test_queued_messages_are_written_in_one_batch(clinic):
+    seed_appointments(clinic, 3)
+    outbox = notifications.Outbox(flush_interval=0.05)
+    for appointment_id in (1, 2, 3):
+        outbox.enqueue(appointment_id, 1, notifications.PATIENT, f"Appointment {appointment_id} approved.")
+    outbox.close()
+    assert (outbox.written, outbox.batches, outbox.dropped) == (3, 1, 0)
+    assert notifications.unread_count(1, notifications.PATIENT) == 3
+    assert [row[2] for row in notifications.recent(1, notifications.PATIENT, 2)] == \
+        ["Appointment 3 approved.", "Appointment 2 approved."]
+    notifications.mark_read(1, notifications.PATIENT)
+    assert notifications.unread_count(1, notifications.PATIENT) == 0
+    assert notifications.unread_count(1, notifications.OPHTHALMOLOGIST) == 0
+
+
+def test_message_for_a_deleted_appointment_does_not_sink_the_batch(clinic):
+    def connect():
+        conn = sqlite_standin.connect(clinic)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+    database.configure_pool(connect=connect)
+    seed_appointments(clinic, 2)
+    outbox = notifications.Outbox(flush_interval=0.05)
+    for appointment_id in (1, 99, 2):
+        outbox.enqueue(appointment_id, 1, notifications.PATIENT, "Your appointment was cancelled.")
+    outbox.close()
+    assert (outbox.written, outbox.dropped) == (2, 1)
+    assert notifications.unread_count(1, notifications.PATIENT) == 2
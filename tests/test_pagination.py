@@ -0,0 +1,45 @@
+import sqlite3
+
+import services
+from pagination import KeysetPager
+
+DATES = ["2030-01-01", "2030-01-02", "2030-01-02", "2030-01-02", "2030-01-03", "2030-01-03", "2030-01-04"]
+
+
+def seed(db):
+    conn = sqlite3.connect(db)
+    conn.executemany("INSERT INTO Appointment(appointment_id, patient_id, ophthalmologist_id, appointment_date, "
+                     "appointment_time, appointment_status) VALUES(?, 1, 1, ?, ?, 1)",
+                     [(i, day, f"{day} 10:00:00") for i, day in enumerate(DATES, 1)])
+    conn.commit()
+    conn.close()
+
+
+def test_pages_cover_every_row_once_across_date_ties(clinic):
+    seed(clinic)
+    seen, after, pages = [], None, 0
+    while True:
+        rows, after = services.fetch_page("patient_appointments", (1,), after, page_size=3)
+        seen += [row[0] for row in rows]
+        pages += 1
+        if after is None:
+            break
+    # Newest date first, ties broken by the higher id
+    assert seen == [7, 6, 5, 4, 3, 2, 1] and pages == 3
+
+
+def test_ascending_list_pages_forward(clinic):
+    seed(clinic)
+    rows, after = services.fetch_page("ophthalmologist_appointments", (1,), page_size=4)
+    assert [row[0] for row in rows] == [1, 2, 3, 4]
+    rows, after = services.fetch_page("ophthalmologist_appointments", (1,), after, page_size=4)
+    assert [row[0] for row in rows] == [5, 6, 7] and after is None
+
+
+def test_pager_remembers_where_visited_pages_start():
+    pager = KeysetPager("x", "T", "", "d", "id")
+    pager.next(("row", "2030-01-03", 5))
+    pager.next(("row", "2030-01-02", 2))
+    assert pager.page_number == 3 and pager.starts[-1] == ("2030-01-02", 2)
+    assert pager.previous() and pager.starts[-1] == ("2030-01-03", 5)
+    assert pager.previous() and not pager.previous() and pager.page_number == 1
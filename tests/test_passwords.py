@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+import passwords
+import services
+import sqlite_standin
+
+
+@pytest.fixture
+def full_pool():
+    # One worker, no waiting room, and that worker held until released
+    passwords.configure_pool(1, 0)
+    started, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=passwords.get_pool().run,
+                              args=(lambda: started.set() or release.wait(),))
+    holder.start()
+    started.wait()
+    yield
+    release.set()
+    holder.join()
+    passwords.configure_pool()
+
+
+def set_password(db, column, value):
+    conn = sqlite_standin.connect(db)
+    conn.execute(f"UPDATE Patient SET {column} = ? WHERE patient_id = 1", (value,))
+    conn.commit()
+    conn.close()
+
+
+def test_hashed_login(clinic):
+    set_password(clinic, "password_hash", passwords.hash_now("secret words"))
+    assert services.patient_login("Sara@Example.com", "secret words") == 1
+    assert services.patient_login("sara@example.com", "wrong") is None
+
+
+def test_busy_pool_asks_to_retry(clinic, full_pool):
+    set_password(clinic, "password_hash", passwords.hash_now("secret words"))
+    with pytest.raises(services.ServiceError, match="try again"):
+        services.patient_login("sara@example.com", "secret words")
+
+
+def test_legacy_login_stands_when_pool_is_busy(clinic, full_pool):
+    # The number matches without hashing; saving the new hash is left for later
+    set_password(clinic, "password", 4321)
+    assert services.patient_login("sara@example.com", "4321") == 1
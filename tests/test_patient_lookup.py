@@ -0,0 +1,60 @@
+import datetime
+import sqlite3
+
+import pytest
+
+import services
+
+PAST = datetime.datetime.now() - datetime.timedelta(days=2)
+
+# (patient_id, name, appointment with ophthalmologist 1: None, "future" or "past")
+PATIENTS = [(2, "Sarah Khan", "past"), (3, "Sam_Lee", "future"), (4, "Samir Ali", "future"),
+            (5, "Salma Noor", None)]
+
+
+@pytest.fixture
+def patients(clinic):
+    conn = sqlite3.connect(clinic)
+    for patient_id, name, visit in PATIENTS:
+        conn.execute("INSERT INTO Patient(patient_id, name, gender, date_of_birth, email, phonenumber, password) "
+                     "VALUES(?, ?, 'Other', '1990-01-01', ?, ?, 0)", (patient_id, name, f"p{patient_id}@example.com",
+                                                                     patient_id))
+        if visit:
+            when = PAST if visit == "past" else PAST + datetime.timedelta(days=30)
+            conn.execute("INSERT INTO Appointment(patient_id, ophthalmologist_id, appointment_date, appointment_time, "
+                         "appointment_status) VALUES(?, 1, ?, ?, 1)",
+                         (patient_id, when.date().isoformat(), when.strftime("%Y-%m-%d 10:00:00")))
+    conn.commit()
+    conn.close()
+    return clinic
+
+
+def names(rows):
+    return [row[1] for row in rows]
+
+
+def test_prefix_matches_only_the_ophthalmologists_patients(patients):
+    assert names(services.ophthalmologist_patients(1, "sa")) == ["Sam_Lee", "Samir Ali", "Sarah Khan"]
+    assert names(services.ophthalmologist_patients(1, "sa", limit=2)) == ["Sam_Lee", "Samir Ali"]
+    assert names(services.ophthalmologist_patients(1, "")) == ["Sam_Lee", "Samir Ali", "Sarah Khan"]
+
+
+def test_wildcards_in_the_prefix_are_literal(patients):
+    assert names(services.ophthalmologist_patients(1, "Sam_")) == ["Sam_Lee"]
+    assert services.ophthalmologist_patients(1, "%") == []
+
+
+def test_unbilled_scope_lists_concluded_visits_without_a_bill(patients):
+    assert names(services.unbilled_patients(1, "")) == ["Sarah Khan"]
+    assert services.record_patients(1, "") == []
+
+
+def test_records_scope_lists_patients_with_a_record(patients):
+    conn = sqlite3.connect(patients)
+    appointment_id = conn.execute("SELECT appointment_id FROM Appointment WHERE patient_id = 2").fetchone()[0]
+    conn.execute("INSERT INTO Patient_Record(patient_id, ophthalmologist_id, appointment_id, record_date, "
+                 "treatment_details) VALUES(2, 1, ?, ?, 'Drops')", (appointment_id, PAST.date().isoformat()))
+    conn.commit()
+    conn.close()
+    assert names(services.record_patients(1, "sar")) == ["Sarah Khan"]
+    assert services.record_patients(1, "sam") == []
@@ -0,0 +1,48 @@
+import sqlite3
+
+import database
+from query_cache import QueryCache, tables_in
+
+PATIENTS = "SELECT RTRIM(name) FROM Patient WHERE patient_id = ?"
+
+
+def test_write_drops_only_entries_of_its_tables():
+    cache = QueryCache()
+    cache.put("patients", [1], {"patient"}, cache.generation({"patient"}))
+    cache.put("bills", [2], {"bill", "appointment"}, cache.generation({"bill", "appointment"}))
+    cache.invalidate(tables_in("UPDATE Appointment SET appointment_status = 1"))
+    assert cache.get("patients") == [1] and cache.get("bills") is None
+
+
+def test_read_that_raced_a_write_is_not_stored():
+    cache = QueryCache()
+    generation = cache.generation({"patient"})
+    cache.invalidate({"patient"})
+    cache.put("patients", [1], {"patient"}, generation)
+    assert cache.get("patients") is None
+
+
+def test_expired_and_least_recent_entries_go():
+    cache = QueryCache(max_entries=2, ttl=-1)
+    cache.put("a", [1], set(), ())
+    assert cache.get("a") is None
+    cache = QueryCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, [key], set(), ())
+    cache.get("a")
+    cache.put("c", ["c"], set(), ())
+    assert cache.get("b") is None and cache.get("a") == ["a"] and cache.stats()["evictions"] == 1
+
+
+def test_execute_query_serves_reads_until_a_write_to_their_table(clinic):
+    assert database.execute_query(PATIENTS, (1,), fetch=True) == [("Sara Malik",)]
+    # Changed behind the cache's back: the cached rows are still served
+    conn = sqlite3.connect(clinic)
+    conn.execute("UPDATE Patient SET name = 'Sara Khan'")
+    conn.commit()
+    conn.close()
+    assert database.execute_query(PATIENTS, (1,), fetch=True) == [("Sara Malik",)]
+    database.execute_query("UPDATE Ophthalmologist SET clinicname = 'Eye Care'")
+    assert database.execute_query(PATIENTS, (1,), fetch=True) == [("Sara Malik",)]
+    database.execute_query("UPDATE Patient SET phonenumber = 5 WHERE patient_id = 1")
+    assert database.execute_query(PATIENTS, (1,), fetch=True) == [("Sara Khan",)]
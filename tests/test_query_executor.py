@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+QtCore = pytest.importorskip("PyQt6.QtCore")
+
+from query_executor import QueryExecutor
+
+
+@pytest.fixture
+def app(qapp):
+    return qapp
+
+
+def wait(executor, key, timeout=5):
+    deadline = time.monotonic() + timeout
+    while executor.is_pending(key) and time.monotonic() < deadline:
+        QtCore.QCoreApplication.processEvents()
+        time.sleep(0.01)
+
+
+def test_cancel_all_drops_loads(app):
+    executor = QueryExecutor()
+    results = []
+    executor.run("load", time.sleep, (0.05,), results.append)
+    executor.cancel_all()
+    executor.thread_pool.waitForDone()
+    QtCore.QCoreApplication.processEvents()
+    assert results == []
+
+
+def test_cancel_all_keeps_user_jobs(app):
+    executor = QueryExecutor()
+    results = []
+    executor.run("export", lambda: time.sleep(0.05) or "done", (), results.append, keep=True)
+    executor.cancel_all()
+    wait(executor, "export")
+    assert results == ["done"]
+    assert executor.idle()
+
+
+def test_cancel_still_stops_kept_jobs(app):
+    executor = QueryExecutor()
+    results = []
+    executor.run("export", lambda: "done", (), results.append, keep=True)
+    executor.cancel("export")
+    executor.thread_pool.waitForDone()
+    QtCore.QCoreApplication.processEvents()
+    assert results == []
+
+
+def test_work_runs_off_the_ui_thread(app):
+    executor = QueryExecutor()
+    results = []
+    executor.run("load", threading.get_ident, (), lambda worker: results.append((worker, threading.get_ident())))
+    wait(executor, "load")
+    (worker, callback), = results
+    assert worker != threading.get_ident() and callback == threading.get_ident()
+
+
+def test_resubmitting_a_key_hands_the_old_result_to_on_stale(app):
+    executor = QueryExecutor()
+    results, stale = [], []
+    executor.run("load", lambda: time.sleep(0.05) or "old", (), results.append, on_stale=stale.append)
+    executor.run("load", lambda: "new", (), results.append, on_stale=stale.append)
+    wait(executor, "load")
+    executor.thread_pool.waitForDone()
+    QtCore.QCoreApplication.processEvents()
+    assert results == ["new"] and stale == ["old"]
+
+
+def test_fetch_runs_the_query(app, clinic):
+    executor = QueryExecutor()
+    results = []
+    executor.fetch("patients", "SELECT RTRIM(name) FROM Patient", None, results.append)
+    wait(executor, "patients")
+    assert results == [[("Sara Malik",)]]
@@ -0,0 +1,35 @@
+import database
+from query_stats import QueryStats, payload_bytes, shape
+
+
+def test_shapes_group_statements_and_keep_no_parameters():
+    stats = QueryStats(slow_query_ms=50)
+    stats.record("SELECT *\n   FROM Patient WHERE email = ?", 10, rows=1, nbytes=20)
+    stats.record("SELECT * FROM Patient   WHERE email = ?", 80, rows=0, error=True)
+    snap = stats.snapshot()
+    (key, entry), = snap["shapes"].items()
+    assert key == "SELECT * FROM Patient WHERE email = ?"
+    assert (entry["count"], entry["errors"], entry["rows"], entry["bytes"]) == (2, 1, 1, 20)
+    assert [slow["ms"] for slow in snap["slow_queries"]] == [80]
+
+
+def test_percentiles_come_within_a_bucket_of_the_truth():
+    stats = QueryStats()
+    for ms in range(1, 101):
+        stats.record("SELECT 1", ms)
+    entry = stats.snapshot()["shapes"]["SELECT 1"]
+    assert 50 <= entry["p50_ms"] <= 50 * 1.1 and 95 <= entry["p95_ms"] <= 95 * 1.1
+    assert entry["max_ms"] == 100
+
+
+def test_payload_counts_text_by_length():
+    assert payload_bytes([("abc", 1, None), (b"xy", 2.5, "d")]) == 3 + 8 + 2 + 8 + 1
+
+
+def test_execute_query_records_its_statements(clinic):
+    database.query_stats.reset()
+    query = "SELECT RTRIM(name) FROM Patient WHERE patient_id = ?"
+    database.execute_query(query, (1,), fetch=True)
+    database.execute_query(query, (1,), fetch=True)
+    entry = database.query_stats.snapshot()["shapes"][shape(query)]
+    assert (entry["count"], entry["cache_hits"], entry["rows"]) == (1, 1, 1)
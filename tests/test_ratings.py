@@ -0,0 +1,57 @@
+import datetime
+import sqlite3
+
+import pytest
+
+import database
+import ratings
+import services
+
+OLD = (datetime.date.today() - datetime.timedelta(days=ratings.WINDOW_DAYS)).isoformat()
+
+
+def aggregates(db):
+    conn = sqlite3.connect(db)
+    rows = (conn.execute(f"SELECT ophthalmologist_id, {ratings.AGGREGATE_COLUMNS} FROM Ophthalmologist_Rating "
+                         "ORDER BY ophthalmologist_id").fetchall(),
+            conn.execute("SELECT ophthalmologist_id, rating_date, rating_count, rating_sum "
+                         "FROM Ophthalmologist_Rating_Day ORDER BY ophthalmologist_id, rating_date").fetchall())
+    conn.close()
+    return rows
+
+
+def rebuild(db):
+    conn = sqlite3.connect(db)
+    ratings.rebuild(conn)
+    conn.close()
+    database.result_cache.clear()
+
+
+def test_live_aggregates_match_a_rebuild(clinic):
+    for rating in (5, 4, 5):
+        services.submit_feedback(1, 1, rating, "Good")
+    live = aggregates(clinic)
+    assert live[0] == [(1, 3, 14, 0, 0, 0, 1, 2)]
+    rebuild(clinic)
+    assert aggregates(clinic) == live
+
+
+def test_window_leaves_out_older_feedback(clinic):
+    services.submit_feedback(1, 1, 4, "Good")
+    conn = sqlite3.connect(clinic)
+    # Just outside the window, written around the aggregates like an import
+    conn.execute("INSERT INTO Feedback(patient_id, ophthalmologist_id, rating, comments, feedback_date) "
+                 "VALUES(1, 1, 1, 'Slow', ?)", (OLD,))
+    conn.commit()
+    conn.close()
+    rebuild(clinic)
+    row = services.ophthalmologists()[0]
+    assert row[3:5] == (2, 5) and row[5:10] == (1, 0, 0, 1, 0)
+    assert row[10:] == (1, 4)
+    assert ratings.average(*row[3:5]) == 2.5 and ratings.average(*row[10:]) == 4.0
+
+
+def test_rating_out_of_range_is_refused(clinic):
+    with pytest.raises(services.ServiceError):
+        services.submit_feedback(1, 1, 6, "Great")
+    assert aggregates(clinic) == ([], [])
@@ -0,0 +1,64 @@
+import shutil
+import sqlite3
+
+import pytest
+
+import database
+import sqlite_standin
+
+NAME = "SELECT RTRIM(name) FROM Patient WHERE patient_id = 1"
+
+
+@pytest.fixture
+def replica(clinic, tmp_path):
+    # A copy of the primary that has not caught up with a rename yet
+    path = str(tmp_path / "replica.db")
+    shutil.copy(clinic, path)
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE Patient SET name = 'Sara Old' WHERE patient_id = 1")
+    conn.commit()
+    conn.close()
+    database.configure_replica(connect=lambda: sqlite_standin.connect(path))
+    yield path
+    database.configure_replica()
+
+
+def name(cache=False):
+    return database.execute_query(NAME, fetch=True, cache=cache)[0][0]
+
+
+def test_reads_go_to_the_replica(replica):
+    with database.session(database.Session()):
+        assert name() == "Sara Old"
+        assert name(cache=True) == "Sara Old"
+        with database.transaction() as tx:
+            tx.execute(NAME)
+            assert tx.fetchone()[0] == "Sara Malik"
+
+
+def test_a_session_reads_its_own_writes(replica):
+    writer, other = database.Session(), database.Session()
+    with database.session(writer):
+        assert database.execute_query("UPDATE Patient SET phonenumber = 5 WHERE patient_id = 1")
+        assert name() == "Sara Malik"
+    with database.session(other):
+        assert name() == "Sara Old"
+    writer.last_write -= database.READ_YOUR_WRITES
+    with database.session(writer):
+        assert name() == "Sara Old"
+
+
+def test_failed_write_does_not_pin_the_session(replica):
+    with database.session(database.Session()) as current:
+        assert not database.execute_query("UPDATE NoSuchTable SET x = 1")
+        assert current.last_write is None and name() == "Sara Old"
+
+
+def test_replica_failure_falls_back_to_the_primary(clinic, tmp_path):
+    # An empty database stands in for a replica that cannot answer
+    database.configure_replica(connect=lambda: sqlite_standin.connect(str(tmp_path / "empty.db")))
+    try:
+        with database.session(database.Session()):
+            assert name() == "Sara Malik"
+    finally:
+        database.configure_replica()
@@ -0,0 +1,73 @@
+import sqlite3
+import time
+import types
+
+import pytest
+
+pytest.importorskip("PyQt6.QtWidgets")
+
+from PyQt6.QtCore import QCoreApplication
+
+import row_versions
+import services
+from query_executor import QueryExecutor
+from table_models import PagedTable
+
+NAME = "ophthalmologist_appointments"
+
+
+def seed(db):
+    conn = sqlite3.connect(db)
+    conn.executemany("INSERT INTO Appointment(appointment_id, patient_id, ophthalmologist_id, appointment_date, "
+                     "appointment_time, appointment_status) VALUES(?, 1, 1, ?, ?, 0)",
+                     [(i, f"2030-01-0{i}", f"2030-01-0{i} 10:00:00") for i in range(1, 6)])
+    conn.commit()
+    conn.close()
+
+
+def write(db, *statements):
+    conn = sqlite3.connect(db)
+    for statement in statements:
+        conn.execute(statement)
+    conn.commit()
+    conn.close()
+
+
+def settle(executor, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not executor.idle() and time.monotonic() < deadline:
+        QCoreApplication.processEvents()
+        time.sleep(0.01)
+
+
+def test_changes_since_a_watermark(clinic):
+    seed(clinic)
+    mark = row_versions.watermark()
+    write(clinic, "UPDATE Appointment SET appointment_status = 1 WHERE appointment_id = 2",
+          "DELETE FROM Appointment WHERE appointment_id = 4")
+    new_mark, rows, deleted = row_versions.changes(services.pager(NAME), (1,), mark)
+    assert [row[0] for row in rows] == [2] and rows[0][4] == 1 and deleted == [4]
+    assert new_mark > mark
+    assert row_versions.changes(services.pager(NAME), (1,), new_mark)[1:] == ([], [])
+
+
+def test_refresh_patches_the_page_to_match_a_fresh_load(qapp, clinic):
+    seed(clinic)
+    window = types.SimpleNamespace(executor=QueryExecutor(), cursor_models=[])
+    table = PagedTable(window, services.pager(NAME, page_size=4), ["Id"], [lambda row: str(row[0])])
+    table.load((1,))
+    settle(window.executor)
+    assert [row[0] for row in table.model.rows] == [1, 2, 3, 4] and table.model.has_more
+    # The same filter again patches the page instead of reloading it
+    assert table.can_refresh()
+
+    write(clinic, "UPDATE Appointment SET appointment_status = 1 WHERE appointment_id = 3",
+          "DELETE FROM Appointment WHERE appointment_id = 2",
+          "INSERT INTO Appointment(appointment_id, patient_id, ophthalmologist_id, appointment_date, "
+          "appointment_time, appointment_status) VALUES(6, 1, 1, '2030-01-01', '2030-01-01 11:00:00', 0)")
+    table.load((1,))
+    settle(window.executor)
+    fresh, _ = services.fetch_page(NAME, (1,), page_size=4)
+    assert table.model.rows == fresh
+    assert [row[0] for row in fresh] == [1, 6, 3, 4] and table.model.rows[2][4] == 1
+    window.executor.shutdown()
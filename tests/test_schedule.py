@@ -0,0 +1,50 @@
+import datetime
+import sqlite3
+
+import availability
+import database
+import migrate
+import sqlite_standin
+
+DAY = datetime.date(2030, 5, 6)
+
+# (hour, minute, status): booked, approved, and one off the hour. A status
+# column that can hold a rejection comes with migration 011.
+APPOINTMENTS = [(10, 0, 0), (11, 0, 1), (13, 30, 1)]
+
+
+def seed(path):
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO Patient(patient_id, name, gender, date_of_birth, email, phonenumber, password) "
+                 "VALUES(1, 'Sara Malik', 'Female', '1990-01-01', 'sara@example.com', 1, 0)")
+    conn.execute("INSERT INTO Ophthalmologist(ophthalmologist_id, name, email, phonenumber, clinicname, "
+                 "clinicaddress, password) VALUES(1, 'Dr Omar Malik', 'omar@example.com', 2, 'Vision Care', "
+                 "'1 Main St', 0)")
+    conn.executemany("INSERT INTO Appointment(patient_id, ophthalmologist_id, appointment_date, appointment_time, "
+                     "appointment_status) VALUES(1, 1, ?, ?, ?)",
+                     [(DAY.isoformat(), f"{DAY} {hour:02d}:{minute:02d}:00", status)
+                      for hour, minute, status in APPOINTMENTS])
+    conn.commit()
+    return conn
+
+
+def mask(conn):
+    return conn.execute("SELECT slot_mask FROM Ophthalmologist_Schedule WHERE ophthalmologist_id = 1").fetchone()[0]
+
+
+def test_repair_frees_slots_held_by_the_backfill(tmp_path):
+    path = str(tmp_path / "clinic.db")
+    sqlite_standin.create_database(path)
+    conn = seed(path)
+    migrate.migrate(conn, "sqlite", 8)
+    # 002 marks the 13:30 as holding the 13:00 slot
+    assert mask(conn) == 0b1011
+    migrate.migrate(conn, "sqlite")
+    assert mask(conn) == 0b11
+    conn.close()
+
+    database.configure_pool(connect=lambda: sqlite_standin.connect(path))
+    try:
+        assert 3 in availability.load_availability(1, DAY, 1)[DAY]
+    finally:
+        database.close_pool()
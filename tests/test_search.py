@@ -0,0 +1,70 @@
+import sqlite3
+
+import pytest
+
+import database
+import search
+import services
+import sqlite_standin
+
+RECORDS = [
+    # (record_id, ophthalmologist_id, diagnosis, prescription, treatment)
+    (1, 1, "Glaucoma", "Latanoprost", "Drops every night"),
+    (2, 1, "Cataract", "None", "Glaucoma screening next year"),
+    (3, 1, "Dry eye", "Artificial tears", "Warm compress"),
+    (4, 2, "Glaucoma", "Timolol", "Drops twice a day"),
+]
+
+
+@pytest.fixture
+def records(clinic):
+    conn = sqlite3.connect(clinic)
+    conn.execute("INSERT INTO Ophthalmologist(ophthalmologist_id, name, email, phonenumber, clinicname, "
+                 "clinicaddress, password) VALUES(2, 'Dr Aisha Khan', 'aisha@example.com', 3, 'Clear Sight', "
+                 "'2 Main St', 0)")
+    conn.execute("INSERT INTO Appointment(appointment_id, patient_id, ophthalmologist_id, appointment_date, "
+                 "appointment_time, appointment_status) VALUES(1, 1, 1, '2030-01-01', '2030-01-01 10:00:00', 1)")
+    conn.commit()
+    conn.close()
+    with database.transaction() as tx:
+        for record_id, ophth_id, diagnosis, prescription, treatment in RECORDS:
+            tx.execute("INSERT INTO Patient_Record(record_id, patient_id, ophthalmologist_id, appointment_id, "
+                       "record_date, diagnosis, prescription, treatment_details) VALUES(?,1,?,1,'2030-01-01',?,?,?)",
+                       (record_id, ophth_id, diagnosis, prescription, treatment))
+            search.index_record(tx, record_id, ophth_id, diagnosis, prescription, treatment)
+    return clinic
+
+
+def found(text, ophth_id=1):
+    rows, total = search.search(ophth_id, text)
+    return [row[0] for row in rows], total
+
+
+def test_diagnosis_match_ranks_above_a_mention_in_the_notes(records):
+    assert found("glaucoma") == ([1, 2], 2)
+    assert found("glaucoma", 2) == ([4], 1)
+
+
+def test_every_word_must_match_and_long_words_match_as_prefixes(records):
+    assert found("Glaucoma latanoprost") == ([1], 1)
+    assert found("latano") == ([1], 1)
+    assert found("glaucoma tears") == ([], 0)
+    assert found("the of") == ([], 0)
+    with pytest.raises(services.ServiceError):
+        services.search_records(1, "the of")
+
+
+def test_rebuild_indexes_records_written_before_the_index(records):
+    conn = sqlite3.connect(records)
+    conn.execute("INSERT INTO Patient_Record(record_id, patient_id, ophthalmologist_id, appointment_id, record_date, "
+                 "diagnosis, prescription, treatment_details) VALUES(5, 1, 1, 1, '2030-01-02', 'Keratoconus', "
+                 "'', 'Cross-linking')")
+    conn.commit()
+    conn.close()
+    assert found("keratoconus") == ([], 0)
+    conn = sqlite_standin.connect(records)
+    assert search.rebuild(conn, chunk=2) == 5
+    conn.close()
+    # rebuild writes on its own connection, past the result cache
+    database.result_cache.clear()
+    assert found("keratoconus") == ([5], 1) and found("glaucoma") == ([1, 2], 2)
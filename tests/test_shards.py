@@ -0,0 +1,71 @@
+import datetime
+import sqlite3
+
+import pytest
+
+import availability
+import database
+import services
+import shards
+import sqlite_standin
+
+DAY = datetime.date.today() + datetime.timedelta(days=7)
+
+
+@pytest.fixture
+def sharded(clinic, tmp_path):
+    # Sara has two appointments with Dr Omar Malik (Vision Care) and one
+    # with Dr Lina Aziz (Bright Eyes); each clinic gets a database of its own
+    conn = sqlite3.connect(clinic)
+    conn.execute("INSERT INTO Ophthalmologist(ophthalmologist_id, name, email, phonenumber, clinicname, "
+                 "clinicaddress, password) VALUES(2, 'Dr Lina Aziz', 'lina@example.com', 3, 'Bright Eyes', "
+                 "'2 Side St', 0)")
+    for ophth_id, days in ((1, 1), (2, 2), (1, 3)):
+        day = DAY + datetime.timedelta(days=days)
+        conn.execute("INSERT INTO Appointment(patient_id, ophthalmologist_id, appointment_date, appointment_time, "
+                     "appointment_status) VALUES(1, ?, ?, ?, 0)", (ophth_id, day.isoformat(), f"{day} 10:00:00"))
+    conn.commit()
+    conn.close()
+    directory, split = shards.split_sqlite(clinic, str(tmp_path / "shards"))
+    database.close_pool()
+    database.configure_pool(connect=lambda: sqlite_standin.connect(directory))
+    database.result_cache.clear()
+    shards.configure([shards.Shard(name, clinics, lambda path=path: sqlite_standin.connect(path), id_base)
+                      for name, clinics, path, id_base in split])
+    yield split
+    shards.close()
+
+
+def ids(path):
+    conn = sqlite3.connect(path)
+    rows = [row[0] for row in conn.execute("SELECT appointment_id FROM Appointment ORDER BY appointment_id")]
+    conn.close()
+    return rows
+
+
+def test_split_gives_each_clinic_its_own_id_range(sharded):
+    (bright, _, bright_path, bright_base), (vision, _, vision_path, vision_base) = sharded
+    assert ids(bright_path) == [bright_base + 2]
+    assert ids(vision_path) == [vision_base + 1, vision_base + 3]
+    shard_map = shards.get_map()
+    assert shard_map.for_ophthalmologist(1).name == vision and shard_map.for_ophthalmologist(2).name == bright
+    assert shard_map.for_id(vision_base + 3).name == vision and shard_map.for_id(bright_base + 2).name == bright
+    assert [len(group) for group in shards.group_ids([vision_base + 1, bright_base + 2, vision_base + 3])] == [2, 1]
+
+
+def test_new_rows_are_numbered_in_their_clinics_range(sharded):
+    vision_base = sharded[1][3]
+    with shards.by_ophthalmologist(1):
+        assert availability.book_slot(1, 1, DAY, 0)
+    assert ids(sharded[1][2])[-1] > vision_base + 3
+    assert sorted(row[0] for row in services.patient_appointments(1, 1)) == ids(sharded[1][2])
+
+
+def test_patient_lists_merge_every_clinic(sharded):
+    rows, after = services.fetch_page("patient_appointments", (1,), page_size=2)
+    rest, last = services.fetch_page("patient_appointments", (1,), after, page_size=2)
+    assert last is None
+    # Newest first across both clinics
+    assert [row[3] for row in rows + rest] == ["Dr Omar Malik", "Dr Lina Aziz", "Dr Omar Malik"]
+    assert services.patient_dashboard(1)["pending"] == 3
+    assert services.ophthalmologist_dashboard(2)["pending"] == 1
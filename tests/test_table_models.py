@@ -0,0 +1,50 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("PyQt6.QtCore")
+
+from PyQt6.QtCore import Qt
+
+from table_models import CursorTableModel
+
+QUERY = "SELECT patient_id, RTRIM(name) FROM Patient ORDER BY patient_id"
+
+
+@pytest.fixture
+def patients(db):
+    conn = sqlite3.connect(db)
+    conn.executemany("INSERT INTO Patient(patient_id, name, gender, date_of_birth, email, phonenumber, password) "
+                     "VALUES(?, ?, 'Other', '1990-01-01', ?, ?, 0)",
+                     [(i, f"Patient {i}", f"p{i}@example.com", i) for i in range(1, 251)])
+    conn.commit()
+    conn.close()
+    return db
+
+
+def model():
+    return CursorTableModel(["Id", "Name"], [lambda row: str(row[0]), lambda row: row[1]])
+
+
+def test_rows_are_read_in_batches_as_the_view_asks(patients):
+    table = model()
+    table.set_source(CursorTableModel.open_source(QUERY, None, cache=False))
+    assert table.rowCount() == 100 and table.canFetchMore() and not table.complete
+    table.fetchMore()
+    assert table.rowCount() == 200
+    table.fetch_all()
+    assert table.rowCount() == 250 and table.complete and not table.canFetchMore()
+    assert table.data(table.index(249, 1), Qt.ItemDataRole.DisplayRole) == "Patient 250"
+
+
+def test_limit_stops_reading_and_records_more_rows(patients):
+    table = model()
+    table.set_source(CursorTableModel.open_source(QUERY, None, cache=False), limit=150)
+    table.fetch_all()
+    assert table.rowCount() == 150 and table.has_more and table.cursor is None
+
+
+def test_short_result_closes_the_cursor_at_once(patients):
+    table = model()
+    table.set_source(CursorTableModel.open_source(QUERY.replace("ORDER", "WHERE patient_id <= 3 ORDER"), None))
+    assert table.rowCount() == 3 and table.complete and not table.canFetchMore()